@@ -1,14 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import Annotated
-from app.database import get_db
+from typing import Annotated, AsyncIterator, Union
+from app.database import get_db, get_async_db
 from app.services.behavior_engine import BehaviorEngine
 from app.services.simulation import SimulationService
 from app.services.categorization import CategorizationService
-from app.services.insight_formatter_v2 import InsightFormatter
+from app.services.analytics_context import UserAnalyticsContext
+from app.services.health_score_cache import etag_matches
+from app.services.insight_formatter_v2 import InsightFormatter, get_model_income_stats
 from app.services.simulations.refinement import RefinementService
 from app.schemas.simulation_schemas import (
     BehaviourModelResponse, SimulationRequest, SimulationResponse,
+    BatchSimulationRequest, BatchSimulationResponse,
     ScenarioComparisonRequest, ScenarioComparisonResponse,
     ReallocationRequest, ReallocationResponse,
     ProjectionRequest, ProjectionResponse
@@ -20,11 +26,13 @@ from app.schemas.insights import (
 from app.schemas.transaction_schemas import (
     TransactionCreate, TransactionResponse
 )
+from app.models.behaviour import BehaviourModel
 from app.models.transactions import Transaction
 from app.models.user import User
-from app.oauth2 import get_current_user
+from app.oauth2 import get_current_user, get_current_user_async
 from datetime import datetime, timedelta
 import statistics
+import json
 import os
 
 router = APIRouter(tags=["Simulation & Behavior"])
@@ -51,9 +59,12 @@ def verify_user_access(user_id: int, current_user: User):
 
 def get_user_behavior_model(db: Session, user_id: int):
     """Get behavior model for user or raise 404."""
-    from app.models.behaviour import BehaviourModel
-    
     model = db.query(BehaviourModel).filter_by(user_id=user_id).first()
+    return require_behavior_model(model, user_id)
+
+
+def require_behavior_model(model, user_id: int):
+    """The behavior model, or a 404 when the user has none yet."""
     if not model:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -62,6 +73,59 @@ def get_user_behavior_model(db: Session, user_id: int):
     return model
 
 
+def get_analytics_context(
+    user_id: int,
+    current_user: Annotated[User, Depends(get_current_user)],
+    db: Session = Depends(get_db)
+) -> UserAnalyticsContext:
+    """Request-scoped UserAnalyticsContext for routes on the sync session (access checked first)."""
+    verify_user_access(user_id, current_user)
+    return UserAnalyticsContext.load(db, current_user)
+
+
+async def get_analytics_context_async(
+    user_id: int,
+    current_user: Annotated[User, Depends(get_current_user_async)],
+    db: AsyncSession = Depends(get_async_db)
+) -> UserAnalyticsContext:
+    """Same as get_analytics_context on the AsyncSession."""
+    verify_user_access(user_id, current_user)
+    return await db.run_sync(UserAnalyticsContext.load, current_user)
+
+
+def _sse(event: str, data) -> str:
+    """One server-sent event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _refined_insight_events(
+    result_event: str,
+    result: Union[SimulationResponse, ScenarioComparisonResponse]
+) -> AsyncIterator[str]:
+    """
+    SSE stream for the refined endpoints: the simulation result first, then the
+    insight as `token` deltas, then `done` with the full text (or `error`).
+    """
+    yield _sse(result_event, result.model_dump(mode="json"))
+    parts = []
+    try:
+        async for delta in refinement_service.stream_insight(result):
+            parts.append(delta)
+            yield _sse("token", delta)
+    except Exception as e:
+        yield _sse("error", {"detail": f"Insight generation failed: {str(e)}"})
+        return
+    yield _sse("done", {"refined_insight": "".join(parts)})
+
+
+def _event_stream_response(events: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 def _get_volatility_level(volatility: float) -> str:
     """Categorize income volatility level."""
     if volatility > 0.4:
@@ -110,38 +174,27 @@ def _build_income_analysis(income_stats: dict) -> dict:
     }
 
 
-def get_income_stats(db: Session, user_id: int) -> dict | None:
-    """
-    Calculate income statistics from behavior model.
-    
-    Returns income volatility, averages, and patterns for the last 6 months.
-    """
-    from app.models.behaviour import BehaviourModel
-    
-    model = db.query(BehaviourModel).filter_by(user_id=user_id).first()
-    
-    if not model or not model.monthly_patterns:
-        return None
-    
-    income_stats = model.monthly_patterns.get('income_stats')
-    
-    # If income_stats exists and has meaningful data, return it
-    if income_stats and income_stats.get('transaction_count', 0) > 0:
-        return income_stats
-    
-    return None
+def refresh_dashboard_insights(db: Session, user_id: int) -> tuple[str, str]:
+    """Rebuild and store a missing or stale insight bundle; returns (etag, body)."""
+    model = get_user_behavior_model(db, user_id)
+    behavior_engine.store_insights(model)
+    etag, body = model.insights_etag, model.insights
+    db.commit()
+    return etag, body
 
 
 @router.get(
     "/users/{user_id}/insights/dashboard",
     response_model=DashboardInsightResponse,
     summary="Get dashboard insights",
-    description="Get personalized dashboard with quick wins, warnings, and behavior summary"
+    description="Get personalized dashboard with quick wins, warnings, and behavior summary",
+    responses={304: {"description": "Insights unchanged since the ETag sent in If-None-Match"}}
 )
 async def get_dashboard_insights(
     user_id: int,
-    current_user: Annotated[User, Depends(get_current_user)],
-    db: Session = Depends(get_db)
+    request: Request,
+    current_user: Annotated[User, Depends(get_current_user_async)],
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get complete dashboard insights for frontend display.
@@ -153,39 +206,35 @@ async def get_dashboard_insights(
     - **Recommended actions**: Prioritized next steps
     
     Perfect for the main dashboard screen in your Flutter app.
+    
+    The bundle is precomputed whenever the behavior model changes (see
+    BehaviorEngine.refresh_insights) and served as stored; send the returned
+    ETag as If-None-Match to get a 304 while the model is unchanged.
     """
     verify_user_access(user_id, current_user)
-    model = get_user_behavior_model(db, user_id)
-    income_stats = get_income_stats(db, user_id)
-    
-    # Format insights
-    behavior_summary = insight_formatter.format_behavior_summary(model, income_stats)
-    quick_wins = insight_formatter.get_quick_wins(model)
-    risk_warnings = insight_formatter.get_risk_warnings(model, income_stats)
-    
-    # Generate recommended actions
-    recommended_actions = []
-    if quick_wins:
-        top_win = quick_wins[0]
-        recommended_actions.append(
-            f"Start with {top_win.category}: {top_win.action} to save ${top_win.monthly_savings:.0f}/month"
+    row = (await db.execute(
+        select(
+            BehaviourModel.version,
+            BehaviourModel.insights_version,
+            BehaviourModel.insights_etag,
+            BehaviourModel.insights
+        ).where(BehaviourModel.user_id == user_id)
+    )).first()
+    if row is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No behavior model found for user {user_id}"
         )
     
-    if any(w.severity == 'high' for w in risk_warnings):
-        recommended_actions.append("Review high-priority warnings before making changes")
-    
-    if model.transaction_count < 50:
-        recommended_actions.append("Continue tracking transactions for better personalization")
+    etag, body = row.insights_etag, row.insights
+    if body is None or row.insights_version != row.version:
+        # Models not updated since the bundle was introduced, or a failed build
+        etag, body = await db.run_sync(refresh_dashboard_insights, user_id)
     
-    if not recommended_actions:
-        recommended_actions.append("Explore scenario comparisons to find savings opportunities")
-    
-    return DashboardInsightResponse(
-        behavior_summary=behavior_summary,
-        quick_wins=quick_wins,
-        risk_warnings=risk_warnings,
-        recommended_actions=recommended_actions
-    )
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 @router.get(
@@ -196,15 +245,12 @@ async def get_dashboard_insights(
 )
 async def get_behavior_summary(
     user_id: int,
-    current_user: Annotated[User, Depends(get_current_user)],
-    db: Session = Depends(get_db)
+    context: Annotated[UserAnalyticsContext, Depends(get_analytics_context_async)]
 ):
     """Get detailed behavior summary for the user."""
-    verify_user_access(user_id, current_user)
-    model = get_user_behavior_model(db, user_id)
-    income_stats = get_income_stats(db, user_id)
+    model = require_behavior_model(context.model, user_id)
     
-    behavior_summary = insight_formatter.format_behavior_summary(model, income_stats)
+    behavior_summary = insight_formatter.format_behavior_summary(model, context.income_stats)
     return BehaviorSummaryResponse(behavior_summary=behavior_summary)
 
 
@@ -217,12 +263,10 @@ async def get_behavior_summary(
 )
 async def get_behavior_model(
     user_id: int,
-    current_user: Annotated[User, Depends(get_current_user)],
-    db: Session = Depends(get_db)
+    context: Annotated[UserAnalyticsContext, Depends(get_analytics_context_async)]
 ):
     """Get the behavior model for a specific user"""
-    verify_user_access(user_id, current_user)
-    return get_user_behavior_model(db, user_id)
+    return require_behavior_model(context.model, user_id)
 
 
 @router.post(
@@ -234,7 +278,7 @@ async def get_behavior_model(
 async def simulate_spending(
     user_id: int,
     request: SimulationRequest,
-    current_user: Annotated[User, Depends(get_current_user)],
+    context: Annotated[UserAnalyticsContext, Depends(get_analytics_context)],
     db: Session = Depends(get_db)
 ):
     """
@@ -252,8 +296,6 @@ async def simulate_spending(
     - Feasibility assessment
     - Projected monthly and annual impact
     """
-    verify_user_access(user_id, current_user)
-    
     try:
         result = simulation_service.simulate_spending_scenario(
             db=db,
@@ -261,7 +303,8 @@ async def simulate_spending(
             scenario_type=request.scenario_type,
             target_percent=request.target_percent,
             time_period_days=request.time_period_days,
-            target_categories=request.target_categories
+            target_categories=request.target_categories,
+            context=context
         )
         return result
         
@@ -277,6 +320,57 @@ async def simulate_spending(
         )
 
 
+@router.post(
+    "/users/{user_id}/simulate/batch",
+    response_model=BatchSimulationResponse,
+    summary="Simulate many spending scenarios at once",
+    description="Evaluate a vector of target percents and category sets against one loaded model and baseline"
+)
+def simulate_spending_batch(
+    user_id: int,
+    request: BatchSimulationRequest,
+    context: Annotated[UserAnalyticsContext, Depends(get_analytics_context)],
+    db: Session = Depends(get_db)
+):
+    """
+    Simulate up to 100 scenarios in one call (e.g. every stop of a "what if" slider).
+    
+    The behaviour model and spending baseline are loaded once and all
+    scenarios are evaluated together. Results are returned in request order,
+    each with the same fields as `/simulate`.
+    
+    A plain function so FastAPI runs the synchronous session work in its
+    threadpool rather than on the event loop.
+    """
+    try:
+        results = simulation_service.simulate_batch(
+            db=db,
+            user_id=user_id,
+            scenario_type=request.scenario_type,
+            target_percents=[scenario.target_percent for scenario in request.scenarios],
+            target_categories=[scenario.target_categories for scenario in request.scenarios],
+            time_period_days=request.time_period_days,
+            context=context
+        )
+        return BatchSimulationResponse(
+            scenario_type=request.scenario_type,
+            baseline_monthly=results[0].baseline_monthly,
+            time_period_days=request.time_period_days,
+            results=results
+        )
+        
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Batch simulation failed: {str(e)}"
+        )
+
+
 @router.post(
     "/users/{user_id}/simulate/refined",
     summary="Simulate spending with AI-refined markdown insight",
@@ -285,7 +379,7 @@ async def simulate_spending(
 async def simulate_spending_refined(
     user_id: int,
     request: SimulationRequest,
-    current_user: Annotated[User, Depends(get_current_user)],
+    context: Annotated[UserAnalyticsContext, Depends(get_analytics_context)],
     db: Session = Depends(get_db)
 ):
     """
@@ -296,8 +390,6 @@ async def simulate_spending_refined(
     - AI-generated 2-4 sentence insight in markdown format
     - Concise, actionable summary perfect for mobile display
     """
-    verify_user_access(user_id, current_user)
-    
     try:
         # Run simulation
         simulation_result = simulation_service.simulate_spending_scenario(
@@ -306,7 +398,8 @@ async def simulate_spending_refined(
             scenario_type=request.scenario_type,
             target_percent=request.target_percent,
             time_period_days=request.time_period_days,
-            target_categories=request.target_categories
+            target_categories=request.target_categories,
+            context=context
         )
         
         # Generate refined insight using Gemini
@@ -329,6 +422,53 @@ async def simulate_spending_refined(
         )
 
 
+@router.post(
+    "/users/{user_id}/simulate/refined/stream",
+    summary="Stream spending simulation with AI-refined insight (SSE)",
+    description="Server-sent events: the simulation result, then the insight as it is generated"
+)
+async def simulate_spending_refined_stream(
+    user_id: int,
+    request: SimulationRequest,
+    context: Annotated[UserAnalyticsContext, Depends(get_analytics_context)],
+    db: Session = Depends(get_db)
+):
+    """
+    Streaming variant of `/simulate/refined` (text/event-stream).
+    
+    Events:
+    - `simulation`: the complete simulation result (sent immediately)
+    - `token`: the next piece of the markdown insight
+    - `done`: `{"refined_insight": ...}` with the full text
+    - `error`: insight generation failed after the stream started
+    
+    Insights are cached per simulation payload, so a repeat view arrives as a
+    single `token` event.
+    """
+    try:
+        simulation_result = simulation_service.simulate_spending_scenario(
+            db=db,
+            user_id=user_id,
+            scenario_type=request.scenario_type,
+            target_percent=request.target_percent,
+            time_period_days=request.time_period_days,
+            target_categories=request.target_categories,
+            context=context
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Simulation failed: {str(e)}"
+        )
+    
+    return _event_stream_response(_refined_insight_events("simulation", simulation_result))
+
+
 @router.post(
     "/users/{user_id}/simulate/enhanced",
     response_model=ScenarioInsight,
@@ -338,7 +478,7 @@ async def simulate_spending_refined(
 async def simulate_spending_enhanced(
     user_id: int,
     request: SimulationRequest,
-    current_user: Annotated[User, Depends(get_current_user)],
+    context: Annotated[UserAnalyticsContext, Depends(get_analytics_context)],
     db: Session = Depends(get_db)
 ):
     """
@@ -354,8 +494,6 @@ async def simulate_spending_enhanced(
     
     Perfect for displaying actionable insights in your Flutter app.
     """
-    verify_user_access(user_id, current_user)
-    
     try:
         # Run simulation
         simulation_result = simulation_service.simulate_spending_scenario(
@@ -364,13 +502,10 @@ async def simulate_spending_enhanced(
             scenario_type=request.scenario_type,
             target_percent=request.target_percent,
             time_period_days=request.time_period_days,
-            target_categories=request.target_categories
+            target_categories=request.target_categories,
+            context=context
         )
         
-        # Get user model and income stats for context
-        model = get_user_behavior_model(db, user_id)
-        income_stats = get_income_stats(db, user_id)
-        
         # Format for frontend
         # Convert Pydantic model to dict recursively (handles nested models)
         # Use model_dump() for Pydantic v2 which recursively converts nested models
@@ -394,8 +529,8 @@ async def simulate_spending_enhanced(
         
         enhanced_result = insight_formatter.format_scenario_summary(
             simulation_dict,
-            model,
-            income_stats
+            context.model,
+            context.income_stats
         )
         
         return enhanced_result
@@ -422,7 +557,7 @@ async def simulate_spending_enhanced(
 async def compare_scenarios(
     user_id: int,
     request: ScenarioComparisonRequest,
-    current_user: Annotated[User, Depends(get_current_user)],
+    context: Annotated[UserAnalyticsContext, Depends(get_analytics_context)],
     db: Session = Depends(get_db)
 ):
     """
@@ -435,15 +570,14 @@ async def compare_scenarios(
     - Visual comparison data for charts
     - Key insights to help decision-making
     """
-    verify_user_access(user_id, current_user)
-    
     try:
         result = simulation_service.compare_scenarios(
             db=db,
             user_id=user_id,
             scenario_type=request.scenario_type,
             time_period_days=request.time_period_days,
-            num_scenarios=request.num_scenarios
+            num_scenarios=request.num_scenarios,
+            context=context
         )
         return result
         
@@ -467,7 +601,7 @@ async def compare_scenarios(
 async def compare_scenarios_refined(
     user_id: int,
     request: ScenarioComparisonRequest,
-    current_user: Annotated[User, Depends(get_current_user)],
+    context: Annotated[UserAnalyticsContext, Depends(get_analytics_context)],
     db: Session = Depends(get_db)
 ):
     """
@@ -478,8 +612,6 @@ async def compare_scenarios_refined(
     - AI-generated 2-4 sentence insight in markdown format
     - Concise summary comparing scenarios and highlighting recommendations
     """
-    verify_user_access(user_id, current_user)
-    
     try:
         # Run comparison
         comparison_result = simulation_service.compare_scenarios(
@@ -487,7 +619,8 @@ async def compare_scenarios_refined(
             user_id=user_id,
             scenario_type=request.scenario_type,
             time_period_days=request.time_period_days,
-            num_scenarios=request.num_scenarios
+            num_scenarios=request.num_scenarios,
+            context=context
         )
         
         # Generate refined insight using Gemini
@@ -510,6 +643,46 @@ async def compare_scenarios_refined(
         )
 
 
+@router.post(
+    "/users/{user_id}/simulate/compare/refined/stream",
+    summary="Stream scenario comparison with AI-refined insight (SSE)",
+    description="Server-sent events: the comparison result, then the insight as it is generated"
+)
+async def compare_scenarios_refined_stream(
+    user_id: int,
+    request: ScenarioComparisonRequest,
+    context: Annotated[UserAnalyticsContext, Depends(get_analytics_context)],
+    db: Session = Depends(get_db)
+):
+    """
+    Streaming variant of `/simulate/compare/refined` (text/event-stream).
+    
+    Events are the same as `/simulate/refined/stream`, with `comparison`
+    carrying the complete comparison result.
+    """
+    try:
+        comparison_result = simulation_service.compare_scenarios(
+            db=db,
+            user_id=user_id,
+            scenario_type=request.scenario_type,
+            time_period_days=request.time_period_days,
+            num_scenarios=request.num_scenarios,
+            context=context
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Scenario comparison failed: {str(e)}"
+        )
+    
+    return _event_stream_response(_refined_insight_events("comparison", comparison_result))
+
+
 @router.post(
     "/users/{user_id}/simulate/compare/enhanced",
     response_model=ComparisonInsightResponse,
@@ -519,7 +692,7 @@ async def compare_scenarios_refined(
 async def compare_scenarios_enhanced(
     user_id: int,
     request: ScenarioComparisonRequest,
-    current_user: Annotated[User, Depends(get_current_user)],
+    context: Annotated[UserAnalyticsContext, Depends(get_analytics_context)],
     db: Session = Depends(get_db)
 ):
     """
@@ -533,8 +706,6 @@ async def compare_scenarios_enhanced(
     
     Perfect for helping users choose between multiple options in your Flutter app.
     """
-    verify_user_access(user_id, current_user)
-    
     try:
         # Run comparison
         comparison_result = simulation_service.compare_scenarios(
@@ -542,7 +713,8 @@ async def compare_scenarios_enhanced(
             user_id=user_id,
             scenario_type=request.scenario_type,
             time_period_days=request.time_period_days,
-            num_scenarios=request.num_scenarios
+            num_scenarios=request.num_scenarios,
+            context=context
         )
         
         # Format for frontend
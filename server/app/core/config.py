@@ -11,6 +11,12 @@ class Settings(BaseSettings):
     access_token_expire_minutes: int
     gemini_api_key: str
     
+    # Database connection pool (per engine, per process)
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: int = 30
+    db_pool_recycle: int = 1800
+    
     # Redis configuration (can use REDIS_URL or individual components)
     redis_host: str = "redis"
     redis_port: int = 6379
@@ -28,6 +34,36 @@ class Settings(BaseSettings):
     # Worker configuration
     default_user_id: int = 1
     
+    # Country code assumed for phone numbers stored without one
+    default_phone_country_code: str = "91"
+    
+    # OCR media queue configuration
+    ocr_queue_name: str = "ocr-media-jobs"
+    ocr_global_concurrency: int = 8
+    ocr_user_concurrency: int = 2
+    ocr_worker_concurrency: int = 4
+    
+    # Statement import configuration
+    statement_import_workers: int = 4
+    
+    # Health score snapshot cache (seconds); entries are keyed on users.data_version
+    health_score_cache_ttl: int = 3600
+    
+    # Daily health score snapshot job
+    health_score_snapshot_workers: int = 4
+    
+    # Nightly bulk simulation insight job
+    simulation_insight_workers: int = 4
+    
+    # Monte Carlo cash-flow projections (simulated paths per request)
+    monte_carlo_paths: int = 2000
+    
+    # Simulation spending baselines cache (seconds); entries are keyed on users.data_version
+    simulation_baseline_cache_ttl: int = 300
+    
+    # Refined (LLM) simulation insights cache (seconds); entries are keyed on a hash of the simulation payload
+    refinement_cache_ttl: int = 7 * 24 * 3600
+    
     # Twilio configuration (optional - defaults to empty strings if not configured)
     twilio_account_sid: str = ""
     twilio_auth_token: str = ""
@@ -0,0 +1,76 @@
+"""
+Process-wide Gemini clients.
+
+The HTTP client, provider, model and pydantic_ai agents are created lazily on first
+use and shared by every request, so connections are pooled instead of being set up
+per call. close_llm_clients() is called on application shutdown.
+"""
+import threading
+from typing import Dict, Optional
+
+import httpx
+from pydantic_ai import Agent
+from pydantic_ai.models.google import GoogleModel
+from pydantic_ai.providers.google import GoogleProvider
+
+from app.core.config import settings
+
+GEMINI_MODEL_NAME = "gemini-2.5-flash"
+
+_lock = threading.Lock()
+_http_client: Optional[httpx.AsyncClient] = None
+_model: Optional[GoogleModel] = None
+_agents: Dict[str, Agent] = {}
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Shared HTTP client used for all Gemini calls."""
+    global _http_client
+    with _lock:
+        if _http_client is None or _http_client.is_closed:
+            _http_client = httpx.AsyncClient(
+                timeout=httpx.Timeout(60.0, connect=10.0),
+                limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+            )
+        return _http_client
+
+
+def get_gemini_model() -> GoogleModel:
+    """Shared Gemini model (and provider) bound to the shared HTTP client."""
+    global _model
+    if _model is None:
+        http_client = get_http_client()
+        with _lock:
+            if _model is None:
+                provider = GoogleProvider(api_key=settings.gemini_api_key, http_client=http_client)
+                _model = GoogleModel(GEMINI_MODEL_NAME, provider=provider)
+    return _model
+
+
+def get_agent(name: str, output_type, system_prompt: str) -> Agent:
+    """
+    Return the agent registered under `name`, creating it on first use.
+
+    Agents are stateless between runs, so one instance can serve concurrent requests.
+    """
+    agent = _agents.get(name)
+    if agent is None:
+        model = get_gemini_model()
+        with _lock:
+            agent = _agents.get(name)
+            if agent is None:
+                agent = Agent(model=model, output_type=output_type, system_prompt=system_prompt)
+                _agents[name] = agent
+    return agent
+
+
+async def close_llm_clients() -> None:
+    """Close the shared HTTP client and drop cached agents (called on shutdown)."""
+    global _http_client, _model
+    with _lock:
+        client = _http_client
+        _http_client = None
+        _model = None
+        _agents.clear()
+    if client is not None and not client.is_closed:
+        await client.aclose()
@@ -1,11 +1,17 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from app.database import engine, Base
 from app.routers import user_router, transactions_router, email_transactions, email_config_router, ocr_router, goal_router, lean_week_router, twilio_webhook, gamification_router, health_score_router
 from app.api import simulation_routes
 from app.core.config import settings
+from app.core.llm import close_llm_clients
+from app.services.statement_parser import shutdown_statement_pool
 
 from app.models.user import User
 from app.models.transactions import Transaction
+from app.models.cash_flow_rollup import CashFlowRollup
+from app.models.health_score_snapshot import HealthScoreSnapshot
+from app.models.simulation_insight import SimulationInsight
 from app.models.behaviour import BehaviourModel
 from app.models.goal import Goal, GoalContribution
 from app.models.gamification import GamificationEvent, UserPoints, UserStreak, Achievement, UserAchievement
@@ -13,10 +19,21 @@ from app.models.gamification import GamificationEvent, UserPoints, UserStreak, A
 # Create database tables
 Base.metadata.create_all(bind=engine)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Release pooled Gemini connections
+    await close_llm_clients()
+    # Stop statement parsing workers
+    shutdown_statement_pool()
+
+
 app = FastAPI(
     title=settings.app_name,
     description="Kronyx API with Authentication and Email Transaction Processing",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Include routers
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, JSON, Float, DateTime, func
+from sqlalchemy import Column, Integer, ForeignKey, JSON, Float, DateTime, String, Text, func
 from sqlalchemy.orm import relationship
 from app.database import Base
 
@@ -23,6 +23,12 @@ class BehaviourModel(Base):
     # Metadata
     last_updated = Column(DateTime(timezone=True), server_default=func.now())
     transaction_count = Column(Integer, default=0)
+    version = Column(Integer, default=0, server_default="0", nullable=False)  # Bumped on every model update
+    
+    # Precomputed dashboard insights (serialised DashboardInsightResponse) for insights_version
+    insights = Column(Text, nullable=True)
+    insights_etag = Column(String, nullable=True)
+    insights_version = Column(Integer, nullable=True)
     
     # RELATIONSHIP
     user = relationship("User", back_populates="behaviour_model")
\ No newline at end of file
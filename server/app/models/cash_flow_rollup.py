@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, String, Numeric, DateTime, Date, ForeignKey, Index
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class CashFlowRollup(Base):
+    """
+    Per-user income/expense totals for one calendar month or ISO week.
+    Kept in sync with transactions by app.services.cash_flow_rollups.
+    """
+    __tablename__ = "cash_flow_rollups"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    granularity = Column(String(8), nullable=False)  # "month" / "week"
+    period_start = Column(Date, nullable=False)  # First day of the month, or Monday of the ISO week
+
+    income = Column(Numeric(16, 2), nullable=False, default=0)
+    expenses = Column(Numeric(16, 2), nullable=False, default=0)
+    income_count = Column(Integer, nullable=False, default=0)
+    expense_count = Column(Integer, nullable=False, default=0)
+    income_sources = Column(Integer, nullable=False, default=0)  # Distinct credit merchants
+    first_transaction_at = Column(DateTime(timezone=True), nullable=True)
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        Index("uq_cash_flow_rollups_user_period", user_id, granularity, period_start, unique=True),
+    )
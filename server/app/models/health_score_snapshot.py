@@ -0,0 +1,50 @@
+from sqlalchemy import Column, Integer, Float, String, Date, DateTime, ForeignKey, Index, LargeBinary
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class HealthScoreSnapshot(Base):
+    """
+    A user's financial health score as computed by the daily snapshot job
+    (app.services.health_score_snapshots). Source of the score trend.
+    """
+    __tablename__ = "health_score_snapshots"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    snapshot_date = Column(Date, nullable=False)
+
+    overall_score = Column(Float, nullable=False)
+    income_stability = Column(Float, nullable=False)
+    spending_discipline = Column(Float, nullable=False)
+    emergency_fund = Column(Float, nullable=False)
+    savings_rate = Column(Float, nullable=False)
+    debt_health = Column(Float, nullable=False)
+    diversification = Column(Float, nullable=False)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        # One snapshot per user and day; also serves the trend read
+        Index("uq_health_score_snapshots_user_date", user_id, snapshot_date, unique=True),
+    )
+
+
+class CohortScoreSketch(Base):
+    """
+    Distribution of one cohort segment's health scores on a snapshot date,
+    stored as a compressed ScoreHistogram (app.services.cohort_stats).
+    """
+    __tablename__ = "cohort_score_sketches"
+
+    id = Column(Integer, primary_key=True, index=True)
+    segment = Column(String(64), nullable=False)  # "all", "income_volatility:high", ...
+    snapshot_date = Column(Date, nullable=False)
+    user_count = Column(Integer, nullable=False)
+    sketch = Column(LargeBinary, nullable=False)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("uq_cohort_score_sketches_segment_date", segment, snapshot_date, unique=True),
+    )
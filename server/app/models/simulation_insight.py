@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, JSON
+from app.database import Base
+
+
+class SimulationInsight(Base):
+    """
+    A user's latest nightly bulk simulation results for one scenario type,
+    written by app.services.simulations.batch (one entry per scenario, None
+    for scenarios that target none of the user's categories).
+    """
+    __tablename__ = "simulation_insights"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    scenario_type = Column(String(16), nullable=False)  # "reduction" / "increase"
+    results = Column(JSON, nullable=False)  # SimulationResponse dumps in scenario order
+    generated_at = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        # Each run replaces the previous results
+        Index("uq_simulation_insights_user_scenario_type", user_id, scenario_type, unique=True),
+    )
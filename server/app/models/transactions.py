@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, Numeric, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Numeric, DateTime, ForeignKey, Index
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy import event
+from sqlalchemy.orm import mapped_column, relationship, Session
 from app.database import Base
 
 
@@ -8,14 +9,16 @@ class Transaction(Base):
     __tablename__ = "transactions"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    # active_history: the old value is loaded on assignment so a transaction moved to
+    # another user or period also refreshes the rollup bucket it left, even when expired
+    user_id = mapped_column(Integer, ForeignKey("users.id"), nullable=False, index=True, active_history=True)
     
     amount = Column(Numeric(14, 2), nullable=True)
     merchant = Column(String, nullable=True)
     category = Column(String, nullable=True)
     upiId = Column(String, nullable=True)
     transactionId = Column(String, nullable=True, index=True)
-    timestamp = Column(DateTime(timezone=True), nullable=True)
+    timestamp = mapped_column(DateTime(timezone=True), nullable=True, active_history=True)
     type = Column(String, nullable=True)  # "debit" / "credit"
     balance = Column(Numeric(14, 2), nullable=True)
     bankName = Column(String, nullable=True)
@@ -26,3 +29,24 @@ class Transaction(Base):
     
     # Relationships
     user = relationship("User", back_populates="transactions")
+
+    __table_args__ = (
+        # Per-user time-range scans (history, date-range, cash flow, dedup window)
+        Index("ix_transactions_user_id_timestamp", user_id, timestamp.desc()),
+        # Per-user scans restricted to one type (debit-only simulations)
+        Index("ix_transactions_user_id_type_timestamp", user_id, type, timestamp),
+        # A bank reference can only be imported once per user
+        Index("uq_transactions_user_id_transaction_id", user_id, transactionId, unique=True),
+    )
+
+
+@event.listens_for(Session, "after_flush")
+def _refresh_cash_flow_rollups(session, flush_context):
+    """Keep cash_flow_rollups and users.data_version in step with transaction writes (same DB transaction)."""
+    # Imported here because the rollup service depends on this model
+    from app.services.cash_flow_rollups import refresh_for_flush
+    from app.services.data_version import bump_data_versions
+    changed_users = refresh_for_flush(session)
+    if changed_users:
+        bump_data_versions(session.connection(), changed_users)
+
@@ -1,6 +1,7 @@
 from sqlalchemy import Column, Integer, String, Boolean, Numeric
 from app.database import Base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
+from app.utils.phone import normalize_phone
 
 class User(Base):
     __tablename__ = "users"
@@ -9,12 +10,20 @@ class User(Base):
     name = Column(String, nullable=False)
     email = Column(String, unique=True, index=True, nullable=False)
     phone_number = Column(String, nullable=False)
+    phone_e164 = Column(String, unique=True, index=True, nullable=True)  # Normalised phone_number, used for WhatsApp lookup
     hashed_password = Column(String, nullable=False)
     email_app_password = Column(String, nullable=True)  # Encrypted Gmail app password
     email_parsing_enabled = Column(Boolean, default=False, nullable=False)
     savings = Column(Numeric(14, 2), default=0, nullable=False)  # User's current savings/balance
+    data_version = Column(Integer, default=0, server_default="0", nullable=False)  # Bumped whenever the user's transactions change
 
     # Relationships
     transactions = relationship("Transaction", back_populates="user")
     behaviour_model = relationship("BehaviourModel", back_populates="user", uselist=False)
-    goals = relationship("Goal", back_populates="user")
\ No newline at end of file
+    goals = relationship("Goal", back_populates="user")
+
+    @validates("phone_number")
+    def _sync_phone_e164(self, key, value):
+        """Keep the normalised lookup column in step with phone_number."""
+        self.phone_e164 = normalize_phone(value)
+        return value
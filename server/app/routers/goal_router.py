@@ -2,11 +2,12 @@ from datetime import datetime
 from typing import Annotated, List
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.database import get_db
+from app.database import get_async_db
 from app.models.user import User
-from app.oauth2 import get_current_user
+from app.oauth2 import get_current_user_async
 from app.schemas.goal_schema import (
     GoalCreate, 
     GoalUpdate, 
@@ -20,42 +21,36 @@ from app.services.goal_service import GoalService
 router = APIRouter(prefix="/goals", tags=["Goals"])
 
 
-@router.post("/", response_model=GoalResponse, status_code=status.HTTP_201_CREATED)
-async def create_goal(
-    goal: GoalCreate,
-    current_user: Annotated[User, Depends(get_current_user)],
-    db: Session = Depends(get_db)
-):
-    """Create a new savings goal for the current user."""
-    new_goal = GoalService.create_goal(db, current_user.id, goal)
-    return new_goal
+def _goal_not_found(goal_id: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=f"Goal with id {goal_id} not found"
+    )
 
 
-@router.get("/", response_model=List[GoalResponse])
-async def get_all_goals(
-    current_user: Annotated[User, Depends(get_current_user)],
-    db: Session = Depends(get_db),
-    active_only: bool = False
-):
-    """Get all goals for the current user. Set active_only=true to get only active goals."""
+def _list_goals(db: Session, user_id: int, active_only: bool):
     if active_only:
-        goals = GoalService.get_active_goals(db, current_user.id)
-    else:
-        goals = GoalService.get_all_goals(db, current_user.id)
-    return goals
+        return GoalService.get_active_goals(db, user_id)
+    return GoalService.get_all_goals(db, user_id)
 
 
-@router.get("/progress", response_model=List[GoalProgress])
-async def get_goals_with_progress(
-    current_user: Annotated[User, Depends(get_current_user)],
-    db: Session = Depends(get_db),
-    active_only: bool = False
-):
-    """Get all goals with calculated progress metrics."""
-    if active_only:
-        goals = GoalService.get_active_goals(db, current_user.id)
-    else:
-        goals = GoalService.get_all_goals(db, current_user.id)
+def _contribution_responses(goal) -> List[GoalContributionResponse]:
+    """Serialize goal.contributions (lazy loaded, so call on a sync session)."""
+    if not hasattr(goal, 'contributions'):
+        return []
+    return [
+        GoalContributionResponse(
+            id=c.id,
+            goal_id=c.goal_id,
+            transaction_id=c.transaction_id,
+            amount=c.amount,
+            created_at=c.created_at
+        ) for c in goal.contributions
+    ]
+
+
+def _build_goals_progress(db: Session, user_id: int, active_only: bool) -> List[GoalProgress]:
+    goals = _list_goals(db, user_id, active_only)
     
     goals_with_progress = []
     for goal in goals:
@@ -78,19 +73,10 @@ async def get_goals_with_progress(
     return goals_with_progress
 
 
-@router.get("/{goal_id}", response_model=GoalDetailedResponse)
-async def get_goal(
-    goal_id: int,
-    current_user: Annotated[User, Depends(get_current_user)],
-    db: Session = Depends(get_db)
-):
-    """Get a specific goal with detailed information including contribution history."""
-    goal = GoalService.get_goal(db, goal_id, current_user.id)
+def _build_goal_detail(db: Session, goal_id: int, user_id: int) -> GoalDetailedResponse:
+    goal = GoalService.get_goal(db, goal_id, user_id)
     if not goal:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Goal with id {goal_id} not found"
-        )
+        raise _goal_not_found(goal_id)
     
     # Calculate progress
     progress = GoalService.calculate_progress(goal)
@@ -108,116 +94,123 @@ async def get_goal(
         is_achieved=goal.is_achieved,
         created_at=goal.created_at,
         updated_at=goal.updated_at,
-        contributions=[
-            GoalContributionResponse(
-                id=c.id,
-                goal_id=c.goal_id,
-                transaction_id=c.transaction_id,
-                amount=c.amount,
-                created_at=c.created_at
-            ) for c in goal.contributions
-        ] if hasattr(goal, 'contributions') else [],
+        contributions=_contribution_responses(goal),
         progress_percentage=progress['progress_percentage'],
         days_remaining=progress['days_remaining'],
         is_overdue=progress['is_overdue']
     )
 
 
+def _build_goal_contributions(db: Session, goal_id: int, user_id: int) -> List[GoalContributionResponse]:
+    goal = GoalService.get_goal(db, goal_id, user_id)
+    if not goal:
+        raise _goal_not_found(goal_id)
+    return _contribution_responses(goal)
+
+
+async def _set_goal_active(db: AsyncSession, goal_id: int, user_id: int, is_active: bool):
+    goal = await db.run_sync(GoalService.get_goal, goal_id, user_id)
+    if not goal:
+        raise _goal_not_found(goal_id)
+    
+    goal.is_active = is_active
+    await db.commit()
+    await db.refresh(goal)
+    return goal
+
+
+@router.post("/", response_model=GoalResponse, status_code=status.HTTP_201_CREATED)
+async def create_goal(
+    goal: GoalCreate,
+    current_user: Annotated[User, Depends(get_current_user_async)],
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Create a new savings goal for the current user."""
+    new_goal = await db.run_sync(GoalService.create_goal, current_user.id, goal)
+    return new_goal
+
+
+@router.get("/", response_model=List[GoalResponse])
+async def get_all_goals(
+    current_user: Annotated[User, Depends(get_current_user_async)],
+    db: AsyncSession = Depends(get_async_db),
+    active_only: bool = False
+):
+    """Get all goals for the current user. Set active_only=true to get only active goals."""
+    return await db.run_sync(_list_goals, current_user.id, active_only)
+
+
+@router.get("/progress", response_model=List[GoalProgress])
+async def get_goals_with_progress(
+    current_user: Annotated[User, Depends(get_current_user_async)],
+    db: AsyncSession = Depends(get_async_db),
+    active_only: bool = False
+):
+    """Get all goals with calculated progress metrics."""
+    return await db.run_sync(_build_goals_progress, current_user.id, active_only)
+
+
+@router.get("/{goal_id}", response_model=GoalDetailedResponse)
+async def get_goal(
+    goal_id: int,
+    current_user: Annotated[User, Depends(get_current_user_async)],
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get a specific goal with detailed information including contribution history."""
+    return await db.run_sync(_build_goal_detail, goal_id, current_user.id)
+
+
 @router.put("/{goal_id}", response_model=GoalResponse)
 async def update_goal(
     goal_id: int,
     goal_update: GoalUpdate,
-    current_user: Annotated[User, Depends(get_current_user)],
-    db: Session = Depends(get_db)
+    current_user: Annotated[User, Depends(get_current_user_async)],
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update a goal."""
-    updated_goal = GoalService.update_goal(db, goal_id, current_user.id, goal_update)
+    updated_goal = await db.run_sync(GoalService.update_goal, goal_id, current_user.id, goal_update)
     if not updated_goal:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Goal with id {goal_id} not found"
-        )
+        raise _goal_not_found(goal_id)
     return updated_goal
 
 
 @router.delete("/{goal_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_goal(
     goal_id: int,
-    current_user: Annotated[User, Depends(get_current_user)],
-    db: Session = Depends(get_db)
+    current_user: Annotated[User, Depends(get_current_user_async)],
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete a goal."""
-    success = GoalService.delete_goal(db, goal_id, current_user.id)
+    success = await db.run_sync(GoalService.delete_goal, goal_id, current_user.id)
     if not success:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Goal with id {goal_id} not found"
-        )
+        raise _goal_not_found(goal_id)
 
 
 @router.post("/{goal_id}/activate", response_model=GoalResponse)
 async def activate_goal(
     goal_id: int,
-    current_user: Annotated[User, Depends(get_current_user)],
-    db: Session = Depends(get_db)
+    current_user: Annotated[User, Depends(get_current_user_async)],
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Activate a goal to start tracking contributions."""
-    goal = GoalService.get_goal(db, goal_id, current_user.id)
-    if not goal:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Goal with id {goal_id} not found"
-        )
-    
-    goal.is_active = True
-    db.commit()
-    db.refresh(goal)
-    return goal
+    return await _set_goal_active(db, goal_id, current_user.id, True)
 
 
 @router.post("/{goal_id}/deactivate", response_model=GoalResponse)
 async def deactivate_goal(
     goal_id: int,
-    current_user: Annotated[User, Depends(get_current_user)],
-    db: Session = Depends(get_db)
+    current_user: Annotated[User, Depends(get_current_user_async)],
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Deactivate a goal to stop tracking contributions."""
-    goal = GoalService.get_goal(db, goal_id, current_user.id)
-    if not goal:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Goal with id {goal_id} not found"
-        )
-    
-    goal.is_active = False
-    db.commit()
-    db.refresh(goal)
-    return goal
+    return await _set_goal_active(db, goal_id, current_user.id, False)
 
 
 @router.get("/{goal_id}/contributions", response_model=List[GoalContributionResponse])
 async def get_goal_contributions(
     goal_id: int,
-    current_user: Annotated[User, Depends(get_current_user)],
-    db: Session = Depends(get_db)
+    current_user: Annotated[User, Depends(get_current_user_async)],
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get all contributions for a specific goal."""
-    goal = GoalService.get_goal(db, goal_id, current_user.id)
-    if not goal:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Goal with id {goal_id} not found"
-        )
-    
-    if not hasattr(goal, 'contributions'):
-        return []
-    
-    return [
-        GoalContributionResponse(
-            id=c.id,
-            goal_id=c.goal_id,
-            transaction_id=c.transaction_id,
-            amount=c.amount,
-            created_at=c.created_at
-        ) for c in goal.contributions
-    ]
+    return await db.run_sync(_build_goal_contributions, goal_id, current_user.id)
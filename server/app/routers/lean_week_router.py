@@ -2,11 +2,11 @@
 Lean Week Predictor API Routes
 """
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Annotated, Optional
-from app.database import get_db
+from app.database import get_async_db
 from app.models.user import User
-from app.oauth2 import get_current_user
+from app.oauth2 import get_current_user_async
 from app.services.lean_week_predictor import LeanWeekPredictor
 from app.schemas.lean_week_schemas import (
     LeanWeekAnalysisResponse,
@@ -27,9 +27,9 @@ lean_predictor = LeanWeekPredictor()
     description="Comprehensive analysis of cash flow challenges, forecasts, and income smoothing recommendations"
 )
 async def get_lean_week_analysis(
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[User, Depends(get_current_user_async)],
     current_balance: Optional[float] = Query(None, description="Current account balance. Uses user.savings if not provided"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get comprehensive lean week analysis including:
@@ -42,8 +42,8 @@ async def get_lean_week_analysis(
     balance = current_balance if current_balance is not None else float(current_user.savings or 0)
     
     try:
-        analysis = lean_predictor.get_complete_lean_analysis(
-            db=db,
+        analysis = await db.run_sync(
+            lean_predictor.get_complete_lean_analysis,
             user_id=current_user.id,
             current_balance=balance
         )
@@ -62,10 +62,10 @@ async def get_lean_week_analysis(
     description="Forecast cash flow for upcoming months with best/worst/likely scenarios"
 )
 async def get_cash_flow_forecast(
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[User, Depends(get_current_user_async)],
     periods: int = Query(3, ge=1, le=12, description="Number of future periods (months) to forecast"),
     current_balance: Optional[float] = Query(None, description="Current account balance"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Forecast future cash flow with scenario analysis:
@@ -78,8 +78,8 @@ async def get_cash_flow_forecast(
     balance = current_balance if current_balance is not None else float(current_user.savings or 0)
     
     try:
-        forecast = lean_predictor.forecast_cash_flow(
-            db=db,
+        forecast = await db.run_sync(
+            lean_predictor.forecast_cash_flow,
             user_id=current_user.id,
             forecast_periods=periods,
             current_balance=balance
@@ -99,10 +99,10 @@ async def get_cash_flow_forecast(
     description="Calculate how much to save during good months to smooth income volatility"
 )
 async def get_income_smoothing_recommendations(
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[User, Depends(get_current_user_async)],
     current_balance: Optional[float] = Query(None, description="Current savings/emergency fund"),
     target_months: int = Query(3, ge=1, le=12, description="Target months of expenses to maintain as buffer"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get personalized income smoothing strategy:
@@ -114,8 +114,8 @@ async def get_income_smoothing_recommendations(
     balance = current_balance if current_balance is not None else float(current_user.savings or 0)
     
     try:
-        recommendations = lean_predictor.calculate_income_smoothing_recommendation(
-            db=db,
+        recommendations = await db.run_sync(
+            lean_predictor.calculate_income_smoothing_recommendation,
             user_id=current_user.id,
             current_balance=balance,
             target_months_buffer=target_months
@@ -8,8 +8,9 @@ from app.oauth2 import get_current_user
 from app.models.user import User
 from app.models.transactions import Transaction
 from app.schemas.transaction_schemas import TransactionCreate, TransactionResponse
-from app.utils.ocr import OCRAgent
+from app.utils.ocr import get_ocr_agent
 from app.utils.pdf_to_text import extract_text_from_pdf
+from app.services.document_parser import extract_transaction_locally
 
 router = APIRouter(
     prefix="/ocr",
@@ -41,7 +42,7 @@ async def extract_text_from_images(
             raise HTTPException(status_code=400, detail=f"File is empty")
 
         # Extract transaction using OCR Agent
-        ocr_agent = OCRAgent()
+        ocr_agent = get_ocr_agent()
         transaction_data = await ocr_agent.extract_transaction(content)
         
         return transaction_data
@@ -60,6 +61,9 @@ async def extract_transaction_from_text(
     """
     Extract transaction details from PDF using PyMuPDF and AI.
     
+    Machine-generated bank PDFs and receipts are parsed locally first;
+    the LLM is only called when the local parse is not confident.
+    
     - **file**: PDF file containing transaction details
     - Returns transaction data as JSON
     """
@@ -79,9 +83,11 @@ async def extract_transaction_from_text(
         if not extracted_text:
             raise HTTPException(status_code=400, detail="No text found in PDF")
 
-        # Extract transaction using OCR Agent
-        ocr_agent = OCRAgent()
-        transaction_data = await ocr_agent.extract_transaction_from_text(extracted_text)
+        # Try the deterministic templates before paying for an LLM call
+        transaction_data = extract_transaction_locally(extracted_text)
+        if transaction_data is None:
+            ocr_agent = get_ocr_agent()
+            transaction_data = await ocr_agent.extract_transaction_from_text(extracted_text)
         
         return transaction_data
 
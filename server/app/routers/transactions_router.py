@@ -2,20 +2,26 @@ from datetime import datetime
 from typing import Annotated, List, Optional
 import os
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, File, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, select
+from sqlalchemy.exc import IntegrityError
 
-from app.database import get_db
+from app.database import get_async_db
 from app.models.transactions import Transaction
 from app.models.user import User
-from app.oauth2 import get_current_user
-from app.schemas.transaction_schemas import TransactionCreate, TransactionResponse
+from app.oauth2 import get_current_user_async
+from app.schemas.transaction_schemas import TransactionCreate, TransactionResponse, StatementImportResponse
 from app.services.behavior_engine import BehaviorEngine
 from app.services.categorization import CategorizationService
 from app.services.goal_service import GoalService
 from app.services.gamification_service import GamificationService
+from app.services.transaction_import import import_transactions
+from app.services.statement_parser import parse_statement_pdf, rows_to_transactions
 from app.models.gamification import EventType
+from app.core.config import settings
 
 router = APIRouter(prefix="/transactions", tags=["Transactions"])
 
@@ -26,11 +32,35 @@ categorization_service = CategorizationService(
 behavior_engine = BehaviorEngine(categorization_service)
 
 
+def _award_event(db: Session, user_id: int, event_type: EventType):
+    """Award a gamification event (runs on the sync facade of the async session)."""
+    GamificationService(db).award_event(user_id, event_type)
+
+
+async def _get_user_transaction(db: AsyncSession, transaction_id: int, user_id: int) -> Transaction:
+    """Load one of the user's transactions or raise 404."""
+    result = await db.execute(
+        select(Transaction).where(
+            Transaction.id == transaction_id,
+            Transaction.user_id == user_id
+        )
+    )
+    transaction = result.scalars().first()
+    
+    if not transaction:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Transaction not found"
+        )
+    
+    return transaction
+
+
 @router.post("/", response_model=TransactionResponse, status_code=status.HTTP_201_CREATED)
 async def create_transaction(
     transaction: TransactionCreate,
-    current_user: Annotated[User, Depends(get_current_user)],
-    db: Session = Depends(get_db)
+    current_user: Annotated[User, Depends(get_current_user_async)],
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new transaction with automatic categorization."""
     # Verify the transaction belongs to the current user
@@ -50,34 +80,44 @@ async def create_transaction(
     elif transaction.type == "debit":
         current_user.savings -= transaction.amount
     
-    db.commit()
-    db.refresh(new_transaction)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # (user_id, transactionId) is unique
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Transaction with this transactionId already exists"
+        )
+    await db.refresh(new_transaction)
     
     # Award gamification event for transaction import
     try:
-        gamification = GamificationService(db)
-        gamification.award_event(current_user.id, EventType.TRANSACTION_IMPORTED)
+        await db.run_sync(_award_event, current_user.id, EventType.TRANSACTION_IMPORTED)
     except Exception as e:
         print(f"Error awarding TRANSACTION_IMPORTED event: {str(e)}")
     
     # Update behavior model with AI categorization
-    await behavior_engine.update_model(db, new_transaction.user_id, new_transaction)
+    await behavior_engine.update_model_async(db, new_transaction.user_id, new_transaction)
     
     # Process transaction for active goals
     try:
-        await GoalService.process_transaction_for_goals(db, new_transaction)
+        await db.run_sync(GoalService.apply_transaction_to_goals, new_transaction)
     except Exception as e:
         # Log error but don't fail transaction creation
         print(f"Error processing transaction {new_transaction.id} for goals: {str(e)}")
     
+    # Persist the behavior model update and category
+    await db.commit()
+    
     return new_transaction
 
 
 @router.post("/bulk", response_model=List[TransactionResponse], status_code=status.HTTP_201_CREATED)
 async def create_multiple_transactions(
     transactions: List[TransactionCreate],
-    current_user: Annotated[User, Depends(get_current_user)],
-    db: Session = Depends(get_db)
+    current_user: Annotated[User, Depends(get_current_user_async)],
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create multiple transactions at once with automatic categorization and deduplication."""
     # Verify all transactions belong to the current user
@@ -88,124 +128,82 @@ async def create_multiple_transactions(
                 detail="Not authorized to create transactions for another user"
             )
     
-    # Deduplication: Check for existing transactions
-    new_transactions = []
-    skipped_count = 0
-    
-    for transaction_data in transactions:
-        # Check if transaction already exists
-        # First try to match by transactionId if available
-        existing = None
-        if transaction_data.transactionId:
-            existing = db.query(Transaction).filter(
-                and_(
-                    Transaction.user_id == current_user.id,
-                    Transaction.transactionId == transaction_data.transactionId
-                )
-            ).first()
-        
-        # If not found by transactionId, check by amount, merchant, timestamp, and type
-        # (within a 5-minute window to account for slight timestamp differences)
-        if not existing and transaction_data.timestamp:
-            from datetime import timedelta
-            time_window_start = transaction_data.timestamp - timedelta(minutes=5)
-            time_window_end = transaction_data.timestamp + timedelta(minutes=5)
-            
-            query = db.query(Transaction).filter(
-                and_(
-                    Transaction.user_id == current_user.id,
-                    Transaction.amount == transaction_data.amount,
-                    Transaction.type == transaction_data.type,
-                    Transaction.timestamp >= time_window_start,
-                    Transaction.timestamp <= time_window_end
-                )
-            )
-            
-            # If merchant is available, also match by merchant
-            if transaction_data.merchant:
-                query = query.filter(Transaction.merchant == transaction_data.merchant)
-            
-            existing = query.first()
-        
-        # If transaction doesn't exist, add it to the list
-        if not existing:
-            new_transactions.append(Transaction(**transaction_data.model_dump()))
-        else:
-            skipped_count += 1
-            print(f"⚠️ Skipping duplicate transaction: {transaction_data.transactionId or 'No ID'} - Amount: {transaction_data.amount}, Type: {transaction_data.type}")
-    
-    if not new_transactions:
-        # All transactions were duplicates
-        return []
-    
-    # Create only new transactions
-    db.add_all(new_transactions)
-    
-    # Update user savings for each new transaction
-    for transaction in transactions:
-        # Only update savings if this transaction was actually added (not a duplicate)
-        if any(t.amount == transaction.amount and 
-               t.type == transaction.type and 
-               (t.timestamp == transaction.timestamp or 
-                (t.timestamp and transaction.timestamp and 
-                 abs((t.timestamp - transaction.timestamp).total_seconds()) < 300))
-               for t in new_transactions):
-            if transaction.type == "credit":
-                current_user.savings += transaction.amount
-            elif transaction.type == "debit":
-                current_user.savings -= transaction.amount
-    
-    db.commit()
+    new_transactions, _ = await import_transactions(
+        db, current_user, transactions, behavior_engine=behavior_engine
+    )
     
     # Refresh all to get IDs and created_at
     for t in new_transactions:
-        db.refresh(t)
+        await db.refresh(t)
     
-    print(f"✅ Created {len(new_transactions)} new transactions, skipped {skipped_count} duplicates")
+    return new_transactions
+
+
+@router.post("/import/statement", response_model=StatementImportResponse, status_code=status.HTTP_201_CREATED)
+async def import_statement(
+    current_user: Annotated[User, Depends(get_current_user_async)],
+    file: UploadFile = File(...),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Import every transaction from a bank statement PDF.
     
-    # Award gamification event for bulk import (only for new transactions)
-    try:
-        gamification = GamificationService(db)
-        for _ in new_transactions:
-            gamification.award_event(current_user.id, EventType.TRANSACTION_IMPORTED)
-    except Exception as e:
-        print(f"Error awarding TRANSACTION_IMPORTED events: {str(e)}")
+    Pages are parsed in worker processes and the rows go through the same
+    deduplication path as /transactions/bulk.
+    """
+    if file.content_type and file.content_type not in ("application/pdf", "application/octet-stream"):
+        raise HTTPException(status_code=400, detail="File is not a PDF")
     
-    # Update behavior model for each new transaction
-    for t in new_transactions:
-        await behavior_engine.update_model(db, t.user_id, t)
+    content = await file.read()
+    if not content:
+        raise HTTPException(status_code=400, detail="File is empty")
     
-    # Process transactions for active goals
-    for t in new_transactions:
-        try:
-            await GoalService.process_transaction_for_goals(db, t)
-        except Exception as e:
-            # Log error but don't fail transaction creation
-            print(f"Error processing transaction {t.id} for goals: {str(e)}")
-    
-    return new_transactions
+    try:
+        statement = await run_in_threadpool(
+            parse_statement_pdf, content, settings.statement_import_workers
+        )
+    except Exception as e:
+        print(f"Error parsing statement: {str(e)}")
+        raise HTTPException(status_code=400, detail=f"Failed to parse statement: {str(e)}")
+    
+    transactions, rejected = rows_to_transactions(
+        statement["rows"], current_user.id, statement["bank_name"]
+    )
+    new_transactions, skipped_count = await import_transactions(
+        db, current_user, transactions, behavior_engine=behavior_engine
+    )
+    
+    return StatementImportResponse(
+        pages=statement["page_count"],
+        rows_found=len(statement["rows"]),
+        imported=len(new_transactions),
+        duplicates_skipped=skipped_count,
+        rejected=rejected
+    )
 
 
 @router.get("/", response_model=List[TransactionResponse])
 async def get_transactions(
-    current_user: Annotated[User, Depends(get_current_user)],
-    db: Session = Depends(get_db),
+    current_user: Annotated[User, Depends(get_current_user_async)],
+    db: AsyncSession = Depends(get_async_db),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000)
 ):
     """Get all transactions for the current user."""
-    transactions = db.query(Transaction).filter(
-        Transaction.user_id == current_user.id
-    ).order_by(Transaction.timestamp.desc()).offset(skip).limit(limit).all()
-    return transactions
+    result = await db.execute(
+        select(Transaction).where(
+            Transaction.user_id == current_user.id
+        ).order_by(Transaction.timestamp.desc()).offset(skip).limit(limit)
+    )
+    return result.scalars().all()
 
 
 @router.get("/date-range", response_model=List[TransactionResponse])
 async def get_transactions_by_date_range(
     start_date: datetime = Query(..., description="Start date/time (ISO format)"),
     end_date: datetime = Query(..., description="End date/time (ISO format)"),
-    current_user: Annotated[User, Depends(get_current_user)] = None,
-    db: Session = Depends(get_db)
+    current_user: Annotated[User, Depends(get_current_user_async)] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get all transactions between two dates for the current user."""
     if start_date > end_date:
@@ -214,44 +212,35 @@ async def get_transactions_by_date_range(
             detail="start_date must be before end_date"
         )
     
-    transactions = db.query(Transaction).filter(
-        and_(
-            Transaction.user_id == current_user.id,
-            Transaction.timestamp >= start_date,
-            Transaction.timestamp <= end_date
-        )
-    ).order_by(Transaction.timestamp.desc()).all()
+    result = await db.execute(
+        select(Transaction).where(
+            and_(
+                Transaction.user_id == current_user.id,
+                Transaction.timestamp >= start_date,
+                Transaction.timestamp <= end_date
+            )
+        ).order_by(Transaction.timestamp.desc())
+    )
     
-    return transactions
+    return result.scalars().all()
 
 
 @router.get("/{transaction_id}", response_model=TransactionResponse)
 async def get_transaction(
     transaction_id: int,
-    current_user: Annotated[User, Depends(get_current_user)],
-    db: Session = Depends(get_db)
+    current_user: Annotated[User, Depends(get_current_user_async)],
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get a specific transaction by ID."""
-    transaction = db.query(Transaction).filter(
-        Transaction.id == transaction_id,
-        Transaction.user_id == current_user.id
-    ).first()
-    
-    if not transaction:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Transaction not found"
-        )
-    
-    return transaction
+    return await _get_user_transaction(db, transaction_id, current_user.id)
 
 
 @router.put("/{transaction_id}", response_model=TransactionResponse)
 async def update_transaction(
     transaction_id: int,
     transaction_update: TransactionCreate,
-    current_user: Annotated[User, Depends(get_current_user)],
-    db: Session = Depends(get_db)
+    current_user: Annotated[User, Depends(get_current_user_async)],
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update a transaction."""
     # Verify the update belongs to the current user
@@ -261,16 +250,7 @@ async def update_transaction(
             detail="Not authorized to update transaction for another user"
         )
     
-    transaction = db.query(Transaction).filter(
-        Transaction.id == transaction_id,
-        Transaction.user_id == current_user.id
-    ).first()
-    
-    if not transaction:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Transaction not found"
-        )
+    transaction = await _get_user_transaction(db, transaction_id, current_user.id)
     
     # Reverse the old transaction's effect on savings
     if transaction.type == "credit":
@@ -291,14 +271,13 @@ async def update_transaction(
     elif transaction_update.type == "debit":
         current_user.savings -= transaction_update.amount
     
-    db.commit()
-    db.refresh(transaction)
+    await db.commit()
+    await db.refresh(transaction)
     
     # Award gamification event for manual categorization
     if category_changed and transaction_update.category:
         try:
-            gamification = GamificationService(db)
-            gamification.award_event(current_user.id, EventType.TRANSACTION_CATEGORIZED)
+            await db.run_sync(_award_event, current_user.id, EventType.TRANSACTION_CATEGORIZED)
         except Exception as e:
             print(f"Error awarding TRANSACTION_CATEGORIZED event: {str(e)}")
     
@@ -308,21 +287,12 @@ async def update_transaction(
 @router.delete("/{transaction_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_transaction(
     transaction_id: int,
-    current_user: Annotated[User, Depends(get_current_user)],
-    db: Session = Depends(get_db)
+    current_user: Annotated[User, Depends(get_current_user_async)],
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete a transaction."""
-    transaction = db.query(Transaction).filter(
-        Transaction.id == transaction_id,
-        Transaction.user_id == current_user.id
-    ).first()
-    
-    if not transaction:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Transaction not found"
-        )
+    transaction = await _get_user_transaction(db, transaction_id, current_user.id)
     
-    db.delete(transaction)
-    db.commit()
+    await db.delete(transaction)
+    await db.commit()
     return None
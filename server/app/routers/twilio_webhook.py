@@ -4,6 +4,7 @@ import httpx
 import logging
 from twilio.rest import Client
 from twilio.twiml.messaging_response import MessagingResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from datetime import datetime
 
@@ -11,8 +12,11 @@ from app.core.config import settings
 from app.database import get_db, SessionLocal
 from app.models.user import User
 from app.models.transactions import Transaction
-from app.utils.ocr import OCRAgent
+from app.utils.ocr import get_ocr_agent
 from app.utils.pdf_to_text import extract_text_from_pdf
+from app.services.document_parser import extract_transaction_locally
+from app.services.user_lookup import find_user_by_phone
+from app.services.ocr_worker import enqueue_media_job, OCR_PRIORITY_INTERACTIVE
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -95,16 +99,7 @@ async def whatsapp_webhook(
                 try:
                     # Extract phone number without whatsapp: prefix
                     phone = From.replace('whatsapp:', '')
-                    user = db.query(User).filter(User.phone_number == phone).first()
-                    
-                    # Try without country code if not found
-                    if not user and phone.startswith('+'):
-                        phone_without_code = phone[1:]
-                        for length in [2, 3, 1]:
-                            phone_variant = phone_without_code[length:]
-                            user = db.query(User).filter(User.phone_number == phone_variant).first()
-                            if user:
-                                break
+                    user = find_user_by_phone(db, From)
                     
                     if user:
                         balance_msg = (
@@ -129,17 +124,7 @@ async def whatsapp_webhook(
                 # Get recent transactions
                 db = SessionLocal()
                 try:
-                    phone = From.replace('whatsapp:', '')
-                    user = db.query(User).filter(User.phone_number == phone).first()
-                    
-                    # Try without country code if not found
-                    if not user and phone.startswith('+'):
-                        phone_without_code = phone[1:]
-                        for length in [2, 3, 1]:
-                            phone_variant = phone_without_code[length:]
-                            user = db.query(User).filter(User.phone_number == phone_variant).first()
-                            if user:
-                                break
+                    user = find_user_by_phone(db, From)
                     
                     if user:
                         transactions = db.query(Transaction).filter(
@@ -172,13 +157,17 @@ async def whatsapp_webhook(
                 "This will take 10-20 seconds."
             )
             
-            # Process media in background
-            background_tasks.add_task(
-                process_media_ocr,
-                from_number=From,
-                media_url=MediaUrl0,
-                content_type=MediaContentType0
-            )
+            # Hand the media to the OCR worker; process in-process only if the queue is down
+            try:
+                enqueue_media_job(From, MediaUrl0, MediaContentType0, priority=OCR_PRIORITY_INTERACTIVE)
+            except Exception as e:
+                logger.warning(f"⚠️ OCR queue unavailable, processing in background task: {e}")
+                background_tasks.add_task(
+                    process_media_ocr,
+                    from_number=From,
+                    media_url=MediaUrl0,
+                    content_type=MediaContentType0
+                )
             
             return PlainTextResponse(content=str(response), media_type="application/xml")
         
@@ -198,9 +187,12 @@ async def whatsapp_webhook(
         return PlainTextResponse(content=str(response), media_type="application/xml")
 
 
-async def process_media_ocr(from_number: str, media_url: str, content_type: str):
+async def process_media_ocr(from_number: str, media_url: str, content_type: str) -> dict:
     """
-    Background task to download media, perform OCR, and add transaction to user account.
+    Download media, perform OCR, and add transaction to user account.
+    Runs as an `ocr_media` job on the OCR worker (or as a background task as a fallback).
+    
+    Errors are reported to the user over WhatsApp and returned in the result.
     """
     db = SessionLocal()
     try:
@@ -209,25 +201,8 @@ async def process_media_ocr(from_number: str, media_url: str, content_type: str)
         # Extract phone number and remove whatsapp: prefix
         phone = from_number.replace('whatsapp:', '')
         
-        # Try to find user with exact match first
-        user = db.query(User).filter(User.phone_number == phone).first()
-        
-        # If not found, try without country code (remove +91, +1, etc.)
-        if not user and phone.startswith('+'):
-            # Remove + and country code (assuming 1-3 digit country codes)
-            phone_without_code = phone[1:]  # Remove +
-            # Try variations: without country code entirely
-            for length in [2, 3, 1]:  # Try 2-digit, 3-digit, 1-digit country codes
-                phone_variant = phone_without_code[length:]
-                user = db.query(User).filter(User.phone_number == phone_variant).first()
-                if user:
-                    logger.info(f"✅ Found user with phone variant: {phone_variant}")
-                    break
-                # Also try with just the country code removed but keeping +
-                user = db.query(User).filter(User.phone_number == '+' + phone_variant).first()
-                if user:
-                    logger.info(f"✅ Found user with phone variant: +{phone_variant}")
-                    break
+        # Single indexed lookup on the normalised (E.164) number
+        user = find_user_by_phone(db, from_number)
         
         if not user:
             logger.error(f"❌ User not found for phone: {phone}")
@@ -237,7 +212,7 @@ async def process_media_ocr(from_number: str, media_url: str, content_type: str)
                 f"No account linked to {phone}\n\n"
                 "Please contact support to link your WhatsApp number to your Kronyx account."
             )
-            return
+            return {"status": "failed", "reason": "user_not_found"}
         
         # Download media from Twilio (follow redirects to CDN)
         if not settings.twilio_account_sid or not settings.twilio_auth_token:
@@ -247,7 +222,7 @@ async def process_media_ocr(from_number: str, media_url: str, content_type: str)
                 "❌ *Service Unavailable*\n\n"
                 "Twilio service is not configured. Please contact support."
             )
-            return
+            return {"status": "failed", "reason": "twilio_not_configured"}
         
         auth = (settings.twilio_account_sid, settings.twilio_auth_token)
         
@@ -259,19 +234,19 @@ async def process_media_ocr(from_number: str, media_url: str, content_type: str)
         logger.info(f"✅ Downloaded media: {len(file_data)} bytes")
         
         # Process based on content type
-        ocr_agent = OCRAgent()
-        
         if content_type == 'application/pdf':
             # Extract text from PDF first
             extracted_text = extract_text_from_pdf(file_data)
             if not extracted_text:
                 raise Exception("No text found in PDF")
             
-            # Extract transaction from text
-            transaction_data = await ocr_agent.extract_transaction_from_text(extracted_text)
+            # Try the deterministic templates first, fall back to the LLM
+            transaction_data = extract_transaction_locally(extracted_text)
+            if transaction_data is None:
+                transaction_data = await get_ocr_agent().extract_transaction_from_text(extracted_text)
         else:
             # Process image directly
-            transaction_data = await ocr_agent.extract_transaction(file_data)
+            transaction_data = await get_ocr_agent().extract_transaction(file_data)
         
         logger.info(f"✅ OCR extracted: {transaction_data}")
         
@@ -295,7 +270,18 @@ async def process_media_ocr(from_number: str, media_url: str, content_type: str)
         )
         
         db.add(new_transaction)
-        db.commit()
+        try:
+            db.commit()
+        except IntegrityError:
+            # (user_id, transactionId) is unique: this receipt was already recorded
+            db.rollback()
+            logger.info(f"Duplicate transaction {transaction_data.transactionId} for user {user.id}")
+            send_whatsapp_message(
+                from_number,
+                f"ℹ️ *Already Recorded*\n\n"
+                f"Transaction {transaction_data.transactionId} is already in your account."
+            )
+            return {"status": "skipped", "reason": "duplicate", "user_id": user.id}
         db.refresh(new_transaction)
         
         logger.info(f"✅ Transaction saved: ID {new_transaction.id}")
@@ -320,6 +306,8 @@ async def process_media_ocr(from_number: str, media_url: str, content_type: str)
         
         send_whatsapp_message(from_number, confirmation_msg)
         
+        return {"status": "success", "transaction_id": new_transaction.id, "user_id": user.id}
+        
     except Exception as e:
         logger.error(f"❌ Error processing OCR: {e}")
         send_whatsapp_message(
@@ -331,5 +319,6 @@ async def process_media_ocr(from_number: str, media_url: str, content_type: str)
             "• Ensuring good lighting\n"
             "• Sending a PDF if available"
         )
+        return {"status": "failed", "reason": "processing_error", "error": str(e)}
     finally:
         db.close()
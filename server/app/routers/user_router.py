@@ -9,6 +9,7 @@ from app.core.config import settings
 from app.database import get_db
 from app.models.user import User
 from app.oauth2 import create_access_token, get_current_user, get_password_hash, verify_password
+from app.utils.phone import normalize_phone
 from app.schemas.user_schema import Token, UserCreate, UserResponse, UserLogin
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
@@ -35,6 +36,14 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
             detail="Email already registered"
         )
     
+    # Phone numbers identify WhatsApp senders, so they must be unique too
+    phone_e164 = normalize_phone(user.phone_number)
+    if phone_e164 and db.query(User).filter(User.phone_e164 == phone_e164).first():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Phone number already registered"
+        )
+    
     # Create new user
     hashed_password = get_password_hash(user.password)
     new_user = User(
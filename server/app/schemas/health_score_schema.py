@@ -41,11 +41,15 @@ class HealthScoreTrend(BaseModel):
 
 
 class HealthScoreComparison(BaseModel):
-    """How user compares to others (can be simulated for demo)."""
+    """How user compares to other users (latest daily snapshot cohort)."""
     
     percentile: int = Field(..., ge=0, le=100, description="User's percentile (0-100)")
     comparison_text: str = Field(..., description="Human-readable comparison")
     avg_score: float = Field(..., ge=0, le=100, description="Average score of all users")
+    cohort_size: int = Field(0, ge=0, description="Users in the compared cohort")
+    segment: Optional[str] = Field(None, description="User's segment, e.g. 'income_volatility:high'")
+    segment_percentile: Optional[int] = Field(None, ge=0, le=100, description="User's percentile within the segment")
+    segment_avg_score: Optional[float] = Field(None, ge=0, le=100, description="Average score of the segment")
     
     model_config = ConfigDict(frozen=True)
 
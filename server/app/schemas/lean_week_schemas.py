@@ -58,12 +58,14 @@ class ForecastPeriod(BaseModel):
     projected_balance: CashFlowScenario
     is_lean_period: bool
     balance_at_risk: bool
+    negative_balance_probability: float = 0.0
 
 
 class CashFlowForecast(BaseModel):
     """Cash flow forecast response"""
     forecasts: List[ForecastPeriod]
     warnings: List[str]
+    negative_balance_probability: float = 0.0
     confidence: float
     income_volatility: float
     avg_monthly_income: float
@@ -36,6 +36,19 @@ class SimulationRequest(BaseModel):
     time_period_days: int = Field(default=30, gt=0, le=365, description="Analysis period in days")
 
 
+class BatchScenario(BaseModel):
+    """One scenario of a batch simulation"""
+    target_percent: float = Field(..., gt=0, le=100, description="Target percentage change")
+    target_categories: Optional[list[str]] = Field(None, description="Specific categories to target (None = all categories)")
+
+
+class BatchSimulationRequest(BaseModel):
+    """Request schema for evaluating many scenarios against one model and baseline"""
+    scenario_type: Literal["reduction", "increase"] = Field(default="reduction", description="Type of simulation")
+    scenarios: list[BatchScenario] = Field(..., min_length=1, max_length=100, description="Scenarios to evaluate (1-100)")
+    time_period_days: int = Field(default=30, gt=0, le=365, description="Analysis period in days")
+
+
 class ScenarioComparisonRequest(BaseModel):
     """Request schema for comparing multiple spending scenarios"""
     scenario_type: Literal["reduction", "increase"] = Field(default="reduction", description="Type of scenarios to generate")
@@ -69,6 +82,7 @@ class ProjectionRequest(BaseModel):
         description="Expected category changes as percentages (e.g., {'DINING': -15, 'EXERCISE': 10})"
     )
     time_period_days: int = Field(default=30, gt=0, le=365, description="Historical period to analyze")
+    current_balance: float = Field(default=0.0, description="Starting balance for the negative-balance probability")
 
 
 class CategoryAnalysis(BaseModel):
@@ -96,6 +110,14 @@ class SimulationResponse(BaseModel):
     targeted_categories: Optional[list[str]] = None
 
 
+class BatchSimulationResponse(BaseModel):
+    """Response schema for batch simulation (results in request order)"""
+    scenario_type: str
+    baseline_monthly: Decimal
+    time_period_days: int
+    results: list[SimulationResponse]
+
+
 class ScenarioSummary(BaseModel):
     """Summary of a single scenario for comparison"""
     scenario_id: str
@@ -152,10 +174,13 @@ class MonthlyProjection(BaseModel):
     """Projection data for a single month"""
     month: int
     month_label: str
-    projected_spending: Decimal
+    projected_spending: Decimal  # P50 of the simulated paths
+    spending_p10: Optional[Decimal] = None
+    spending_p90: Optional[Decimal] = None
     category_breakdown: dict[str, Decimal]
     cumulative_change: Decimal
     confidence: float = Field(ge=0, le=1)
+    negative_balance_probability: Optional[float] = Field(default=None, ge=0, le=1)
 
 
 class ProjectionResponse(BaseModel):
@@ -169,6 +194,9 @@ class ProjectionResponse(BaseModel):
     annual_impact: Decimal
     trend_analysis: str
     confidence_level: str
+    negative_balance_probability: Optional[float] = Field(
+        default=None, ge=0, le=1, description="Chance the balance goes negative over the horizon (needs income stats)"
+    )
     key_insights: list[str]
     projection_chart: dict
 
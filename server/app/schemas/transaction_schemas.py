@@ -37,7 +37,13 @@ class TransactionResponse(TransactionBase):
     created_at: datetime
     
     class Config:
-        from_attributes = True  
-
+        from_attributes = True
 
 
+class StatementImportResponse(BaseModel):
+    """Summary of a bank statement import"""
+    pages: int
+    rows_found: int
+    imported: int
+    duplicates_skipped: int
+    rejected: int
@@ -0,0 +1,68 @@
+"""
+Achievement Cache
+Lookups the award path needs on every event, without querying for them each
+time:
+
+- the achievement catalogue (code -> id) is loaded once per process. It only
+  changes when achievements are seeded, which clears it; a code missing from
+  it triggers one reload so a catalogue seeded by another process is picked up.
+- the ids of the achievements a user has earned are loaded once per Session
+  and kept in Session.info. Awards made through the session add to the set,
+  and a rollback drops it so an award that was never committed is not
+  remembered.
+"""
+import threading
+from typing import Dict, Iterable, Optional, Set
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models.gamification import Achievement, UserAchievement
+
+EARNED_KEY = "earned_achievements"
+
+_catalogue: Optional[Dict[str, int]] = None
+_lock = threading.Lock()
+
+
+def clear_achievement_catalogue():
+    global _catalogue
+    with _lock:
+        _catalogue = None
+
+
+def _load_catalogue(db: Session) -> Dict[str, int]:
+    global _catalogue
+    catalogue = dict(db.query(Achievement.code, Achievement.id).all())
+    with _lock:
+        _catalogue = catalogue
+    return catalogue
+
+
+def achievement_ids(db: Session, codes: Iterable[str]) -> Dict[str, int]:
+    """Ids of the given achievement codes; unknown codes are left out."""
+    codes = set(codes)
+    catalogue = _catalogue
+    if catalogue is None or not codes <= catalogue.keys():
+        catalogue = _load_catalogue(db)
+    return {code: catalogue[code] for code in codes if code in catalogue}
+
+
+def earned_achievement_ids(db: Session, user_id: int) -> Set[int]:
+    """
+    Ids of the achievements the user has earned, loaded once per session.
+    The returned set is the cached one; add to it when awarding.
+    """
+    earned = db.info.setdefault(EARNED_KEY, {})
+    if user_id not in earned:
+        earned[user_id] = {
+            achievement_id for (achievement_id,) in db.query(UserAchievement.achievement_id).filter(
+                UserAchievement.user_id == user_id
+            )
+        }
+    return earned[user_id]
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_earned_achievements(session, previous_transaction):
+    session.info.pop(EARNED_KEY, None)
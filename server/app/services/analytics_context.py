@@ -0,0 +1,37 @@
+"""
+User Analytics Context
+Everything the simulation and insight code needs about one user, loaded once
+per request: the User (already loaded by authentication), the BehaviourModel
+and the income statistics derived from it. Routes receive it as a dependency
+and pass it to the simulation services and InsightFormatter instead of each
+of them querying the model again.
+"""
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from app.models.behaviour import BehaviourModel
+from app.models.user import User
+from app.services.insight_formatter_v2 import get_model_income_stats
+
+
+@dataclass
+class UserAnalyticsContext:
+    user: User
+    model: Optional[BehaviourModel]
+    income_stats: Optional[Dict[str, Any]]
+
+    @property
+    def user_id(self) -> int:
+        return self.user.id
+
+    @property
+    def data_version(self) -> int:
+        return self.user.data_version
+
+    @classmethod
+    def load(cls, db: Session, user: User) -> "UserAnalyticsContext":
+        """One behaviour model query; income stats are read from the model."""
+        model = db.query(BehaviourModel).filter_by(user_id=user.id).first()
+        return cls(user=user, model=model, income_stats=get_model_income_stats(model))
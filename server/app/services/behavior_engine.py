@@ -1,11 +1,18 @@
+import logging
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy.orm.attributes import flag_modified
 from app.models.behaviour import BehaviourModel
 from app.services.statistics import StatisticsService
 from app.services.categorization import CategorizationService
+from app.services.health_score_cache import make_etag
+from app.services.insight_formatter_v2 import InsightFormatter, get_model_income_stats
 from app.utils.constants import DECAY_FACTOR
 from app.utils.datetime_utils import utc_now, ensure_utc, safe_isoformat, safe_fromisoformat
 
+logger = logging.getLogger(__name__)
+
 class BehaviorEngine:
     """
     Core engine for incremental learning from transactions.
@@ -15,14 +22,79 @@ class BehaviorEngine:
     def __init__(self, categorization_service: CategorizationService):
         self.stats_service = StatisticsService()
         self.categorization_service = categorization_service
+        self.insight_formatter = InsightFormatter()
     
     async def update_model(self, db: Session, user_id: int, transaction) -> BehaviourModel:
+        """
+        Updates user's behavior model after each transaction (sync session).
+        See apply_transaction for the update steps; the dashboard insights are
+        refreshed for the new model version before the caller commits.
+        """
+        await self.categorize_transaction(transaction)
+        return self.apply_and_refresh(db, user_id, transaction)
+    
+    async def update_model_async(self, db: AsyncSession, user_id: int, transaction) -> BehaviourModel:
+        """
+        Same as update_model for an AsyncSession.
+        Categorization (the only awaited step) runs first, then the statistics
+        update runs on the session's sync facade without blocking the event loop.
+        """
+        await self.categorize_transaction(transaction)
+        return await db.run_sync(self.apply_and_refresh, user_id, transaction)
+    
+    def apply_and_refresh(self, db: Session, user_id: int, transaction) -> BehaviourModel:
+        """apply_transaction followed by refresh_insights."""
+        model = self.apply_transaction(db, user_id, transaction)
+        self.refresh_insights(model)
+        return model
+    
+    def refresh_insights(self, model: BehaviourModel) -> BehaviourModel:
+        """
+        Precompute the dashboard insight bundle for the model's current version.
+        
+        The serialised DashboardInsightResponse and its ETag are stored on the
+        model, so they are committed together with the statistics they were
+        built from. Does nothing if the stored bundle is already current; a
+        bundle that fails validation is left stale (and rebuilt on read).
+        Note: Caller is responsible for committing changes
+        """
+        if model.insights is not None and model.insights_version == model.version:
+            return model
+        try:
+            return self.store_insights(model)
+        except ValidationError as e:
+            logger.warning(f"Failed to build dashboard insights for user {model.user_id}: {e}")
+            return model
+    
+    def store_insights(self, model: BehaviourModel) -> BehaviourModel:
+        """Build and store the dashboard insight bundle (raises ValidationError)."""
+        bundle = self.insight_formatter.build_dashboard(model, get_model_income_stats(model))
+        body = bundle.model_dump_json()
+        model.insights = body
+        model.insights_etag = make_etag(body)
+        model.insights_version = model.version
+        return model
+    
+    async def categorize_transaction(self, transaction) -> None:
+        """Categorize an expense that has no category yet (hybrid rule-based + LLM)."""
+        if transaction.type != "debit" or transaction.category:
+            return
+        category, confidence = await self.categorization_service.categorize(
+            transaction.merchant or "",
+            float(transaction.amount),
+            transaction.rawMessage or "",
+            transaction.type
+        )
+        transaction.category = category
+        # Note: Caller is responsible for committing the transaction
+    
+    def apply_transaction(self, db: Session, user_id: int, transaction) -> BehaviourModel:
         """
         Updates user's behavior model after each transaction.
         
         Steps:
         1. Get or create behavior model
-        2. Categorize transaction using hybrid approach (rule-based + LLM)
+        2. Use the category set by categorize_transaction
         3. Apply time decay to existing stats
         4. Update statistics (Welford's algorithm)
         5. Recalculate elasticity
@@ -50,23 +122,13 @@ class BehaviorEngine:
         
         # Handle income transactions (credit) for freelancers/gig workers
         if transaction.type == "credit":
-            return await self._update_income_stats(model, transaction)
+            return self._update_income_stats(model, transaction)
         
         # Process expense transactions (debit)
         if transaction.type != "debit":
             return model
         
-        # Categorize if not already done (uses hybrid approach)
-        if not transaction.category:
-            category, confidence = await self.categorization_service.categorize(
-                transaction.merchant or "",
-                float(transaction.amount),
-                transaction.rawMessage or "",
-                transaction.type
-            )
-            transaction.category = category
-            # Note: Caller is responsible for committing the transaction
-        
+        # Category is filled in by categorize_transaction beforehand
         category = transaction.category
         amount = float(transaction.amount)
         
@@ -145,6 +207,7 @@ class BehaviorEngine:
         model.elasticity = elasticity
         model.baselines = baselines
         model.transaction_count += 1
+        model.version = (model.version or 0) + 1
         model.last_updated = utc_now()
         
         # Mark JSON fields as modified so SQLAlchemy detects changes
@@ -156,7 +219,7 @@ class BehaviorEngine:
         # Note: Caller is responsible for committing changes
         return model
     
-    async def _update_income_stats(self, model: BehaviourModel, transaction) -> BehaviourModel:
+    def _update_income_stats(self, model: BehaviourModel, transaction) -> BehaviourModel:
         """
         Track income patterns for freelancers/gig workers with variable income.
         
@@ -274,6 +337,7 @@ class BehaviorEngine:
         # Save income stats
         model.monthly_patterns['income_stats'] = income_stats
         model.transaction_count += 1
+        model.version = (model.version or 0) + 1
         model.last_updated = utc_now()
         
         flag_modified(model, "monthly_patterns")
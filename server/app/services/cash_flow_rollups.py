@@ -0,0 +1,348 @@
+"""
+Cash Flow Rollups
+Materialised per-user monthly and weekly income/expense totals (cash_flow_rollups).
+
+Maintenance:
+- Every ORM flush that inserts, updates or deletes transactions recomputes the
+  touched (user, period) buckets inside the same database transaction, with one
+  grouped query per user and granularity, so a bulk import is refreshed as a batch.
+  The users' rows are locked first (SELECT ... FOR UPDATE on Postgres), so
+  concurrent writers for the same user take turns: each recomputes from the
+  committed state of the one before it instead of racing on the
+  delete-and-insert (a unique violation, or totals missing the other's rows).
+- `python -m app.services.cash_flow_rollups rebuild [--user-id N]` repairs the
+  table after writes that bypass the ORM (raw SQL, data migrations).
+
+Reads (cash_flow_series) combine a live aggregate for the partial first period
+with the stored whole periods after it, so analytics touch O(periods) rows.
+"""
+import argparse
+import logging
+from collections import namedtuple
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import and_, case, delete, func, insert, inspect, select
+from sqlalchemy.orm import Session
+
+from app.models.cash_flow_rollup import CashFlowRollup
+from app.models.transactions import Transaction
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = ("month", "week")
+
+# Users recomputed per statement when rebuilding the whole table
+REBUILD_USER_CHUNK = 500
+
+# Fields that move a transaction between buckets or change bucket totals
+TRACKED_FIELDS = ("user_id", "timestamp", "amount", "type", "merchant")
+
+PeriodTotals = namedtuple(
+    "PeriodTotals",
+    ["period", "income", "expenses", "income_count", "expense_count", "income_sources", "start_date"]
+)
+
+
+def period_start_expression(dialect_name: str, granularity: str):
+    """
+    SQL expression for the first day of the month/ISO week containing a transaction.
+    Postgres uses date_trunc (weeks start on Monday); SQLite uses date modifiers.
+    """
+    if dialect_name == "postgresql":
+        return func.date_trunc(granularity, Transaction.timestamp)
+    if granularity == "month":
+        return func.date(Transaction.timestamp, "start of month")
+    # Step back six days, then forward to the next Monday: the Monday on or before
+    return func.date(Transaction.timestamp, "-6 days", "weekday 1")
+
+
+def to_period_date(value) -> date:
+    """Normalise a period start (datetime from Postgres, 'YYYY-MM-DD' from SQLite) to a date."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def period_start(ts: datetime, granularity: str) -> date:
+    """First day of the month/ISO week containing ts (UTC)."""
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc)
+    day = ts.date()
+    if granularity == "month":
+        return day.replace(day=1)
+    return day - timedelta(days=day.weekday())
+
+
+def next_period_start(start: date, granularity: str) -> date:
+    if granularity == "month":
+        return date(start.year + start.month // 12, start.month % 12 + 1, 1)
+    return start + timedelta(days=7)
+
+
+def _dialect_name(executor) -> str:
+    """Dialect of a Connection or Session."""
+    dialect = getattr(executor, "dialect", None)
+    if dialect is None:
+        dialect = executor.get_bind().dialect
+    return dialect.name
+
+
+def _totals_select(dialect_name: str, granularity: str, *conditions, by_user: bool = False):
+    """
+    Grouped per-period totals. Matches the row-by-row rules of the analytics code:
+    rows without a timestamp or with a zero/NULL amount are ignored, anything that
+    is not a credit counts as an expense, and income sources are the distinct
+    non-empty merchants of credits.
+    """
+    period = period_start_expression(dialect_name, granularity).label("period")
+    is_credit = Transaction.type == "credit"
+    group_by = [Transaction.user_id, period] if by_user else [period]
+
+    return select(
+        *group_by,
+        func.sum(case((is_credit, Transaction.amount), else_=0)).label("income"),
+        func.sum(case((is_credit, 0), else_=Transaction.amount)).label("expenses"),
+        func.count(case((is_credit, 1))).label("income_count"),
+        func.count(case((is_credit, None), else_=1)).label("expense_count"),
+        func.count(func.distinct(case(
+            (and_(is_credit, Transaction.merchant != ""), Transaction.merchant)
+        ))).label("income_sources"),
+        func.min(Transaction.timestamp).label("start_date")
+    ).where(
+        Transaction.timestamp.isnot(None),
+        Transaction.amount.isnot(None),
+        Transaction.amount != 0,
+        *conditions
+    ).group_by(*group_by).order_by(*group_by)
+
+
+def _rollup_values(user_id: int, granularity: str, row) -> Dict:
+    return {
+        "user_id": user_id,
+        "granularity": granularity,
+        "period_start": to_period_date(row.period),
+        "income": row.income or 0,
+        "expenses": row.expenses or 0,
+        "income_count": row.income_count,
+        "expense_count": row.expense_count,
+        "income_sources": row.income_sources,
+        "first_transaction_at": row.start_date,
+    }
+
+
+def lock_users_statement(user_ids: Optional[Set[int]] = None):
+    """SELECT ... FOR UPDATE of the users' rows (all users when None), in id order to avoid deadlocks."""
+    stmt = select(User.id).order_by(User.id).with_for_update()
+    if user_ids is not None:
+        stmt = stmt.where(User.id.in_(sorted(user_ids)))
+    return stmt
+
+
+def lock_users(connection, user_ids: Optional[Set[int]] = None):
+    """
+    Serialise rollup refreshes per user until the transaction ends. At READ
+    COMMITTED the statements after the lock see rows committed by the previous
+    holder. SQLite has no row locks and serialises writers anyway.
+    """
+    connection.execute(lock_users_statement(user_ids)).all()
+
+
+def refresh_periods(connection, user_id: int, granularity: str, first: date, last: date):
+    """
+    Recompute the stored totals of one user's periods first..last (inclusive).
+    The caller must hold the user's lock (lock_users).
+    """
+    end = next_period_start(last, granularity)
+    rows = connection.execute(_totals_select(
+        _dialect_name(connection),
+        granularity,
+        Transaction.user_id == user_id,
+        Transaction.timestamp >= datetime.combine(first, time.min),
+        Transaction.timestamp < datetime.combine(end, time.min)
+    )).all()
+
+    connection.execute(delete(CashFlowRollup).where(
+        CashFlowRollup.user_id == user_id,
+        CashFlowRollup.granularity == granularity,
+        CashFlowRollup.period_start >= first,
+        CashFlowRollup.period_start < end
+    ))
+    if rows:
+        connection.execute(insert(CashFlowRollup), [_rollup_values(user_id, granularity, row) for row in rows])
+
+
+def refresh_for_flush(session: Session) -> Set[int]:
+    """
+    after_flush hook: refresh the buckets touched by transactions in this flush.
+    Both the old and new bucket are refreshed when a transaction moves.
+
+    Returns:
+        Ids of the users whose transactions changed
+    """
+    touched: Dict[int, Set[datetime]] = {}
+    rebuild_users: Set[int] = set()
+
+    def touch(user_id, ts):
+        if user_id is not None and ts is not None:
+            touched.setdefault(user_id, set()).add(ts)
+
+    for obj in session.new:
+        if isinstance(obj, Transaction):
+            touch(obj.user_id, obj.timestamp)
+
+    for obj in session.dirty:
+        if not isinstance(obj, Transaction):
+            continue
+        state = inspect(obj)
+        if not any(state.attrs[field].history.has_changes() for field in TRACKED_FIELDS):
+            continue
+        user_history = state.attrs.user_id.history
+        ts_history = state.attrs.timestamp.history
+        touch(
+            user_history.deleted[0] if user_history.deleted else obj.user_id,
+            ts_history.deleted[0] if ts_history.deleted else obj.timestamp
+        )
+        touch(obj.user_id, obj.timestamp)
+
+    for obj in session.deleted:
+        if not isinstance(obj, Transaction):
+            continue
+        # Don't trigger a load of a row that is already gone
+        loaded = inspect(obj).dict
+        if "timestamp" in loaded:
+            touch(loaded.get("user_id"), loaded["timestamp"])
+        elif loaded.get("user_id") is not None:
+            rebuild_users.add(loaded["user_id"])
+        else:
+            logger.warning("Deleted transaction without loaded user_id; run the rollup rebuild command")
+
+    if not touched and not rebuild_users:
+        return set()
+
+    connection = session.connection()
+    lock_users(connection, set(touched) | rebuild_users)
+    for user_id, timestamps in touched.items():
+        if user_id in rebuild_users:
+            continue
+        for granularity in GRANULARITIES:
+            periods = [period_start(ts, granularity) for ts in timestamps]
+            refresh_periods(connection, user_id, granularity, min(periods), max(periods))
+    for user_id in rebuild_users:
+        rebuild_rollups(connection, user_id)
+    return set(touched) | rebuild_users
+
+
+def rebuild_rollups(connection, user_id: Optional[int] = None) -> int:
+    """
+    Recompute rollups from the transactions table, for one user or for everyone.
+
+    Returns:
+        Number of rollup rows written
+    """
+    dialect_name = _dialect_name(connection)
+    lock_users(connection, {user_id} if user_id is not None else None)
+    if user_id is not None:
+        user_ids = [user_id]
+        connection.execute(delete(CashFlowRollup).where(CashFlowRollup.user_id == user_id))
+    else:
+        user_ids = connection.execute(
+            select(Transaction.user_id).distinct().order_by(Transaction.user_id)
+        ).scalars().all()
+        connection.execute(delete(CashFlowRollup))
+
+    written = 0
+    for start in range(0, len(user_ids), REBUILD_USER_CHUNK):
+        chunk = user_ids[start:start + REBUILD_USER_CHUNK]
+        for granularity in GRANULARITIES:
+            rows = connection.execute(_totals_select(
+                dialect_name, granularity, Transaction.user_id.in_(chunk), by_user=True
+            )).all()
+            if rows:
+                connection.execute(
+                    insert(CashFlowRollup),
+                    [_rollup_values(row.user_id, granularity, row) for row in rows]
+                )
+                written += len(rows)
+    return written
+
+
+def cash_flow_series(db, user_id: int, granularity: str, cutoff: datetime) -> List[PeriodTotals]:
+    """
+    Per-period totals for a user since cutoff, oldest first.
+
+    The period containing cutoff is aggregated live (only its rows after cutoff
+    count); every later period is read from cash_flow_rollups.
+    """
+    return cash_flow_series_for_users(db, [user_id], granularity, cutoff).get(user_id, [])
+
+
+def cash_flow_series_for_users(
+    db,
+    user_ids: List[int],
+    granularity: str,
+    cutoff: datetime
+) -> Dict[int, List[PeriodTotals]]:
+    """cash_flow_series for many users at once: two set-based queries in total."""
+    boundary = next_period_start(period_start(cutoff, granularity), granularity)
+
+    live = db.execute(_totals_select(
+        _dialect_name(db),
+        granularity,
+        Transaction.user_id.in_(user_ids),
+        Transaction.timestamp >= cutoff,
+        Transaction.timestamp < datetime.combine(boundary, time.min),
+        by_user=True
+    )).all()
+    stored = db.execute(
+        select(
+            CashFlowRollup.user_id,
+            CashFlowRollup.period_start,
+            CashFlowRollup.income,
+            CashFlowRollup.expenses,
+            CashFlowRollup.income_count,
+            CashFlowRollup.expense_count,
+            CashFlowRollup.income_sources,
+            CashFlowRollup.first_transaction_at
+        ).where(
+            CashFlowRollup.user_id.in_(user_ids),
+            CashFlowRollup.granularity == granularity,
+            CashFlowRollup.period_start >= boundary
+        ).order_by(CashFlowRollup.user_id, CashFlowRollup.period_start)
+    ).all()
+
+    series: Dict[int, List[PeriodTotals]] = {}
+    for row in live:
+        series.setdefault(row.user_id, []).append(PeriodTotals(
+            to_period_date(row.period), row.income, row.expenses, row.income_count,
+            row.expense_count, row.income_sources, row.start_date
+        ))
+    for user_id, *totals in stored:
+        series.setdefault(user_id, []).append(PeriodTotals(*totals))
+    return series
+
+
+def main():
+    """Command line entry point: rebuild the rollup table."""
+    from app.database import engine
+    from app.models import behaviour, goal, user  # noqa: F401 - resolve User relationships
+    from app.services.data_version import bump_data_versions
+
+    parser = argparse.ArgumentParser(description="Maintain the cash_flow_rollups table")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    rebuild = subcommands.add_parser("rebuild", help="Recompute rollups from transactions")
+    rebuild.add_argument("--user-id", type=int, default=None, help="Only rebuild this user")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    with engine.begin() as connection:
+        written = rebuild_rollups(connection, args.user_id)
+        bump_data_versions(connection, [args.user_id] if args.user_id is not None else None)
+    logger.info(f"Rebuilt cash flow rollups: {written} rows")
+
+
+if __name__ == "__main__":
+    main()
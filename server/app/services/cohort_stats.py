@@ -0,0 +1,186 @@
+"""
+Cohort Statistics
+Health score distributions of all users and of segments (e.g. freelancers
+with high income volatility), used for "Better than X% of users".
+
+Scores are rounded to 0.1 on a 0-100 scale, so a histogram with one bin per
+0.1 step (1001 bins) is an exact quantile sketch. It is mergeable by adding
+counts (each snapshot chunk builds one, the job merges them), compresses to a
+few hundred bytes, and a percentile lookup is a fixed-size prefix sum,
+independent of the number of users.
+"""
+import math
+import sys
+import zlib
+from array import array
+from datetime import date
+from itertools import accumulate
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.models.health_score_snapshot import CohortScoreSketch
+from app.schemas.health_score_schema import FinancialHealthScore, HealthScoreComparison
+
+SCORE_BINS = 1001  # 0.0, 0.1, ... 100.0
+
+OVERALL_SEGMENT = "all"
+
+# Same volatility threshold as the emergency fund target in the health score;
+# income_stability = 100 - volatility * 150
+HIGH_VOLATILITY = 0.3
+HIGH_VOLATILITY_STABILITY = 100 - HIGH_VOLATILITY * 150
+
+SEGMENT_LABELS = {
+    "income_volatility:high": "users with highly variable income",
+    "income_volatility:low": "users with steady income",
+}
+
+
+class ScoreHistogram:
+    """Mergeable histogram of 0-100 scores at 0.1 resolution."""
+
+    __slots__ = ("counts",)
+
+    def __init__(self, counts: Optional[array] = None):
+        self.counts = counts if counts is not None else array("I", [0]) * SCORE_BINS
+
+    @staticmethod
+    def _bin(score: float) -> int:
+        return min(SCORE_BINS - 1, max(0, round(score * 10)))
+
+    def add(self, score: float):
+        self.counts[self._bin(score)] += 1
+
+    def merge(self, other: "ScoreHistogram") -> "ScoreHistogram":
+        for i, count in enumerate(other.counts):
+            if count:
+                self.counts[i] += count
+        return self
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def mean(self) -> float:
+        total = self.count
+        if not total:
+            return 0.0
+        return sum(i * count for i, count in enumerate(self.counts)) / total / 10
+
+    def percent_below(self, score: float) -> int:
+        """Whole percent of scores strictly below score."""
+        total = self.count
+        if not total:
+            return 0
+        below = sum(self.counts[:self._bin(score)])
+        return below * 100 // total
+
+    def quantile(self, q: float) -> float:
+        """Smallest score with at least q of the scores at or below it."""
+        total = self.count
+        if not total:
+            return 0.0
+        target = max(1, math.ceil(total * q))
+        for i, running in enumerate(accumulate(self.counts)):
+            if running >= target:
+                return i / 10
+        return 100.0
+
+    def to_bytes(self) -> bytes:
+        counts = self.counts
+        if sys.byteorder == "big":
+            counts = array("I", counts)
+            counts.byteswap()
+        return zlib.compress(counts.tobytes())
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "ScoreHistogram":
+        counts = array("I")
+        counts.frombytes(zlib.decompress(data))
+        if sys.byteorder == "big":
+            counts.byteswap()
+        return cls(counts)
+
+
+def segment_for(score: FinancialHealthScore) -> str:
+    """Segment of a scored user (besides the overall cohort)."""
+    volatility = "high" if score.breakdown.income_stability <= HIGH_VOLATILITY_STABILITY else "low"
+    return f"income_volatility:{volatility}"
+
+
+def build_sketches(scores: Iterable[FinancialHealthScore]) -> Dict[str, ScoreHistogram]:
+    """Histograms of the overall cohort and each segment."""
+    sketches: Dict[str, ScoreHistogram] = {}
+    for score in scores:
+        for segment in (OVERALL_SEGMENT, segment_for(score)):
+            sketches.setdefault(segment, ScoreHistogram()).add(score.overall_score)
+    return sketches
+
+
+def merge_sketches(target: Dict[str, ScoreHistogram], other: Dict[str, ScoreHistogram]) -> Dict[str, ScoreHistogram]:
+    for segment, sketch in other.items():
+        if segment in target:
+            target[segment].merge(sketch)
+        else:
+            target[segment] = sketch
+    return target
+
+
+def save_cohort_sketches(db: Session, snapshot_date: date, sketches: Dict[str, ScoreHistogram]):
+    """Replace the stored sketches of snapshot_date."""
+    db.execute(delete(CohortScoreSketch).where(CohortScoreSketch.snapshot_date == snapshot_date))
+    if sketches:
+        db.execute(insert(CohortScoreSketch), [
+            {
+                "segment": segment,
+                "snapshot_date": snapshot_date,
+                "user_count": sketch.count,
+                "sketch": sketch.to_bytes(),
+            }
+            for segment, sketch in sorted(sketches.items())
+        ])
+
+
+def load_cohort_sketches(db: Session, segments: List[str]) -> Dict[str, ScoreHistogram]:
+    """Latest stored sketches of the given segments (one indexed read)."""
+    latest = select(func.max(CohortScoreSketch.snapshot_date)).where(
+        CohortScoreSketch.segment == OVERALL_SEGMENT
+    ).scalar_subquery()
+    rows = db.execute(
+        select(CohortScoreSketch.segment, CohortScoreSketch.sketch).where(
+            CohortScoreSketch.segment.in_(segments),
+            CohortScoreSketch.snapshot_date == latest
+        )
+    ).all()
+    return {row.segment: ScoreHistogram.from_bytes(row.sketch) for row in rows}
+
+
+def cohort_comparison(db: Session, score: FinancialHealthScore) -> Optional[HealthScoreComparison]:
+    """Compare a score with the latest cohort, or None before the first snapshot job."""
+    segment = segment_for(score)
+    sketches = load_cohort_sketches(db, [OVERALL_SEGMENT, segment])
+    overall = sketches.get(OVERALL_SEGMENT)
+    if overall is None or not overall.count:
+        return None
+
+    percentile = overall.percent_below(score.overall_score)
+    text = f"Better than {percentile}% of Volt users"
+
+    segment_sketch = sketches.get(segment)
+    segment_percentile = segment_avg = None
+    if segment_sketch is not None and segment_sketch.count:
+        segment_percentile = segment_sketch.percent_below(score.overall_score)
+        segment_avg = round(segment_sketch.mean(), 1)
+        text += f" and {segment_percentile}% of {SEGMENT_LABELS.get(segment, segment)}"
+
+    return HealthScoreComparison(
+        percentile=percentile,
+        comparison_text=text,
+        avg_score=round(overall.mean(), 1),
+        cohort_size=overall.count,
+        segment=segment,
+        segment_percentile=segment_percentile,
+        segment_avg_score=segment_avg
+    )
@@ -0,0 +1,22 @@
+"""
+User Data Versions
+users.data_version is a per-user counter bumped in the same DB transaction as
+any change to the user's transactions. Caches of derived analytics key on it,
+so a write invalidates them without having to find and delete entries.
+"""
+from typing import Iterable, Optional
+
+from sqlalchemy import update
+
+from app.models.user import User
+
+
+def bump_data_versions(connection, user_ids: Optional[Iterable[int]] = None):
+    """Increment data_version for the given users (all users when None)."""
+    stmt = update(User).values(data_version=User.data_version + 1)
+    if user_ids is not None:
+        user_ids = sorted(set(user_ids))
+        if not user_ids:
+            return
+        stmt = stmt.where(User.id.in_(user_ids))
+    connection.execute(stmt)
@@ -0,0 +1,273 @@
+"""
+Deterministic Document Parser
+Extracts transactions from machine-generated PDF text (bank alerts/statements and receipts)
+without calling the LLM. Reuses the email parser's regexes.
+
+Each template returns the parsed fields plus a confidence score. Callers only fall back
+to the OCR agent when no template is confident enough.
+"""
+import re
+import logging
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Optional, Tuple
+
+from pydantic import ValidationError
+
+from app.schemas.transaction_schemas import TransactionCreate
+from app.services.email_parser import (
+    AMOUNT_PATTERN,
+    MERCHANT_SPENT_PATTERN,
+    MERCHANT_TO_PATTERN,
+    UPI_PATTERN,
+    TXN_ID_PATTERN,
+    DATETIME_PATTERN,
+    DEBIT_PATTERN,
+    CREDIT_PATTERN,
+    BALANCE_PATTERN,
+    ACCOUNT_PATTERN,
+    detect_bank_name,
+    categorize_merchant,
+)
+
+logger = logging.getLogger(__name__)
+
+# Minimum confidence required to skip the LLM. Above amount + type + timestamp (0.75),
+# so a local parse must also name a merchant or carry a reference: any text with a
+# date and an amount in it is not a transaction.
+CONFIDENCE_THRESHOLD = 0.8
+
+# Field weights used to score a parse (sum to 1.0)
+FIELD_WEIGHTS = {
+    "amount": 0.35,
+    "type": 0.2,
+    "timestamp": 0.2,
+    "merchant": 0.15,
+    "reference": 0.1,
+}
+
+MERCHANT_FROM_PATTERN = re.compile(r"(?:received )?from ([A-Za-z0-9@.&\- ]+?)(?: on | via |\.|,|\n|$)", re.I)
+RECEIPT_TOTAL_PATTERNS = [
+    re.compile(r"(?:grand\s+total|amount\s+paid|net\s+payable|total\s+amount|net\s+amount)\s*[:\-]?\s*(?:INR|Rs\.?|₹)?\s*([\d,]+(?:\.\d{1,2})?)", re.I),
+    re.compile(r"\btotal\b\s*[:\-]?\s*(?:INR|Rs\.?|₹)?\s*([\d,]+(?:\.\d{1,2})?)", re.I),
+]
+RECEIPT_HEADER_WORDS = ("tax invoice", "invoice", "receipt", "bill of supply", "cash memo", "gstin", "original")
+
+DATE_PATTERNS = [
+    (re.compile(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b"), "ymd"),
+    (re.compile(r"\b(\d{1,2})[-/](\d{1,2})[-/](\d{4})\b"), "dmy"),
+    (re.compile(r"\b(\d{1,2})[\s\-]([A-Za-z]{3})[A-Za-z]*[\s\-,]+(\d{4})\b"), "d_mon_y"),
+]
+TIME_PATTERN = re.compile(r"\b(\d{1,2}):(\d{2})(?::(\d{2}))?\s*([AaPp][Mm])?")
+
+
+def to_decimal(value: str) -> Optional[Decimal]:
+    """Convert a matched amount string (e.g. '1,234.50') to Decimal."""
+    try:
+        amount = Decimal(value.replace(",", ""))
+    except (InvalidOperation, AttributeError):
+        return None
+    return amount.quantize(Decimal("0.01"))
+
+
+def _parse_timestamp(text: str) -> Optional[datetime]:
+    """Find the first date (and time on the same line, if present) in the text."""
+    m_dt = DATETIME_PATTERN.search(text)
+    if m_dt:
+        try:
+            return datetime.strptime(m_dt.group(1), "%d-%m-%Y %H:%M")
+        except ValueError:
+            pass
+
+    for pattern, layout in DATE_PATTERNS:
+        match = pattern.search(text)
+        if not match:
+            continue
+        try:
+            if layout == "ymd":
+                year, month, day = (int(g) for g in match.groups())
+                parsed = datetime(year, month, day)
+            elif layout == "dmy":
+                day, month, year = (int(g) for g in match.groups())
+                parsed = datetime(year, month, day)
+            else:
+                parsed = datetime.strptime(
+                    f"{match.group(1)} {match.group(2).title()} {match.group(3)}", "%d %b %Y"
+                )
+        except ValueError:
+            continue
+
+        # Look for a time on the remainder of the same line
+        line_end = text.find("\n", match.end())
+        rest_of_line = text[match.end():line_end if line_end != -1 else len(text)]
+        m_time = TIME_PATTERN.search(rest_of_line)
+        if m_time:
+            hour, minute = int(m_time.group(1)), int(m_time.group(2))
+            second = int(m_time.group(3) or 0)
+            meridiem = (m_time.group(4) or "").lower()
+            if meridiem == "pm" and hour < 12:
+                hour += 12
+            elif meridiem == "am" and hour == 12:
+                hour = 0
+            if hour < 24 and minute < 60 and second < 60:
+                parsed = parsed.replace(hour=hour, minute=minute, second=second)
+        return parsed
+
+    return None
+
+
+def _score(fields: Dict, type_found: bool = True) -> float:
+    """
+    Confidence of a parse based on which key fields were found.
+    type_found=False when the type was assumed rather than read from the text.
+    """
+    score = 0.0
+    if fields.get("amount"):
+        score += FIELD_WEIGHTS["amount"]
+    if fields.get("type") and type_found:
+        score += FIELD_WEIGHTS["type"]
+    if fields.get("timestamp"):
+        score += FIELD_WEIGHTS["timestamp"]
+    if fields.get("merchant"):
+        score += FIELD_WEIGHTS["merchant"]
+    if fields.get("transactionId") or fields.get("upiId"):
+        score += FIELD_WEIGHTS["reference"]
+    return round(score, 2)
+
+
+def parse_bank_alert_text(text: str) -> Tuple[Dict, float]:
+    """
+    Bank statement / transaction advice template.
+    Uses the same patterns as the bank email parser.
+    """
+    amount = None
+    m_amount = AMOUNT_PATTERN.search(text)
+    if m_amount:
+        amount = to_decimal(m_amount.group(1))
+
+    if DEBIT_PATTERN.search(text):
+        txn_type = "debit"
+    elif CREDIT_PATTERN.search(text):
+        txn_type = "credit"
+    else:
+        txn_type = None
+
+    merchant = None
+    m_merchant = MERCHANT_SPENT_PATTERN.search(text)
+    if not m_merchant and txn_type == "credit":
+        m_merchant = MERCHANT_FROM_PATTERN.search(text)
+    if not m_merchant:
+        m_merchant = MERCHANT_TO_PATTERN.search(text)
+    if m_merchant:
+        merchant = m_merchant.group(1).strip()[:200] or None
+
+    m_upi = UPI_PATTERN.search(text)
+    m_txn = TXN_ID_PATTERN.search(text)
+
+    balance = None
+    m_bal = BALANCE_PATTERN.search(text)
+    if m_bal:
+        balance = to_decimal(m_bal.group(1))
+
+    m_acc = ACCOUNT_PATTERN.search(text)
+
+    fields = {
+        "amount": amount,
+        "merchant": merchant,
+        "category": categorize_merchant(merchant),
+        "upiId": m_upi.group(1).strip()[:100] if m_upi else None,
+        "transactionId": m_txn.group(1).strip()[:100] if m_txn else None,
+        "timestamp": _parse_timestamp(text),
+        "type": txn_type,
+        "balance": balance,
+        "bankName": detect_bank_name(text),
+        "accountNumber": m_acc.group(1) if m_acc else None,
+    }
+    return fields, _score(fields)
+
+
+def parse_receipt_text(text: str) -> Tuple[Dict, float]:
+    """
+    Merchant receipt / invoice template.
+    The merchant is taken from the first meaningful line and the amount from the final total.
+    """
+    amount = None
+    for pattern in RECEIPT_TOTAL_PATTERNS:
+        matches = pattern.findall(text)
+        if matches:
+            # Subtotals come before the final total, so take the last match
+            amount = to_decimal(matches[-1])
+            break
+
+    merchant = None
+    for line in text.splitlines():
+        candidate = line.strip()
+        if not candidate or not re.search(r"[A-Za-z]{3,}", candidate):
+            continue
+        if any(word in candidate.lower() for word in RECEIPT_HEADER_WORDS):
+            continue
+        merchant = candidate[:200]
+        break
+
+    m_txn = TXN_ID_PATTERN.search(text)
+    m_upi = UPI_PATTERN.search(text)
+
+    fields = {
+        "amount": amount,
+        "merchant": merchant,
+        "category": categorize_merchant(merchant),
+        "upiId": m_upi.group(1).strip()[:100] if m_upi else None,
+        "transactionId": m_txn.group(1).strip()[:100] if m_txn else None,
+        "timestamp": _parse_timestamp(text),
+        # Receipts are always money going out
+        "type": "debit" if amount else None,
+        "balance": None,
+        "bankName": None,
+        "accountNumber": None,
+    }
+    # The debit type only counts when the text says it is a receipt/invoice
+    is_receipt = any(word in text.lower() for word in RECEIPT_HEADER_WORDS)
+    return fields, _score(fields, type_found=is_receipt)
+
+
+def parse_document_text(text: str) -> Tuple[Dict, float]:
+    """Run every template and return the most confident parse."""
+    best_fields, best_confidence = {}, 0.0
+    for template in (parse_bank_alert_text, parse_receipt_text):
+        fields, confidence = template(text)
+        if confidence > best_confidence:
+            best_fields, best_confidence = fields, confidence
+    return best_fields, best_confidence
+
+
+def extract_transaction_locally(
+    text: str,
+    user_id: int = 1,
+    threshold: float = CONFIDENCE_THRESHOLD
+) -> Optional[TransactionCreate]:
+    """
+    Try to build a transaction from document text without the LLM.
+
+    Returns:
+        TransactionCreate if a template parsed the text with enough confidence, otherwise None
+    """
+    if not text:
+        return None
+
+    fields, confidence = parse_document_text(text)
+    if confidence < threshold:
+        logger.info(f"Local document parse confidence {confidence:.2f} below {threshold}, falling back to LLM")
+        return None
+
+    try:
+        transaction = TransactionCreate(
+            user_id=user_id,
+            rawMessage=text[:1000],
+            **fields
+        )
+    except ValidationError as e:
+        logger.info(f"Local document parse rejected by schema: {e}")
+        return None
+
+    logger.info(f"Parsed document locally with confidence {confidence:.2f}")
+    return transaction
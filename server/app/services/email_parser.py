@@ -3,6 +3,57 @@ from datetime import datetime
 from typing import Dict, Optional
 
 
+# Shared transaction patterns (also used by the document parser for PDFs)
+AMOUNT_PATTERN = re.compile(r"(?:INR|Rs\.?|₹)\s*([\d,]+\.?\d*)", re.I)
+MERCHANT_SPENT_PATTERN = re.compile(r"spent at ([A-Za-z0-9 &.\-]+)", re.I)
+MERCHANT_TO_PATTERN = re.compile(r"to ([A-Za-z0-9@.\-]+)", re.I)
+UPI_PATTERN = re.compile(r"UPI(?: ID)?:?\s*([a-zA-Z0-9@._-]+)", re.I)
+TXN_ID_PATTERN = re.compile(r"(?:Txn|Transaction)\s*ID[: ]\s*([A-Za-z0-9\-]+)", re.I)
+DATETIME_PATTERN = re.compile(r"(\d{1,2}-\d{1,2}-\d{4} \d{1,2}:\d{2})")
+DEBIT_PATTERN = re.compile(r"debited|spent|sent|withdrawn", re.I)
+CREDIT_PATTERN = re.compile(r"credited|received|deposited", re.I)
+BALANCE_PATTERN = re.compile(
+    r"(?:avl\.?\s*bal(?:ance)?|available balance|balance)[: ]*\s*(?:INR|Rs\.?|₹)?\s*([\d,]+\.?\d*)",
+    re.I,
+)
+ACCOUNT_PATTERN = re.compile(r"[Xx*]{2,}\s*(\d{4})")
+
+
+def detect_bank_name(text: str) -> Optional[str]:
+    """Map a sender address or document text to a known bank name."""
+    text_lower = text.lower()
+    if "hdfc" in text_lower:
+        return "HDFC Bank"
+    elif "icici" in text_lower:
+        return "ICICI Bank"
+    elif "sbi" in text_lower:
+        return "SBI"
+    elif "axis" in text_lower:
+        return "Axis Bank"
+    return None
+
+
+def categorize_merchant(merchant: Optional[str]) -> Optional[str]:
+    """Basic keyword categorization based on the merchant name."""
+    if not merchant:
+        return None
+
+    merchant_lower = merchant.lower()
+    if any(word in merchant_lower for word in ["swiggy", "zomato", "restaurant", "cafe", "food"]):
+        return "Food & Dining"
+    elif any(word in merchant_lower for word in ["uber", "ola", "rapido", "transport", "petrol", "fuel"]):
+        return "Transportation"
+    elif any(word in merchant_lower for word in ["amazon", "flipkart", "myntra", "shopping", "mall"]):
+        return "Shopping"
+    elif any(word in merchant_lower for word in ["netflix", "spotify", "prime", "hotstar", "entertainment"]):
+        return "Entertainment"
+    elif any(word in merchant_lower for word in ["electricity", "water", "gas", "bill", "recharge"]):
+        return "Bills & Utilities"
+    elif any(word in merchant_lower for word in ["atm", "withdrawal"]):
+        return "Cash Withdrawal"
+    return "Others"
+
+
 def parse_bank_email(subject: str, body: str, sender: str) -> Dict:
     """
     Parse a bank transaction email and return:
@@ -16,7 +67,7 @@ def parse_bank_email(subject: str, body: str, sender: str) -> Dict:
 
     # amount
     amount = None
-    m_amount = re.search(r"(?:INR|Rs\.?|₹)\s*([\d,]+\.?\d*)", raw, re.I)
+    m_amount = AMOUNT_PATTERN.search(raw)
     if m_amount:
         try:
             amount = float(m_amount.group(1).replace(",", ""))
@@ -25,26 +76,26 @@ def parse_bank_email(subject: str, body: str, sender: str) -> Dict:
 
     # merchant
     merchant = None
-    m_merchant = re.search(r"spent at ([A-Za-z0-9 &.\-]+)", raw, re.I)
+    m_merchant = MERCHANT_SPENT_PATTERN.search(raw)
     if not m_merchant:
-        m_merchant = re.search(r"to ([A-Za-z0-9@.\-]+)", raw, re.I)
+        m_merchant = MERCHANT_TO_PATTERN.search(raw)
     if m_merchant:
         merchant = m_merchant.group(1).strip()
 
     # UPI ID
     upiId: Optional[str] = None
-    m_upi = re.search(r"UPI(?: ID)?:?\s*([a-zA-Z0-9@._-]+)", raw, re.I)
+    m_upi = UPI_PATTERN.search(raw)
     if m_upi:
         upiId = m_upi.group(1).strip()
 
     # transaction ID
     transactionId: Optional[str] = None
-    m_txn = re.search(r"(?:Txn|Transaction)\s*ID[: ]\s*([A-Za-z0-9\-]+)", raw, re.I)
+    m_txn = TXN_ID_PATTERN.search(raw)
     if m_txn:
         transactionId = m_txn.group(1).strip()
 
     # timestamp
-    m_dt = re.search(r"(\d{1,2}-\d{1,2}-\d{4} \d{1,2}:\d{2})", raw)
+    m_dt = DATETIME_PATTERN.search(raw)
     if m_dt:
         try:
             dt = datetime.strptime(m_dt.group(1), "%d-%m-%Y %H:%M")
@@ -55,20 +106,16 @@ def parse_bank_email(subject: str, body: str, sender: str) -> Dict:
         timestamp_iso = datetime.utcnow().isoformat()
 
     # type
-    if re.search(r"debited|spent|sent|withdrawn", raw, re.I):
+    if DEBIT_PATTERN.search(raw):
         txn_type = "debit"
-    elif re.search(r"credited|received|deposited", raw, re.I):
+    elif CREDIT_PATTERN.search(raw):
         txn_type = "credit"
     else:
         txn_type = None
 
     # balance
     balance = None
-    m_bal = re.search(
-        r"(?:avl\.?\s*bal(?:ance)?|available balance|balance)[: ]*\s*(?:INR|Rs\.?|₹)?\s*([\d,]+\.?\d*)",
-        raw,
-        re.I,
-    )
+    m_bal = BALANCE_PATTERN.search(raw)
     if m_bal:
         try:
             balance = float(m_bal.group(1).replace(",", ""))
@@ -76,41 +123,16 @@ def parse_bank_email(subject: str, body: str, sender: str) -> Dict:
             pass
 
     # bank name from sender
-    sender_lower = sender.lower()
-    bankName = None
-    if "hdfc" in sender_lower:
-        bankName = "HDFC Bank"
-    elif "icici" in sender_lower:
-        bankName = "ICICI Bank"
-    elif "sbi" in sender_lower:
-        bankName = "SBI"
-    elif "axis" in sender_lower:
-        bankName = "Axis Bank"
+    bankName = detect_bank_name(sender)
 
     # account number (last 4)
     accountNumber = None
-    m_acc = re.search(r"[Xx*]{2,}\s*(\d{4})", raw)
+    m_acc = ACCOUNT_PATTERN.search(raw)
     if m_acc:
         accountNumber = m_acc.group(1)
 
     # category - basic categorization based on merchant/context
-    category = None
-    if merchant:
-        merchant_lower = merchant.lower()
-        if any(word in merchant_lower for word in ["swiggy", "zomato", "restaurant", "cafe", "food"]):
-            category = "Food & Dining"
-        elif any(word in merchant_lower for word in ["uber", "ola", "rapido", "transport", "petrol", "fuel"]):
-            category = "Transportation"
-        elif any(word in merchant_lower for word in ["amazon", "flipkart", "myntra", "shopping", "mall"]):
-            category = "Shopping"
-        elif any(word in merchant_lower for word in ["netflix", "spotify", "prime", "hotstar", "entertainment"]):
-            category = "Entertainment"
-        elif any(word in merchant_lower for word in ["electricity", "water", "gas", "bill", "recharge"]):
-            category = "Bills & Utilities"
-        elif any(word in merchant_lower for word in ["atm", "withdrawal"]):
-            category = "Cash Withdrawal"
-        else:
-            category = "Others"
+    category = categorize_merchant(merchant)
 
     return {
         "amount": amount,
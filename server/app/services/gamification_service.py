@@ -1,7 +1,8 @@
+from bisect import bisect_right
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
+from sqlalchemy import func, and_, insert
 from datetime import datetime, date, timedelta
-from typing import Optional, Dict, List, Tuple
+from typing import Optional, Dict, List, Sequence, Set, Tuple
 from app.models.gamification import (
     GamificationEvent, UserPoints, UserStreak, Achievement, UserAchievement,
     EventType, StreakType, BadgeTier
@@ -10,6 +11,10 @@ from app.schemas.gamification_schema import (
     GamificationProfileResponse, StreakSchema, BadgeSchema,
     GamificationEventResponse, GamificationFeedResponse
 )
+from app.services.achievement_cache import (
+    achievement_ids, clear_achievement_catalogue, earned_achievement_ids
+)
+from app.services.xp_caps import DailyXPCounter, get_daily_xp_counter
 import logging
 
 logger = logging.getLogger(__name__)
@@ -35,6 +40,46 @@ DAILY_XP_CAPS = {
     EventType.DAILY_CHECKIN: 3,  # Only once per day
 }
 
+# Achievements for the number of events of a type: (count, achievement code)
+EVENT_ACHIEVEMENTS = {
+    EventType.TRANSACTION_CATEGORIZED: [
+        (1, "FIRST_CATEGORIZATION"),
+        (50, "CATEGORIZER_BRONZE"),
+        (200, "CATEGORIZER_SILVER"),
+        (1000, "CATEGORIZER_GOLD"),
+    ],
+    EventType.GOAL_COMPLETED: [
+        (1, "GOAL_CRUSHER_BRONZE"),
+        (3, "GOAL_CRUSHER_SILVER"),
+        (10, "GOAL_CRUSHER_GOLD"),
+    ],
+}
+
+# Achievements for reaching a level: (level, achievement code)
+LEVEL_ACHIEVEMENTS = [
+    (5, "LEVEL_5"),
+    (10, "LEVEL_10"),
+    (25, "LEVEL_25"),
+]
+
+# Highest level computed; XP beyond it stays at MAX_LEVEL + 1
+MAX_LEVEL = 100
+
+
+def level_total_xp(level: int) -> int:
+    """Total XP required to reach this level (cumulative)"""
+    if level <= 1:
+        return 0
+    if level <= 5:
+        return (0, 100, 220, 360, 520)[level - 1]
+    # After L5 each level costs 200 + 20 XP per level past 5
+    n = level - 5
+    return 520 + 200 * n + 10 * n * (n + 1)
+
+
+# LEVEL_XP_TOTALS[i] is the total XP for level i + 1
+LEVEL_XP_TOTALS = [level_total_xp(level) for level in range(1, MAX_LEVEL + 2)]
+
 # Streak bonus milestones
 STREAK_BONUSES = {
     3: 5,
@@ -49,82 +94,34 @@ STREAK_BONUSES = {
 class GamificationService:
     """Service to handle all gamification logic"""
     
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, xp_counter: Optional[DailyXPCounter] = None):
         self.db = db
+        self.xp_counter = xp_counter or get_daily_xp_counter()
     
     def _calculate_level_xp(self, level: int) -> int:
         """Calculate total XP required to reach this level (cumulative)"""
-        if level <= 1:
-            return 0
-        elif level == 2:
-            return 100
-        elif level == 3:
-            return 220
-        elif level == 4:
-            return 360
-        elif level == 5:
-            return 520
-        else:
-            # After L5: accumulate XP for each level
-            total = 520  # XP for level 5
-            for lvl in range(6, level + 1):
-                total += 200 + (lvl - 5) * 20
-            return total
+        return level_total_xp(level)
     
     def _get_level_from_xp(self, xp_total: int) -> Tuple[int, int]:
         """
         Calculate level and next level XP from total XP.
         Returns (current_level, xp_for_next_level)
         """
-        level = 1
-        
-        while True:
-            next_level_total_xp = self._calculate_level_xp(level + 1)
-            if xp_total < next_level_total_xp:
-                # Current level found
-                xp_in_current_level = xp_total - self._calculate_level_xp(level)
-                xp_needed_for_next = next_level_total_xp - self._calculate_level_xp(level)
-                return level, xp_needed_for_next
-            level += 1
-            if level > 100:  # Safety cap
-                return level, 1000
+        level = bisect_right(LEVEL_XP_TOTALS, xp_total)
+        if level > MAX_LEVEL:  # Safety cap
+            return MAX_LEVEL + 1, 1000
+        return level, LEVEL_XP_TOTALS[level] - LEVEL_XP_TOTALS[level - 1]
     
-    def _check_daily_cap(self, user_id: int, event_type: EventType) -> bool:
-        """Check if user has hit the daily XP cap for this event type"""
+    def _within_daily_cap(self, user_id: int, event_type: EventType, xp: int) -> bool:
+        """Count xp against the daily cap for this event type; False if the cap was already hit"""
         if event_type not in DAILY_XP_CAPS:
-            return False
-        
-        today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-        
-        total_xp_today = self.db.query(func.sum(GamificationEvent.xp_awarded)).filter(
-            and_(
-                GamificationEvent.user_id == user_id,
-                GamificationEvent.event_type == event_type,
-                GamificationEvent.created_at >= today_start
-            )
-        ).scalar() or 0
-        
-        return total_xp_today >= DAILY_XP_CAPS[event_type]
+            return True
+        return self.xp_counter.try_add(self.db, user_id, event_type, xp, DAILY_XP_CAPS[event_type])
     
-    def award_event(
-        self, 
-        user_id: int, 
-        event_type: EventType, 
-        metadata: Optional[Dict] = None
-    ) -> Optional[GamificationEvent]:
-        """
-        Award XP for a gamification event.
-        Returns the event record or None if capped.
-        """
-        # Check daily cap
-        if self._check_daily_cap(user_id, event_type):
-            logger.info(f"User {user_id} hit daily cap for {event_type}")
-            return None
-        
-        # Calculate XP to award
+    def _event_xp(self, event_type: EventType, metadata: Optional[Dict]) -> int:
+        """XP for one event, scaled by metadata (e.g., milestone percentage)"""
         base_xp = XP_REWARDS.get(event_type, 0)
         
-        # Scale XP based on metadata (e.g., milestone percentage)
         if event_type == EventType.GOAL_MILESTONE_REACHED and metadata:
             milestone_pct = metadata.get("milestone_percentage", 25)
             if milestone_pct >= 75:
@@ -135,15 +132,70 @@ class GamificationService:
                 base_xp = 25
             else:
                 base_xp = 15
+        return base_xp
+    
+    def award_event(
+        self, 
+        user_id: int, 
+        event_type: EventType, 
+        metadata: Optional[Dict] = None
+    ) -> Optional[GamificationEvent]:
+        """
+        Award XP for a gamification event.
+        Returns the event record or None if capped.
+        """
+        events = self.award_events(user_id, [(event_type, metadata)])
+        return events[0] if events else None
+    
+    def award_events(
+        self,
+        user_id: int,
+        events: Sequence[Tuple[EventType, Optional[Dict]]]
+    ) -> List[GamificationEvent]:
+        """
+        Award several events to one user in a single transaction.
         
-        # Create event record
-        event = GamificationEvent(
-            user_id=user_id,
-            event_type=event_type,
-            xp_awarded=base_xp,
-            metadata=metadata
+        Daily caps are applied per event type in order (capped events are
+        dropped), the events are written with one INSERT, UserPoints and the
+        level are updated once, and achievements are evaluated once per event
+        type from a single grouped COUNT.
+        Returns the awarded event records, in request order.
+        """
+        awards = [(event_type, metadata, self._event_xp(event_type, metadata)) for event_type, metadata in events]
+        
+        # How many events of each capped type still fit under today's cap
+        remaining = {}
+        for event_type in dict.fromkeys(event_type for event_type, _, _ in awards):
+            if event_type in DAILY_XP_CAPS:
+                amounts = [xp for other, _, xp in awards if other == event_type]
+                remaining[event_type] = self.xp_counter.reserve(
+                    self.db, user_id, event_type, amounts, DAILY_XP_CAPS[event_type]
+                )
+                if remaining[event_type] < len(amounts):
+                    logger.info(f"User {user_id} hit daily cap for {event_type}")
+        
+        rows = []
+        for event_type, metadata, xp in awards:
+            if event_type in remaining:
+                if not remaining[event_type]:
+                    continue
+                remaining[event_type] -= 1
+            rows.append({
+                "user_id": user_id,
+                "event_type": event_type,
+                "xp_awarded": xp,
+                "event_metadata": metadata
+            })
+        if not rows:
+            return []
+        
+        # Create event records. Ids are assigned in VALUES order within the
+        # one INSERT, so sorting by id restores request order (asking
+        # SQLAlchemy to sort instead splits the INSERT per row on SQLite).
+        awarded = sorted(
+            self.db.scalars(insert(GamificationEvent).returning(GamificationEvent), rows).all(),
+            key=lambda event: event.id
         )
-        self.db.add(event)
         
         # Update user points
         user_points = self.db.query(UserPoints).filter(
@@ -154,23 +206,19 @@ class GamificationService:
             user_points = UserPoints(user_id=user_id, xp_total=0, level=1)
             self.db.add(user_points)
         
-        user_points.xp_total += base_xp
+        user_points.xp_total += sum(row["xp_awarded"] for row in rows)
         new_level, _ = self._get_level_from_xp(user_points.xp_total)
         
         old_level = user_points.level
         user_points.level = new_level
         
-        self.db.commit()
-        self.db.refresh(event)
-        
-        # Check for level-up achievements
-        if new_level > old_level:
-            self._check_level_achievements(user_id, new_level)
+        # Level-up and event-count achievements
+        codes = self._level_achievement_codes(new_level) if new_level > old_level else []
+        codes += self._event_achievement_codes(user_id, {row["event_type"] for row in rows})
+        self._award_achievements(user_id, codes)
         
-        # Check for event-based achievements
-        self._evaluate_achievements(user_id, event_type)
-        
-        return event
+        self.db.commit()
+        return awarded
     
     def update_streak(
         self, 
@@ -359,49 +407,37 @@ class GamificationService:
         }
         return messages.get(event.event_type, "Event completed")
     
-    def _evaluate_achievements(self, user_id: int, event_type: EventType):
-        """Check and award achievements based on recent events"""
-        # Count total events of this type
-        count = self.db.query(func.count(GamificationEvent.id)).filter(
+    def _event_achievement_codes(self, user_id: int, event_types: Set[EventType]) -> List[str]:
+        """Event-count achievements reached, from one grouped count of the user's events"""
+        # Types whose achievements are all earned need no count
+        event_types = [
+            event_type for event_type in event_types
+            if event_type in EVENT_ACHIEVEMENTS and not self._has_all_achievements(
+                user_id, [code for _, code in EVENT_ACHIEVEMENTS[event_type]]
+            )
+        ]
+        if not event_types:
+            return []
+        
+        counts = dict(self.db.query(
+            GamificationEvent.event_type, func.count(GamificationEvent.id)
+        ).filter(
             and_(
                 GamificationEvent.user_id == user_id,
-                GamificationEvent.event_type == event_type
+                GamificationEvent.event_type.in_(event_types)
             )
-        ).scalar()
+        ).group_by(GamificationEvent.event_type).all())
         
-        # Define achievement triggers
-        achievement_checks = []
-        
-        if event_type == EventType.TRANSACTION_CATEGORIZED:
-            if count >= 1:
-                achievement_checks.append("FIRST_CATEGORIZATION")
-            if count >= 50:
-                achievement_checks.append("CATEGORIZER_BRONZE")
-            if count >= 200:
-                achievement_checks.append("CATEGORIZER_SILVER")
-            if count >= 1000:
-                achievement_checks.append("CATEGORIZER_GOLD")
-        
-        elif event_type == EventType.GOAL_COMPLETED:
-            if count >= 1:
-                achievement_checks.append("GOAL_CRUSHER_BRONZE")
-            if count >= 3:
-                achievement_checks.append("GOAL_CRUSHER_SILVER")
-            if count >= 10:
-                achievement_checks.append("GOAL_CRUSHER_GOLD")
-        
-        # Award achievements
-        for achievement_code in achievement_checks:
-            self._award_achievement(user_id, achievement_code)
+        return [
+            code
+            for event_type in event_types
+            for threshold, code in EVENT_ACHIEVEMENTS[event_type]
+            if counts.get(event_type, 0) >= threshold
+        ]
     
-    def _check_level_achievements(self, user_id: int, level: int):
-        """Award achievements based on level"""
-        if level >= 5:
-            self._award_achievement(user_id, "LEVEL_5")
-        if level >= 10:
-            self._award_achievement(user_id, "LEVEL_10")
-        if level >= 25:
-            self._award_achievement(user_id, "LEVEL_25")
+    def _level_achievement_codes(self, level: int) -> List[str]:
+        """Level achievements reached at this level"""
+        return [code for threshold, code in LEVEL_ACHIEVEMENTS if level >= threshold]
     
     def _check_streak_achievements(
         self, 
@@ -424,34 +460,35 @@ class GamificationService:
     
     def _award_achievement(self, user_id: int, achievement_code: str):
         """Award an achievement to a user if not already earned"""
-        achievement = self.db.query(Achievement).filter(
-            Achievement.code == achievement_code
-        ).first()
-        
-        if not achievement:
-            logger.warning(f"Achievement {achievement_code} not found")
-            return
-        
-        # Check if already earned
-        existing = self.db.query(UserAchievement).filter(
-            and_(
-                UserAchievement.user_id == user_id,
-                UserAchievement.achievement_id == achievement.id
-            )
-        ).first()
-        
-        if existing:
-            return
-        
-        # Award achievement
-        user_achievement = UserAchievement(
-            user_id=user_id,
-            achievement_id=achievement.id
-        )
-        self.db.add(user_achievement)
+        self._award_achievements(user_id, [achievement_code])
         self.db.commit()
+    
+    def _award_achievements(self, user_id: int, achievement_codes: List[str]):
+        """
+        Award the achievements the user has not earned yet. Ids come from the
+        achievement catalogue and the user's earned set is cached per session,
+        so this normally runs no queries. Caller is responsible for committing.
+        """
+        if not achievement_codes:
+            return
         
-        logger.info(f"Awarded achievement {achievement_code} to user {user_id}")
+        ids = achievement_ids(self.db, achievement_codes)
+        for code in set(achievement_codes) - ids.keys():
+            logger.warning(f"Achievement {code} not found")
+        
+        # Skip those already earned
+        earned = earned_achievement_ids(self.db, user_id)
+        for code, achievement_id in ids.items():
+            if achievement_id in earned:
+                continue
+            self.db.add(UserAchievement(user_id=user_id, achievement_id=achievement_id))
+            earned.add(achievement_id)
+            logger.info(f"Awarded achievement {code} to user {user_id}")
+    
+    def _has_all_achievements(self, user_id: int, achievement_codes: List[str]) -> bool:
+        """Whether the user already holds every one of these achievements"""
+        ids = achievement_ids(self.db, achievement_codes)
+        return len(ids) == len(achievement_codes) and set(ids.values()) <= earned_achievement_ids(self.db, user_id)
 
 
 def seed_achievements(db: Session):
@@ -567,4 +604,5 @@ def seed_achievements(db: Session):
             db.add(achievement)
     
     db.commit()
+    clear_achievement_catalogue()
     logger.info("Seeded achievements")
@@ -90,6 +90,11 @@ class GoalService:
     
     @staticmethod
     async def process_transaction_for_goals(db: Session, transaction: Transaction) -> List[GoalContribution]:
+        """Async entry point kept for existing callers; see apply_transaction_to_goals."""
+        return GoalService.apply_transaction_to_goals(db, transaction)
+    
+    @staticmethod
+    def apply_transaction_to_goals(db: Session, transaction: Transaction) -> List[GoalContribution]:
         """
         Process a transaction and update active goals.
         Credits add to savings, debits subtract from savings.
@@ -105,6 +110,8 @@ class GoalService:
             return []
         
         contributions = []
+        # Gamification events of all goals, awarded together after the loop
+        awards = []
         
         for goal in active_goals:
             # Calculate amount to add/subtract based on transaction type
@@ -139,16 +146,10 @@ class GoalService:
                     logger.info(f"Goal {goal.id} '{goal.title}' achieved for user {transaction.user_id}!")
                     
                     # Award goal completion event
-                    try:
-                        from app.services.gamification_service import GamificationService
-                        gamification = GamificationService(db)
-                        gamification.award_event(
-                            transaction.user_id, 
-                            EventType.GOAL_COMPLETED,
-                            metadata={"goal_id": goal.id, "goal_title": goal.title}
-                        )
-                    except Exception as e:
-                        logger.warning(f"Failed to award GOAL_COMPLETED event: {e}")
+                    awards.append((
+                        EventType.GOAL_COMPLETED,
+                        {"goal_id": goal.id, "goal_title": goal.title}
+                    ))
                         
                 elif goal.current_amount < goal.target_amount and goal.is_achieved:
                     # If amount drops below target, mark as not achieved
@@ -160,23 +161,24 @@ class GoalService:
                     milestones = [25, 50, 75]
                     for milestone in milestones:
                         if previous_percentage < milestone <= current_percentage:
-                            try:
-                                from app.services.gamification_service import GamificationService
-                                gamification = GamificationService(db)
-                                gamification.award_event(
-                                    transaction.user_id,
-                                    EventType.GOAL_MILESTONE_REACHED,
-                                    metadata={
-                                        "goal_id": goal.id,
-                                        "goal_title": goal.title,
-                                        "milestone_percentage": milestone
-                                    }
-                                )
-                            except Exception as e:
-                                logger.warning(f"Failed to award GOAL_MILESTONE_REACHED event: {e}")
+                            awards.append((
+                                EventType.GOAL_MILESTONE_REACHED,
+                                {
+                                    "goal_id": goal.id,
+                                    "goal_title": goal.title,
+                                    "milestone_percentage": milestone
+                                }
+                            ))
                 
                 contributions.append(contribution)
         
+        if awards:
+            try:
+                from app.services.gamification_service import GamificationService
+                GamificationService(db).award_events(transaction.user_id, awards)
+            except Exception as e:
+                logger.warning(f"Failed to award goal events: {e}")
+        
         if contributions:
             db.commit()
             logger.info(f"Processed {len(contributions)} goal contributions for transaction {transaction.id}")
@@ -0,0 +1,248 @@
+"""
+Financial Health Score
+Scores a user's last months of cash flow (0-100) from income stability,
+spending discipline, emergency fund, savings rate, debt health and income
+diversification. Shared by the health score API and the snapshot batch job.
+"""
+from datetime import date, datetime, time
+from typing import Dict, List, Optional, Sequence, Tuple
+import statistics
+
+from app.schemas.health_score_schema import (
+    FinancialHealthScore,
+    HealthScoreBreakdown,
+    HealthScoreFactors,
+    HealthScoreTrend,
+    HealthScoreRecommendations
+)
+from app.services.lean_week_predictor import LeanWeekPredictor
+
+# Trend points returned (one per month, the last being the current score)
+TREND_POINTS = 6
+
+
+def calculate_grade(score: float) -> str:
+    """Convert numerical score to letter grade."""
+    if score >= 97: return 'A+'
+    elif score >= 93: return 'A'
+    elif score >= 90: return 'A-'
+    elif score >= 87: return 'B+'
+    elif score >= 83: return 'B'
+    elif score >= 80: return 'B-'
+    elif score >= 77: return 'C+'
+    elif score >= 73: return 'C'
+    elif score >= 70: return 'C-'
+    elif score >= 67: return 'D+'
+    elif score >= 63: return 'D'
+    elif score >= 60: return 'D-'
+    else: return 'F'
+
+
+def build_trend(
+    history: Sequence[Tuple[date, float]],
+    current_score: float,
+    today: Optional[date] = None
+) -> List[HealthScoreTrend]:
+    """
+    Monthly trend from snapshot history (oldest first): the latest snapshot of
+    each earlier month, followed by today's score.
+    """
+    today = today or datetime.utcnow().date()
+    latest_by_month: Dict[Tuple[int, int], Tuple[date, float]] = {}
+    for snapshot_date, score in history:
+        if snapshot_date < today.replace(day=1):
+            latest_by_month[(snapshot_date.year, snapshot_date.month)] = (snapshot_date, score)
+
+    points = [latest_by_month[month] for month in sorted(latest_by_month)][-(TREND_POINTS - 1):]
+    points.append((today, current_score))
+
+    trend = []
+    previous = None
+    for point_date, score in points:
+        trend.append(HealthScoreTrend(
+            date=datetime.combine(point_date, time.min),
+            score=max(0, min(100, score)),
+            change=round(score - previous, 1) if previous is not None else None
+        ))
+        previous = score
+    return trend
+
+
+def score_monthly_flow(
+    monthly_flow: List[Dict],
+    history: Sequence[Tuple[date, float]] = ()
+) -> FinancialHealthScore:
+    """
+    Score a non-empty monthly cash flow series (LeanWeekPredictor.get_monthly_cash_flow).
+
+    Args:
+        monthly_flow: Monthly cash flow, oldest first
+        history: (snapshot_date, overall_score) of earlier snapshots, oldest first
+    """
+    predictor = LeanWeekPredictor()
+    
+    # Calculate income volatility (coefficient of variation)
+    incomes = [m['income'] for m in monthly_flow if m['income'] > 0]
+    avg_income = statistics.mean(incomes) if incomes else 1
+    if len(incomes) > 1 and avg_income > 0:
+        income_std = statistics.stdev(incomes)
+        volatility = income_std / avg_income
+    else:
+        volatility = 0.0
+    
+    # Calculate component scores (0-100 each)
+    
+    # 1. Income Stability (inverse of volatility)
+    # Low volatility = high score
+    income_stability = max(0, 100 - (volatility * 150))  # Scale volatility to 0-100
+    
+    # 2. Spending Discipline
+    # Based on expense consistency and impulse spending patterns
+    expenses = [m['expenses'] for m in monthly_flow]
+    expense_cv = (statistics.stdev(expenses) / statistics.mean(expenses)) if len(expenses) > 1 and statistics.mean(expenses) > 0 else 0
+    spending_discipline = max(0, 100 - (expense_cv * 100))
+    
+    # 3. Emergency Fund Score
+    # Calculate if user has buffer
+    lean_analysis = predictor.identify_lean_periods(monthly_flow)
+    avg_expenses = statistics.mean(expenses) if expenses else 0
+    
+    # Get current balance (last net flow)
+    recent_balance = sum(m['net_flow'] for m in monthly_flow)
+    months_of_expenses = (recent_balance / avg_expenses) if avg_expenses > 0 else 0
+    
+    # Target: 3-6 months based on volatility
+    target_months = 3 if volatility < 0.3 else 6
+    # Clamped at 0: net outflow over the window means no buffer, not a negative score
+    emergency_fund = max(0, min(100, (months_of_expenses / target_months) * 100))
+    
+    # 4. Savings Rate
+    total_income = sum(incomes) if incomes else 1
+    total_expenses = sum(expenses) if expenses else 0
+    savings_rate_pct = ((total_income - total_expenses) / total_income) * 100 if total_income > 0 else 0
+    savings_rate = min(100, max(0, savings_rate_pct * 5))  # Scale to 0-100
+    
+    # 5. Debt Health (placeholder - can be enhanced with actual debt tracking)
+    debt_health = 85.0  # Default good score if no debt data
+    
+    # 6. Income Diversification
+    unique_sources = set()
+    for m in monthly_flow:
+        if 'income_sources' in m:
+            unique_sources.add(m['income_sources'])
+    diversification = min(100, len(unique_sources) * 25)  # 4+ sources = 100
+    
+    # Calculate overall score (weighted average)
+    overall_score = (
+        income_stability * 0.25 +
+        spending_discipline * 0.20 +
+        emergency_fund * 0.20 +
+        savings_rate * 0.15 +
+        debt_health * 0.10 +
+        diversification * 0.10
+    )
+    
+    # Identify factors
+    positive_factors = []
+    negative_factors = []
+    critical_issues = []
+    
+    if income_stability > 70:
+        positive_factors.append(f"Stable income with {volatility:.1%} volatility")
+    elif income_stability < 40:
+        negative_factors.append(f"High income volatility ({volatility:.1%})")
+        critical_issues.append("Income is highly variable - prioritize emergency fund")
+    
+    if spending_discipline > 75:
+        positive_factors.append("Consistent spending patterns")
+    elif spending_discipline < 50:
+        negative_factors.append("Irregular spending patterns detected")
+    
+    if emergency_fund > 70:
+        positive_factors.append(f"Good emergency buffer ({months_of_expenses:.1f} months)")
+    elif emergency_fund < 30:
+        critical_issues.append(f"Need {target_months} months of expenses saved")
+    
+    if savings_rate_pct > 15:
+        positive_factors.append(f"Strong {savings_rate_pct:.1f}% savings rate")
+    elif savings_rate_pct < 0:
+        critical_issues.append("Spending exceeds income")
+        negative_factors.append("Negative savings rate")
+    
+    if diversification > 75:
+        positive_factors.append("Multiple income sources")
+    elif diversification < 40:
+        negative_factors.append("Limited income diversification")
+    
+    # Create recommendations
+    recommendations = []
+    
+    if emergency_fund < 70:
+        recommendations.append(HealthScoreRecommendations(
+            priority='high',
+            action=f"Build emergency fund to {target_months} months of expenses",
+            impact=f"Would increase score by {(70 - emergency_fund) * 0.2:.1f} points",
+            difficulty='moderate',
+            estimated_score_gain=(70 - emergency_fund) * 0.2
+        ))
+    
+    if spending_discipline < 70:
+        recommendations.append(HealthScoreRecommendations(
+            priority='medium',
+            action="Create consistent monthly budget and track expenses",
+            impact=f"Would increase score by {(70 - spending_discipline) * 0.2:.1f} points",
+            difficulty='easy',
+            estimated_score_gain=(70 - spending_discipline) * 0.2
+        ))
+    
+    if diversification < 60:
+        recommendations.append(HealthScoreRecommendations(
+            priority='medium',
+            action="Diversify income sources to reduce risk",
+            impact=f"Would increase score by {(60 - diversification) * 0.1:.1f} points",
+            difficulty='challenging',
+            estimated_score_gain=(60 - diversification) * 0.1
+        ))
+    
+    # Sort by estimated gain
+    recommendations.sort(key=lambda r: r.estimated_score_gain, reverse=True)
+    recommendations = recommendations[:3]  # Top 3
+    
+    # Trend from persisted snapshots, ending with the current score
+    trend = build_trend(history, round(overall_score, 1))
+    
+    # Score description
+    if overall_score >= 80:
+        description = "Excellent financial health! You're managing money effectively."
+    elif overall_score >= 65:
+        description = "Good financial health with room for improvement."
+    elif overall_score >= 50:
+        description = "Fair financial health. Focus on key improvements."
+    else:
+        description = "Financial health needs attention. Take action on critical issues."
+    
+    # Data quality
+    data_quality = 'excellent' if len(monthly_flow) >= 6 else 'good' if len(monthly_flow) >= 3 else 'fair'
+    
+    return FinancialHealthScore(
+        overall_score=round(overall_score, 1),
+        grade=calculate_grade(overall_score),
+        score_description=description,
+        breakdown=HealthScoreBreakdown(
+            income_stability=round(income_stability, 1),
+            spending_discipline=round(spending_discipline, 1),
+            emergency_fund=round(emergency_fund, 1),
+            savings_rate=round(savings_rate, 1),
+            debt_health=round(debt_health, 1),
+            diversification=round(diversification, 1)
+        ),
+        factors=HealthScoreFactors(
+            positive_factors=positive_factors,
+            negative_factors=negative_factors,
+            critical_issues=critical_issues
+        ),
+        comparison=None,  # Filled from cohort statistics by the caller
+        trend=trend,
+        recommendations=recommendations,
+        data_quality=data_quality
+    )
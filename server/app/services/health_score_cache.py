@@ -0,0 +1,73 @@
+"""
+Health Score Snapshot Cache
+Serialized FinancialHealthScore responses keyed on (user_id, users.data_version).
+
+A transaction write bumps the user's data_version, so the next request misses
+and recomputes; nothing has to be deleted. Entries live in Redis (shared by all
+API processes) with a TTL, which also bounds how long a score can lag behind
+the rolling 6-month window. A small in-process TTLCache sits in front, and is
+the only tier while Redis is unreachable.
+
+Each entry carries an ETag derived from the body, so clients revalidating with
+If-None-Match get a 304 without the score being recomputed or re-sent.
+"""
+import hashlib
+import json
+from typing import NamedTuple, Optional
+
+from app.core.config import settings
+from app.services.tiered_cache import TieredCache, cache_redis_client
+
+KEY_PREFIX = "health_score"
+
+
+class CachedScore(NamedTuple):
+    etag: str
+    body: str
+
+
+def make_etag(body: str) -> str:
+    return '"' + hashlib.sha256(body.encode()).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header value matches etag (weak comparison)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+class HealthScoreCache(TieredCache):
+    """Two-tier (in-process + Redis) cache of serialized health scores."""
+
+    name = "Health score cache"
+
+    @staticmethod
+    def key(user_id: int, data_version: int) -> str:
+        return f"{KEY_PREFIX}:{user_id}:{data_version}"
+
+    def encode(self, entry: CachedScore) -> str:
+        return json.dumps(entry._asdict())
+
+    def decode(self, raw: str) -> CachedScore:
+        return CachedScore(**json.loads(raw))
+
+    async def get(self, user_id: int, data_version: int) -> Optional[CachedScore]:
+        return await self.get_entry(self.key(user_id, data_version))
+
+    async def set(self, user_id: int, data_version: int, body: str) -> CachedScore:
+        return await self.set_entry(self.key(user_id, data_version), CachedScore(etag=make_etag(body), body=body))
+
+
+_health_score_cache: Optional[HealthScoreCache] = None
+
+
+def get_health_score_cache() -> HealthScoreCache:
+    """Process-wide cache (also used as a FastAPI dependency)."""
+    global _health_score_cache
+    if _health_score_cache is None:
+        _health_score_cache = HealthScoreCache(cache_redis_client(), ttl=settings.health_score_cache_ttl)
+    return _health_score_cache
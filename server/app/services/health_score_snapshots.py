@@ -0,0 +1,205 @@
+"""
+Health Score Snapshots
+Daily batch job that stores every active user's health score in
+health_score_snapshots, the source of the real score trend.
+
+Users are processed in chunks across a process pool. Each chunk loads the
+monthly cash flow of all its users with two set-based queries (live partial
+month + cash_flow_rollups), scores them in memory and replaces the chunk's
+snapshots for the day with one DELETE and one multi-row INSERT, so re-running
+the job on the same day is idempotent. Chunks also return score histograms,
+merged into the day's cohort distributions (see cohort_stats).
+
+Run daily (e.g. Heroku Scheduler):
+    python -m app.services.health_score_snapshots [--workers N] [--chunk-size N]
+"""
+import argparse
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from itertools import repeat
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal, engine
+from app.models.cash_flow_rollup import CashFlowRollup
+from app.models.health_score_snapshot import HealthScoreSnapshot
+from app.services.cash_flow_rollups import cash_flow_series_for_users, period_start
+from app.services.cohort_stats import ScoreHistogram, build_sketches, merge_sketches, save_cohort_sketches
+from app.services.health_score import score_monthly_flow
+from app.services.lean_week_predictor import LeanWeekPredictor
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_CHUNK = 500
+
+# Same window as the health score endpoint (get_monthly_cash_flow, months=6)
+SCORE_WINDOW_DAYS = 6 * 30
+
+# Snapshot history read for the trend
+TREND_WINDOW_DAYS = 190
+
+
+def active_user_ids(db: Session, now: datetime) -> List[int]:
+    """Users with any transaction in the scoring window."""
+    first_month = period_start(now - timedelta(days=SCORE_WINDOW_DAYS), "month")
+    return db.execute(
+        select(CashFlowRollup.user_id).where(
+            CashFlowRollup.granularity == "month",
+            CashFlowRollup.period_start >= first_month
+        ).distinct().order_by(CashFlowRollup.user_id)
+    ).scalars().all()
+
+
+def write_snapshots(
+    db: Session,
+    user_ids: List[int],
+    snapshot_date: date,
+    now: datetime
+) -> Tuple[int, Dict[str, ScoreHistogram]]:
+    """
+    Score a chunk of users and replace their snapshots for snapshot_date.
+
+    Returns:
+        Tuple of (snapshots written, cohort sketches of the chunk's scores)
+    """
+    series = cash_flow_series_for_users(db, user_ids, "month", now - timedelta(days=SCORE_WINDOW_DAYS))
+
+    rows = []
+    scores = []
+    for user_id in user_ids:
+        monthly_flow = LeanWeekPredictor.monthly_flow_from_series(series.get(user_id, []))
+        if not monthly_flow:
+            continue
+        try:
+            score = score_monthly_flow(monthly_flow)
+        except Exception:
+            # One unscorable user must not fail the whole chunk
+            logger.exception(f"Health score snapshot failed for user {user_id}")
+            continue
+        scores.append(score)
+        rows.append({
+            "user_id": user_id,
+            "snapshot_date": snapshot_date,
+            "overall_score": score.overall_score,
+            **score.breakdown.model_dump()
+        })
+
+    db.execute(delete(HealthScoreSnapshot).where(
+        HealthScoreSnapshot.user_id.in_(user_ids),
+        HealthScoreSnapshot.snapshot_date == snapshot_date
+    ))
+    if rows:
+        db.execute(insert(HealthScoreSnapshot), rows)
+    return len(rows), build_sketches(scores)
+
+
+def snapshot_chunk(
+    user_ids: List[int],
+    now: datetime,
+    session_factory=None
+) -> Tuple[int, Dict[str, ScoreHistogram]]:
+    """Snapshot one chunk of users in its own session and transaction."""
+    with (session_factory or SessionLocal)() as db:
+        result = write_snapshots(db, user_ids, now.date(), now)
+        db.commit()
+    return result
+
+
+def _merge_chunk_results(results) -> Tuple[int, Dict[str, ScoreHistogram]]:
+    written = 0
+    sketches: Dict[str, ScoreHistogram] = {}
+    for chunk_written, chunk_sketches in results:
+        written += chunk_written
+        merge_sketches(sketches, chunk_sketches)
+    return written, sketches
+
+
+def _init_worker():
+    # Connections inherited from the parent process must not be reused
+    engine.dispose(close=False)
+
+
+def run_snapshot_job(
+    workers: int = 1,
+    chunk_size: int = SNAPSHOT_CHUNK,
+    session_factory=None,
+    now: Optional[datetime] = None
+) -> Dict:
+    """
+    Snapshot all active users.
+
+    Args:
+        workers: Worker processes (1 runs the chunks in this process)
+        chunk_size: Users per chunk
+        session_factory: Session factory for in-process runs (defaults to SessionLocal)
+        now: Reference time (defaults to utcnow)
+
+    Returns:
+        Dict with users, snapshots, chunks, seconds and users_per_second
+    """
+    now = now or datetime.utcnow()
+    started = time.perf_counter()
+
+    with (session_factory or SessionLocal)() as db:
+        user_ids = active_user_ids(db, now)
+    chunks = [user_ids[i:i + chunk_size] for i in range(0, len(user_ids), chunk_size)]
+
+    if workers <= 1 or len(chunks) <= 1:
+        results = (snapshot_chunk(chunk, now, session_factory) for chunk in chunks)
+        written, sketches = _merge_chunk_results(results)
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), initializer=_init_worker) as executor:
+            written, sketches = _merge_chunk_results(executor.map(snapshot_chunk, chunks, repeat(now)))
+
+    # Cohort percentiles for the day, merged from every chunk's sketches
+    with (session_factory or SessionLocal)() as db:
+        save_cohort_sketches(db, now.date(), sketches)
+        db.commit()
+
+    seconds = time.perf_counter() - started
+    stats = {
+        "users": len(user_ids),
+        "snapshots": written,
+        "chunks": len(chunks),
+        "seconds": round(seconds, 2),
+        "users_per_second": round(len(user_ids) / seconds, 1) if seconds > 0 else 0.0
+    }
+    logger.info(
+        f"Health score snapshots: {stats['snapshots']} written for {stats['users']} users "
+        f"in {stats['seconds']}s ({stats['users_per_second']} users/s, {stats['chunks']} chunks)"
+    )
+    return stats
+
+
+def recent_snapshot_scores(db: Session, user_id: int, today: Optional[date] = None) -> List[Tuple[date, float]]:
+    """(snapshot_date, overall_score) for the trend window, oldest first (one index range read)."""
+    today = today or datetime.utcnow().date()
+    rows = db.execute(
+        select(HealthScoreSnapshot.snapshot_date, HealthScoreSnapshot.overall_score).where(
+            HealthScoreSnapshot.user_id == user_id,
+            HealthScoreSnapshot.snapshot_date >= today - timedelta(days=TREND_WINDOW_DAYS)
+        ).order_by(HealthScoreSnapshot.snapshot_date)
+    ).all()
+    return [(row.snapshot_date, row.overall_score) for row in rows]
+
+
+def main():
+    """Command line entry point for the scheduled job."""
+    from app.core.config import settings
+    from app.models import behaviour, goal, user  # noqa: F401 - resolve User relationships
+
+    parser = argparse.ArgumentParser(description="Snapshot health scores of all active users")
+    parser.add_argument("--workers", type=int, default=settings.health_score_snapshot_workers)
+    parser.add_argument("--chunk-size", type=int, default=SNAPSHOT_CHUNK)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    run_snapshot_job(workers=args.workers, chunk_size=args.chunk_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -14,20 +14,30 @@ from app.schemas.insights import (
     IncomeHealth, DataQuality, BehaviorSummary,
     RecommendationInsight, TradeOffInsight, DifficultyBreakdown,
     ScenarioOption, DifficultyScenarioItem, QuickWinOpportunity,
-    RiskWarning, DashboardInsight, ComparisonInsight
+    RiskWarning, DashboardInsight, ComparisonInsight, DashboardInsightResponse
 )
 from app.services.insight_calculator import InsightCalculator
 from app.config.insight_config import InsightThresholds, InsightConfig
 from app.models.behaviour import BehaviourModel
 from app.utils.category_utils import (
     get_category_reliability_score,
-    identify_rare_categories,
     get_category_summary
 )
 
 logger = logging.getLogger(__name__)
 
 
+def get_model_income_stats(model: Optional[BehaviourModel]) -> Optional[Dict[str, Any]]:
+    """Income statistics tracked on the behavior model, or None if there are none yet."""
+    if not model or not model.monthly_patterns:
+        return None
+    
+    income_stats = model.monthly_patterns.get('income_stats')
+    if income_stats and income_stats.get('transaction_count', 0) > 0:
+        return income_stats
+    return None
+
+
 class InsightFormatter:
     """
     Formats behavior models and simulation results into frontend-ready insights.
@@ -250,7 +260,8 @@ class InsightFormatter:
     def format_behavior_summary(
         self,
         model: BehaviourModel,
-        income_stats: Optional[Dict[str, Any]] = None
+        income_stats: Optional[Dict[str, Any]] = None,
+        category_summary: Optional[Dict[str, Dict]] = None
     ) -> BehaviorSummary:
         """
         Format user's behavior model into dashboard insights.
@@ -258,6 +269,7 @@ class InsightFormatter:
         Args:
             model: User's BehaviourModel
             income_stats: Optional income statistics
+            category_summary: get_category_summary(model), if the caller already has it
             
         Returns:
             Validated BehaviorSummary with all metrics
@@ -265,8 +277,9 @@ class InsightFormatter:
         Raises:
             ValidationError: If output doesn't match schema
         """
-        category_summary = get_category_summary(model)
-        rare_categories = identify_rare_categories(model)
+        if category_summary is None:
+            category_summary = get_category_summary(model)
+        rare_categories = [cat for cat, stats in category_summary.items() if stats.get('is_rare', False)]
         
         # Build top categories
         top_categories = self._build_top_categories(category_summary)
@@ -311,18 +324,21 @@ class InsightFormatter:
     
     def get_quick_wins(
         self,
-        model: BehaviourModel
+        model: BehaviourModel,
+        category_summary: Optional[Dict[str, Dict]] = None
     ) -> List[QuickWinOpportunity]:
         """
         Identify top quick win opportunities for the user.
         
         Args:
             model: User's BehaviourModel
+            category_summary: get_category_summary(model), if the caller already has it
             
         Returns:
             List of up to 5 validated QuickWinOpportunity objects
         """
-        category_summary = get_category_summary(model)
+        if category_summary is None:
+            category_summary = get_category_summary(model)
         quick_wins = []
         
         for cat, stats in category_summary.items():
@@ -449,6 +465,50 @@ class InsightFormatter:
         
         return warnings
     
+    def build_dashboard(
+        self,
+        model: BehaviourModel,
+        income_stats: Optional[Dict[str, Any]] = None
+    ) -> DashboardInsightResponse:
+        """
+        Complete dashboard bundle: behavior summary, quick wins, risk warnings
+        and recommended actions, all built from one category summary.
+        
+        Args:
+            model: User's BehaviourModel
+            income_stats: Optional income statistics
+            
+        Returns:
+            Validated DashboardInsightResponse
+        """
+        category_summary = get_category_summary(model)
+        behavior_summary = self.format_behavior_summary(model, income_stats, category_summary)
+        quick_wins = self.get_quick_wins(model, category_summary)
+        risk_warnings = self.get_risk_warnings(model, income_stats)
+        
+        recommended_actions = []
+        if quick_wins:
+            top_win = quick_wins[0]
+            recommended_actions.append(
+                f"Start with {top_win.category}: {top_win.action} to save ${top_win.monthly_savings:.0f}/month"
+            )
+        
+        if any(w.severity == 'high' for w in risk_warnings):
+            recommended_actions.append("Review high-priority warnings before making changes")
+        
+        if model.transaction_count < 50:
+            recommended_actions.append("Continue tracking transactions for better personalization")
+        
+        if not recommended_actions:
+            recommended_actions.append("Explore scenario comparisons to find savings opportunities")
+        
+        return DashboardInsightResponse(
+            behavior_summary=behavior_summary,
+            quick_wins=quick_wins,
+            risk_warnings=risk_warnings,
+            recommended_actions=recommended_actions
+        )
+    
     # Private helper methods
     
     def _validate_simulation_result(self, result: Dict[str, Any]) -> None:
@@ -3,6 +3,7 @@ Custom Python Job Queue System using Redis
 Simple, lightweight job queue without external dependencies
 """
 import json
+import ssl
 import time
 import uuid
 import logging
@@ -14,6 +15,17 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def redis_ssl_params(redis_url: str) -> Dict[str, Any]:
+    """Connection kwargs for Heroku Redis, which uses SSL with self-signed certificates"""
+    # Heroku Redis uses SSL even with redis:// URL (port 23580+ indicates SSL)
+    if 'amazonaws.com' in redis_url or redis_url.startswith('rediss://'):
+        return {
+            'ssl_cert_reqs': ssl.CERT_NONE,  # Don't verify SSL certificates (Heroku uses self-signed)
+            'ssl_check_hostname': False
+        }
+    return {}
+
+
 class JobQueue:
     """Simple job queue using Redis"""
     
@@ -24,20 +36,10 @@ class JobQueue:
             redis_url: Redis connection URL (e.g., redis://localhost:6379/0)
             queue_name: Name of the queue
         """
-        # Configure SSL for Heroku Redis (uses self-signed certificates)
-        import ssl
-        ssl_params = {}
-        # Heroku Redis uses SSL even with redis:// URL (port 23580+ indicates SSL)
-        if 'amazonaws.com' in redis_url or redis_url.startswith('rediss://'):
-            ssl_params = {
-                'ssl_cert_reqs': ssl.CERT_NONE,  # Don't verify SSL certificates (Heroku uses self-signed)
-                'ssl_check_hostname': False
-            }
-        
         self.redis_client = redis.from_url(
             redis_url, 
             decode_responses=True,
-            **ssl_params
+            **redis_ssl_params(redis_url)
         )
         self.queue_name = queue_name
         self.processing_queue = f"{queue_name}:processing"
@@ -168,6 +170,28 @@ class JobQueue:
             self.redis_client.sadd(self.failed_queue, job_id)
             logger.error(f"Job {job_id} permanently failed after {job['attempts']} attempts")
     
+    def requeue_job(self, job_id: str, reason: str = ""):
+        """
+        Put a dequeued job back on the queue without counting an attempt
+        (e.g. when a concurrency limit is reached)
+        """
+        job_key = f"{self.job_data_prefix}{job_id}"
+        job_data = self.redis_client.get(job_key)
+        
+        if not job_data:
+            return
+        
+        job = json.loads(job_data)
+        job["status"] = "waiting"
+        job["deferred"] = job.get("deferred", 0) + 1
+        if reason:
+            job["waiting_reason"] = reason
+        
+        self.redis_client.set(job_key, json.dumps(job))
+        self.redis_client.srem(self.processing_queue, job_id)
+        # Sort behind other jobs of the same priority so a blocked job doesn't hold the head
+        self.redis_client.zadd(self.queue_name, {job_id: -job.get("priority", 0) + 0.5})
+    
     def get_job_status(self, job_id: str) -> Optional[Dict[str, Any]]:
         """Get job status and data"""
         job_key = f"{self.job_data_prefix}{job_id}"
@@ -192,6 +216,67 @@ class JobQueue:
         logger.warning("Queue cleared")
 
 
+class ConcurrencyLimiter:
+    """
+    Redis-backed limit on jobs running at once, globally and per key (e.g. per user).
+    
+    Each running job holds a leased slot: a member of a sorted set scored by
+    its expiry time. Acquiring first drops expired slots, so a slot leaked by a
+    crashed worker frees itself slot_ttl seconds after it was taken, however
+    busy the limiter is. slot_ttl should exceed the longest job.
+    """
+    
+    ACQUIRE_SCRIPT = """
+    redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[3])
+    redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', ARGV[3])
+    if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[1]) or redis.call('ZCARD', KEYS[2]) >= tonumber(ARGV[2]) then
+        return 0
+    end
+    redis.call('ZADD', KEYS[1], ARGV[4], ARGV[5])
+    redis.call('ZADD', KEYS[2], ARGV[4], ARGV[5])
+    -- Only clears sets left idle; live slots expire by score
+    redis.call('EXPIRE', KEYS[1], ARGV[6])
+    redis.call('EXPIRE', KEYS[2], ARGV[6])
+    return 1
+    """
+    
+    def __init__(self, redis_client, name: str, global_limit: int, per_key_limit: int, slot_ttl: int = 300):
+        self.redis_client = redis_client
+        self.global_key = f"{name}:slots"
+        self.key_prefix = f"{name}:slots:"
+        self.global_limit = global_limit
+        self.per_key_limit = per_key_limit
+        self.slot_ttl = slot_ttl
+        self._acquire = redis_client.register_script(self.ACQUIRE_SCRIPT)
+    
+    def acquire(self, key: str, now: Optional[float] = None) -> Optional[str]:
+        """
+        Take a slot for key if both the global and per-key limits allow it.
+        
+        Returns:
+            The slot id to pass to release(), or None if a limit was hit
+        """
+        now = time.time() if now is None else now
+        slot = str(uuid.uuid4())
+        acquired = self._acquire(
+            keys=[self.global_key, f"{self.key_prefix}{key}"],
+            args=[self.global_limit, self.per_key_limit, now, now + self.slot_ttl, slot, self.slot_ttl]
+        )
+        return slot if acquired else None
+    
+    def at_global_limit(self, now: Optional[float] = None) -> bool:
+        """Whether unexpired slots already fill the global limit"""
+        now = time.time() if now is None else now
+        return self.redis_client.zcount(self.global_key, f"({now}", "+inf") >= self.global_limit
+    
+    def release(self, key: str, slot: str):
+        """Give back a slot taken with acquire()"""
+        pipe = self.redis_client.pipeline()
+        pipe.zrem(self.global_key, slot)
+        pipe.zrem(f"{self.key_prefix}{key}", slot)
+        pipe.execute()
+
+
 class Worker:
     """Worker to process jobs from queue"""
     
@@ -9,13 +9,95 @@ Features:
 - Provides early warnings for cash crunches
 """
 from typing import Dict, List, Tuple, Optional
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from decimal import Decimal
 from sqlalchemy.orm import Session
 from sqlalchemy import func, extract
 import math
+import numpy as np
 from app.models.transactions import Transaction
+from app.services.cash_flow_rollups import cash_flow_series, next_period_start, period_start
 from app.services.income_forecast import IncomeForecastService
+from app.services.simulations.monte_carlo import MonteCarloEngine
+
+# Pay cycles tried for a forecast's income profile: paid every k weeks / months.
+# Weekly series also try a monthly payday on each day of the month.
+WEEKLY_PAY_CYCLES = (2, 3, 4)
+MONTHLY_PAY_CYCLES = (2, 3)
+
+# A cycle is only used if it leaves at most this share of the income variance
+MAX_CYCLE_RESIDUAL = 0.5
+
+
+def _days_of_month_covered(start: date) -> np.ndarray:
+    """
+    Days of the month (index 0 is the 1st) that fall in the week from start.
+    A month's last day also covers the later days the month lacks, so a
+    payday on the 31st is found in the week holding the 30th of a 30-day month.
+    """
+    covered = np.zeros(31, dtype=bool)
+    for offset in range(7):
+        day = start + timedelta(days=offset)
+        covered[day.day - 1] = True
+        if (day + timedelta(days=1)).month != day.month:
+            covered[day.day:] = True
+    return covered
+
+
+def _pay_cycle_positions(starts: List[date], granularity: str) -> List[np.ndarray]:
+    """Position of each period in every candidate pay cycle"""
+    if granularity == 'week':
+        weeks = np.array([start.toordinal() // 7 for start in starts])
+        cycles = [weeks % k for k in WEEKLY_PAY_CYCLES]
+        # Monthly payday on a given day: 1 for the week containing it, 0 otherwise
+        covered = np.array([_days_of_month_covered(start) for start in starts])
+        cycles.extend(covered[:, day].astype(int) for day in range(31))
+        return cycles
+    months = np.array([start.year * 12 + start.month - 1 for start in starts])
+    return [months % k for k in MONTHLY_PAY_CYCLES]
+
+
+def income_cycle_profile(
+    starts: List[date],
+    incomes: np.ndarray,
+    future_starts: List[date],
+    granularity: str
+) -> Optional[Tuple[np.ndarray, float]]:
+    """
+    Expected income of each future period from the pay cycle that best fits a
+    dense income series (one entry per period in starts).
+    
+    Each candidate cycle groups past periods by their position in it (e.g.
+    payday week or not); a future period expects the mean income of its
+    position. Every position must be seen at least twice, and the cycle with
+    the least income variance left within positions wins if that is at most
+    MAX_CYCLE_RESIDUAL of the total.
+    
+    Returns:
+        (income mean per future period, standard deviation within positions),
+        or None if income follows no cycle (e.g. it is flat)
+    """
+    count = len(incomes)
+    if count < 2:
+        return None
+    total_variance = float(incomes.var(ddof=1))
+    if total_variance == 0:
+        return None
+    
+    best = None
+    for positions in _pay_cycle_positions(starts + future_starts, granularity):
+        past, future = positions[:count], positions[count:]
+        seen = np.bincount(past, minlength=positions.max() + 1)
+        if len(seen) < 2 or seen.min() < 2:
+            continue
+        means = np.bincount(past, weights=incomes, minlength=len(seen)) / seen
+        residual_variance = float(((incomes - means[past]) ** 2).sum()) / max(count - len(seen), 1)
+        if best is None or residual_variance < best[0]:
+            best = (residual_variance, means[future])
+    
+    if best is None or best[0] > MAX_CYCLE_RESIDUAL * total_variance:
+        return None
+    return best[1], float(np.sqrt(best[0]))
 
 
 class LeanWeekPredictor:
@@ -39,51 +121,27 @@ class LeanWeekPredictor:
         """
         cutoff_date = datetime.utcnow() - timedelta(days=months * 30)
         
-        # Get all transactions grouped by month
-        transactions = db.query(Transaction).filter(
-            Transaction.user_id == user_id,
-            Transaction.timestamp >= cutoff_date,
-            Transaction.timestamp.isnot(None)
-        ).order_by(Transaction.timestamp.asc()).all()
-        
-        # Group by month
-        monthly_data = {}
-        for txn in transactions:
-            if not txn.timestamp or not txn.amount:
-                continue
-                
-            month_key = txn.timestamp.strftime('%Y-%m')
-            
-            if month_key not in monthly_data:
-                monthly_data[month_key] = {
-                    'month': month_key,
-                    'income': 0.0,
-                    'expenses': 0.0,
-                    'net_flow': 0.0,
-                    'income_count': 0,
-                    'expense_count': 0,
-                    'income_sources': set(),
-                    'start_date': txn.timestamp
-                }
-            
-            amount = float(txn.amount)
-            
-            if txn.type == 'credit':
-                monthly_data[month_key]['income'] += amount
-                monthly_data[month_key]['income_count'] += 1
-                if txn.merchant:
-                    monthly_data[month_key]['income_sources'].add(txn.merchant)
-            else:
-                monthly_data[month_key]['expenses'] += amount
-                monthly_data[month_key]['expense_count'] += 1
-        
-        # Calculate net flow and convert to list
+        return LeanWeekPredictor.monthly_flow_from_series(
+            cash_flow_series(db, user_id, 'month', cutoff_date)
+        )
+    
+    @staticmethod
+    def monthly_flow_from_series(rows) -> List[Dict]:
+        """Convert monthly PeriodTotals (see cash_flow_rollups) to cash flow dicts"""
         result = []
-        for month_key in sorted(monthly_data.keys()):
-            data = monthly_data[month_key]
-            data['net_flow'] = data['income'] - data['expenses']
-            data['income_sources'] = len(data['income_sources'])
-            result.append(data)
+        for row in rows:
+            income = float(row.income or 0)
+            expenses = float(row.expenses or 0)
+            result.append({
+                'month': row.period.strftime('%Y-%m'),
+                'income': income,
+                'expenses': expenses,
+                'net_flow': income - expenses,
+                'income_count': row.income_count,
+                'expense_count': row.expense_count,
+                'income_sources': row.income_sources,
+                'start_date': row.start_date
+            })
         
         return result
     
@@ -102,44 +160,19 @@ class LeanWeekPredictor:
         """
         cutoff_date = datetime.utcnow() - timedelta(weeks=weeks)
         
-        transactions = db.query(Transaction).filter(
-            Transaction.user_id == user_id,
-            Transaction.timestamp >= cutoff_date,
-            Transaction.timestamp.isnot(None)
-        ).order_by(Transaction.timestamp.asc()).all()
-        
-        # Group by week (ISO week number)
-        weekly_data = {}
-        for txn in transactions:
-            if not txn.timestamp or not txn.amount:
-                continue
-            
-            # Get ISO week
-            iso_year, iso_week, _ = txn.timestamp.isocalendar()
-            week_key = f"{iso_year}-W{iso_week:02d}"
-            
-            if week_key not in weekly_data:
-                weekly_data[week_key] = {
-                    'week': week_key,
-                    'income': 0.0,
-                    'expenses': 0.0,
-                    'net_flow': 0.0,
-                    'start_date': txn.timestamp
-                }
-            
-            amount = float(txn.amount)
-            
-            if txn.type == 'credit':
-                weekly_data[week_key]['income'] += amount
-            else:
-                weekly_data[week_key]['expenses'] += amount
-        
-        # Calculate net flow
         result = []
-        for week_key in sorted(weekly_data.keys()):
-            data = weekly_data[week_key]
-            data['net_flow'] = data['income'] - data['expenses']
-            result.append(data)
+        for row in cash_flow_series(db, user_id, 'week', cutoff_date):
+            # Buckets start on Monday, so this is the ISO week of every row in it
+            iso_year, iso_week, _ = row.period.isocalendar()
+            income = float(row.income or 0)
+            expenses = float(row.expenses or 0)
+            result.append({
+                'week': f"{iso_year}-W{iso_week:02d}",
+                'income': income,
+                'expenses': expenses,
+                'net_flow': income - expenses,
+                'start_date': row.start_date
+            })
         
         return result
     
@@ -240,7 +273,8 @@ class LeanWeekPredictor:
         db: Session,
         user_id: int,
         forecast_periods: int = 3,
-        current_balance: float = 0.0
+        current_balance: float = 0.0,
+        history: Optional['CashFlowHistory'] = None
     ) -> Dict:
         """
         Forecast future cash flow for next N periods (months)
@@ -250,17 +284,20 @@ class LeanWeekPredictor:
             user_id: User ID
             forecast_periods: Number of future periods to forecast
             current_balance: Current account balance
+            history: Shared cash-flow series for the request (created if omitted)
             
         Returns:
             Cash flow forecast with warnings
         """
         # Get historical data
-        monthly_history = self.get_monthly_cash_flow(db, user_id, months=6)
+        history = history or CashFlowHistory(db, user_id)
+        monthly_history = history.monthly(6)
         
         if len(monthly_history) < 2:
             return {
                 'forecasts': [],
                 'warnings': ['Insufficient transaction history for accurate forecasting'],
+                'negative_balance_probability': 0.0,
                 'confidence': 0.0,
                 'income_volatility': 0.0,
                 'avg_monthly_income': 0.0,
@@ -286,88 +323,236 @@ class LeanWeekPredictor:
         # Simple expense forecast (assume relatively stable)
         expense_forecast = avg_expenses
         
-        # Generate forecasts for future periods
+        # Simulate income/expense paths from the history's mean and spread
+        simulation = MonteCarloEngine(
+            income_mean=income_forecast,
+            income_std=income_std,
+            expense_mean=[expense_forecast],
+            expense_std=[expense_std],
+            seed=user_id
+        ).simulate(forecast_periods, current_balance)
+        
+        # Best/likely/worst are the P90/P50/P10 outcomes (P10/P50/P90 for expenses)
         forecasts = []
-        running_balance = current_balance
         warnings = []
         
         for i in range(forecast_periods):
             period_num = i + 1
-            
-            # Forecast with uncertainty bands
-            forecast_income_best = income_forecast * (1 + income_volatility * 0.5)
-            forecast_income_worst = max(0, income_forecast * (1 - income_volatility * 1.5))
-            forecast_income_likely = income_forecast
-            
-            forecast_expense_best = avg_expenses * 0.9  # Optimistic
-            forecast_expense_worst = avg_expenses * 1.1  # Pessimistic
-            forecast_expense_likely = avg_expenses
-            
-            # Calculate scenarios
-            best_case_net = forecast_income_best - forecast_expense_best
-            worst_case_net = forecast_income_worst - forecast_expense_worst
-            likely_net = forecast_income_likely - forecast_expense_likely
-            
-            # Update running balance
-            best_balance = running_balance + best_case_net
-            worst_balance = running_balance + worst_case_net
-            likely_balance = running_balance + likely_net
+            income = simulation.band('income', i)
+            expenses = simulation.band('expenses', i)
+            net = simulation.band('net', i)
+            balance = simulation.band('balance', i)
+            negative_probability = float(simulation.negative_probability[i])
             
             # Check for warnings
-            is_lean = worst_case_net < 0
-            balance_risk = worst_balance < 0
+            is_lean = net['p10'] < 0
+            balance_risk = balance['p10'] < 0
             
             if is_lean:
-                warnings.append(f"Month {period_num}: Potential lean period - worst case deficit of ${abs(worst_case_net):,.2f}")
+                warnings.append(f"Month {period_num}: Potential lean period - worst case deficit of ${abs(net['p10']):,.2f}")
             
             if balance_risk:
-                warnings.append(f"Month {period_num}: CRITICAL - Balance may go negative (${worst_balance:,.2f})")
+                warnings.append(
+                    f"Month {period_num}: CRITICAL - Balance may go negative (${balance['p10']:,.2f}, "
+                    f"{negative_probability:.0%} chance)"
+                )
             
             forecasts.append({
                 'period': period_num,
                 'month_offset': i + 1,
                 'income': {
-                    'best': round(forecast_income_best, 2),
-                    'likely': round(forecast_income_likely, 2),
-                    'worst': round(forecast_income_worst, 2)
+                    'best': round(income['p90'], 2),
+                    'likely': round(income['p50'], 2),
+                    'worst': round(income['p10'], 2)
                 },
                 'expenses': {
-                    'best': round(forecast_expense_best, 2),
-                    'likely': round(forecast_expense_likely, 2),
-                    'worst': round(forecast_expense_worst, 2)
+                    'best': round(expenses['p10'], 2),
+                    'likely': round(expenses['p50'], 2),
+                    'worst': round(expenses['p90'], 2)
                 },
                 'net_cash_flow': {
-                    'best': round(best_case_net, 2),
-                    'likely': round(likely_net, 2),
-                    'worst': round(worst_case_net, 2)
+                    'best': round(net['p90'], 2),
+                    'likely': round(net['p50'], 2),
+                    'worst': round(net['p10'], 2)
                 },
                 'projected_balance': {
-                    'best': round(best_balance, 2),
-                    'likely': round(likely_balance, 2),
-                    'worst': round(worst_balance, 2)
+                    'best': round(balance['p90'], 2),
+                    'likely': round(balance['p50'], 2),
+                    'worst': round(balance['p10'], 2)
                 },
                 'is_lean_period': is_lean,
-                'balance_at_risk': balance_risk
+                'balance_at_risk': balance_risk,
+                'negative_balance_probability': round(negative_probability, 3)
             })
-            
-            # Use likely scenario for next period
-            running_balance = likely_balance
         
         return {
             'forecasts': forecasts,
             'warnings': warnings,
+            'negative_balance_probability': round(float(simulation.negative_probability[-1]), 3),
             'confidence': income_confidence,
             'income_volatility': round(income_volatility, 3),
             'avg_monthly_income': round(avg_income, 2),
             'avg_monthly_expenses': round(avg_expenses, 2)
         }
     
+    def predict_lean_weeks(
+        self,
+        db: Session,
+        user_id: int,
+        weeks_ahead: int = 8,
+        lookback_weeks: int = 12,
+        history: Optional['CashFlowHistory'] = None
+    ) -> Dict:
+        """
+        Forecast the next weeks' net cash flow and flag likely lean weeks
+        
+        See predict_lean_periods; this is its weekly form.
+        """
+        return self.predict_lean_periods(
+            db, user_id, 'week', periods_ahead=weeks_ahead, lookback=lookback_weeks, history=history
+        )
+    
+    def predict_lean_periods(
+        self,
+        db: Session,
+        user_id: int,
+        granularity: str = 'week',
+        periods_ahead: int = 8,
+        lookback: int = 12,
+        history: Optional['CashFlowHistory'] = None
+    ) -> Dict:
+        """
+        Forecast upcoming weeks/months and flag likely lean ones
+        
+        Reads the (cached) weekly or monthly series of `history`, so a caller that
+        already loaded the same span pays no extra query. Periods without any
+        transactions between the first and last observed one count as zero-flow
+        periods. Best/likely/worst are the P90/P50/P10 net flow of simulated paths,
+        and a period is flagged lean when its likely net flow is at or below the
+        historical lean threshold. Income follows the user's pay cycle when one
+        fits (see income_cycle_profile), so the weeks between paydays come out
+        lean; otherwise its level comes from exponential smoothing.
+        
+        Args:
+            db: Database session
+            user_id: User ID
+            granularity: 'week' or 'month'
+            periods_ahead: Number of future periods to forecast
+            lookback: Number of past periods to learn from
+            history: Shared cash-flow series for the request (created if omitted)
+            
+        Returns:
+            Dict with 'forecast' (period, start_date, end_date, best_case,
+            likely_case, worst_case, confidence, is_lean), 'lean_threshold',
+            'predicted_lean_count' and 'warnings'
+        """
+        history = history or CashFlowHistory(db, user_id)
+        if granularity == 'week':
+            series = history.weekly(lookback)
+            threshold_percentile = 0.2
+        else:
+            series = history.monthly(lookback)
+            threshold_percentile = 0.25
+        
+        if len(series) < 2:
+            return {
+                'forecast': [],
+                'lean_threshold': 0.0,
+                'predicted_lean_count': 0,
+                'warnings': ['Insufficient transaction history for accurate forecasting']
+            }
+        
+        # Dense income/expense arrays, one entry per period
+        observed = {self._period_start(row, granularity): row for row in series}
+        starts = sorted(observed)
+        dense_starts, incomes, expenses = [], [], []
+        start = starts[0]
+        while start <= starts[-1]:
+            row = observed.get(start)
+            dense_starts.append(start)
+            incomes.append(row['income'] if row else 0.0)
+            expenses.append(row['expenses'] if row else 0.0)
+            start = next_period_start(start, granularity)
+        incomes = np.array(incomes)
+        expenses = np.array(expenses)
+        
+        # Same rule as identify_lean_periods
+        net_flows = np.sort(incomes - expenses)
+        lean_threshold = float(net_flows[int(len(net_flows) * threshold_percentile)])
+        
+        future_starts = []
+        start = next_period_start(period_start(datetime.utcnow(), granularity), granularity)
+        for _ in range(periods_ahead):
+            future_starts.append(start)
+            start = next_period_start(start, granularity)
+        
+        # Income follows the pay cycle where there is one (paydays vs the weeks
+        # between them); otherwise its smoothed level carries forward
+        income_forecast, income_confidence = self.forecast_service.exponential_smoothing_forecast(incomes.tolist())
+        income_std = float(incomes.std())
+        profile = income_cycle_profile(dense_starts, incomes, future_starts, granularity)
+        if profile is not None:
+            income_forecast, income_std = profile
+        
+        simulation = MonteCarloEngine(
+            income_mean=income_forecast,
+            income_std=income_std,
+            expense_mean=[float(expenses.mean())],
+            expense_std=[float(expenses.std())],
+            seed=user_id
+        ).simulate(periods_ahead)
+        
+        forecast = []
+        for i, start in enumerate(future_starts):
+            end = next_period_start(start, granularity)
+            net = simulation.band('net', i)
+            forecast.append({
+                'period': self._period_key(start, granularity),
+                'start_date': start,
+                'end_date': end - timedelta(days=1),
+                'best_case': round(net['p90'], 2),
+                'likely_case': round(net['p50'], 2),
+                'worst_case': round(net['p10'], 2),
+                # Confidence fades with the horizon
+                'confidence': round(max(0.0, income_confidence * (1 - 0.05 * i)), 2),
+                'is_lean': net['p50'] <= lean_threshold
+            })
+        
+        lean = [f for f in forecast if f['is_lean']]
+        warnings = [
+            f"{f['period']}: Likely lean period - projected net flow ${f['likely_case']:,.2f}" for f in lean
+        ]
+        
+        return {
+            'forecast': forecast,
+            'lean_threshold': round(lean_threshold, 2),
+            'predicted_lean_count': len(lean),
+            'warnings': warnings
+        }
+    
+    @staticmethod
+    def _period_start(row: Dict, granularity: str) -> date:
+        """Start date of a cash flow dict's period ('YYYY-Www' week or 'YYYY-MM' month key)"""
+        if granularity == 'week':
+            year, week = row['week'].split('-W')
+            return date.fromisocalendar(int(year), int(week), 1)
+        year, month = row['month'].split('-')
+        return date(int(year), int(month), 1)
+    
+    @staticmethod
+    def _period_key(start: date, granularity: str) -> str:
+        if granularity == 'week':
+            iso_year, iso_week, _ = start.isocalendar()
+            return f"{iso_year}-W{iso_week:02d}"
+        return start.strftime('%Y-%m')
+    
     def calculate_income_smoothing_recommendation(
         self,
         db: Session,
         user_id: int,
         current_balance: float = 0.0,
-        target_months_buffer: int = 3
+        target_months_buffer: int = 3,
+        history: Optional['CashFlowHistory'] = None
     ) -> Dict:
         """
         Calculate how much to save during good months to smooth income volatility
@@ -377,11 +562,13 @@ class LeanWeekPredictor:
             user_id: User ID
             current_balance: Current savings/emergency fund
             target_months_buffer: Target number of months of expenses to maintain
+            history: Shared cash-flow series for the request (created if omitted)
             
         Returns:
             Income smoothing recommendations
         """
-        monthly_history = self.get_monthly_cash_flow(db, user_id, months=6)
+        history = history or CashFlowHistory(db, user_id)
+        monthly_history = history.monthly(6)
         
         if not monthly_history:
             return {
@@ -530,19 +717,24 @@ class LeanWeekPredictor:
         Returns:
             Complete lean week analysis
         """
-        # Get historical cash flow
-        monthly_history = self.get_monthly_cash_flow(db, user_id, months=6)
-        weekly_history = self.get_weekly_cash_flow(db, user_id, weeks=12)
+        # Get historical cash flow (each series is queried once for the whole analysis)
+        history = CashFlowHistory(db, user_id)
+        monthly_history = history.monthly(6)
+        weekly_history = history.weekly(12)
         
         # Identify historical lean periods
         lean_analysis_monthly = self.identify_lean_periods(monthly_history)
         lean_analysis_weekly = self.identify_lean_periods(weekly_history, threshold_percentile=0.2)
         
         # Forecast future cash flow
-        forecast = self.forecast_cash_flow(db, user_id, forecast_periods=3, current_balance=current_balance)
+        forecast = self.forecast_cash_flow(
+            db, user_id, forecast_periods=3, current_balance=current_balance, history=history
+        )
         
         # Get income smoothing recommendations
-        smoothing = self.calculate_income_smoothing_recommendation(db, user_id, current_balance)
+        smoothing = self.calculate_income_smoothing_recommendation(
+            db, user_id, current_balance, history=history
+        )
         
         # Overall risk assessment
         risk_level = self._assess_overall_risk(
@@ -648,3 +840,32 @@ class LeanWeekPredictor:
             'risk_score': score,
             'risk_factors': risk_factors
         }
+
+
+class CashFlowHistory:
+    """
+    Request-scoped memo of a user's cash-flow series.
+    
+    Each (granularity, span) series is queried once and then shared by every
+    computation in the request (history, forecast, smoothing), so a complete
+    lean analysis runs one monthly and one weekly aggregate instead of
+    three monthly scans plus a weekly one. Callers must treat the returned
+    lists as read-only.
+    """
+    
+    def __init__(self, db: Session, user_id: int):
+        self.db = db
+        self.user_id = user_id
+        self._series: Dict[Tuple[str, int], List[Dict]] = {}
+    
+    def monthly(self, months: int = 6) -> List[Dict]:
+        key = ('month', months)
+        if key not in self._series:
+            self._series[key] = LeanWeekPredictor.get_monthly_cash_flow(self.db, self.user_id, months=months)
+        return self._series[key]
+    
+    def weekly(self, weeks: int = 12) -> List[Dict]:
+        key = ('week', weeks)
+        if key not in self._series:
+            self._series[key] = LeanWeekPredictor.get_weekly_cash_flow(self.db, self.user_id, weeks=weeks)
+        return self._series[key]
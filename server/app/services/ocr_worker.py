@@ -0,0 +1,212 @@
+"""
+OCR Worker Service
+Processes `ocr_media` jobs (WhatsApp receipt images/PDFs) from the Redis queue.
+
+Each worker process runs up to `ocr_worker_concurrency` jobs at once on a single
+event loop. A Redis concurrency limiter additionally caps jobs running across all
+workers and per sender, so a burst of receipts cannot exhaust memory or Gemini quota.
+A poll looks past jobs whose sender is at their limit for another sender's job;
+jobs that hit a limit are put back on the queue behind jobs of the same priority.
+"""
+import asyncio
+import logging
+from typing import Dict, Any, Optional, Set
+
+from app.core.config import settings
+from app.services.job_queue import JobQueue, ConcurrencyLimiter
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+OCR_JOB_TYPE = "ocr_media"
+
+# Interactive uploads (a user waiting on WhatsApp) jump ahead of batch work
+OCR_PRIORITY_INTERACTIVE = 10
+OCR_PRIORITY_BATCH = 0
+
+# Seconds to wait before polling again after hitting a concurrency limit
+LIMIT_BACKOFF = 0.5
+
+# Most limited jobs set aside in one poll while looking for a runnable one
+MAX_DEFERRED_PER_POLL = 50
+
+_ocr_queue: Optional[JobQueue] = None
+
+
+def get_ocr_queue() -> JobQueue:
+    """Process-wide queue used to submit OCR jobs."""
+    global _ocr_queue
+    if _ocr_queue is None:
+        _ocr_queue = JobQueue(redis_url=settings.redis_url, queue_name=settings.ocr_queue_name)
+    return _ocr_queue
+
+
+def enqueue_media_job(from_number: str, media_url: str, content_type: str, priority: int = OCR_PRIORITY_BATCH) -> str:
+    """
+    Submit a WhatsApp media message for OCR.
+
+    Returns:
+        job_id of the queued job
+
+    Raises:
+        redis.RedisError if the queue is unreachable
+    """
+    return get_ocr_queue().enqueue(
+        OCR_JOB_TYPE,
+        {"from_number": from_number, "media_url": media_url, "content_type": content_type},
+        priority=priority
+    )
+
+
+class OCRWorker:
+    """Worker that runs OCR jobs concurrently within global and per-user limits"""
+
+    def __init__(
+        self,
+        job_queue: JobQueue,
+        limiter: ConcurrencyLimiter,
+        concurrency: int = 4
+    ):
+        self.job_queue = job_queue
+        self.limiter = limiter
+        self.concurrency = concurrency
+        self.running = False
+        self._slots = asyncio.Semaphore(concurrency)
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def process_media(self, job_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Handler for `ocr_media` jobs"""
+        from app.routers.twilio_webhook import process_media_ocr
+
+        return await process_media_ocr(
+            from_number=job_data["from_number"],
+            media_url=job_data["media_url"],
+            content_type=job_data.get("content_type")
+        )
+
+    async def run_job(self, job: Dict[str, Any], limit_key: str, slot: str):
+        """Run one job and record its outcome, always releasing its slots"""
+        job_id = job["job_id"]
+        try:
+            result = await self.process_media(job["data"])
+            if result and result.get("status") == "failed":
+                # The user has already been told; retrying would message them again
+                await asyncio.to_thread(
+                    self.job_queue.fail_job, job_id, result.get("error") or result.get("reason", "failed"), retry=False
+                )
+            else:
+                await asyncio.to_thread(self.job_queue.complete_job, job_id, result)
+        except Exception as e:
+            logger.error(f"OCR job {job_id} error: {e}")
+            await asyncio.to_thread(self.job_queue.fail_job, job_id, f"Job processing failed: {str(e)}")
+        finally:
+            try:
+                await asyncio.to_thread(self.limiter.release, limit_key, slot)
+            finally:
+                self._slots.release()
+
+    async def poll_once(self) -> bool:
+        """
+        Try to start the next runnable job.
+
+        Jobs whose sender is at the per-user limit are set aside and the scan
+        carries on, so one sender's burst cannot hold back everyone else's
+        jobs; the set-aside jobs go back on the queue afterwards. Redis calls
+        run in a thread so they don't block running jobs.
+
+        Returns:
+            True if a job was started, False if nothing waiting could run
+        """
+        await self._slots.acquire()
+        started = False
+        deferred = []
+        blocked: Set[str] = set()
+
+        try:
+            while len(deferred) < MAX_DEFERRED_PER_POLL:
+                job = await asyncio.to_thread(self.job_queue.dequeue)
+                if not job:
+                    break
+
+                if job["job_type"] != OCR_JOB_TYPE:
+                    await asyncio.to_thread(
+                        self.job_queue.fail_job, job["job_id"],
+                        f"No handler registered for job type: {job['job_type']}", retry=False
+                    )
+                    continue
+
+                limit_key = job["data"]["from_number"]
+                if limit_key in blocked:
+                    deferred.append(job)
+                    continue
+
+                slot = await asyncio.to_thread(self.limiter.acquire, limit_key)
+                if slot is None:
+                    deferred.append(job)
+                    if await asyncio.to_thread(self.limiter.at_global_limit):
+                        # Nothing else can run until a slot frees up
+                        break
+                    blocked.add(limit_key)
+                    continue
+
+                task = asyncio.create_task(self.run_job(job, limit_key, slot))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+                started = True
+                break
+        finally:
+            for job in deferred:
+                await asyncio.to_thread(self.job_queue.requeue_job, job["job_id"], reason="concurrency_limit")
+            if not started:
+                self._slots.release()
+
+        return started
+
+    async def run(self, poll_interval: float = 1.0):
+        """Poll the queue until stopped, then wait for running jobs"""
+        self.running = True
+        logger.info(f"OCR worker started (concurrency {self.concurrency})")
+
+        while self.running:
+            try:
+                started = await self.poll_once()
+                if not started:
+                    await asyncio.sleep(LIMIT_BACKOFF if self._tasks else poll_interval)
+            except Exception as e:
+                logger.error(f"OCR worker error: {e}")
+                await asyncio.sleep(poll_interval)
+
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        logger.info("OCR worker stopped")
+
+    def stop(self):
+        """Stop polling after the current iteration"""
+        self.running = False
+
+
+def main():
+    """Main entry point for the OCR worker service"""
+    job_queue = JobQueue(redis_url=settings.redis_url, queue_name=settings.ocr_queue_name)
+    limiter = ConcurrencyLimiter(
+        job_queue.redis_client,
+        name=settings.ocr_queue_name,
+        global_limit=settings.ocr_global_concurrency,
+        per_key_limit=settings.ocr_user_concurrency
+    )
+
+    async def _run():
+        worker = OCRWorker(job_queue, limiter, concurrency=settings.ocr_worker_concurrency)
+        await worker.run()
+
+    try:
+        asyncio.run(_run())
+    except KeyboardInterrupt:
+        logger.info("OCR worker stopped by user")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,9 @@ Acts as the main interface for simulation functionality.
 from sqlalchemy.orm import Session
 from typing import Dict, List, Optional
 
+from app.services.analytics_context import UserAnalyticsContext
 from app.services.simulations.scenario import simulate_spending_scenario as _simulate_spending_scenario
+from app.services.simulations.batch import simulate_batch as _simulate_batch
 from app.services.simulations.comparison import compare_scenarios as _compare_scenarios
 from app.services.simulations.reallocation import simulate_reallocation as _simulate_reallocation
 from app.services.simulations.projection import project_future_spending as _project_future_spending
@@ -25,7 +27,8 @@ class SimulationService:
         scenario_type: str,
         target_percent: float,
         time_period_days: int = 30,
-        target_categories: Optional[List[str]] = None
+        target_categories: Optional[List[str]] = None,
+        context: Optional[UserAnalyticsContext] = None
     ):
         """
         Simulate spending scenarios (reduction or increase) with optional category targeting.
@@ -38,7 +41,33 @@ class SimulationService:
             scenario_type=scenario_type,
             target_percent=target_percent,
             time_period_days=time_period_days,
-            target_categories=target_categories
+            target_categories=target_categories,
+            context=context
+        )
+    
+    @staticmethod
+    def simulate_batch(
+        db: Session,
+        user_id: int,
+        scenario_type: str,
+        target_percents: List[float],
+        target_categories: Optional[List[Optional[List[str]]]] = None,
+        time_period_days: int = 30,
+        context: Optional[UserAnalyticsContext] = None
+    ):
+        """
+        Simulate many scenarios against one loaded behaviour model and baseline.
+        
+        See simulations/batch.py for implementation details.
+        """
+        return _simulate_batch(
+            db=db,
+            user_id=user_id,
+            scenario_type=scenario_type,
+            target_percents=target_percents,
+            target_categories=target_categories,
+            time_period_days=time_period_days,
+            context=context
         )
     
     @staticmethod
@@ -47,7 +76,8 @@ class SimulationService:
         user_id: int,
         scenario_type: str,
         time_period_days: int = 30,
-        num_scenarios: int = 3
+        num_scenarios: int = 3,
+        context: Optional[UserAnalyticsContext] = None
     ):
         """
         Generate and compare multiple spending scenarios.
@@ -59,7 +89,8 @@ class SimulationService:
             user_id=user_id,
             scenario_type=scenario_type,
             time_period_days=time_period_days,
-            num_scenarios=num_scenarios
+            num_scenarios=num_scenarios,
+            context=context
         )
     
     @staticmethod
@@ -67,7 +98,8 @@ class SimulationService:
         db: Session,
         user_id: int,
         reallocations: Dict[str, float],
-        time_period_days: int = 30
+        time_period_days: int = 30,
+        context: Optional[UserAnalyticsContext] = None
     ):
         """
         Simulate budget reallocation between categories.
@@ -78,7 +110,8 @@ class SimulationService:
             db=db,
             user_id=user_id,
             reallocations=reallocations,
-            time_period_days=time_period_days
+            time_period_days=time_period_days,
+            context=context
         )
     
     @staticmethod
@@ -88,7 +121,9 @@ class SimulationService:
         projection_months: int,
         time_period_days: int = 30,
         behavioral_changes: Optional[Dict[str, float]] = None,
-        scenario_id: Optional[str] = None
+        scenario_id: Optional[str] = None,
+        current_balance: float = 0.0,
+        context: Optional[UserAnalyticsContext] = None
     ):
         """
         Project future spending with optional behavioral changes.
@@ -101,5 +136,7 @@ class SimulationService:
             projection_months=projection_months,
             time_period_days=time_period_days,
             behavioral_changes=behavioral_changes,
-            scenario_id=scenario_id
+            scenario_id=scenario_id,
+            current_balance=current_balance,
+            context=context
         )
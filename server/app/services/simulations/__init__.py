@@ -3,7 +3,9 @@ Simulation services package.
 Contains all simulation-related functionality.
 """
 
+from .batch import simulate_batch, run_bulk_simulation
 from .comparison import compare_scenarios
+from .engine import ScenarioEngine
 from .helpers import (
     generate_reduction_scenarios,
     generate_increase_scenarios,
@@ -17,7 +19,10 @@ from .reallocation import simulate_reallocation
 from .scenario import simulate_spending_scenario
 
 __all__ = [
+    'simulate_batch',
+    'run_bulk_simulation',
     'compare_scenarios',
+    'ScenarioEngine',
     'generate_reduction_scenarios',
     'generate_increase_scenarios',
     'calculate_difficulty_score',
@@ -0,0 +1,92 @@
+"""
+Simulation spending baselines.
+The debit total of a user's last N days, computed with one COUNT/SUM
+aggregate (ix_transactions_user_id_type_timestamp) together with the date of
+the user's first debit, and cached in-process per
+(user_id, time_period_days, users.data_version).
+
+A transaction write bumps the user's data_version, so the next simulation
+misses and re-aggregates; the TTL bounds how far a cached total can lag behind
+the sliding window as old transactions fall out of it.
+"""
+import threading
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional
+
+from cachetools import TTLCache
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.transactions import Transaction
+from app.models.user import User
+from app.utils.datetime_utils import ensure_utc
+
+BASELINE_CACHE_SIZE = 10000
+
+
+class SpendingBaseline(NamedTuple):
+    count: int
+    total: float
+    history_days: float = 0.0  # Since the user's first debit (any period); 0 without debits
+
+
+_cache: TTLCache = TTLCache(maxsize=BASELINE_CACHE_SIZE, ttl=settings.simulation_baseline_cache_ttl)
+_lock = threading.Lock()
+
+
+def clear_baseline_cache():
+    with _lock:
+        _cache.clear()
+
+
+def spending_baseline(
+    db: Session,
+    user_id: int,
+    time_period_days: int = 30,
+    data_version: Optional[int] = None
+) -> SpendingBaseline:
+    """
+    Number and total of the user's debits in the last time_period_days, and
+    how many days of debit history the user has.
+
+    Args:
+        db: Database session
+        user_id: User ID
+        time_period_days: Historical period to analyze
+        data_version: The user's users.data_version if the caller already has it
+            (read with one primary-key query otherwise)
+    """
+    if data_version is None:
+        data_version = db.execute(select(User.data_version).where(User.id == user_id)).scalar()
+    key = (user_id, time_period_days, data_version)
+    if data_version is not None:
+        with _lock:
+            cached = _cache.get(key)
+        if cached is not None:
+            return cached
+
+    now = datetime.utcnow()
+    cutoff_date = now - timedelta(days=time_period_days)
+    first_debit = (
+        select(func.min(Transaction.timestamp))
+        .where(Transaction.user_id == user_id, Transaction.type == "debit")
+        .scalar_subquery()
+    )
+    count, total, first_debit_at = db.execute(
+        select(func.count(Transaction.id), func.sum(Transaction.amount), first_debit).where(
+            Transaction.user_id == user_id,
+            Transaction.type == "debit",
+            Transaction.timestamp >= cutoff_date
+        )
+    ).one()
+    history_days = 0.0
+    if first_debit_at is not None:
+        first_debit_at = ensure_utc(first_debit_at).replace(tzinfo=None)
+        history_days = max((now - first_debit_at).total_seconds() / 86400, 0.0)
+    baseline = SpendingBaseline(count, float(total or 0), history_days)
+
+    if data_version is not None:
+        with _lock:
+            _cache[key] = baseline
+    return baseline
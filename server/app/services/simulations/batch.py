@@ -0,0 +1,268 @@
+"""
+Batch scenario simulation.
+Evaluates many target percents / category sets against one loaded model and
+baseline per user (the "what if" slider), and scores every user with a
+behaviour model in chunks across a process pool for nightly insight generation.
+
+The nightly job writes each chunk's results to simulation_insights from the
+worker (one DELETE and one multi-row INSERT per chunk, so re-running replaces
+the previous results); workers only return counts, so memory stays bounded by
+one chunk however many users there are.
+
+Run nightly (e.g. Heroku Scheduler):
+    python -m app.services.simulations.batch [--scenario-type reduction]
+        [--target-percents 10 20 30] [--categories DINING SHOPPING] [--workers N] [--chunk-size N]
+"""
+
+import argparse
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import repeat
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal, engine
+from app.models.behaviour import BehaviourModel
+from app.models.simulation_insight import SimulationInsight
+from app.schemas.simulation_schemas import SimulationResponse
+from app.services.analytics_context import UserAnalyticsContext
+from .engine import ScenarioEngine
+
+logger = logging.getLogger(__name__)
+
+BULK_CHUNK = 500
+
+# Scenarios of the nightly job when none are given
+DEFAULT_TARGET_PERCENTS = (10.0, 20.0, 30.0)
+
+
+def simulate_batch(
+    db: Session,
+    user_id: int,
+    scenario_type: str,
+    target_percents: Sequence[float],
+    target_categories: Optional[Sequence[Optional[List[str]]]] = None,
+    time_period_days: int = 30,
+    context: Optional[UserAnalyticsContext] = None
+) -> List[SimulationResponse]:
+    """
+    Simulate several scenarios for one user in a single engine pass.
+
+    Args:
+        db: Database session
+        user_id: User ID to simulate for
+        scenario_type: 'reduction' or 'increase'
+        target_percents: Target percentage change of each scenario
+        target_categories: Category set of each scenario (None = all categories for every scenario)
+        time_period_days: Historical period to analyze
+        context: The request's UserAnalyticsContext (saves the behaviour model query)
+
+    Returns:
+        One SimulationResponse per scenario, in request order
+
+    Raises:
+        ValueError: If no behavior model found, no transactions in period,
+            or a scenario targets none of the user's categories
+    """
+    if target_categories is None:
+        target_categories = [None] * len(target_percents)
+    scenario_engine = ScenarioEngine.load(db, user_id, time_period_days, context)
+    return scenario_engine.simulate_many(scenario_type, target_percents, target_categories)
+
+
+def _targets_user_data(scenario_engine: ScenarioEngine, categories: Optional[List[str]]) -> bool:
+    try:
+        scenario_engine.selection_mask(categories)
+    except ValueError:
+        return False
+    return True
+
+
+def simulate_users(
+    db: Session,
+    user_ids: List[int],
+    scenario_type: str,
+    target_percents: Sequence[float],
+    target_categories: Optional[Sequence[Optional[List[str]]]] = None,
+    time_period_days: int = 30,
+    now: Optional[datetime] = None
+) -> Dict[int, List[Optional[SimulationResponse]]]:
+    """
+    simulate_batch for a chunk of users, loaded with two queries.
+
+    Each user's list has one entry per scenario; a scenario that targets none
+    of the user's categories is None, and the user's other scenarios still run.
+    Users without a model, without debits in the period or with no applicable
+    scenario are skipped.
+    """
+    if target_categories is None:
+        target_categories = [None] * len(target_percents)
+    engines = ScenarioEngine.load_many(db, user_ids, time_period_days, now)
+
+    results = {}
+    for user_id, user_engine in engines.items():
+        applicable = [s for s, categories in enumerate(target_categories) if _targets_user_data(user_engine, categories)]
+        if not applicable:
+            continue
+        try:
+            responses = user_engine.simulate_many(
+                scenario_type,
+                [target_percents[s] for s in applicable],
+                [target_categories[s] for s in applicable]
+            )
+        except Exception:
+            # One bad model must not fail the whole chunk
+            logger.exception(f"Bulk simulation failed for user {user_id}")
+            continue
+        user_results: List[Optional[SimulationResponse]] = [None] * len(target_percents)
+        for s, response in zip(applicable, responses):
+            user_results[s] = response
+        results[user_id] = user_results
+    return results
+
+
+def write_insights(
+    db: Session,
+    user_ids: List[int],
+    scenario_type: str,
+    target_percents: Sequence[float],
+    target_categories: Optional[Sequence[Optional[List[str]]]],
+    time_period_days: int,
+    now: datetime
+) -> int:
+    """
+    Simulate a chunk of users and replace their simulation_insights rows for scenario_type.
+
+    Returns:
+        Number of users whose results were written
+    """
+    results = simulate_users(db, user_ids, scenario_type, target_percents, target_categories, time_period_days, now)
+    rows = [
+        {
+            "user_id": user_id,
+            "scenario_type": scenario_type,
+            "results": [response.model_dump(mode="json") if response else None for response in responses],
+            "generated_at": now
+        }
+        for user_id, responses in results.items()
+    ]
+
+    db.execute(delete(SimulationInsight).where(
+        SimulationInsight.user_id.in_(user_ids),
+        SimulationInsight.scenario_type == scenario_type
+    ))
+    if rows:
+        db.execute(insert(SimulationInsight), rows)
+    return len(rows)
+
+
+def simulate_chunk(
+    user_ids: List[int],
+    scenario_type: str,
+    target_percents: Sequence[float],
+    target_categories: Optional[Sequence[Optional[List[str]]]],
+    time_period_days: int,
+    now: datetime,
+    session_factory=None
+) -> int:
+    """Simulate one chunk of users and store the results, in its own session and transaction."""
+    with (session_factory or SessionLocal)() as db:
+        written = write_insights(db, user_ids, scenario_type, target_percents, target_categories, time_period_days, now)
+        db.commit()
+    return written
+
+
+def _init_worker():
+    # Connections inherited from the parent process must not be reused
+    engine.dispose(close=False)
+
+
+def run_bulk_simulation(
+    scenario_type: str,
+    target_percents: Sequence[float],
+    target_categories: Optional[Sequence[Optional[List[str]]]] = None,
+    time_period_days: int = 30,
+    workers: int = 1,
+    chunk_size: int = BULK_CHUNK,
+    session_factory=None,
+    now: Optional[datetime] = None
+) -> Dict:
+    """
+    Simulate the same scenarios for every user with a behaviour model and
+    store the results in simulation_insights.
+
+    Args:
+        scenario_type: 'reduction' or 'increase'
+        target_percents: Target percentage change of each scenario
+        target_categories: Category set of each scenario (None = all categories)
+        time_period_days: Historical period to analyze
+        workers: Worker processes (1 runs the chunks in this process)
+        chunk_size: Users per chunk
+        session_factory: Session factory for in-process runs (defaults to SessionLocal)
+        now: Reference time (defaults to utcnow)
+
+    Returns:
+        Dict with users, insights, chunks, seconds and users_per_second
+    """
+    now = now or datetime.utcnow()
+    started = time.perf_counter()
+
+    with (session_factory or SessionLocal)() as db:
+        user_ids = db.execute(
+            select(BehaviourModel.user_id).order_by(BehaviourModel.user_id)
+        ).scalars().all()
+    chunks = [user_ids[i:i + chunk_size] for i in range(0, len(user_ids), chunk_size)]
+    args = (scenario_type, target_percents, target_categories, time_period_days, now)
+
+    if workers <= 1 or len(chunks) <= 1:
+        written = sum(simulate_chunk(chunk, *args, session_factory=session_factory) for chunk in chunks)
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), initializer=_init_worker) as executor:
+            written = sum(executor.map(simulate_chunk, chunks, *(repeat(arg) for arg in args)))
+
+    seconds = time.perf_counter() - started
+    stats = {
+        "users": len(user_ids),
+        "insights": written,
+        "chunks": len(chunks),
+        "seconds": round(seconds, 2),
+        "users_per_second": round(len(user_ids) / seconds, 1) if seconds > 0 else 0.0
+    }
+    logger.info(
+        f"Bulk simulation: {stats['insights']}/{stats['users']} users written "
+        f"in {stats['seconds']}s ({stats['users_per_second']} users/s, {stats['chunks']} chunks)"
+    )
+    return stats
+
+
+def main():
+    """Command line entry point for the nightly insight job."""
+    from app.core.config import settings
+    from app.models import goal, user  # noqa: F401 - resolve User relationships
+
+    parser = argparse.ArgumentParser(description="Store bulk simulation insights for every user with a behaviour model")
+    parser.add_argument("--scenario-type", choices=("reduction", "increase"), default="reduction")
+    parser.add_argument("--target-percents", type=float, nargs="+", default=list(DEFAULT_TARGET_PERCENTS))
+    parser.add_argument("--categories", nargs="+", default=None, help="Categories every scenario targets (default: all)")
+    parser.add_argument("--time-period-days", type=int, default=30)
+    parser.add_argument("--workers", type=int, default=settings.simulation_insight_workers)
+    parser.add_argument("--chunk-size", type=int, default=BULK_CHUNK)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    run_bulk_simulation(
+        args.scenario_type,
+        args.target_percents,
+        [args.categories] * len(args.target_percents) if args.categories else None,
+        time_period_days=args.time_period_days,
+        workers=args.workers,
+        chunk_size=args.chunk_size
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -3,15 +3,13 @@ Multiple scenario comparison logic.
 Generates and compares different spending scenarios.
 """
 
-from datetime import datetime, timedelta
-from typing import List
 from decimal import Decimal
+from typing import Optional
 from sqlalchemy.orm import Session
 
-from app.models.transactions import Transaction
-from app.models.behaviour import BehaviourModel
 from app.schemas.simulation_schemas import ScenarioComparisonResponse, ScenarioSummary
-from .scenario import simulate_spending_scenario
+from app.services.analytics_context import UserAnalyticsContext
+from .engine import ScenarioEngine
 from .helpers import (
     generate_reduction_scenarios,
     generate_increase_scenarios,
@@ -26,7 +24,8 @@ def compare_scenarios(
     user_id: int,
     scenario_type: str,
     time_period_days: int = 30,
-    num_scenarios: int = 3
+    num_scenarios: int = 3,
+    context: Optional[UserAnalyticsContext] = None
 ) -> ScenarioComparisonResponse:
     """
     Generate and compare multiple spending scenarios.
@@ -37,27 +36,15 @@ def compare_scenarios(
         scenario_type: 'reduction' or 'increase'
         time_period_days: Historical period to analyze
         num_scenarios: Number of scenarios to generate (2-5)
+        context: The request's UserAnalyticsContext (saves the behaviour model query)
         
     Returns:
         ScenarioComparisonResponse with multiple scenarios and comparison data
     """
     
-    model = db.query(BehaviourModel).filter_by(user_id=user_id).first()
-    if not model:
-        raise ValueError("No behavior model found for user")
-    
-    # Get baseline data
-    cutoff_date = datetime.utcnow() - timedelta(days=time_period_days)
-    txs = db.query(Transaction).filter(
-        Transaction.user_id == user_id,
-        Transaction.type == "debit",
-        Transaction.timestamp >= cutoff_date
-    ).all()
-    
-    if not txs:
-        raise ValueError("No transactions found in the specified period")
-    
-    baseline_total = sum(float(t.amount) for t in txs)
+    # One model and baseline read; all scenarios evaluated together
+    engine = ScenarioEngine.load(db, user_id, time_period_days, context)
+    model = engine.model
     stats = model.category_stats or {}
     elasticity_map = model.elasticity or {}
     
@@ -67,18 +54,14 @@ def compare_scenarios(
     else:
         scenario_configs = generate_increase_scenarios(num_scenarios, stats, elasticity_map)
     
-    # Run simulation for each scenario
+    results = engine.simulate_many(
+        scenario_type,
+        [config["target_percent"] for config in scenario_configs],
+        [config.get("target_categories") for config in scenario_configs]
+    )
+    
     scenarios = []
-    for config in scenario_configs:
-        result = simulate_spending_scenario(
-            db=db,
-            user_id=user_id,
-            scenario_type=scenario_type,
-            target_percent=config["target_percent"],
-            time_period_days=time_period_days,
-            target_categories=config.get("target_categories")
-        )
-        
+    for config, result in zip(scenario_configs, results):
         # Calculate difficulty score
         difficulty_score = calculate_difficulty_score(
             result.category_breakdown,
@@ -129,7 +112,7 @@ def compare_scenarios(
     
     return ScenarioComparisonResponse(
         scenario_type=scenario_type,
-        baseline_monthly=Decimal(str(baseline_total)),
+        baseline_monthly=Decimal(str(engine.baseline_total)),
         time_period_days=time_period_days,
         scenarios=scenarios,
         recommended_scenario_id=recommended,
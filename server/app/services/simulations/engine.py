@@ -0,0 +1,271 @@
+"""
+Vectorised scenario engine.
+Loads a user's behaviour model and spending baseline once and evaluates any
+number of reduction/increase scenarios as NumPy matrix operations
+(scenarios x categories) instead of one database round trip and Python
+category loop per scenario.
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.models.transactions import Transaction
+from app.models.behaviour import BehaviourModel
+from app.models.user import User
+from app.services.analytics_context import UserAnalyticsContext
+from app.utils.constants import DISCRETIONARY_CATEGORIES, ESSENTIAL_CATEGORIES
+from app.schemas.simulation_schemas import SimulationResponse, CategoryAnalysis
+from .baseline import spending_baseline
+from .helpers import generate_recommendations
+
+DEFAULT_ELASTICITY = 0.3
+
+DIFFICULTY_LEVELS = np.array(["easy", "moderate", "challenging"])
+
+
+def _feasibility(actual_change_pct: float, target_percent: float) -> str:
+    if actual_change_pct >= target_percent * 0.9:
+        return "highly_achievable"
+    if actual_change_pct >= target_percent * 0.7:
+        return "achievable"
+    if actual_change_pct >= target_percent * 0.5:
+        return "challenging"
+    return "unrealistic"
+
+
+class ScenarioEngine:
+    """
+    Scenario evaluation over per-category arrays of one user's behaviour model.
+
+    Category arrays (all in category_stats order): mean, elasticity, variance,
+    count and the discretionary/essential masks.
+    """
+
+    def __init__(self, model: BehaviourModel, baseline_total: float, history_days: Optional[float] = None):
+        self.model = model
+        self.baseline_total = baseline_total
+        self.history_days = history_days
+        self.impulse_score = model.impulse_score or 0.0
+
+        stats = model.category_stats or {}
+        elasticity_map = model.elasticity or {}
+        self.categories: List[str] = list(stats.keys())
+        self._index = {category: i for i, category in enumerate(self.categories)}
+
+        self.mean = np.array([stats[c].get("mean", 0) for c in self.categories], dtype=float)
+        self.elasticity = np.array([elasticity_map.get(c, DEFAULT_ELASTICITY) for c in self.categories], dtype=float)
+        self.variance = np.array([stats[c].get("variance", 0) for c in self.categories], dtype=float)
+        self.count = np.array([stats[c].get("count", 0) for c in self.categories], dtype=float)
+        self.discretionary = np.array([c in DISCRETIONARY_CATEGORIES for c in self.categories], dtype=bool)
+        self.essential = np.array([c in ESSENTIAL_CATEGORIES for c in self.categories], dtype=bool)
+
+        # Scenario-independent confidence from sample count and variance, clamped to [0,1]
+        self.confidence = np.clip(
+            (self.count / 20) * (1 - self.variance / (self.mean ** 2 + 1)), 0.0, 1.0
+        )
+
+    @classmethod
+    def load(
+        cls,
+        db: Session,
+        user_id: int,
+        time_period_days: int = 30,
+        context: Optional[UserAnalyticsContext] = None
+    ) -> "ScenarioEngine":
+        """
+        Load the behaviour model and the (cached) debit baseline of the period.
+        With a context, its model and data_version are used instead of querying.
+
+        Raises:
+            ValueError: If no behavior model found or no transactions in period
+        """
+        if context is not None:
+            row = (context.model, context.data_version) if context.model is not None else None
+        else:
+            row = db.execute(
+                select(BehaviourModel, User.data_version)
+                .join(User, User.id == BehaviourModel.user_id)
+                .where(BehaviourModel.user_id == user_id)
+            ).first()
+        if not row:
+            raise ValueError("No behavior model found for user")
+        model, data_version = row
+
+        baseline = spending_baseline(db, user_id, time_period_days, data_version)
+        if not baseline.count:
+            raise ValueError("No transactions found in the specified period")
+
+        return cls(model, baseline.total, baseline.history_days)
+
+    @classmethod
+    def load_many(
+        cls,
+        db: Session,
+        user_ids: Sequence[int],
+        time_period_days: int = 30,
+        now: Optional[datetime] = None
+    ) -> Dict[int, "ScenarioEngine"]:
+        """
+        Engines for many users with two set-based queries (models, grouped baselines).
+        Users that load() would reject (no model, no debits in the period) are left out.
+        """
+        cutoff_date = (now or datetime.utcnow()) - timedelta(days=time_period_days)
+        models = db.query(BehaviourModel).filter(BehaviourModel.user_id.in_(user_ids)).all()
+        baselines = {
+            user_id: float(total or 0)
+            for user_id, count, total in db.execute(
+                select(Transaction.user_id, func.count(Transaction.id), func.sum(Transaction.amount)).where(
+                    Transaction.user_id.in_(user_ids),
+                    Transaction.type == "debit",
+                    Transaction.timestamp >= cutoff_date
+                ).group_by(Transaction.user_id)
+            )
+            if count
+        }
+        return {
+            model.user_id: cls(model, baselines[model.user_id])
+            for model in models
+            if model.user_id in baselines
+        }
+
+    def selection_mask(self, target_categories: Optional[List[str]]) -> np.ndarray:
+        """
+        Categories a scenario analyses (all when target_categories is empty).
+
+        Raises:
+            ValueError: If none of target_categories is in the user's data
+        """
+        if not target_categories:
+            return np.ones(len(self.categories), dtype=bool)
+        mask = np.zeros(len(self.categories), dtype=bool)
+        for category in target_categories:
+            if category in self._index:
+                mask[self._index[category]] = True
+        if not mask.any():
+            raise ValueError(f"None of the specified categories found in user data: {target_categories}")
+        return mask
+
+    def evaluate(
+        self,
+        scenario_type: str,
+        target_percents: Sequence[float],
+        target_categories: Sequence[Optional[List[str]]]
+    ) -> Dict[str, np.ndarray]:
+        """
+        Evaluate scenarios as (scenarios x categories) matrices.
+
+        Returns:
+            Dict of max_change_pct, achievable_pct, monthly_change, difficulty
+            (index into DIFFICULTY_LEVELS) and selected (S x C), plus
+            total_change and actual_change_pct (S)
+        """
+        targets = np.asarray(target_percents, dtype=float)[:, None]
+        selected = np.array([self.selection_mask(cats) for cats in target_categories], dtype=bool)
+        selected = selected.reshape(len(targets), len(self.categories))
+
+        if scenario_type == "reduction":
+            # Max reduction limited by elasticity; impulse boost for discretionary categories
+            max_change = np.broadcast_to(self.elasticity * 100, selected.shape)
+            achievable = np.minimum(targets, max_change)
+            boosted = np.minimum(achievable + self.impulse_score * 15, max_change)
+            achievable = np.where(self.discretionary, boosted, achievable)
+        else:
+            # Essential spending has natural limits; discretionary can increase more freely
+            max_change = np.where(
+                self.essential,
+                np.minimum(50, self.elasticity * 80),
+                np.minimum(200, self.elasticity * 150)
+            )
+            max_change = np.broadcast_to(max_change, selected.shape)
+            achievable = np.minimum(targets, max_change)
+
+        monthly_change = self.mean * (achievable / 100)
+        total_change = np.where(selected, monthly_change, 0.0).sum(axis=1)
+
+        difficulty = np.where(
+            achievable >= targets * 0.9, 0,
+            np.where(achievable >= targets * 0.6, 1, 2)
+        )
+
+        if self.baseline_total > 0:
+            actual_change_pct = total_change / self.baseline_total * 100
+        else:
+            actual_change_pct = np.zeros(len(targets))
+
+        return {
+            "max_change_pct": max_change,
+            "achievable_pct": achievable,
+            "monthly_change": monthly_change,
+            "difficulty": difficulty,
+            "selected": selected,
+            "total_change": total_change,
+            "actual_change_pct": actual_change_pct,
+        }
+
+    def simulate_many(
+        self,
+        scenario_type: str,
+        target_percents: Sequence[float],
+        target_categories: Sequence[Optional[List[str]]]
+    ) -> List[SimulationResponse]:
+        """Full SimulationResponse for each scenario, evaluated in one pass."""
+        result = self.evaluate(scenario_type, target_percents, target_categories)
+
+        income_stats = None
+        if self.model.monthly_patterns:
+            income_stats = self.model.monthly_patterns.get("income_stats")
+
+        responses = []
+        for s, target_percent in enumerate(target_percents):
+            category_breakdown = {}
+            for c in np.flatnonzero(result["selected"][s]):
+                category_breakdown[self.categories[c]] = CategoryAnalysis(
+                    current_monthly=round(float(self.mean[c]), 2),
+                    max_reduction_pct=round(float(result["max_change_pct"][s, c]), 1),
+                    achievable_reduction_pct=round(float(result["achievable_pct"][s, c]), 1),
+                    monthly_savings=round(float(result["monthly_change"][s, c]), 2),
+                    confidence=round(float(self.confidence[c]), 2),
+                    difficulty=str(DIFFICULTY_LEVELS[result["difficulty"][s, c]])
+                )
+
+            total_change = float(result["total_change"][s])
+            actual_change_pct = float(result["actual_change_pct"][s])
+            if scenario_type == "reduction":
+                projected_total = self.baseline_total - total_change
+            else:
+                projected_total = self.baseline_total + total_change
+
+            recommendations = generate_recommendations(
+                category_breakdown,
+                self.impulse_score,
+                scenario_type,
+                target_categories[s],
+                income_stats
+            )
+
+            responses.append(SimulationResponse(
+                scenario_type=scenario_type,
+                target_percent=target_percent,
+                achievable_percent=round(actual_change_pct, 1),
+                baseline_monthly=round(self.baseline_total, 2),
+                projected_monthly=round(projected_total, 2),
+                total_change=round(total_change, 2),
+                annual_impact=round(total_change * 12, 2),
+                feasibility=_feasibility(actual_change_pct, target_percent),
+                category_breakdown=category_breakdown,
+                recommendations=recommendations,
+                targeted_categories=target_categories[s]
+            ))
+        return responses
+
+    def simulate(
+        self,
+        scenario_type: str,
+        target_percent: float,
+        target_categories: Optional[List[str]] = None
+    ) -> SimulationResponse:
+        return self.simulate_many(scenario_type, [target_percent], [target_categories])[0]
@@ -0,0 +1,165 @@
+"""
+Monte Carlo cash-flow engine.
+Draws thousands of monthly income and per-category expense paths at once as
+NumPy arrays (paths x months x categories) from a user's Welford mean and
+variance, and summarises them as P10/P50/P90 bands plus the probability that
+the running balance goes negative.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from app.core.config import settings
+from app.models.behaviour import BehaviourModel
+
+PERCENTILES = (10, 50, 90)
+
+DAYS_PER_MONTH = 365.25 / 12
+
+
+def monthly_income_moments(income_stats: Dict) -> Tuple[float, float]:
+    """
+    Mean and standard deviation of monthly income.
+
+    income_stats holds Welford statistics over individual payments, so they are
+    scaled by the payments per month observed in income_frequency_days (the gaps
+    between payments): n independent payments sum to n x mean and n x variance.
+    Without gaps (fewer than two payments) income is taken as one payment a month.
+    """
+    mean = income_stats.get("mean", 0.0)
+    variance = max(income_stats.get("variance", 0.0), 0.0)
+    gaps = income_stats.get("income_frequency_days") or []
+    # Floor the average gap at a day so same-day payments (zero gaps) cannot inflate the count
+    payments = DAYS_PER_MONTH / max(sum(gaps) / len(gaps), 1.0) if gaps else 1.0
+    return mean * payments, float(np.sqrt(variance * payments))
+
+
+def monthly_category_moments(category_stats: Dict, observed_days: Optional[float]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Mean and standard deviation of monthly spending per category (category_stats order).
+
+    category_stats, like income_stats, are Welford statistics over individual
+    transactions, so each category is scaled by its transactions per month:
+    its count over the observed_days of history, taken as at least a month.
+    Without a history every transaction is taken as one a month.
+    """
+    categories = list(category_stats.keys())
+    mean = np.array([category_stats[c].get("mean", 0) for c in categories], dtype=float)
+    variance = np.array([max(category_stats[c].get("variance", 0), 0) for c in categories], dtype=float)
+    if observed_days:
+        count = np.array([category_stats[c].get("count", 0) for c in categories], dtype=float)
+        transactions = count / (max(observed_days, DAYS_PER_MONTH) / DAYS_PER_MONTH)
+    else:
+        transactions = np.ones(len(categories))
+    return mean * transactions, np.sqrt(variance * transactions)
+
+
+@dataclass
+class MonteCarloResult:
+    """
+    Percentile bands of a simulation. Band arrays have shape (3, months) in
+    PERCENTILES order; category_expenses is the P50 of each category (months x categories).
+    """
+    categories: List[str]
+    income: np.ndarray
+    expenses: np.ndarray
+    net: np.ndarray
+    balance: np.ndarray
+    category_expenses: np.ndarray
+    negative_probability: np.ndarray  # P(balance < 0 in any month up to and including this one)
+
+    def band(self, name: str, month: int) -> Dict[str, float]:
+        """P10/P50/P90 of one series ("income", "expenses", "net", "balance") for a month index."""
+        values = getattr(self, name)[:, month]
+        return {f"p{p}": float(v) for p, v in zip(PERCENTILES, values)}
+
+
+class MonteCarloEngine:
+    """
+    Monthly cash-flow simulator for one user.
+
+    Income and each expense category are drawn independently per month from a
+    normal distribution with the given mean and standard deviation, floored at 0.
+    Income mean and standard deviation may also be given per month (one entry
+    per simulated month) for income that follows a pay cycle.
+    The generator is seeded so the same inputs give the same bands.
+    """
+
+    def __init__(
+        self,
+        income_mean: Union[float, Sequence[float]],
+        income_std: Union[float, Sequence[float]],
+        expense_mean: Sequence[float],
+        expense_std: Sequence[float],
+        categories: Optional[List[str]] = None,
+        paths: Optional[int] = None,
+        seed: Optional[int] = None
+    ):
+        self.income_mean = np.asarray(income_mean, dtype=float) if np.ndim(income_mean) else float(income_mean)
+        self.income_std = np.maximum(income_std, 0.0) if np.ndim(income_std) else max(float(income_std), 0.0)
+        self.expense_mean = np.asarray(expense_mean, dtype=float).reshape(-1)
+        self.expense_std = np.maximum(np.asarray(expense_std, dtype=float).reshape(-1), 0.0)
+        self.categories = categories if categories is not None else [f"expenses_{i}" for i in range(len(self.expense_mean))]
+        self.paths = paths or settings.monte_carlo_paths
+        self.rng = np.random.default_rng(seed)
+
+    @classmethod
+    def from_behaviour_model(
+        cls,
+        model: BehaviourModel,
+        behavioral_changes: Optional[Dict[str, float]] = None,
+        observed_days: Optional[float] = None,
+        **kwargs
+    ) -> "MonteCarloEngine":
+        """
+        Build from category_stats and monthly_patterns income_stats, scaled to a
+        month by monthly_category_moments and monthly_income_moments.
+
+        Args:
+            model: The user's behaviour model
+            behavioral_changes: Category percentage changes scaling both mean and spread
+            observed_days: Days of debit history category_stats were built from
+            **kwargs: paths / seed
+        """
+        stats = model.category_stats or {}
+        changes = behavioral_changes or {}
+        categories = list(stats.keys())
+
+        factor = np.array([1 + changes.get(c, 0) / 100 for c in categories], dtype=float)
+        mean, std = monthly_category_moments(stats, observed_days)
+
+        income_mean, income_std = monthly_income_moments(
+            (model.monthly_patterns or {}).get("income_stats") or {}
+        )
+        return cls(
+            income_mean=income_mean,
+            income_std=income_std,
+            expense_mean=mean * factor,
+            expense_std=std * factor,
+            categories=categories,
+            **kwargs
+        )
+
+    def simulate(self, months: int, starting_balance: float = 0.0) -> MonteCarloResult:
+        """Simulate `months` months of cash flow starting from starting_balance."""
+        shape = (self.paths, months)
+        income = np.maximum(self.rng.normal(self.income_mean, self.income_std, shape), 0.0)
+        category_expenses = np.maximum(
+            self.rng.normal(self.expense_mean, self.expense_std, shape + (len(self.expense_mean),)), 0.0
+        )
+        expenses = category_expenses.sum(axis=2)
+        net = income - expenses
+        balance = starting_balance + np.cumsum(net, axis=1)
+        went_negative = np.minimum.accumulate(balance, axis=1) < 0
+
+        return MonteCarloResult(
+            categories=self.categories,
+            income=np.percentile(income, PERCENTILES, axis=0),
+            expenses=np.percentile(expenses, PERCENTILES, axis=0),
+            net=np.percentile(net, PERCENTILES, axis=0),
+            balance=np.percentile(balance, PERCENTILES, axis=0),
+            category_expenses=np.median(category_expenses, axis=0),
+            negative_probability=went_negative.mean(axis=0)
+        )
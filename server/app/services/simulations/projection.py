@@ -3,16 +3,16 @@ Future spending projection logic.
 Handles month-by-month spending forecasts.
 """
 
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Dict, Optional
 from decimal import Decimal
 from sqlalchemy.orm import Session
 from calendar import month_name
-import random
 
-from app.models.transactions import Transaction
-from app.models.behaviour import BehaviourModel
 from app.schemas.simulation_schemas import ProjectionResponse, MonthlyProjection
+from app.services.analytics_context import UserAnalyticsContext
+from .engine import ScenarioEngine
+from .monte_carlo import MonteCarloEngine
 
 
 def project_future_spending(
@@ -21,7 +21,9 @@ def project_future_spending(
     projection_months: int,
     time_period_days: int = 30,
     behavioral_changes: Optional[Dict[str, float]] = None,
-    scenario_id: Optional[str] = None
+    scenario_id: Optional[str] = None,
+    current_balance: float = 0.0,
+    context: Optional[UserAnalyticsContext] = None
 ):
     """
     Project future spending with optional behavioral changes.
@@ -33,60 +35,45 @@ def project_future_spending(
         time_period_days: Historical period to analyze
         behavioral_changes: Expected category percentage changes
         scenario_id: Apply a scenario from comparison
+        current_balance: Starting balance for the negative-balance probability
+        context: The request's UserAnalyticsContext (saves the behaviour model query)
         
     Returns:
         ProjectionResponse with month-by-month projections
     """
     
-    model = db.query(BehaviourModel).filter_by(user_id=user_id).first()
-    if not model:
-        raise ValueError("No behavior model found for user")
-    
-    # Get baseline data
-    cutoff_date = datetime.utcnow() - timedelta(days=time_period_days)
-    txs = db.query(Transaction).filter(
-        Transaction.user_id == user_id,
-        Transaction.type == "debit",
-        Transaction.timestamp >= cutoff_date
-    ).all()
-    
-    if not txs:
-        raise ValueError("No transactions found in the specified period")
-    
-    baseline_monthly = sum(float(t.amount) for t in txs)
-    stats = model.category_stats or {}
+    # Behaviour model and debit baseline (COUNT/SUM), same checks as the scenario engine
+    scenario_engine = ScenarioEngine.load(db, user_id, time_period_days, context)
+    model = scenario_engine.model
+    baseline_monthly = scenario_engine.baseline_total
     
     # Determine changes to apply
     changes = behavioral_changes or {}
     
+    # Monte Carlo paths per category from the Welford mean/variance (seeded per user),
+    # scaled to a month over the user's debit history
+    simulation = MonteCarloEngine.from_behaviour_model(
+        model, changes, observed_days=scenario_engine.history_days, seed=user_id
+    ).simulate(projection_months, current_balance)
+    has_income = bool((model.monthly_patterns or {}).get("income_stats"))
+    
     # Generate monthly projections
     monthly_projections = []
     cumulative_change = 0
     current_date = datetime.utcnow()
     
     for month_num in range(1, projection_months + 1):
+        index = month_num - 1
         # Calculate month details
         target_month = (current_date.month + month_num - 1) % 12 + 1
         month_label = f"{month_name[target_month]} {current_date.year + (current_date.month + month_num - 1) // 12}"
         
-        # Apply changes to each category
-        category_spending = {}
-        month_total = 0
-        
-        for category, cat_stats in stats.items():
-            base_amount = cat_stats.get("mean", 0)
-            
-            # Apply behavioral change if specified
-            change_pct = changes.get(category, 0)
-            adjusted_amount = base_amount * (1 + change_pct / 100)
-            
-            # Add slight natural variation (±5%) for realism
-            random.seed(month_num)  # Consistent "randomness"
-            variation = random.uniform(-0.05, 0.05)
-            projected_amount = adjusted_amount * (1 + variation)
-            
-            category_spending[category] = Decimal(str(round(projected_amount, 2)))
-            month_total += projected_amount
+        category_spending = {
+            category: Decimal(str(round(float(amount), 2)))
+            for category, amount in zip(simulation.categories, simulation.category_expenses[index])
+        }
+        spending = simulation.band("expenses", index)
+        month_total = spending["p50"]
         
         # Confidence decreases over time
         confidence = max(0.5, 1.0 - (month_num * 0.03))  # 3% decrease per month
@@ -98,9 +85,14 @@ def project_future_spending(
             month=month_num,
             month_label=month_label,
             projected_spending=Decimal(str(round(month_total, 2))),
+            spending_p10=Decimal(str(round(spending["p10"], 2))),
+            spending_p90=Decimal(str(round(spending["p90"], 2))),
             category_breakdown=category_spending,
             cumulative_change=Decimal(str(round(cumulative_change, 2))),
-            confidence=confidence
+            confidence=confidence,
+            negative_balance_probability=(
+                round(float(simulation.negative_probability[index]), 3) if has_income else None
+            )
         ))
     
     # Calculate totals
@@ -121,6 +113,8 @@ def project_future_spending(
     else:
         trend = "Stable baseline projection with natural variations"
     
+    negative_balance_probability = monthly_projections[-1].negative_balance_probability
+    
     # Confidence level
     if projection_months <= 3:
         confidence_level = "High"
@@ -148,12 +142,19 @@ def project_future_spending(
         if most_increased and most_increased[1] > 0:
             insights.append(f"Largest planned increase: {most_increased[0]} ({most_increased[1]:.0f}%)")
     
+    if negative_balance_probability is not None and negative_balance_probability >= 0.1:
+        insights.append(
+            f"{negative_balance_probability:.0%} chance your balance goes negative within {projection_months} months"
+        )
+    
     insights.append(f"Confidence decreases over time - {confidence_level.lower()} confidence for this time horizon")
     
     # Chart data
     projection_chart = {
         "months": [m.month_label for m in monthly_projections],
         "projected": [float(m.projected_spending) for m in monthly_projections],
+        "projected_p10": [float(m.spending_p10) for m in monthly_projections],
+        "projected_p90": [float(m.spending_p90) for m in monthly_projections],
         "baseline": [baseline_monthly] * projection_months,
         "cumulative_change": [float(m.cumulative_change) for m in monthly_projections],
         "confidence": [float(m.confidence) for m in monthly_projections]
@@ -169,6 +170,7 @@ def project_future_spending(
         annual_impact=Decimal(str(round(annual_impact, 2))),
         trend_analysis=trend,
         confidence_level=confidence_level,
+        negative_balance_probability=negative_balance_probability,
         key_insights=insights,
         projection_chart=projection_chart
     )
@@ -3,22 +3,22 @@ Budget reallocation simulation logic.
 Handles moving money between spending categories.
 """
 
-from datetime import datetime, timedelta
-from typing import Dict
+from typing import Dict, Optional
 from decimal import Decimal
 from sqlalchemy.orm import Session
 
-from app.models.transactions import Transaction
-from app.models.behaviour import BehaviourModel
 from app.utils.constants import ESSENTIAL_CATEGORIES, DISCRETIONARY_CATEGORIES
 from app.schemas.simulation_schemas import ReallocationResponse, CategoryReallocation
+from app.services.analytics_context import UserAnalyticsContext
+from .engine import ScenarioEngine
 
 
 def simulate_reallocation(
     db: Session,
     user_id: int,
     reallocations: Dict[str, float],
-    time_period_days: int = 30
+    time_period_days: int = 30,
+    context: Optional[UserAnalyticsContext] = None
 ):
     """
     Simulate budget reallocation between categories.
@@ -28,27 +28,16 @@ def simulate_reallocation(
         user_id: User ID to simulate for
         reallocations: Dict of category changes (must sum to zero)
         time_period_days: Historical period to analyze
+        context: The request's UserAnalyticsContext (saves the behaviour model query)
         
     Returns:
         ReallocationResponse with feasibility analysis
     """
     
-    model = db.query(BehaviourModel).filter_by(user_id=user_id).first()
-    if not model:
-        raise ValueError("No behavior model found for user")
-    
-    # Get baseline data
-    cutoff_date = datetime.utcnow() - timedelta(days=time_period_days)
-    txs = db.query(Transaction).filter(
-        Transaction.user_id == user_id,
-        Transaction.type == "debit",
-        Transaction.timestamp >= cutoff_date
-    ).all()
-    
-    if not txs:
-        raise ValueError("No transactions found in the specified period")
-    
-    baseline_total = sum(float(t.amount) for t in txs)
+    # Behaviour model and (cached) debit baseline, same checks as the scenario engine
+    scenario_engine = ScenarioEngine.load(db, user_id, time_period_days, context)
+    model = scenario_engine.model
+    baseline_total = scenario_engine.baseline_total
     stats = model.category_stats or {}
     elasticity_map = model.elasticity or {}
     
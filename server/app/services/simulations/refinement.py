@@ -1,36 +1,82 @@
 from pydantic_ai import Agent
-from pydantic_ai.models.google import GoogleModel
-from pydantic_ai.providers.google import GoogleProvider
 from app.core.config import settings
+from app.core.llm import get_agent
 from app.schemas.simulation_schemas import ScenarioComparisonResponse, SimulationResponse
-from typing import Union
+from app.services.tiered_cache import TieredCache, cache_redis_client
+from typing import AsyncIterator, Optional, Union
+import hashlib
 import json
 
 
+REFINEMENT_SYSTEM_PROMPT = (
+    "You are a financial insights expert. Analyze the provided simulation or comparison data "
+    "and generate a concise, actionable insight in 2-4 sentences formatted in markdown. "
+    "Use markdown formatting like **bold** for emphasis, and organize the content clearly. "
+    "Focus on the most important findings, feasibility, and practical recommendations. "
+    "Be clear, direct, and use natural language. Avoid technical jargon and make it easy to "
+    "understand for everyday users."
+)
+
+# Bump when the prompts change so cached insights are regenerated
+REFINEMENT_PROMPT_VERSION = 1
+
+KEY_PREFIX = "refined_insight"
+
+
+def payload_hash(data: Union[ScenarioComparisonResponse, SimulationResponse]) -> str:
+    """Canonical hash of a simulation/comparison payload (independent of dict key order)."""
+    canonical = json.dumps(data.model_dump(mode="json"), sort_keys=True, separators=(",", ":"))
+    digest = hashlib.sha256(
+        f"{type(data).__name__}:{REFINEMENT_PROMPT_VERSION}:{canonical}".encode()
+    ).hexdigest()
+    return digest
+
+
+class RefinementCache(TieredCache):
+    """Refined insight text keyed on the payload hash; identical numbers never reach Gemini twice."""
+
+    name = "Refinement cache"
+
+    @staticmethod
+    def key(data: Union[ScenarioComparisonResponse, SimulationResponse]) -> str:
+        return f"{KEY_PREFIX}:{payload_hash(data)}"
+
+    async def get(self, data: Union[ScenarioComparisonResponse, SimulationResponse]) -> Optional[str]:
+        return await self.get_entry(self.key(data))
+
+    async def set(self, data: Union[ScenarioComparisonResponse, SimulationResponse], insight: str) -> str:
+        return await self.set_entry(self.key(data), insight)
+
+
+_refinement_cache: Optional[RefinementCache] = None
+
+
+def get_refinement_cache() -> RefinementCache:
+    """Process-wide refinement cache."""
+    global _refinement_cache
+    if _refinement_cache is None:
+        _refinement_cache = RefinementCache(cache_redis_client(), ttl=settings.refinement_cache_ttl)
+    return _refinement_cache
+
+
 class RefinementService:
-    def __init__(self):
-        self.provider = GoogleProvider(api_key=settings.gemini_api_key)
-        self.model = GoogleModel("gemini-2.5-flash", provider=self.provider)
+    def __init__(self, cache: Optional[RefinementCache] = None):
+        self._cache = cache
 
-    async def refine_insight(self, data: Union[ScenarioComparisonResponse, SimulationResponse]) -> str:
-        """Generate a concise 2-4 sentence insight from simulation data using Gemini."""
-        
-        agent = Agent(
-            model=self.model,
-            output_type=str,
-            system_prompt=(
-                "You are a financial insights expert. Analyze the provided simulation or comparison data "
-                "and generate a concise, actionable insight in 2-4 sentences formatted in markdown. "
-                "Use markdown formatting like **bold** for emphasis, and organize the content clearly. "
-                "Focus on the most important findings, feasibility, and practical recommendations. "
-                "Be clear, direct, and use natural language. Avoid technical jargon and make it easy to "
-                "understand for everyday users."
-            )
-        )
-
-        # Convert the data to a formatted string for the agent
+    @property
+    def agent(self) -> Agent:
+        """Shared insight agent, created on first use (see app.core.llm)."""
+        return get_agent("simulation_refinement", str, REFINEMENT_SYSTEM_PROMPT)
+
+    @property
+    def cache(self) -> RefinementCache:
+        return self._cache or get_refinement_cache()
+
+    @staticmethod
+    def build_prompt(data: Union[ScenarioComparisonResponse, SimulationResponse]) -> str:
+        """Convert the data to a formatted string for the agent"""
         if isinstance(data, SimulationResponse):
-            prompt = f"""
+            return f"""
 Analyze this budget simulation:
 - Scenario: {data.scenario_type}
 - Target: {data.target_percent}% change
@@ -44,13 +90,13 @@ Analyze this budget simulation:
 
 Provide a clear, actionable insight in 2-4 sentences using markdown formatting.
 """
-        else:  # ScenarioComparisonResponse
-            scenarios_info = "\n".join([
-                f"- {s.name} ({s.scenario_type}): {s.target_percent}% change, {s.feasibility} feasibility, "
-                f"${s.total_change} monthly change, affects {', '.join(s.top_categories[:2])}"
-                for s in data.scenarios
-            ])
-            prompt = f"""
+        # ScenarioComparisonResponse
+        scenarios_info = "\n".join([
+            f"- {s.name} ({s.scenario_type}): {s.target_percent}% change, {s.feasibility} feasibility, "
+            f"${s.total_change} monthly change, affects {', '.join(s.top_categories[:2])}"
+            for s in data.scenarios
+        ])
+        return f"""
 Analyze this scenario comparison:
 - Baseline monthly: ${data.baseline_monthly}
 - Time period: {data.time_period_days} days
@@ -63,8 +109,35 @@ Scenarios:
 Provide a clear, actionable insight in 2-4 sentences comparing these scenarios using markdown formatting.
 """
 
-        response = await agent.run(prompt)
+    async def refine_insight(self, data: Union[ScenarioComparisonResponse, SimulationResponse]) -> str:
+        """Generate a concise 2-4 sentence insight from simulation data using Gemini (cached per payload)."""
+        cached = await self.cache.get(data)
+        if cached is not None:
+            return cached
+
+        response = await self.agent.run(self.build_prompt(data))
         insight = response.output
         
-        return insight
- 
\ No newline at end of file
+        return await self.cache.set(data, insight)
+
+    async def stream_insight(
+        self,
+        data: Union[ScenarioComparisonResponse, SimulationResponse]
+    ) -> AsyncIterator[str]:
+        """
+        Yield the insight as text deltas while Gemini generates it.
+
+        A cached insight is yielded as a single chunk; a fully streamed one is
+        cached for the next request.
+        """
+        cached = await self.cache.get(data)
+        if cached is not None:
+            yield cached
+            return
+
+        parts = []
+        async with self.agent.run_stream(self.build_prompt(data)) as result:
+            async for delta in result.stream_text(delta=True, debounce_by=None):
+                parts.append(delta)
+                yield delta
+        await self.cache.set(data, "".join(parts))
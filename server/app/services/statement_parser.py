@@ -0,0 +1,377 @@
+"""
+Bank Statement Parser
+Turns multi-page bank statement PDFs into transactions without the LLM.
+
+Pages are streamed with PyMuPDF (`page.get_text("words")`) and rebuilt into table rows
+using word positions. Large statements are split into contiguous page ranges that are
+parsed in a process pool; each worker opens the PDF itself and walks its pages one at a
+time, so memory stays bounded by the page being parsed rather than the whole document.
+
+The pool is created on first use and shared by all uploads; shutdown_statement_pool()
+is called on application shutdown.
+"""
+import os
+import re
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from app.core.config import settings
+from app.schemas.transaction_schemas import TransactionCreate
+from app.services.document_parser import to_decimal
+from app.services.email_parser import CREDIT_PATTERN, detect_bank_name, categorize_merchant
+from app.utils.pdf_to_text import iter_pdf_pages, get_pdf_page_count
+
+logger = logging.getLogger(__name__)
+
+# Statements this short are parsed in-process; forking workers costs more than it saves
+INLINE_PAGE_LIMIT = 4
+
+# Words whose vertical centres are this close (in points) belong to the same row
+LINE_TOLERANCE = 3.0
+
+ROW_DATE_PATTERN = re.compile(
+    r"^(\d{1,2})[-/](\d{1,2})[-/](\d{2,4})\b"
+    r"|^(\d{4})-(\d{1,2})-(\d{1,2})\b"
+    r"|^(\d{1,2})[\s\-]([A-Za-z]{3})[A-Za-z]*[\s\-](\d{2,4})\b"
+)
+AMOUNT_TOKEN_PATTERN = re.compile(r"^(?:INR|Rs\.?|₹)?([\d,]+\.\d{2})(Cr|Dr|CR|DR)?$")
+MARKER_TOKENS = {"cr": "credit", "dr": "debit"}
+
+DEBIT_HEADERS = {"withdrawal", "withdrawals", "debit", "debits", "withdrawal(dr)", "debit(dr)", "dr"}
+CREDIT_HEADERS = {"deposit", "deposits", "credit", "credits", "deposit(cr)", "credit(cr)", "cr"}
+BALANCE_HEADERS = {"balance", "closing", "balance(inr)"}
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def get_statement_pool() -> ProcessPoolExecutor:
+    """Process pool shared by statement uploads, created on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=max(1, settings.statement_import_workers))
+        return _pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor) -> None:
+    """Forget a pool whose worker died so the next upload starts a fresh one."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+
+
+def shutdown_statement_pool() -> None:
+    """Stop the worker processes (called on shutdown)."""
+    global _pool
+    with _pool_lock:
+        pool = _pool
+        _pool = None
+    if pool is not None:
+        pool.shutdown(wait=True)
+
+
+def _parse_row_date(match: re.Match) -> Optional[datetime]:
+    """Build a datetime from a ROW_DATE_PATTERN match."""
+    groups = match.groups()
+    try:
+        if groups[0]:
+            day, month, year = int(groups[0]), int(groups[1]), int(groups[2])
+            if year < 100:
+                year += 2000
+            return datetime(year, month, day)
+        if groups[3]:
+            return datetime(int(groups[3]), int(groups[4]), int(groups[5]))
+        year = int(groups[8])
+        if year < 100:
+            year += 2000
+        return datetime.strptime(f"{groups[6]} {groups[7].title()} {year}", "%d %b %Y")
+    except ValueError:
+        return None
+
+
+def group_words_into_lines(words: List[tuple]) -> List[List[tuple]]:
+    """
+    Group PyMuPDF word tuples (x0, y0, x1, y1, text, ...) into visual lines.
+    Table cells are often separate blocks, so rows are rebuilt from coordinates.
+    """
+    lines: List[List[tuple]] = []
+    current: List[tuple] = []
+    current_mid = None
+
+    for word in sorted(words, key=lambda w: ((w[1] + w[3]) / 2, w[0])):
+        mid = (word[1] + word[3]) / 2
+        if current and abs(mid - current_mid) > LINE_TOLERANCE:
+            lines.append(sorted(current, key=lambda w: w[0]))
+            current = []
+        if not current:
+            current_mid = mid
+        current.append(word)
+
+    if current:
+        lines.append(sorted(current, key=lambda w: w[0]))
+    return lines
+
+
+def find_columns(line: List[tuple]) -> Optional[Dict[str, float]]:
+    """
+    Detect a statement table header and return the x-centre of the
+    debit / credit / balance columns.
+    """
+    columns = {}
+    for word in line:
+        text = word[4].lower().rstrip(":.")
+        centre = (word[0] + word[2]) / 2
+        if text in DEBIT_HEADERS and "debit" not in columns:
+            columns["debit"] = centre
+        elif text in CREDIT_HEADERS and "credit" not in columns:
+            columns["credit"] = centre
+        elif text in BALANCE_HEADERS and "balance" not in columns:
+            columns["balance"] = centre
+
+    if "debit" in columns and "credit" in columns:
+        return columns
+    return None
+
+
+def parse_statement_line(line: List[tuple], columns: Optional[Dict[str, float]] = None) -> Optional[Dict]:
+    """
+    Parse a single statement row: a leading date, a description and trailing amounts.
+
+    When table columns are known, each amount is assigned to the nearest column.
+    Otherwise a Cr/Dr marker decides the type, and the last of several amounts is
+    treated as the running balance. Rows whose type is still unknown are resolved
+    later from the balance movement (see resolve_row_types).
+    """
+    text = " ".join(word[4] for word in line)
+    m_date = ROW_DATE_PATTERN.match(text)
+    if not m_date:
+        return None
+    timestamp = _parse_row_date(m_date)
+    if timestamp is None:
+        return None
+
+    # Skip the words that make up the date
+    date_word_count = len(m_date.group(0).split())
+    body = line[date_word_count:]
+
+    # Collect trailing amounts (and Cr/Dr markers) from the right
+    amounts: List[Tuple[Decimal, float, Optional[str]]] = []
+    pending_marker = None
+    idx = len(body)
+    while idx > 0:
+        word = body[idx - 1]
+        token = word[4]
+        if token.lower() in MARKER_TOKENS:
+            # Marker printed as a separate word after its amount
+            pending_marker = MARKER_TOKENS[token.lower()]
+            idx -= 1
+            continue
+        m_amount = AMOUNT_TOKEN_PATTERN.match(token)
+        if not m_amount:
+            break
+        marker = MARKER_TOKENS.get((m_amount.group(2) or "").lower()) or pending_marker
+        amounts.append((to_decimal(m_amount.group(1)), (word[0] + word[2]) / 2, marker))
+        pending_marker = None
+        idx -= 1
+
+    amounts.reverse()
+    if not amounts:
+        return None
+
+    description_words = [w[4] for w in body[:idx]]
+    # Drop a value date printed next to the transaction date
+    if description_words and ROW_DATE_PATTERN.match(" ".join(description_words)):
+        m_value = ROW_DATE_PATTERN.match(" ".join(description_words))
+        description_words = description_words[len(m_value.group(0).split()):]
+    description = " ".join(description_words).strip() or None
+
+    amount, txn_type, balance = None, None, None
+    if columns:
+        for value, centre, _ in amounts:
+            nearest = min(columns, key=lambda name: abs(columns[name] - centre))
+            if nearest == "balance":
+                balance = value
+            elif amount is None:
+                amount, txn_type = value, nearest
+    else:
+        if len(amounts) >= 2:
+            balance = amounts[-1][0]
+        amount, _, txn_type = amounts[0]
+
+    if not amount:
+        return None
+
+    return {
+        "timestamp": timestamp,
+        "amount": amount,
+        "type": txn_type,
+        "balance": balance,
+        "merchant": description[:200] if description else None,
+        "rawMessage": text[:1000],
+    }
+
+
+def parse_statement_page(
+    words: List[tuple],
+    columns: Optional[Dict[str, float]] = None
+) -> Tuple[List[Dict], Optional[Dict[str, float]]]:
+    """
+    Parse every transaction row on a page.
+
+    Returns:
+        Tuple of (rows, columns) - columns are carried over to the next page
+        because many statements only print the table header once
+    """
+    rows = []
+    for line in group_words_into_lines(words):
+        header = find_columns(line)
+        if header:
+            columns = header
+            continue
+        row = parse_statement_line(line, columns)
+        if row:
+            rows.append(row)
+    return rows, columns
+
+
+def find_statement_columns(pdf_content: bytes) -> Tuple[Optional[int], Optional[Dict[str, float]]]:
+    """
+    Locate the first table header in the statement.
+
+    Returns:
+        Tuple of (page index, columns), or (None, None) if no page has a header
+    """
+    for page_num, words in enumerate(iter_pdf_pages(pdf_content, "words")):
+        for line in group_words_into_lines(words):
+            columns = find_columns(line)
+            if columns:
+                return page_num, columns
+    return None, None
+
+
+def parse_page_range(
+    pdf_content: bytes,
+    start: int,
+    stop: int,
+    columns: Optional[Dict[str, float]] = None
+) -> List[Dict]:
+    """
+    Parse pages [start, stop) of a statement. Module-level so it can run in a worker process.
+
+    columns are the positions in effect before `start`; ranges after the first need them
+    because the header is often printed on the first page only.
+    """
+    rows = []
+    for words in iter_pdf_pages(pdf_content, "words", start, stop):
+        page_rows, columns = parse_statement_page(words, columns)
+        rows.extend(page_rows)
+    return rows
+
+
+def resolve_row_types(rows: List[Dict]) -> List[Dict]:
+    """
+    Fill in the type of rows that had neither a column nor a Cr/Dr marker,
+    using the running balance when available and the description otherwise.
+    """
+    previous_balance = None
+    for row in rows:
+        if row["type"] is None:
+            if previous_balance is not None and row["balance"] is not None:
+                row["type"] = "credit" if row["balance"] > previous_balance else "debit"
+            elif row["merchant"] and CREDIT_PATTERN.search(row["merchant"]):
+                row["type"] = "credit"
+            else:
+                row["type"] = "debit"
+        if row["balance"] is not None:
+            previous_balance = row["balance"]
+    return rows
+
+
+def _page_ranges(page_count: int, workers: int) -> List[Tuple[int, int]]:
+    """Split pages into at most `workers` contiguous ranges."""
+    size = -(-page_count // workers)
+    return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
+
+def parse_statement_pdf(
+    pdf_content: bytes,
+    max_workers: Optional[int] = None,
+    inline_page_limit: int = INLINE_PAGE_LIMIT
+) -> Dict:
+    """
+    Parse all transaction rows of a statement PDF.
+
+    Args:
+        pdf_content: PDF file content as bytes
+        max_workers: Page ranges to split the statement into (defaults to the CPU count);
+            they run on the shared pool of statement_import_workers processes
+        inline_page_limit: Parse in-process when the PDF has at most this many pages
+
+    Returns:
+        Dict with page_count, bank_name and rows (in statement order)
+    """
+    page_count = get_pdf_page_count(pdf_content)
+    if page_count == 0:
+        return {"page_count": 0, "bank_name": None, "rows": []}
+
+    first_page = next(iter_pdf_pages(pdf_content, "text", 0, 1), "")
+    bank_name = detect_bank_name(first_page)
+
+    workers = max(1, min(max_workers or os.cpu_count() or 1, page_count))
+    if page_count <= inline_page_limit or workers == 1:
+        rows = parse_page_range(pdf_content, 0, page_count)
+    else:
+        ranges = _page_ranges(page_count, workers)
+        # Workers start mid-document, so hand them the header seen on an earlier page
+        header_page, columns = find_statement_columns(pdf_content)
+        pool = get_statement_pool()
+        rows = []
+        try:
+            futures = [
+                pool.submit(
+                    parse_page_range, pdf_content, start, stop,
+                    columns if header_page is not None and header_page < start else None
+                )
+                for start, stop in ranges
+            ]
+            # Collect in page order so balances stay sequential
+            for future in futures:
+                rows.extend(future.result())
+        except BrokenProcessPool:
+            _discard_pool(pool)
+            raise
+
+    logger.info(f"Parsed {len(rows)} statement rows from {page_count} pages")
+    return {"page_count": page_count, "bank_name": bank_name, "rows": resolve_row_types(rows)}
+
+
+def rows_to_transactions(rows: List[Dict], user_id: int, bank_name: Optional[str] = None) -> Tuple[List[TransactionCreate], int]:
+    """
+    Validate parsed rows as transactions.
+
+    Returns:
+        Tuple of (transactions, number of rejected rows)
+    """
+    transactions = []
+    rejected = 0
+    for row in rows:
+        try:
+            transactions.append(TransactionCreate(
+                user_id=user_id,
+                bankName=bank_name,
+                category=categorize_merchant(row["merchant"]),
+                **row
+            ))
+        except ValidationError as e:
+            rejected += 1
+            logger.info(f"Rejected statement row '{row['rawMessage'][:80]}': {e}")
+    return transactions, rejected
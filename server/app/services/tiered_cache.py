@@ -0,0 +1,103 @@
+"""
+Tiered Cache
+Base class for response caches shared by all API processes: entries live in
+Redis with a TTL, and a small in-process TTLCache sits in front. While Redis is
+unreachable the local tier is used alone and Redis is retried after
+REDIS_RETRY_AFTER seconds, so a Redis outage degrades to per-process caching
+instead of failing requests.
+"""
+import logging
+import threading
+import time
+from typing import Any, Optional
+
+import redis
+import redis.asyncio as aioredis
+from cachetools import TTLCache
+
+from app.core.config import settings
+from app.services.job_queue import redis_ssl_params
+
+logger = logging.getLogger(__name__)
+
+LOCAL_CACHE_SIZE = 10000
+
+# Seconds to skip Redis after a connection error before trying it again
+REDIS_RETRY_AFTER = 30
+
+
+def cache_redis_client() -> aioredis.Redis:
+    """Async Redis client for caches: short timeouts so a slow Redis never stalls a request."""
+    redis_url = settings.redis_url
+    return aioredis.from_url(
+        redis_url,
+        decode_responses=True,
+        socket_connect_timeout=0.5,
+        socket_timeout=0.5,
+        **redis_ssl_params(redis_url)
+    )
+
+
+class TieredCache:
+    """
+    In-process + Redis cache of string-serialisable entries.
+
+    Subclasses build keys and override encode/decode when entries are not
+    plain strings.
+    """
+
+    name = "cache"
+
+    def __init__(self, redis_client=None, ttl: int = 3600, local_size: int = LOCAL_CACHE_SIZE):
+        self.redis_client = redis_client
+        self.ttl = ttl
+        self._local: TTLCache = TTLCache(maxsize=local_size, ttl=ttl)
+        self._lock = threading.Lock()
+        self._redis_down_until = 0.0
+
+    def encode(self, entry: Any) -> str:
+        return entry
+
+    def decode(self, raw: str) -> Any:
+        return raw
+
+    def _redis_available(self) -> bool:
+        return self.redis_client is not None and time.monotonic() >= self._redis_down_until
+
+    def _redis_failed(self, error: Exception):
+        logger.warning(f"{self.name}: Redis unavailable, using local cache only ({error})")
+        self._redis_down_until = time.monotonic() + REDIS_RETRY_AFTER
+
+    async def get_entry(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._local.get(key)
+        if entry is not None or not self._redis_available():
+            return entry
+
+        try:
+            raw = await self.redis_client.get(key)
+        except (redis.RedisError, OSError) as e:
+            self._redis_failed(e)
+            return None
+        if raw is None:
+            return None
+
+        entry = self.decode(raw)
+        with self._lock:
+            self._local[key] = entry
+        return entry
+
+    async def set_entry(self, key: str, entry: Any) -> Any:
+        with self._lock:
+            self._local[key] = entry
+
+        if self._redis_available():
+            try:
+                await self.redis_client.set(key, self.encode(entry), ex=self.ttl)
+            except (redis.RedisError, OSError) as e:
+                self._redis_failed(e)
+        return entry
+
+    def clear_local(self):
+        with self._lock:
+            self._local.clear()
@@ -0,0 +1,226 @@
+"""
+Transaction Import Service
+Shared write path for bulk imports (the /transactions/bulk endpoint and statement uploads).
+
+Deduplication runs in two set-based queries instead of one or two queries per row:
+- existing transactionIds for the user (chunked IN list)
+- candidate rows inside the overall time span of the batch, matched in memory
+  with the same rules as before (amount, type, merchant and a ±5 minute window)
+"""
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.transactions import Transaction
+from app.models.user import User
+from app.models.gamification import EventType
+from app.schemas.transaction_schemas import TransactionCreate
+from app.services.goal_service import GoalService
+from app.services.gamification_service import GamificationService
+
+logger = logging.getLogger(__name__)
+
+# Time window used to treat two transactions without a shared ID as the same one
+DEDUP_WINDOW = timedelta(minutes=5)
+
+# Keep IN lists well below SQLite/Postgres bind parameter limits
+ID_CHUNK_SIZE = 500
+
+
+def _naive_utc(dt: datetime) -> datetime:
+    """Normalize a datetime to naive UTC so DB and request values compare safely."""
+    if dt.tzinfo is not None:
+        return dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def _existing_transaction_ids(db: Session, user_id: int, transaction_ids: List[str]) -> set:
+    """Return the subset of transaction_ids already stored for the user."""
+    found = set()
+    unique_ids = list(dict.fromkeys(transaction_ids))
+    for start in range(0, len(unique_ids), ID_CHUNK_SIZE):
+        chunk = unique_ids[start:start + ID_CHUNK_SIZE]
+        rows = db.query(Transaction.transactionId).filter(
+            Transaction.user_id == user_id,
+            Transaction.transactionId.in_(chunk)
+        ).all()
+        found.update(row[0] for row in rows)
+    return found
+
+
+def _load_window_candidates(
+    db: Session,
+    user_id: int,
+    transactions: List[TransactionCreate]
+) -> Dict[Tuple, List[Tuple[datetime, Optional[str]]]]:
+    """
+    Load (amount, type) -> [(timestamp, merchant)] for stored transactions that fall
+    inside the time span covered by the batch.
+    """
+    timestamps = [_naive_utc(t.timestamp) for t in transactions if t.timestamp]
+    if not timestamps:
+        return {}
+
+    rows = db.query(
+        Transaction.amount,
+        Transaction.type,
+        Transaction.timestamp,
+        Transaction.merchant
+    ).filter(
+        Transaction.user_id == user_id,
+        Transaction.timestamp >= min(timestamps) - DEDUP_WINDOW,
+        Transaction.timestamp <= max(timestamps) + DEDUP_WINDOW
+    ).all()
+
+    candidates: Dict[Tuple, List[Tuple[datetime, Optional[str]]]] = {}
+    for amount, txn_type, timestamp, merchant in rows:
+        if amount is None or timestamp is None:
+            continue
+        candidates.setdefault((amount, txn_type), []).append((_naive_utc(timestamp), merchant))
+    return candidates
+
+
+def find_duplicates(db: Session, user_id: int, transactions: List[TransactionCreate]) -> List[bool]:
+    """
+    Flag which incoming transactions already exist for the user.
+
+    A transaction is a duplicate if its transactionId is already stored (or appeared
+    earlier in the same batch), or if a stored transaction has the same amount and type
+    within ±5 minutes (and the same merchant when the incoming one has a merchant).
+
+    Returns:
+        List of booleans aligned with the input list
+    """
+    known_ids = _existing_transaction_ids(
+        db, user_id, [t.transactionId for t in transactions if t.transactionId]
+    )
+    candidates = _load_window_candidates(db, user_id, transactions)
+
+    flags = []
+    for transaction in transactions:
+        if transaction.transactionId:
+            if transaction.transactionId in known_ids:
+                flags.append(True)
+                continue
+            # (user_id, transactionId) is unique, so later copies in the batch are dropped
+            known_ids.add(transaction.transactionId)
+
+        duplicate = False
+        if transaction.timestamp:
+            timestamp = _naive_utc(transaction.timestamp)
+            for stored_ts, stored_merchant in candidates.get((transaction.amount, transaction.type), []):
+                if abs(stored_ts - timestamp) > DEDUP_WINDOW:
+                    continue
+                if transaction.merchant and stored_merchant != transaction.merchant:
+                    continue
+                duplicate = True
+                break
+        flags.append(duplicate)
+
+    return flags
+
+
+def _store_new_transactions(
+    db: Session,
+    user: User,
+    transactions: List[TransactionCreate]
+) -> Tuple[List[Transaction], int]:
+    """Insert the non-duplicate transactions, update savings and award import XP."""
+    duplicate_flags = find_duplicates(db, user.id, transactions)
+
+    new_transactions = []
+    skipped_count = 0
+    for transaction_data, is_duplicate in zip(transactions, duplicate_flags):
+        if is_duplicate:
+            skipped_count += 1
+            logger.info(
+                f"Skipping duplicate transaction: {transaction_data.transactionId or 'No ID'} - "
+                f"Amount: {transaction_data.amount}, Type: {transaction_data.type}"
+            )
+            continue
+        new_transactions.append(Transaction(**transaction_data.model_dump()))
+
+    if not new_transactions:
+        return [], skipped_count
+
+    db.add_all(new_transactions)
+
+    # Update user savings for each new transaction
+    for transaction in new_transactions:
+        if transaction.type == "credit":
+            user.savings += transaction.amount
+        elif transaction.type == "debit":
+            user.savings -= transaction.amount
+
+    db.commit()
+
+    logger.info(f"Created {len(new_transactions)} new transactions, skipped {skipped_count} duplicates")
+
+    # Award gamification event for the import (only for new transactions)
+    try:
+        GamificationService(db).award_events(
+            user.id, [(EventType.TRANSACTION_IMPORTED, None)] * len(new_transactions)
+        )
+    except Exception as e:
+        logger.warning(f"Error awarding TRANSACTION_IMPORTED events: {str(e)}")
+
+    return new_transactions, skipped_count
+
+
+def _apply_side_effects(db: Session, new_transactions: List[Transaction], behavior_engine=None):
+    """Feed new (already categorized) transactions into the behavior model and goals."""
+    if behavior_engine is not None:
+        models = {}
+        for t in new_transactions:
+            model = behavior_engine.apply_transaction(db, t.user_id, t)
+            models[model.user_id] = model
+        # One insight bundle per model, for the version after the whole batch
+        for model in models.values():
+            behavior_engine.refresh_insights(model)
+
+    # Process transactions for active goals
+    for t in new_transactions:
+        try:
+            GoalService.apply_transaction_to_goals(db, t)
+        except Exception as e:
+            # Log error but don't fail the import
+            logger.error(f"Error processing transaction {t.id} for goals: {str(e)}")
+
+    db.commit()
+
+
+async def import_transactions(
+    db: AsyncSession,
+    user: User,
+    transactions: List[TransactionCreate],
+    behavior_engine=None
+) -> Tuple[List[Transaction], int]:
+    """
+    Deduplicate and store a batch of transactions for a user, then run the usual
+    side effects (savings, gamification, behavior model, goals) for the new rows only.
+
+    Database work runs through AsyncSession.run_sync; only categorization is awaited
+    between the two steps.
+
+    Args:
+        db: Async database session (user must belong to it)
+        user: Owner of the transactions
+        transactions: Validated transactions (must all belong to the user)
+        behavior_engine: Optional BehaviorEngine to update with each new transaction
+
+    Returns:
+        Tuple of (new Transaction rows, number of skipped duplicates)
+    """
+    new_transactions, skipped_count = await db.run_sync(_store_new_transactions, user, transactions)
+    if not new_transactions:
+        return [], skipped_count
+
+    if behavior_engine is not None:
+        for t in new_transactions:
+            await behavior_engine.categorize_transaction(t)
+
+    await db.run_sync(_apply_side_effects, new_transactions, behavior_engine)
+    return new_transactions, skipped_count
@@ -7,6 +7,7 @@ import logging
 from typing import Dict, Any
 from datetime import datetime
 from decimal import Decimal
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from app.services.job_queue import JobQueue, Worker
 from app.database import SessionLocal
@@ -131,7 +132,13 @@ class TransactionWorker:
             )
             
             db.add(transaction)
-            db.commit()
+            try:
+                db.commit()
+            except IntegrityError:
+                # Another worker stored the same transactionId in the meantime
+                db.rollback()
+                logger.info(f"Transaction {transaction_data.get('transactionId')} already exists for user {user_id}, skipping")
+                return {"status": "skipped", "reason": "duplicate"}
             db.refresh(transaction)
             
             logger.info(f"Successfully inserted transaction ID: {transaction.id} for user {user_id}")
@@ -0,0 +1,67 @@
+"""
+User Lookup Service
+Finds users by phone number for the WhatsApp integration.
+
+Lookups go through the unique index on users.phone_e164, with a short-lived
+in-process cache of phone -> user_id in front so repeated messages from the
+same sender skip the query entirely.
+"""
+import logging
+import threading
+from typing import Optional
+
+from cachetools import TTLCache
+from sqlalchemy.orm import Session
+
+from app.models.user import User
+from app.utils.phone import normalize_phone
+
+logger = logging.getLogger(__name__)
+
+PHONE_CACHE_TTL = 300  # seconds
+PHONE_CACHE_SIZE = 10000
+
+_phone_cache: TTLCache = TTLCache(maxsize=PHONE_CACHE_SIZE, ttl=PHONE_CACHE_TTL)
+_cache_lock = threading.Lock()
+
+
+def find_user_by_phone(db: Session, raw_phone: str) -> Optional[User]:
+    """
+    Find the user a phone number (any format, including "whatsapp:+91...") belongs to.
+
+    Returns:
+        User or None if no account is linked to the number
+    """
+    phone = normalize_phone(raw_phone)
+    if not phone:
+        return None
+
+    with _cache_lock:
+        user_id = _phone_cache.get(phone)
+
+    if user_id is not None:
+        user = db.get(User, user_id)
+        # The number may have moved to another account since it was cached
+        if user is not None and user.phone_e164 == phone:
+            return user
+        invalidate_phone(phone)
+
+    user = db.query(User).filter(User.phone_e164 == phone).first()
+    if user is not None:
+        with _cache_lock:
+            _phone_cache[phone] = user.id
+    return user
+
+
+def invalidate_phone(raw_phone: str):
+    """Drop a cached phone -> user mapping."""
+    phone = normalize_phone(raw_phone)
+    if phone:
+        with _cache_lock:
+            _phone_cache.pop(phone, None)
+
+
+def clear_phone_cache():
+    """Drop all cached mappings."""
+    with _cache_lock:
+        _phone_cache.clear()
@@ -0,0 +1,168 @@
+"""
+Daily XP Cap Counters
+XP awarded today per (user, event type) for DAILY_XP_CAPS, kept as a Redis
+counter so a cap check is one INCRBY instead of a SUM over today's
+gamification_events.
+
+Keys carry the UTC date and expire at the following UTC midnight, so a new
+day starts from zero without any cleanup. A counter created mid-day (first
+award of the day, or Redis was flushed) is seeded from the database once.
+While Redis is unreachable caps are checked with the SUM query, and Redis is
+retried after REDIS_RETRY_AFTER seconds.
+
+The counter is incremented before the event is committed; an award whose
+commit fails stays counted, which can only make the cap stricter.
+"""
+import logging
+import time
+from datetime import date, datetime, timedelta
+from typing import Optional, Sequence
+
+import redis
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.gamification import EventType, GamificationEvent
+from app.services.job_queue import redis_ssl_params
+from app.services.tiered_cache import REDIS_RETRY_AFTER
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "xp_cap"
+
+
+def day_start(now: datetime) -> datetime:
+    return now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def xp_awarded_today(db: Session, user_id: int, event_type: EventType, now: Optional[datetime] = None) -> int:
+    """XP of event_type awarded to the user since UTC midnight (database fallback)."""
+    today_start = day_start(now or datetime.utcnow())
+    return db.query(func.sum(GamificationEvent.xp_awarded)).filter(
+        GamificationEvent.user_id == user_id,
+        GamificationEvent.event_type == event_type,
+        GamificationEvent.created_at >= today_start
+    ).scalar() or 0
+
+
+def _fitting(start: int, amounts: Sequence[int], cap: int) -> int:
+    """Number of leading amounts awarded when today's total starts at start."""
+    total = start
+    for i, xp in enumerate(amounts):
+        if total >= cap:
+            return i
+        total += xp
+    return len(amounts)
+
+
+def cap_redis_client() -> redis.Redis:
+    """Sync Redis client with short timeouts so a slow Redis never stalls an award."""
+    redis_url = settings.redis_url
+    return redis.from_url(
+        redis_url,
+        decode_responses=True,
+        socket_connect_timeout=0.5,
+        socket_timeout=0.5,
+        **redis_ssl_params(redis_url)
+    )
+
+
+class DailyXPCounter:
+    """Per-day XP counters in Redis, with the database as fallback."""
+
+    def __init__(self, redis_client=None):
+        self.redis_client = redis_client
+        self._redis_down_until = 0.0
+
+    @staticmethod
+    def key(user_id: int, event_type: EventType, day: date) -> str:
+        return f"{KEY_PREFIX}:{user_id}:{event_type.value}:{day.isoformat()}"
+
+    def _redis_available(self) -> bool:
+        return self.redis_client is not None and time.monotonic() >= self._redis_down_until
+
+    def _redis_failed(self, error: Exception):
+        logger.warning(f"XP cap counter: Redis unavailable, checking caps in the database ({error})")
+        self._redis_down_until = time.monotonic() + REDIS_RETRY_AFTER
+
+    def try_add(
+        self,
+        db: Session,
+        user_id: int,
+        event_type: EventType,
+        xp: int,
+        cap: int,
+        now: Optional[datetime] = None
+    ) -> bool:
+        """
+        Count xp against today's cap for event_type.
+
+        Returns False (and counts nothing) if the user had already reached the
+        cap before this award; an award that starts below the cap goes through
+        in full, as with the SUM check.
+        """
+        return self.reserve(db, user_id, event_type, [xp], cap, now) == 1
+
+    def reserve(
+        self,
+        db: Session,
+        user_id: int,
+        event_type: EventType,
+        amounts: Sequence[int],
+        cap: int,
+        now: Optional[datetime] = None
+    ) -> int:
+        """
+        Count consecutive awards of event_type against today's cap.
+
+        Returns how many of amounts (in order) fit: each award goes through
+        if the running total before it is below the cap. Only those are
+        counted. Costs one INCRBY (plus a DECRBY for the rejected tail) however
+        many awards there are.
+        """
+        if not amounts:
+            return 0
+        now = now or datetime.utcnow()
+        if self._redis_available():
+            try:
+                return self._reserve_redis(db, user_id, event_type, amounts, cap, now)
+            except (redis.RedisError, OSError) as e:
+                self._redis_failed(e)
+        return _fitting(xp_awarded_today(db, user_id, event_type, now), amounts, cap)
+
+    def _reserve_redis(
+        self,
+        db: Session,
+        user_id: int,
+        event_type: EventType,
+        amounts: Sequence[int],
+        cap: int,
+        now: datetime
+    ) -> int:
+        key = self.key(user_id, event_type, now.date())
+        requested = sum(amounts)
+        total = self.redis_client.incrby(key, requested)
+        if total == requested:
+            # New counter: start from what the database already has for today
+            earlier = xp_awarded_today(db, user_id, event_type, now)
+            if earlier:
+                total = self.redis_client.incrby(key, earlier)
+            self.redis_client.expireat(key, day_start(now) + timedelta(days=1))
+
+        fitting = _fitting(total - requested, amounts, cap)
+        rejected = sum(amounts[fitting:])
+        if rejected:
+            self.redis_client.decrby(key, rejected)
+        return fitting
+
+
+_daily_xp_counter: Optional[DailyXPCounter] = None
+
+
+def get_daily_xp_counter() -> DailyXPCounter:
+    """Process-wide counter shared by all GamificationService instances."""
+    global _daily_xp_counter
+    if _daily_xp_counter is None:
+        _daily_xp_counter = DailyXPCounter(redis_client=cap_redis_client())
+    return _daily_xp_counter
@@ -0,0 +1,88 @@
+"""
+Image preprocessing for OCR uploads.
+
+Phone photos are often several megabytes. Before an image is sent to the LLM it is
+downscaled to a bounded size, converted to greyscale and re-encoded as JPEG, which also
+drops EXIF metadata (location, device). Text stays legible at this size and the payload
+is typically 10-50x smaller.
+"""
+import io
+import asyncio
+import logging
+from typing import Optional, Tuple
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+# Longest side after downscaling, in pixels
+MAX_DIMENSION = 1600
+JPEG_QUALITY = 80
+
+# Magic numbers for the formats users send us
+IMAGE_SIGNATURES = [
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"BM", "image/bmp"),
+    (b"II*\x00", "image/tiff"),
+    (b"MM\x00*", "image/tiff"),
+]
+
+
+def detect_image_type(data: bytes) -> Optional[str]:
+    """
+    Detect the real MIME type of image bytes from their signature.
+
+    Returns:
+        MIME type, or None if the format is not recognised
+    """
+    for signature, media_type in IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            return media_type
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data[4:8] == b"ftyp" and data[8:12] in (b"heic", b"heix", b"mif1", b"msf1"):
+        return "image/heic"
+    return None
+
+
+def preprocess_image(
+    data: bytes,
+    max_dimension: int = MAX_DIMENSION,
+    quality: int = JPEG_QUALITY
+) -> Tuple[bytes, str]:
+    """
+    Downscale, greyscale and re-encode an image as JPEG without metadata.
+
+    Images Pillow cannot decode are returned unchanged with their detected MIME type.
+
+    Returns:
+        Tuple of (image bytes, media type)
+    """
+    detected_type = detect_image_type(data) or "image/png"
+
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            # Let the JPEG decoder scale down while decoding instead of after
+            img.draft("L", (max_dimension, max_dimension))
+            # Apply the camera orientation before the EXIF tag is dropped
+            img = ImageOps.exif_transpose(img)
+            img = img.convert("L")
+            img.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+
+            output = io.BytesIO()
+            img.save(output, format="JPEG", quality=quality, optimize=True)
+    except (UnidentifiedImageError, OSError, ValueError) as e:
+        logger.warning(f"Could not preprocess {detected_type} image, sending original: {e}")
+        return data, detected_type
+
+    processed = output.getvalue()
+    logger.info(f"Preprocessed {detected_type} image: {len(data)} -> {len(processed)} bytes")
+    return processed, "image/jpeg"
+
+
+async def preprocess_image_async(data: bytes) -> Tuple[bytes, str]:
+    """Run preprocess_image in a worker thread so the event loop is not blocked."""
+    return await asyncio.to_thread(preprocess_image, data)
@@ -1,48 +1,72 @@
 from pydantic_ai import Agent
-from pydantic_ai.models.google import GoogleModel
-from pydantic_ai.providers.google import GoogleProvider
 from pydantic_ai.messages import BinaryContent
 from app.schemas.transaction_schemas import TransactionCreate
-from app.core.config import settings
-from typing import List
+from app.core.llm import get_agent
+from app.utils.image_preprocessing import preprocess_image_async
+from typing import Optional
+
+
+IMAGE_SYSTEM_PROMPT = (
+    "You are a financial transaction OCR expert. Extract transaction details from the image. "
+    "Fill in as many fields as possible from the visible data. Do NOT hallucinate. "
+    "\n\nFields to extract:"
+    "\n- amount (required): Transaction amount as a number"
+    "\n- merchant (required): Merchant or payee name"
+    "\n- timestamp (required): Transaction date and time"
+    "\n- type (required): Either 'debit' or 'credit'"
+    "\n- category: Spending category if visible"
+    "\n- upiId: UPI ID if present"
+    "\n- transactionId: Transaction or reference ID"
+    "\n- balance: Account balance after transaction"
+    "\n- bankName: Bank name if shown"
+    "\n- accountNumber: Account number if visible"
+    "\n- rawMessage: Raw transaction message/description"
+    "\n- user_id: Set to 1 (default)"
+    "\n\nOnly include fields that are clearly visible. Leave others as None."
+)
+
+TEXT_SYSTEM_PROMPT = (
+    "You are a financial transaction extraction expert. Extract transaction details from SMS/text messages. "
+    "Fill in as many fields as possible from the provided text. Do NOT hallucinate. "
+    "\n\nFields to extract:"
+    "\n- amount (required): Transaction amount as a number"
+    "\n- merchant (required): Merchant or payee name"
+    "\n- timestamp (required): Transaction date and time"
+    "\n- type (required): Either 'debit' or 'credit'"
+    "\n- category: Spending category if determinable"
+    "\n- upiId: UPI ID if present"
+    "\n- transactionId: Transaction or reference ID"
+    "\n- balance: Account balance after transaction"
+    "\n- bankName: Bank name if mentioned"
+    "\n- accountNumber: Account number if visible"
+    "\n- rawMessage: Store the original message text"
+    "\n- user_id: Set to 1 (default)"
+    "\n\nOnly include fields that are clearly present in the text. Leave others as None."
+)
 
 
 class OCRAgent:
-    def __init__(self):
-        self.provider = GoogleProvider(api_key=settings.gemini_api_key)
-        self.model = GoogleModel("gemini-2.5-flash", provider=self.provider)
+    """Gemini-backed transaction extraction. Agents are shared process-wide (see app.core.llm)."""
+
+    @property
+    def image_agent(self) -> Agent:
+        return get_agent("ocr_image", TransactionCreate, IMAGE_SYSTEM_PROMPT)
+
+    @property
+    def text_agent(self) -> Agent:
+        return get_agent("ocr_text", TransactionCreate, TEXT_SYSTEM_PROMPT)
 
     async def extract_transaction(self, image: bytes) -> TransactionCreate:
         """Extract transaction details from an image using OCR and AI."""
-        
-        agent = Agent(
-            model=self.model,
-            output_type=TransactionCreate,
-            system_prompt=(
-                "You are a financial transaction OCR expert. Extract transaction details from the image. "
-                "Fill in as many fields as possible from the visible data. Do NOT hallucinate. "
-                "\n\nFields to extract:"
-                "\n- amount (required): Transaction amount as a number"
-                "\n- merchant (required): Merchant or payee name"
-                "\n- timestamp (required): Transaction date and time"
-                "\n- type (required): Either 'debit' or 'credit'"
-                "\n- category: Spending category if visible"
-                "\n- upiId: UPI ID if present"
-                "\n- transactionId: Transaction or reference ID"
-                "\n- balance: Account balance after transaction"
-                "\n- bankName: Bank name if shown"
-                "\n- accountNumber: Account number if visible"
-                "\n- rawMessage: Raw transaction message/description"
-                "\n- user_id: Set to 1 (default)"
-                "\n\nOnly include fields that are clearly visible. Leave others as None."
-            )
-        )
+
+        # Shrink the upload and detect its real type before sending it to Gemini
+        image, media_type = await preprocess_image_async(image)
 
         # Create BinaryContent for the image
-        binary_image = BinaryContent(data=image, media_type='image/png')
+        binary_image = BinaryContent(data=image, media_type=media_type)
 
         # Run OCR and extraction
-        response = await agent.run(
+        response = await self.image_agent.run(
             [
                 "Extract the transaction details from this image. Fill in all visible fields.",
                 binary_image
@@ -56,32 +80,9 @@ class OCRAgent:
 
     async def extract_transaction_from_text(self, text: str) -> TransactionCreate:
         """Extract transaction details from text message using AI."""
-        
-        agent = Agent(
-            model=self.model,
-            output_type=TransactionCreate,
-            system_prompt=(
-                "You are a financial transaction extraction expert. Extract transaction details from SMS/text messages. "
-                "Fill in as many fields as possible from the provided text. Do NOT hallucinate. "
-                "\n\nFields to extract:"
-                "\n- amount (required): Transaction amount as a number"
-                "\n- merchant (required): Merchant or payee name"
-                "\n- timestamp (required): Transaction date and time"
-                "\n- type (required): Either 'debit' or 'credit'"
-                "\n- category: Spending category if determinable"
-                "\n- upiId: UPI ID if present"
-                "\n- transactionId: Transaction or reference ID"
-                "\n- balance: Account balance after transaction"
-                "\n- bankName: Bank name if mentioned"
-                "\n- accountNumber: Account number if visible"
-                "\n- rawMessage: Store the original message text"
-                "\n- user_id: Set to 1 (default)"
-                "\n\nOnly include fields that are clearly present in the text. Leave others as None."
-            )
-        )
 
         # Run extraction
-        response = await agent.run(
+        response = await self.text_agent.run(
             f"Extract the transaction details from this message: {text}"
         )
 
@@ -89,4 +90,14 @@ class OCRAgent:
         print(f"Extracted transaction from text: {transaction}")
 
         return transaction
- 
+
+
+_ocr_agent: Optional[OCRAgent] = None
+
+
+def get_ocr_agent() -> OCRAgent:
+    """Return the process-wide OCRAgent."""
+    global _ocr_agent
+    if _ocr_agent is None:
+        _ocr_agent = OCRAgent()
+    return _ocr_agent
@@ -1,34 +1,56 @@
 import pymupdf
-from typing import Union
+from typing import Iterator, Optional, Union
+
+
+def iter_pdf_pages(
+    pdf_content: bytes,
+    option: str = "text",
+    start: int = 0,
+    stop: Optional[int] = None
+) -> Iterator[Union[str, list]]:
+    """
+    Yield the content of each page one at a time so large PDFs are never held
+    in memory as a single string.
+
+    Args:
+        pdf_content: PDF file content as bytes
+        option: PyMuPDF get_text option ("text", "words", ...)
+        start: First page index (inclusive)
+        stop: Last page index (exclusive), defaults to the end of the document
+
+    Yields:
+        Page content in the requested format
+    """
+    pdf_document = pymupdf.open(stream=pdf_content, filetype="pdf")
+    try:
+        stop = len(pdf_document) if stop is None else min(stop, len(pdf_document))
+        for page_num in range(start, stop):
+            yield pdf_document[page_num].get_text(option)
+    finally:
+        pdf_document.close()
+
+
+def get_pdf_page_count(pdf_content: bytes) -> int:
+    """Return the number of pages in a PDF."""
+    with pymupdf.open(stream=pdf_content, filetype="pdf") as pdf_document:
+        return len(pdf_document)
 
 
 def extract_text_from_pdf(pdf_content: bytes) -> str:
     """
     Extract text from PDF file using PyMuPDF.
-    
+
     Args:
         pdf_content: PDF file content as bytes
-        
+
     Returns:
         Extracted text from all pages of the PDF
-        
+
     Raises:
         Exception: If PDF parsing fails
     """
     try:
-        # Open PDF from bytes
-        pdf_document = pymupdf.open(stream=pdf_content, filetype="pdf")
-        
-        # Extract text from all pages
-        extracted_text = ""
-        for page_num in range(len(pdf_document)):
-            page = pdf_document[page_num]
-            extracted_text += page.get_text()
-        
-        # Close the document
-        pdf_document.close()
-        
-        return extracted_text.strip()
-        
+        return "".join(iter_pdf_pages(pdf_content)).strip()
+
     except Exception as e:
         raise Exception(f"Failed to extract text from PDF: {str(e)}")
@@ -0,0 +1,65 @@
+"""
+Phone number normalisation.
+
+Users register with whatever format they type ("98765 43210", "+91-98765-43210",
+"09876543210") while Twilio sends "whatsapp:+919876543210". Both are normalised
+to E.164 so a user can be found with a single indexed lookup.
+"""
+import re
+from typing import Optional
+
+from app.core.config import settings
+
+NON_DIGITS = re.compile(r"\D")
+
+# E.164 allows at most 15 digits; shorter than 8 is never a full number
+MIN_E164_DIGITS = 8
+MAX_E164_DIGITS = 15
+NATIONAL_NUMBER_LENGTH = 10
+
+
+def _strip_whatsapp(raw: str) -> str:
+    value = raw.strip()
+    if value.lower().startswith("whatsapp:"):
+        value = value[len("whatsapp:"):].strip()
+    return value
+
+
+def has_country_code(raw: Optional[str]) -> bool:
+    """Whether a number is written with an international prefix ("+" or "00")."""
+    if not raw:
+        return False
+    value = _strip_whatsapp(raw)
+    return value.startswith("+") or value.startswith("00")
+
+
+def normalize_phone(raw: Optional[str], default_country_code: Optional[str] = None) -> Optional[str]:
+    """
+    Normalise a phone number to E.164 (e.g. "+919876543210").
+
+    Numbers without an international prefix are assumed to belong to
+    default_country_code (settings.default_phone_country_code by default).
+
+    Returns:
+        E.164 string, or None if the input cannot be a valid number
+    """
+    if not raw:
+        return None
+
+    country_code = default_country_code or settings.default_phone_country_code
+    value = _strip_whatsapp(raw)
+    international = has_country_code(value)
+    digits = NON_DIGITS.sub("", value)
+    if value.startswith("00"):
+        digits = digits[2:]
+
+    if not international:
+        if len(digits) == NATIONAL_NUMBER_LENGTH + 1 and digits.startswith("0"):
+            # Trunk prefix, e.g. 09876543210
+            digits = digits[1:]
+        if len(digits) == NATIONAL_NUMBER_LENGTH:
+            digits = country_code + digits
+
+    if not MIN_E164_DIGITS <= len(digits) <= MAX_E164_DIGITS:
+        return None
+    return f"+{digits}"
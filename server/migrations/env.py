@@ -6,7 +6,7 @@ from app.database import Base, engine as app_engine
 from app.core.config import settings
 
 # import all models here to register
-from app.models import user, transactions, behaviour
+from app.models import user, transactions, behaviour, goal, gamification, cash_flow_rollup, health_score_snapshot, simulation_insight
 
 config = context.config
 config.set_main_option("sqlalchemy.url", settings.database_url)
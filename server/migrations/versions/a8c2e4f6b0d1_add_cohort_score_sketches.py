@@ -0,0 +1,44 @@
+"""add cohort_score_sketches
+
+Revision ID: a8c2e4f6b0d1
+Revises: f5b7d9e1a3c6
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8c2e4f6b0d1'
+down_revision: Union[str, Sequence[str], None] = 'f5b7d9e1a3c6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'cohort_score_sketches',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('segment', sa.String(length=64), nullable=False),
+        sa.Column('snapshot_date', sa.Date(), nullable=False),
+        sa.Column('user_count', sa.Integer(), nullable=False),
+        sa.Column('sketch', sa.LargeBinary(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_cohort_score_sketches_id'), 'cohort_score_sketches', ['id'], unique=False)
+    op.create_index(
+        'uq_cohort_score_sketches_segment_date', 'cohort_score_sketches',
+        ['segment', 'snapshot_date'], unique=True
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_cohort_score_sketches_segment_date', table_name='cohort_score_sketches')
+    op.drop_index(op.f('ix_cohort_score_sketches_id'), table_name='cohort_score_sketches')
+    op.drop_table('cohort_score_sketches')
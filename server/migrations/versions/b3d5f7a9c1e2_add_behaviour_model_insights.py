@@ -0,0 +1,35 @@
+"""add behaviour_models version and precomputed insights
+
+Revision ID: b3d5f7a9c1e2
+Revises: a8c2e4f6b0d1
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3d5f7a9c1e2'
+down_revision: Union[str, Sequence[str], None] = 'a8c2e4f6b0d1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('behaviour_models', sa.Column('version', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('behaviour_models', sa.Column('insights', sa.Text(), nullable=True))
+    op.add_column('behaviour_models', sa.Column('insights_etag', sa.String(), nullable=True))
+    op.add_column('behaviour_models', sa.Column('insights_version', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('behaviour_models') as batch_op:
+        batch_op.drop_column('insights_version')
+        batch_op.drop_column('insights_etag')
+        batch_op.drop_column('insights')
+        batch_op.drop_column('version')
@@ -0,0 +1,60 @@
+"""add normalised phone_e164 to users
+
+Revision ID: b7c1d9e2f3a4
+Revises: 96e5fb2b7f19
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils.phone import has_country_code, normalize_phone
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7c1d9e2f3a4'
+down_revision: Union[str, Sequence[str], None] = '96e5fb2b7f19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('phone_e164', sa.String(), nullable=True))
+
+    # Backfill from phone_number. Only numbers written with a country code
+    # are filled in: a bare national number could belong to any country, and
+    # guessing would link it to the wrong WhatsApp sender. Those, and all but
+    # the oldest of several accounts sharing a number, stay NULL and are
+    # listed for fixing by hand (update_user_phone.py).
+    connection = op.get_bind()
+    users = sa.table(
+        'users',
+        sa.column('id', sa.Integer),
+        sa.column('phone_number', sa.String),
+        sa.column('phone_e164', sa.String),
+    )
+    seen = set()
+    rows = connection.execute(sa.select(users.c.id, users.c.phone_number).order_by(users.c.id)).fetchall()
+    for user_id, phone_number in rows:
+        if phone_number and not has_country_code(phone_number):
+            print(f"phone_e164 backfill: user {user_id} has no country code in {phone_number!r}, left empty")
+            continue
+        phone = normalize_phone(phone_number)
+        if not phone:
+            continue
+        if phone in seen:
+            print(f"phone_e164 backfill: user {user_id} shares {phone} with an older account, left empty")
+            continue
+        seen.add(phone)
+        connection.execute(users.update().where(users.c.id == user_id).values(phone_e164=phone))
+
+    op.create_index(op.f('ix_users_phone_e164'), 'users', ['phone_e164'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_users_phone_e164'), table_name='users')
+    op.drop_column('users', 'phone_e164')
@@ -0,0 +1,64 @@
+"""add composite indexes for per-user transaction scans
+
+Revision ID: c4e8a2f1b6d3
+Revises: b7c1d9e2f3a4
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e8a2f1b6d3'
+down_revision: Union[str, Sequence[str], None] = 'b7c1d9e2f3a4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ('ix_transactions_user_id_timestamp', ['user_id', sa.text('"timestamp" DESC')], False),
+    ('ix_transactions_user_id_type_timestamp', ['user_id', 'type', 'timestamp'], False),
+    ('uq_transactions_user_id_transaction_id', ['user_id', 'transactionId'], True),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The unique index needs (user_id, transactionId) to be unique first. The
+    # oldest row keeps the reference; later copies lose it (the rows are kept).
+    connection = op.get_bind()
+    transactions = sa.table(
+        'transactions',
+        sa.column('id', sa.Integer),
+        sa.column('user_id', sa.Integer),
+        sa.column('transactionId', sa.String),
+    )
+    keep_ids = sa.select(sa.func.min(transactions.c.id)).where(
+        transactions.c.transactionId.isnot(None)
+    ).group_by(transactions.c.user_id, transactions.c.transactionId)
+    result = connection.execute(
+        transactions.update().where(
+            transactions.c.transactionId.isnot(None),
+            transactions.c.id.notin_(keep_ids)
+        ).values(transactionId=None)
+    )
+    if result.rowcount:
+        print(f"transactions: cleared transactionId on {result.rowcount} duplicate rows")
+
+    if connection.dialect.name == 'postgresql':
+        # Build without blocking writes on a large table
+        with op.get_context().autocommit_block():
+            for name, columns, unique in INDEXES:
+                op.create_index(name, 'transactions', columns, unique=unique, postgresql_concurrently=True)
+    else:
+        for name, columns, unique in INDEXES:
+            op.create_index(name, 'transactions', columns, unique=unique)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name='transactions')
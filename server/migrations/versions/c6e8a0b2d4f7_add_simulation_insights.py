@@ -0,0 +1,44 @@
+"""add simulation_insights
+
+Revision ID: c6e8a0b2d4f7
+Revises: b3d5f7a9c1e2
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6e8a0b2d4f7'
+down_revision: Union[str, Sequence[str], None] = 'b3d5f7a9c1e2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'simulation_insights',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('scenario_type', sa.String(length=16), nullable=False),
+        sa.Column('results', sa.JSON(), nullable=False),
+        sa.Column('generated_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_simulation_insights_id'), 'simulation_insights', ['id'], unique=False)
+    op.create_index(
+        'uq_simulation_insights_user_scenario_type', 'simulation_insights',
+        ['user_id', 'scenario_type'], unique=True
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_simulation_insights_user_scenario_type', table_name='simulation_insights')
+    op.drop_index(op.f('ix_simulation_insights_id'), table_name='simulation_insights')
+    op.drop_table('simulation_insights')
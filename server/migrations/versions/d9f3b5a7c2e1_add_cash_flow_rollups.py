@@ -0,0 +1,56 @@
+"""add cash_flow_rollups
+
+Revision ID: d9f3b5a7c2e1
+Revises: c4e8a2f1b6d3
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.services.cash_flow_rollups import rebuild_rollups
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9f3b5a7c2e1'
+down_revision: Union[str, Sequence[str], None] = 'c4e8a2f1b6d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'cash_flow_rollups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('granularity', sa.String(length=8), nullable=False),
+        sa.Column('period_start', sa.Date(), nullable=False),
+        sa.Column('income', sa.Numeric(precision=16, scale=2), nullable=False),
+        sa.Column('expenses', sa.Numeric(precision=16, scale=2), nullable=False),
+        sa.Column('income_count', sa.Integer(), nullable=False),
+        sa.Column('expense_count', sa.Integer(), nullable=False),
+        sa.Column('income_sources', sa.Integer(), nullable=False),
+        sa.Column('first_transaction_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_cash_flow_rollups_id'), 'cash_flow_rollups', ['id'], unique=False)
+    op.create_index(
+        'uq_cash_flow_rollups_user_period', 'cash_flow_rollups',
+        ['user_id', 'granularity', 'period_start'], unique=True
+    )
+
+    # Backfill from existing transactions
+    written = rebuild_rollups(op.get_bind())
+    print(f"cash_flow_rollups: wrote {written} rows")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_cash_flow_rollups_user_period', table_name='cash_flow_rollups')
+    op.drop_index(op.f('ix_cash_flow_rollups_id'), table_name='cash_flow_rollups')
+    op.drop_table('cash_flow_rollups')
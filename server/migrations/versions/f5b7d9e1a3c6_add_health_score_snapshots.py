@@ -0,0 +1,50 @@
+"""add health_score_snapshots
+
+Revision ID: f5b7d9e1a3c6
+Revises: e2a6c8d4f1b9
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5b7d9e1a3c6'
+down_revision: Union[str, Sequence[str], None] = 'e2a6c8d4f1b9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'health_score_snapshots',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('snapshot_date', sa.Date(), nullable=False),
+        sa.Column('overall_score', sa.Float(), nullable=False),
+        sa.Column('income_stability', sa.Float(), nullable=False),
+        sa.Column('spending_discipline', sa.Float(), nullable=False),
+        sa.Column('emergency_fund', sa.Float(), nullable=False),
+        sa.Column('savings_rate', sa.Float(), nullable=False),
+        sa.Column('debt_health', sa.Float(), nullable=False),
+        sa.Column('diversification', sa.Float(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_health_score_snapshots_id'), 'health_score_snapshots', ['id'], unique=False)
+    op.create_index(
+        'uq_health_score_snapshots_user_date', 'health_score_snapshots',
+        ['user_id', 'snapshot_date'], unique=True
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_health_score_snapshots_user_date', table_name='health_score_snapshots')
+    op.drop_index(op.f('ix_health_score_snapshots_id'), table_name='health_score_snapshots')
+    op.drop_table('health_score_snapshots')
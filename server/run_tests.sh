@@ -14,7 +14,7 @@ NC='\033[0m' # No Color
 # Check if pytest is installed
 if ! command -v pytest &> /dev/null; then
     echo -e "${YELLOW}pytest not found. Installing dependencies...${NC}"
-    pip install -r requirements.txt
+    pip install -r requirements-test.txt
 fi
 
 # Run tests based on argument
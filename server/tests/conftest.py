@@ -7,7 +7,9 @@ import os
 import sys
 import pytest
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from fastapi.testclient import TestClient
 
 # Add the server directory to sys.path so 'app' module can be imported
@@ -16,8 +18,12 @@ if SERVER_ROOT not in sys.path:
     sys.path.insert(0, SERVER_ROOT)
 
 from app.main import app
-from app.database import Base, get_db
+from app.database import Base, get_db, get_async_db
 from app.oauth2 import get_password_hash
+from app.services.achievement_cache import clear_achievement_catalogue
+from app.services.health_score_cache import HealthScoreCache, get_health_score_cache
+from app.services.simulations.baseline import clear_baseline_cache
+from app.services import xp_caps
 
 
 # Use SQLite in-memory database for testing
@@ -29,11 +35,21 @@ engine = create_engine(
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async routes use the same file through aiosqlite; NullPool so no connection
+# outlives the event loop of the TestClient that opened it
+async_engine = create_async_engine("sqlite+aiosqlite:///./test.db", poolclass=NullPool)
+AsyncTestingSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
 
 @pytest.fixture(scope="function")
 def db_session():
     """Create a fresh database for each test"""
     Base.metadata.create_all(bind=engine)
+    # Ids and data versions restart with the database
+    clear_baseline_cache()
+    clear_achievement_catalogue()
     db = TestingSessionLocal()
     try:
         yield db
@@ -42,6 +58,14 @@ def db_session():
         Base.metadata.drop_all(bind=engine)
 
 
+@pytest.fixture(autouse=True)
+def daily_xp_counter(monkeypatch):
+    """Daily XP caps checked in the database only (no Redis in tests)"""
+    counter = xp_caps.DailyXPCounter()
+    monkeypatch.setattr(xp_caps, "_daily_xp_counter", counter)
+    return counter
+
+
 @pytest.fixture(scope="function")
 def client(db_session):
     """Create a test client with database override"""
@@ -51,7 +75,18 @@ def client(db_session):
         finally:
             pass
     
+    async def override_get_async_db():
+        async with AsyncTestingSessionLocal() as session:
+            yield session
+        # Async routes write through their own connection; make the test's
+        # session reload anything it already holds
+        db_session.expire_all()
+    
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    # In-process cache only, fresh per test (ids and data versions repeat across tests)
+    health_score_cache = HealthScoreCache()
+    app.dependency_overrides[get_health_score_cache] = lambda: health_score_cache
     with TestClient(app) as test_client:
         yield test_client
     app.dependency_overrides.clear()
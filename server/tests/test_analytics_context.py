@@ -0,0 +1,99 @@
+"""
+Tests for the request-scoped UserAnalyticsContext used by the simulation routes.
+"""
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from fastapi import status
+from sqlalchemy import event
+
+from app.models.behaviour import BehaviourModel
+from app.models.transactions import Transaction
+from app.services.analytics_context import UserAnalyticsContext
+from app.services.simulations import simulate_spending_scenario
+
+INCOME_STATS = {"transaction_count": 4, "mean": 3000.0, "std_dev": 1800.0, "volatility_coefficient": 0.6}
+
+
+@pytest.fixture
+def behaviour_model(db_session, test_user):
+    db_session.add(BehaviourModel(
+        user_id=test_user.id, transaction_count=40, impulse_score=0.4,
+        category_stats={"DINING": {"mean": 420.0, "variance": 900.0, "std_dev": 30.0, "count": 18},
+                        "GROCERIES": {"mean": 610.0, "variance": 2500.0, "std_dev": 50.0, "count": 25}},
+        elasticity={"DINING": 0.7, "GROCERIES": 0.2},
+        monthly_patterns={"income_stats": INCOME_STATS}
+    ))
+    for i in range(4):
+        db_session.add(Transaction(user_id=test_user.id, amount=Decimal("250"), type="debit",
+                                   timestamp=datetime.utcnow() - timedelta(days=i)))
+    db_session.commit()
+
+
+@pytest.fixture
+def model_queries(db_session):
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        if "FROM behaviour_models" in statement:
+            statements.append(statement)
+
+    engine = db_session.get_bind()
+    event.listen(engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(engine, "before_cursor_execute", record)
+
+
+class TestUserAnalyticsContext:
+
+    def test_income_stats_from_model(self, db_session, test_user, behaviour_model):
+        context = UserAnalyticsContext.load(db_session, test_user)
+
+        assert context.model.user_id == test_user.id
+        assert context.income_stats == INCOME_STATS
+        assert context.data_version == test_user.data_version
+
+    def test_without_model(self, db_session, test_user):
+        context = UserAnalyticsContext.load(db_session, test_user)
+
+        assert context.model is None and context.income_stats is None
+        with pytest.raises(ValueError, match="No behavior model"):
+            simulate_spending_scenario(db_session, test_user.id, "reduction", 10, context=context)
+
+
+class TestRoutesLoadModelOnce:
+
+    @pytest.mark.parametrize("suffix, payload", [
+        ("enhanced", {"target_percent": 15}),
+        ("compare/enhanced", {"num_scenarios": 3}),
+        ("batch", {"scenarios": [{"target_percent": 10}, {"target_percent": 20}]}),
+    ])
+    def test_single_model_query(self, client, auth_headers, test_user, behaviour_model, model_queries,
+                                suffix, payload):
+        response = client.post(f"/api/users/{test_user.id}/simulate/{suffix}", headers=auth_headers, json=payload)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(model_queries) == 1
+
+    def test_enhanced_uses_income_stats(self, client, auth_headers, test_user, behaviour_model):
+        response = client.post(f"/api/users/{test_user.id}/simulate/enhanced", headers=auth_headers,
+                               json={"target_percent": 15})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert "income_risk" in [warning["type"] for warning in response.json()["warnings"]]
+
+    def test_behavior_summary(self, client, auth_headers, test_user, behaviour_model):
+        response = client.get(f"/api/users/{test_user.id}/insights/behavior-summary", headers=auth_headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["behavior_summary"]["income_health"] is not None
+
+    def test_access_and_missing_model(self, client, auth_headers, test_user, second_user):
+        other = client.post(f"/api/users/{second_user.id}/simulate", headers=auth_headers,
+                            json={"target_percent": 10})
+        assert other.status_code == status.HTTP_403_FORBIDDEN
+
+        missing = client.get(f"/api/users/{test_user.id}/behavior", headers=auth_headers)
+        assert missing.status_code == status.HTTP_404_NOT_FOUND
+        assert missing.json()["detail"] == f"No behavior model found for user {test_user.id}"
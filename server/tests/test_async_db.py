@@ -0,0 +1,56 @@
+"""
+Tests for the async database session used by the hot routers
+"""
+import asyncio
+
+import httpx
+import pytest
+from fastapi import status
+
+from app.database import get_async_database_url
+from app.main import app
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("postgres://u:p@host:5432/db", "postgresql+asyncpg://u:p@host:5432/db"),
+    ("postgresql://u:p@host/db?sslmode=require", "postgresql+asyncpg://u:p@host/db?ssl=require"),
+    ("postgresql+psycopg2://u:p@host/db", "postgresql+asyncpg://u:p@host/db"),
+    ("sqlite:///./app.db", "sqlite+aiosqlite:///./app.db"),
+    ("postgresql+asyncpg://u:p@host/db", "postgresql+asyncpg://u:p@host/db"),
+])
+def test_async_database_url(url, expected):
+    assert get_async_database_url(url) == expected
+
+
+def test_concurrent_async_requests(client, auth_headers, test_user):
+    """Parallel requests on the async routes each get their own session."""
+    created = client.post(
+        "/transactions/",
+        json={
+            "user_id": test_user.id,
+            "amount": 120.00,
+            "merchant": "Grocer",
+            "type": "debit",
+            "category": "Groceries",
+            "timestamp": "2024-01-15T10:00:00"
+        },
+        headers=auth_headers
+    )
+    assert created.status_code == status.HTTP_201_CREATED
+
+    async def fetch_all():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as ac:
+            return await asyncio.gather(
+                ac.get("/transactions/", headers=auth_headers),
+                ac.get("/goals/", headers=auth_headers),
+                ac.get(f"/transactions/{created.json()['id']}", headers=auth_headers),
+                ac.get("/transactions/", headers=auth_headers),
+            )
+
+    responses = asyncio.run(fetch_all())
+
+    assert [r.status_code for r in responses] == [200, 200, 200, 200]
+    assert len(responses[0].json()) == 1
+    assert responses[1].json() == []
+    assert responses[2].json()["merchant"] == "Grocer"
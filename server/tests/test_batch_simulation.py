@@ -0,0 +1,173 @@
+"""
+Tests for batch scenario simulation: the /simulate/batch endpoint and the
+bulk all-users run.
+"""
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from fastapi import status
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from app.models.behaviour import BehaviourModel
+from app.models.simulation_insight import SimulationInsight
+from app.models.transactions import Transaction
+from app.services.simulations import run_bulk_simulation, simulate_batch, simulate_spending_scenario
+
+CATEGORY_STATS = {
+    "DINING": {"mean": 420.0, "variance": 900.0, "count": 18},
+    "GROCERIES": {"mean": 610.5, "variance": 2500.0, "count": 25},
+    "ENTERTAINMENT": {"mean": 150.0, "variance": 400.0, "count": 6},
+}
+SCENARIOS = [
+    (5.0, None),
+    (20.0, ["DINING"]),
+    (35.0, ["DINING", "ENTERTAINMENT"]),
+    (80.0, None),
+]
+
+
+def add_model(db_session, user, debit="300.00", stats=CATEGORY_STATS):
+    db_session.add(BehaviourModel(user_id=user.id, category_stats=stats, elasticity={"DINING": 0.7},
+                                  impulse_score=0.4, monthly_patterns={}))
+    now = datetime.utcnow()
+    for i in range(5):
+        db_session.add(Transaction(user_id=user.id, amount=Decimal(debit), type="debit",
+                                   category="DINING", timestamp=now - timedelta(days=i * 3)))
+    db_session.commit()
+
+
+@pytest.fixture
+def session_factory(db_session):
+    return sessionmaker(autocommit=False, autoflush=False, bind=db_session.get_bind())
+
+
+class TestSimulateBatch:
+
+    def test_matches_single_scenario_simulations(self, db_session, test_user):
+        add_model(db_session, test_user)
+
+        results = simulate_batch(
+            db_session, test_user.id, "reduction",
+            [percent for percent, _ in SCENARIOS], [categories for _, categories in SCENARIOS]
+        )
+
+        assert len(results) == len(SCENARIOS)
+        for result, (percent, categories) in zip(results, SCENARIOS):
+            assert result == simulate_spending_scenario(db_session, test_user.id, "reduction", percent,
+                                                        target_categories=categories)
+
+    def test_loads_model_and_baseline_once(self, db_session, test_user):
+        add_model(db_session, test_user)
+        user_id = test_user.id
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        engine = db_session.get_bind()
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            simulate_batch(db_session, user_id, "increase", [float(p) for p in range(1, 51)])
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+
+        assert len(statements) == 2
+
+    def test_endpoint_returns_results_in_order(self, client, auth_headers, db_session, test_user):
+        add_model(db_session, test_user)
+        payload = {
+            "scenario_type": "reduction",
+            "scenarios": [
+                {"target_percent": percent, "target_categories": categories}
+                for percent, categories in SCENARIOS
+            ],
+        }
+
+        response = client.post(f"/api/users/{test_user.id}/simulate/batch", json=payload, headers=auth_headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        body = response.json()
+        assert float(body["baseline_monthly"]) == 1500.0
+        assert [r["target_percent"] for r in body["results"]] == [p for p, _ in SCENARIOS]
+        single = client.post(f"/api/users/{test_user.id}/simulate", headers=auth_headers,
+                             json={"target_percent": 20.0, "target_categories": ["DINING"]})
+        assert body["results"][1] == single.json()
+
+    def test_endpoint_errors(self, client, auth_headers, db_session, test_user, second_user):
+        url = f"/api/users/{test_user.id}/simulate/batch"
+        scenarios = {"scenarios": [{"target_percent": 10}]}
+
+        assert client.post(url, json=scenarios, headers=auth_headers).status_code == status.HTTP_404_NOT_FOUND
+        assert client.post(url, json={"scenarios": []}, headers=auth_headers).status_code == \
+            status.HTTP_422_UNPROCESSABLE_ENTITY
+        other = client.post(f"/api/users/{second_user.id}/simulate/batch", json=scenarios, headers=auth_headers)
+        assert other.status_code == status.HTTP_403_FORBIDDEN
+
+        add_model(db_session, test_user)
+        unknown = {"scenarios": [{"target_percent": 10, "target_categories": ["TRAVEL"]}]}
+        assert client.post(url, json=unknown, headers=auth_headers).status_code == status.HTTP_404_NOT_FOUND
+
+
+def stored_insights(db_session, scenario_type="reduction"):
+    db_session.expire_all()
+    return {
+        insight.user_id: insight.results
+        for insight in db_session.query(SimulationInsight).filter_by(scenario_type=scenario_type)
+    }
+
+
+def dumps(responses):
+    return [response.model_dump(mode="json") if response else None for response in responses]
+
+
+class TestBulkSimulation:
+
+    def test_stores_results_for_every_user_with_a_model(self, db_session, session_factory, test_user, second_user):
+        from app.models.user import User
+        third_user = User(name="Third", email="third@example.com", phone_number="555", hashed_password="x")
+        db_session.add(third_user)
+        db_session.commit()
+        add_model(db_session, test_user)
+        add_model(db_session, second_user, debit="90.00", stats={"DINING": CATEGORY_STATS["DINING"]})
+        # Model but no debits in the period: skipped like the single-user endpoint
+        db_session.add(BehaviourModel(user_id=third_user.id, category_stats=CATEGORY_STATS, monthly_patterns={}))
+        db_session.commit()
+        percents = [10.0, 25.0]
+
+        stats = run_bulk_simulation("reduction", percents, chunk_size=1, session_factory=session_factory)
+
+        assert stats["users"] == 3 and stats["insights"] == 2 and stats["chunks"] == 3
+        insights = stored_insights(db_session)
+        assert set(insights) == {test_user.id, second_user.id}
+        for user in (test_user, second_user):
+            assert insights[user.id] == dumps(simulate_batch(db_session, user.id, "reduction", percents))
+
+    def test_unmatched_scenario_only_skips_itself(self, db_session, session_factory, test_user, second_user):
+        add_model(db_session, test_user)
+        add_model(db_session, second_user, stats={"DINING": CATEGORY_STATS["DINING"]})
+
+        stats = run_bulk_simulation("reduction", [15.0, 20.0], [["GROCERIES"], ["DINING"]],
+                                    session_factory=session_factory)
+
+        assert stats["insights"] == 2
+        insights = stored_insights(db_session)
+        assert list(insights[test_user.id][0]["category_breakdown"]) == ["GROCERIES"]
+        assert insights[second_user.id][0] is None
+        assert insights[second_user.id][1] == dumps(
+            simulate_batch(db_session, second_user.id, "reduction", [20.0], [["DINING"]])
+        )[0]
+
+    def test_rerun_replaces_previous_results(self, db_session, session_factory, test_user, second_user):
+        add_model(db_session, test_user)
+        add_model(db_session, second_user, stats={"DINING": CATEGORY_STATS["DINING"]})
+        run_bulk_simulation("reduction", [10.0], session_factory=session_factory)
+
+        # No scenario applies to second_user any more
+        run_bulk_simulation("reduction", [30.0], [["GROCERIES"]], session_factory=session_factory)
+
+        insights = stored_insights(db_session)
+        assert set(insights) == {test_user.id}
+        assert insights[test_user.id][0]["target_percent"] == 30.0
+        assert db_session.query(SimulationInsight).count() == 1
@@ -0,0 +1,162 @@
+"""
+Tests for the SQL-side monthly/weekly cash flow aggregation in LeanWeekPredictor.
+
+The reference functions below are the previous row-by-row Python bucketing; the
+GROUP BY implementation must produce the same dicts.
+"""
+import random
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+
+from app.models.transactions import Transaction
+from app.services.lean_week_predictor import LeanWeekPredictor
+
+
+def reference_monthly(transactions):
+    monthly_data = {}
+    for txn in sorted(transactions, key=lambda t: t.timestamp):
+        if not txn.timestamp or not txn.amount:
+            continue
+        month_key = txn.timestamp.strftime('%Y-%m')
+        data = monthly_data.setdefault(month_key, {
+            'month': month_key, 'income': 0.0, 'expenses': 0.0, 'net_flow': 0.0,
+            'income_count': 0, 'expense_count': 0, 'income_sources': set(),
+            'start_date': txn.timestamp
+        })
+        if txn.type == 'credit':
+            data['income'] += float(txn.amount)
+            data['income_count'] += 1
+            if txn.merchant:
+                data['income_sources'].add(txn.merchant)
+        else:
+            data['expenses'] += float(txn.amount)
+            data['expense_count'] += 1
+    result = []
+    for key in sorted(monthly_data):
+        data = monthly_data[key]
+        data['net_flow'] = data['income'] - data['expenses']
+        data['income_sources'] = len(data['income_sources'])
+        result.append(data)
+    return result
+
+
+def reference_weekly(transactions):
+    weekly_data = {}
+    for txn in sorted(transactions, key=lambda t: t.timestamp):
+        if not txn.timestamp or not txn.amount:
+            continue
+        iso_year, iso_week, _ = txn.timestamp.isocalendar()
+        week_key = f"{iso_year}-W{iso_week:02d}"
+        data = weekly_data.setdefault(week_key, {
+            'week': week_key, 'income': 0.0, 'expenses': 0.0, 'net_flow': 0.0,
+            'start_date': txn.timestamp
+        })
+        if txn.type == 'credit':
+            data['income'] += float(txn.amount)
+        else:
+            data['expenses'] += float(txn.amount)
+    result = []
+    for key in sorted(weekly_data):
+        data = weekly_data[key]
+        data['net_flow'] = data['income'] - data['expenses']
+        result.append(data)
+    return result
+
+
+def assert_same_series(actual, expected):
+    assert [list(row) for row in actual] == [list(row) for row in expected]
+    for got, want in zip(actual, expected):
+        for key, value in want.items():
+            if isinstance(value, float):
+                assert got[key] == pytest.approx(value), key
+            else:
+                assert got[key] == value, key
+
+
+@pytest.fixture
+def seeded_transactions(db_session, test_user, second_user):
+    rng = random.Random(3)
+    now = datetime.utcnow().replace(microsecond=0)
+    rows = []
+    for i in range(250):
+        rows.append(Transaction(
+            user_id=test_user.id,
+            amount=Decimal(str(round(rng.uniform(5, 900), 2))) if i % 17 else Decimal("0"),
+            type=rng.choice(["credit", "debit", "debit", None]),
+            merchant=rng.choice(["Client A", "Client B", "", None, "Shop"]),
+            timestamp=now - timedelta(days=rng.randrange(200), hours=rng.randrange(24))
+        ))
+    # ISO week/year boundaries: Sunday 2024-12-29 is 2024-W52, Monday 2024-12-30 is 2025-W01
+    for ts in (datetime(2024, 12, 29, 23, 0), datetime(2024, 12, 30, 0, 30), datetime(2025, 1, 5, 12, 0)):
+        rows.append(Transaction(user_id=test_user.id, amount=Decimal("10.00"), type="credit",
+                                merchant="Client A", timestamp=ts))
+    rows.append(Transaction(user_id=test_user.id, amount=None, type="debit", timestamp=now))
+    rows.append(Transaction(user_id=test_user.id, amount=Decimal("5.00"), type="debit", timestamp=None))
+    rows.append(Transaction(user_id=second_user.id, amount=Decimal("99.00"), type="credit", timestamp=now))
+    db_session.add_all(rows)
+    db_session.commit()
+    return [r for r in rows if r.user_id == test_user.id]
+
+
+class TestCashFlowAggregation:
+
+    def test_monthly_matches_row_by_row(self, db_session, test_user, seeded_transactions):
+        cutoff = datetime.utcnow() - timedelta(days=60 * 30)
+        expected = reference_monthly(
+            [t for t in seeded_transactions if t.timestamp and t.timestamp >= cutoff]
+        )
+
+        actual = LeanWeekPredictor.get_monthly_cash_flow(db_session, test_user.id, months=60)
+
+        assert_same_series(actual, expected)
+
+    def test_weekly_matches_row_by_row(self, db_session, test_user, seeded_transactions):
+        cutoff = datetime.utcnow() - timedelta(weeks=200)
+        expected = reference_weekly(
+            [t for t in seeded_transactions if t.timestamp and t.timestamp >= cutoff]
+        )
+
+        actual = LeanWeekPredictor.get_weekly_cash_flow(db_session, test_user.id, weeks=200)
+
+        assert_same_series(actual, expected)
+        keys = [row['week'] for row in actual]
+        assert "2024-W52" in keys and "2025-W01" in keys
+
+    def test_reads_partial_period_live_and_rest_from_rollups(self, db_session, test_user, seeded_transactions):
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        engine = db_session.get_bind()
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            LeanWeekPredictor.get_monthly_cash_flow(db_session, test_user.id)
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+
+        assert len(statements) == 2
+        assert "FROM transactions" in statements[0] and "GROUP BY" in statements[0]
+        assert "FROM cash_flow_rollups" in statements[1]
+
+    def test_complete_analysis_queries_each_series_once(self, db_session, test_user, seeded_transactions):
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        engine = db_session.get_bind()
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            analysis = LeanWeekPredictor().get_complete_lean_analysis(db_session, test_user.id, current_balance=500.0)
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+
+        # One monthly and one weekly series (live partial period + rollups each),
+        # shared by history, forecast and smoothing
+        assert len(statements) == 4
+        assert analysis['cash_flow_forecast']['forecasts']
+        assert analysis['income_smoothing']['current_balance'] == 500.0
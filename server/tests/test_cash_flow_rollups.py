@@ -0,0 +1,133 @@
+"""
+Tests for the incrementally maintained cash_flow_rollups table
+"""
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from fastapi import status
+from sqlalchemy import event, select, text
+from sqlalchemy.dialects import postgresql
+
+from app.models.cash_flow_rollup import CashFlowRollup
+from app.models.transactions import Transaction
+from app.services.cash_flow_rollups import (
+    lock_users_statement, rebuild_rollups, period_start, next_period_start
+)
+
+
+def snapshot(db_session):
+    db_session.expire_all()
+    rows = db_session.execute(select(
+        CashFlowRollup.user_id, CashFlowRollup.granularity, CashFlowRollup.period_start,
+        CashFlowRollup.income, CashFlowRollup.expenses, CashFlowRollup.income_count,
+        CashFlowRollup.expense_count, CashFlowRollup.income_sources, CashFlowRollup.first_transaction_at
+    ).order_by(CashFlowRollup.user_id, CashFlowRollup.granularity, CashFlowRollup.period_start)).all()
+    return [tuple(row) for row in rows]
+
+
+def rebuilt(db_session):
+    """Rollups as a full rebuild would write them (rolled back afterwards)."""
+    connection = db_session.connection()
+    rebuild_rollups(connection)
+    expected = snapshot(db_session)
+    db_session.rollback()
+    return expected
+
+
+def make_txn(user, amount, type_, ts, merchant=None):
+    return Transaction(user_id=user.id, amount=Decimal(amount), type=type_, timestamp=ts, merchant=merchant)
+
+
+class TestPeriodHelpers:
+
+    def test_period_boundaries(self):
+        assert period_start(datetime(2025, 1, 5, 23, 0), "week") == date(2024, 12, 30)
+        assert period_start(datetime(2025, 3, 31, 10, 0), "month") == date(2025, 3, 1)
+        assert next_period_start(date(2024, 12, 1), "month") == date(2025, 1, 1)
+        assert next_period_start(date(2024, 12, 30), "week") == date(2025, 1, 6)
+
+
+class TestIncrementalMaintenance:
+
+    def test_insert_update_delete_keep_rollups_exact(self, db_session, test_user, second_user):
+        march = make_txn(test_user, "100.00", "credit", datetime(2025, 3, 10, 9, 0), "Client A")
+        db_session.add_all([
+            march,
+            make_txn(test_user, "40.00", "debit", datetime(2025, 3, 11, 9, 0)),
+            make_txn(test_user, "25.00", "credit", datetime(2025, 4, 2, 9, 0), "Client B"),
+            make_txn(second_user, "10.00", "debit", datetime(2025, 3, 10, 9, 0)),
+        ])
+        db_session.commit()
+        assert snapshot(db_session) == rebuilt(db_session)
+
+        # Move a credit into another month and change its merchant
+        march.timestamp = datetime(2025, 5, 1, 8, 0)
+        march.merchant = "Client C"
+        db_session.commit()
+        after_update = snapshot(db_session)
+        assert after_update == rebuilt(db_session)
+        months = {row[2] for row in after_update if row[0] == test_user.id and row[1] == "month"}
+        assert months == {date(2025, 3, 1), date(2025, 4, 1), date(2025, 5, 1)}
+
+        db_session.delete(march)
+        db_session.commit()
+        after_delete = snapshot(db_session)
+        assert after_delete == rebuilt(db_session)
+        assert date(2025, 5, 1) not in {row[2] for row in after_delete if row[1] == "month"}
+
+    def test_api_writes_refresh_rollups(self, client, auth_headers, test_user, db_session):
+        payload = [
+            {"user_id": test_user.id, "amount": 500.0, "type": "credit", "merchant": "Client A",
+             "transactionId": f"R{i}", "timestamp": (datetime(2025, 1, 1) + timedelta(days=9 * i)).isoformat()}
+            for i in range(12)
+        ]
+        response = client.post("/transactions/bulk", json=payload, headers=auth_headers)
+        assert response.status_code == status.HTTP_201_CREATED
+
+        single = client.post("/transactions/", json={
+            "user_id": test_user.id, "amount": 75.0, "type": "debit", "category": "Food",
+            "timestamp": datetime(2025, 2, 14, 20, 0).isoformat()
+        }, headers=auth_headers)
+        assert single.status_code == status.HTTP_201_CREATED
+        assert client.delete(f"/transactions/{response.json()[0]['id']}", headers=auth_headers).status_code == 204
+
+        rows = snapshot(db_session)
+        assert rows and rows == rebuilt(db_session)
+
+    def test_refresh_locks_users_first(self, db_session, test_user, second_user):
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        engine = db_session.get_bind()
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            db_session.add_all([
+                make_txn(second_user, "10.00", "debit", datetime(2025, 3, 10, 9, 0)),
+                make_txn(test_user, "20.00", "debit", datetime(2025, 3, 10, 9, 0)),
+            ])
+            db_session.flush()
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+
+        lock = next(i for i, s in enumerate(statements) if s.startswith("SELECT users.id"))
+        refresh = next(i for i, s in enumerate(statements) if s.startswith("DELETE FROM cash_flow_rollups"))
+        assert lock < refresh
+
+        compiled = str(lock_users_statement({second_user.id, test_user.id}).compile(dialect=postgresql.dialect()))
+        assert compiled.endswith("ORDER BY users.id FOR UPDATE")
+
+    def test_rebuild_repairs_raw_writes(self, db_session, test_user):
+        db_session.execute(
+            text("INSERT INTO transactions (user_id, amount, type, timestamp) VALUES (:u, 12.5, 'debit', :ts)"),
+            {"u": test_user.id, "ts": datetime(2025, 6, 3, 12, 0)}
+        )
+        db_session.commit()
+        assert snapshot(db_session) == []
+
+        written = rebuild_rollups(db_session.connection())
+        db_session.commit()
+
+        assert written == 2  # one month and one week
+        assert len(snapshot(db_session)) == 2
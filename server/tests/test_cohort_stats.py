@@ -0,0 +1,99 @@
+"""
+Tests for cohort score sketches and "Better than X% of users" comparisons
+"""
+import random
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+
+from app.models.health_score_snapshot import CohortScoreSketch
+from app.models.transactions import Transaction
+from app.services.cohort_stats import ScoreHistogram, OVERALL_SEGMENT
+from app.services.health_score_snapshots import run_snapshot_job
+
+
+class TestScoreHistogram:
+
+    def test_percentiles_match_sorted_scores(self):
+        rng = random.Random(5)
+        scores = [round(rng.uniform(0, 100), 1) for _ in range(2000)]
+        sketch = ScoreHistogram()
+        for score in scores:
+            sketch.add(score)
+
+        for probe in (0.0, 12.3, 50.0, 87.6, 100.0):
+            expected = sum(1 for s in scores if s < probe) * 100 // len(scores)
+            assert sketch.percent_below(probe) == expected
+        assert sketch.mean() == pytest.approx(sum(scores) / len(scores))
+        assert sketch.quantile(0.5) == sorted(scores)[999]
+
+    def test_merge_equals_combined(self):
+        left, right, combined = ScoreHistogram(), ScoreHistogram(), ScoreHistogram()
+        for i in range(300):
+            (left if i % 3 else right).add(i / 3)
+            combined.add(i / 3)
+
+        assert left.merge(right).counts == combined.counts
+
+    def test_serialization_is_compact_and_lossless(self):
+        sketch = ScoreHistogram()
+        for score in (10.0, 10.0, 55.5, 99.9, 150.0, -3.0):
+            sketch.add(score)
+
+        data = sketch.to_bytes()
+        restored = ScoreHistogram.from_bytes(data)
+
+        assert len(data) < 200
+        assert restored.counts == sketch.counts
+        assert restored.count == 6
+        assert restored.percent_below(100.0) == 83  # 150 is clamped into the 100.0 bin
+
+    def test_empty_histogram(self):
+        sketch = ScoreHistogram()
+        assert sketch.count == 0
+        assert sketch.percent_below(50) == 0
+        assert sketch.mean() == 0.0
+
+
+def add_history(db_session, user, income_fn, expense):
+    now = datetime.utcnow()
+    for month in range(5):
+        db_session.add(Transaction(user_id=user.id, amount=Decimal(income_fn(month)), type="credit",
+                                   merchant="Client", timestamp=now - timedelta(days=30 * month + 2)))
+        db_session.add(Transaction(user_id=user.id, amount=Decimal(expense), type="debit",
+                                   timestamp=now - timedelta(days=30 * month + 4)))
+    db_session.commit()
+
+
+class TestCohortComparison:
+
+    def test_no_comparison_before_first_snapshot_job(self, client, auth_headers, db_session, test_user):
+        add_history(db_session, test_user, lambda m: "3000.00", "1800.00")
+
+        response = client.get(f"/users/{test_user.id}/health-score", headers=auth_headers)
+
+        assert response.status_code == 200
+        assert response.json()["comparison"] is None
+
+    def test_comparison_uses_latest_cohort(self, client, auth_headers, db_session, test_user, second_user):
+        # Steady, saving user vs. volatile, overspending user
+        add_history(db_session, test_user, lambda m: "3000.00", "1800.00")
+        add_history(db_session, second_user, lambda m: "4000.00" if m % 2 else "200.00", "2500.00")
+        factory = sessionmaker(autocommit=False, autoflush=False, bind=db_session.get_bind())
+        run_snapshot_job(session_factory=factory)
+
+        segments = dict(db_session.execute(
+            select(CohortScoreSketch.segment, CohortScoreSketch.user_count)
+        ).all())
+        assert segments == {OVERALL_SEGMENT: 2, "income_volatility:low": 1, "income_volatility:high": 1}
+
+        comparison = client.get(f"/users/{test_user.id}/health-score", headers=auth_headers).json()["comparison"]
+
+        assert comparison["cohort_size"] == 2
+        assert comparison["percentile"] == 50
+        assert comparison["segment"] == "income_volatility:low"
+        assert comparison["segment_percentile"] == 0
+        assert comparison["comparison_text"].startswith("Better than 50% of Volt users")
@@ -0,0 +1,137 @@
+"""
+Tests for the precomputed dashboard insight bundle and its ETag handling.
+"""
+import asyncio
+import json
+from datetime import datetime
+
+import pytest
+from fastapi import status
+
+from app.api import simulation_routes
+from app.models.behaviour import BehaviourModel
+from app.models.transactions import Transaction
+from app.services import insight_formatter_v2
+from app.services.behavior_engine import BehaviorEngine
+from app.services.insight_formatter_v2 import InsightFormatter
+
+
+def transaction_payload(user_id, i, category="DINING", amount=40.0):
+    return {
+        "user_id": user_id,
+        "amount": amount + i,
+        "merchant": f"Cafe {i}",
+        "category": category,
+        "type": "debit",
+        "transactionId": f"TX{i:04d}",
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+
+@pytest.fixture
+def build_calls(monkeypatch):
+    calls = []
+    original = InsightFormatter.build_dashboard
+
+    def counting_build(self, model, income_stats=None):
+        calls.append(model.user_id)
+        return original(self, model, income_stats)
+
+    monkeypatch.setattr(InsightFormatter, "build_dashboard", counting_build)
+    return calls
+
+
+def dashboard(client, auth_headers, user_id, etag=None):
+    headers = dict(auth_headers)
+    if etag:
+        headers["If-None-Match"] = etag
+    return client.get(f"/api/users/{user_id}/insights/dashboard", headers=headers)
+
+
+class TestInsightBundle:
+
+    def test_bundle_shares_one_category_summary(self, monkeypatch):
+        calls = []
+        original = insight_formatter_v2.get_category_summary
+        monkeypatch.setattr(insight_formatter_v2, "get_category_summary",
+                            lambda model: calls.append(1) or original(model))
+        model = BehaviourModel(
+            user_id=1, transaction_count=30, impulse_score=0.7,
+            category_stats={"DINING": {"mean": 300.0, "std_dev": 40.0, "count": 20},
+                            "TRAVEL": {"mean": 900.0, "std_dev": 0.0, "count": 1}},
+            elasticity={"DINING": 0.7}, monthly_patterns={}
+        )
+
+        bundle = InsightFormatter().build_dashboard(model)
+
+        assert len(calls) == 1
+        assert bundle.behavior_summary.rare_categories_count == 1
+        assert bundle.quick_wins[0].category_key == "DINING"
+
+    def test_update_model_stores_bundle_for_new_version(self, db_session, test_user):
+        engine = BehaviorEngine(categorization_service=None)
+        tx = Transaction(user_id=test_user.id, amount=120, category="DINING", type="debit",
+                         timestamp=datetime.utcnow())
+        db_session.add(tx)
+        db_session.commit()
+
+        model = asyncio.run(engine.update_model(db_session, test_user.id, tx))
+        db_session.commit()
+
+        assert model.version == 1
+        assert model.insights_version == 1
+        assert json.loads(model.insights) == engine.insight_formatter.build_dashboard(model).model_dump(mode="json")
+
+
+class TestDashboardEndpoint:
+
+    def test_serves_stored_bundle_with_etag(self, client, auth_headers, test_user, build_calls):
+        for i in range(3):
+            response = client.post("/transactions/", json=transaction_payload(test_user.id, i), headers=auth_headers)
+            assert response.status_code == status.HTTP_201_CREATED
+        assert len(build_calls) == 3
+
+        first = dashboard(client, auth_headers, test_user.id)
+        assert first.status_code == status.HTTP_200_OK
+        assert first.json()["behavior_summary"]["transaction_count"] == 3
+        etag = first.headers["etag"]
+
+        cached = dashboard(client, auth_headers, test_user.id, etag)
+        assert cached.status_code == status.HTTP_304_NOT_MODIFIED
+        assert cached.headers["etag"] == etag
+        # Reads never rebuild the bundle
+        assert len(build_calls) == 3
+
+        client.post("/transactions/", json=transaction_payload(test_user.id, 3), headers=auth_headers)
+        changed = dashboard(client, auth_headers, test_user.id, etag)
+        assert changed.status_code == status.HTTP_200_OK
+        assert changed.headers["etag"] != etag
+        assert changed.json()["behavior_summary"]["transaction_count"] == 4
+
+    def test_bulk_import_builds_one_bundle(self, client, auth_headers, test_user, build_calls):
+        payload = [transaction_payload(test_user.id, i) for i in range(5)]
+        response = client.post("/transactions/bulk", json=payload, headers=auth_headers)
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert build_calls == [test_user.id]
+        assert dashboard(client, auth_headers, test_user.id).json()["behavior_summary"]["transaction_count"] == 5
+
+    def test_builds_missing_bundle_once(self, client, auth_headers, db_session, test_user, build_calls):
+        db_session.add(BehaviourModel(
+            user_id=test_user.id, transaction_count=60, impulse_score=0.2,
+            category_stats={"DINING": {"mean": 300.0, "std_dev": 40.0, "count": 20}},
+            elasticity={"DINING": 0.7}, monthly_patterns={}
+        ))
+        db_session.commit()
+
+        first = dashboard(client, auth_headers, test_user.id)
+        second = dashboard(client, auth_headers, test_user.id)
+
+        assert first.status_code == status.HTTP_200_OK
+        assert second.json() == first.json()
+        assert first.json()["recommended_actions"][0].startswith("Start with Dining")
+        assert build_calls == [test_user.id]
+
+    def test_missing_model(self, client, auth_headers, test_user):
+        response = dashboard(client, auth_headers, test_user.id)
+        assert response.status_code == status.HTTP_404_NOT_FOUND
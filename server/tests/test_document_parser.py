@@ -0,0 +1,146 @@
+"""
+Tests for the deterministic PDF/receipt parser used before the LLM fallback
+"""
+import pytest
+import pymupdf
+from io import BytesIO
+from datetime import datetime
+from decimal import Decimal
+
+from app.services.email_parser import parse_bank_email
+from app.services.document_parser import (
+    parse_bank_alert_text,
+    parse_receipt_text,
+    parse_document_text,
+    extract_transaction_locally,
+    CONFIDENCE_THRESHOLD,
+)
+
+
+BANK_ALERT_TEXT = """HDFC Bank
+Transaction Alert
+Rs. 1,250.50 debited from A/c XX4321 on 05-11-2025 14:32
+spent at SWIGGY BANGALORE
+Txn ID: HDF123456789
+Avl Bal: Rs. 10,500.00
+"""
+
+RECEIPT_TEXT = """TAX INVOICE
+Blue Tokai Coffee Roasters
+Koramangala, Bengaluru
+Date: 12/10/2025 09:15 AM
+Cappuccino            220.00
+Croissant             180.00
+Subtotal              400.00
+GST                    20.00
+Grand Total: 420.00
+"""
+
+
+def make_pdf(text: str) -> bytes:
+    """Build a single-page PDF containing the given text"""
+    doc = pymupdf.open()
+    page = doc.new_page()
+    page.insert_text((50, 72), text, fontsize=10)
+    content = doc.tobytes()
+    doc.close()
+    return content
+
+
+class TestBankAlertTemplate:
+    """Bank alert / statement template"""
+
+    def test_parses_all_key_fields(self):
+        fields, confidence = parse_bank_alert_text(BANK_ALERT_TEXT)
+
+        assert fields["amount"] == Decimal("1250.50")
+        assert fields["type"] == "debit"
+        assert fields["merchant"] == "SWIGGY BANGALORE"
+        assert fields["transactionId"] == "HDF123456789"
+        assert fields["timestamp"] == datetime(2025, 11, 5, 14, 32)
+        assert fields["balance"] == Decimal("10500.00")
+        assert fields["accountNumber"] == "4321"
+        assert fields["bankName"] == "HDFC Bank"
+        assert fields["category"] == "Food & Dining"
+        assert confidence == 1.0
+
+    def test_credit_uses_sender_as_merchant(self):
+        text = "INR 5,000.00 credited to A/c XX1111 on 2025-10-01 10:00 received from Acme Corp via NEFT"
+        fields, confidence = parse_bank_alert_text(text)
+
+        assert fields["type"] == "credit"
+        assert fields["merchant"] == "Acme Corp"
+        assert fields["timestamp"] == datetime(2025, 10, 1, 10, 0)
+        assert confidence >= CONFIDENCE_THRESHOLD
+
+    def test_shares_patterns_with_email_parser(self):
+        """Both parsers should agree on the fields they have in common"""
+        email = parse_bank_email("Alert", BANK_ALERT_TEXT, "alerts@hdfcbank.net")
+        fields, _ = parse_bank_alert_text(BANK_ALERT_TEXT)
+
+        assert Decimal(str(email["amount"])) == fields["amount"]
+        assert email["merchant"] == fields["merchant"]
+        assert email["transactionId"] == fields["transactionId"]
+        assert email["type"] == fields["type"]
+
+
+class TestReceiptTemplate:
+    """Merchant receipt template"""
+
+    def test_parses_receipt(self):
+        fields, confidence = parse_receipt_text(RECEIPT_TEXT)
+
+        assert fields["amount"] == Decimal("420.00")
+        assert fields["merchant"] == "Blue Tokai Coffee Roasters"
+        assert fields["type"] == "debit"
+        assert fields["timestamp"] == datetime(2025, 10, 12, 9, 15)
+        assert confidence >= CONFIDENCE_THRESHOLD
+
+    def test_best_template_is_selected(self):
+        fields, confidence = parse_document_text(RECEIPT_TEXT)
+        assert fields["merchant"] == "Blue Tokai Coffee Roasters"
+        assert confidence >= CONFIDENCE_THRESHOLD
+
+
+class TestLocalExtraction:
+    """Confidence gating for the LLM fallback"""
+
+    def test_confident_parse_returns_transaction(self):
+        transaction = extract_transaction_locally(BANK_ALERT_TEXT)
+
+        assert transaction is not None
+        assert transaction.amount == Decimal("1250.50")
+        assert transaction.user_id == 1
+        assert transaction.rawMessage.startswith("HDFC Bank")
+
+    @pytest.mark.parametrize("text", [
+        "",
+        "Quarterly newsletter with no transaction details",
+        "Amount mentioned: Rs. 100 but nothing else",
+    ])
+    def test_low_confidence_returns_none(self, text):
+        assert extract_transaction_locally(text) is None
+
+    @pytest.mark.parametrize("text", [
+        "Please sent the documents by 2024-01-02. Amount due Rs 500",
+        "Meeting on 2025-03-04\nTotal: 1,200.00",
+    ])
+    def test_non_transaction_text_with_date_and_amount(self, text):
+        """A date and an amount alone are not enough to skip the LLM"""
+        _, confidence = parse_document_text(text)
+
+        assert confidence < CONFIDENCE_THRESHOLD
+        assert extract_transaction_locally(text) is None
+
+    def test_pdf_endpoint_skips_llm_for_known_layout(self, client):
+        """A machine-generated bank PDF is parsed without calling Gemini"""
+        response = client.post(
+            "/ocr/text-to-transaction",
+            files={"file": ("alert.pdf", BytesIO(make_pdf(BANK_ALERT_TEXT)), "application/pdf")}
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["amount"] == "1250.50"
+        assert data["merchant"] == "SWIGGY BANGALORE"
+        assert data["type"] == "debit"
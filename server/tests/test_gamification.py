@@ -1,6 +1,7 @@
 import pytest
 from datetime import datetime, date, timedelta
 from decimal import Decimal
+from sqlalchemy import event
 from sqlalchemy.orm import Session
 
 from app.models.user import User
@@ -8,7 +9,7 @@ from app.models.gamification import (
     GamificationEvent, UserPoints, UserStreak, Achievement, UserAchievement,
     EventType, StreakType, BadgeTier
 )
-from app.services.gamification_service import GamificationService, seed_achievements
+from app.services.gamification_service import GamificationService, level_total_xp, seed_achievements
 
 
 @pytest.fixture
@@ -242,6 +243,77 @@ class TestGamificationService:
         assert achievement is not None
 
 
+class TestLevelTable:
+    """Test the precomputed level lookup"""
+    
+    @pytest.mark.parametrize("xp_total, expected", [
+        (0, (1, 100)),
+        (99, (1, 100)),
+        (100, (2, 120)),
+        (519, (4, 160)),
+        (520, (5, 220)),
+        (740, (6, 240)),
+        (level_total_xp(100), (100, level_total_xp(101) - level_total_xp(100))),
+        (level_total_xp(101), (101, 1000)),
+    ])
+    def test_level_boundaries(self, db_session: Session, xp_total: int, expected):
+        """Levels change exactly at the cumulative XP thresholds"""
+        assert GamificationService(db_session)._get_level_from_xp(xp_total) == expected
+
+
+def achievement_queries(db_session: Session, func):
+    """Run func and return the statements that read achievement tables"""
+    statements = []
+    
+    def record(conn, cursor, statement, *args):
+        if "achievements" in statement and statement.startswith("SELECT"):
+            statements.append(statement)
+    
+    engine = db_session.get_bind()
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        func()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return statements
+
+
+class TestAchievementCache:
+    """Test the achievement catalogue and the per-session earned set"""
+    
+    def test_repeat_awards_skip_achievement_queries(self, db_session: Session, test_user: User, gamification_service: GamificationService):
+        """Achievement lookups run on the first award only"""
+        gamification_service.award_event(test_user.id, EventType.TRANSACTION_CATEGORIZED)
+        
+        queries = achievement_queries(db_session, lambda: [
+            GamificationService(db_session).award_event(test_user.id, EventType.TRANSACTION_CATEGORIZED)
+            for _ in range(3)
+        ])
+        
+        assert queries == []
+        assert db_session.query(UserAchievement).filter(UserAchievement.user_id == test_user.id).count() == 1
+    
+    def test_rollback_forgets_uncommitted_award(self, db_session: Session, test_user: User, gamification_service: GamificationService):
+        """An award that was rolled back can be made again"""
+        gamification_service._award_achievements(test_user.id, ["LEVEL_5"])
+        db_session.rollback()
+        
+        gamification_service._award_achievement(test_user.id, "LEVEL_5")
+        
+        assert db_session.query(UserAchievement).filter(UserAchievement.user_id == test_user.id).count() == 1
+    
+    def test_seeding_refreshes_catalogue(self, db_session: Session, test_user: User):
+        """Achievements seeded after the catalogue was loaded can be awarded"""
+        service = GamificationService(db_session)
+        service._award_achievement(test_user.id, "LEVEL_5")
+        assert db_session.query(UserAchievement).count() == 0
+        
+        seed_achievements(db_session)
+        service._award_achievement(test_user.id, "LEVEL_5")
+        
+        assert db_session.query(UserAchievement).count() == 1
+
+
 class TestAchievementSeeding:
     """Test achievement seeding"""
     
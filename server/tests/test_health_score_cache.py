@@ -0,0 +1,167 @@
+"""
+Tests for the health score snapshot cache, data-version invalidation and ETag/304 handling
+"""
+import asyncio
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+import redis
+from fastapi import status
+
+from app.models.transactions import Transaction
+from app.models.user import User
+from app.routers import health_score_router
+from app.services.health_score_cache import HealthScoreCache, etag_matches, make_etag
+
+
+class FakeRedis:
+    """Minimal async stand-in for the two Redis commands the cache uses."""
+
+    def __init__(self, fail: bool = False):
+        self.store = {}
+        self.fail = fail
+        self.calls = 0
+
+    async def get(self, key):
+        self.calls += 1
+        if self.fail:
+            raise redis.ConnectionError("redis down")
+        return self.store.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.calls += 1
+        if self.fail:
+            raise redis.ConnectionError("redis down")
+        self.store[key] = value
+
+
+@pytest.fixture
+def seeded_history(db_session, test_user):
+    now = datetime.utcnow()
+    rows = []
+    for month in range(5):
+        rows.append(Transaction(user_id=test_user.id, amount=Decimal("3000.00"), type="credit",
+                                merchant=f"Client {month % 2}", timestamp=now - timedelta(days=30 * month + 2)))
+        rows.append(Transaction(user_id=test_user.id, amount=Decimal("1800.00"), type="debit",
+                                category="Rent", timestamp=now - timedelta(days=30 * month + 5)))
+    db_session.add_all(rows)
+    db_session.commit()
+    return rows
+
+
+@pytest.fixture
+def build_calls(monkeypatch):
+    calls = []
+    original = health_score_router.build_financial_health_score
+
+    def counting_build(db, user_id):
+        calls.append(user_id)
+        return original(db, user_id)
+
+    monkeypatch.setattr(health_score_router, "build_financial_health_score", counting_build)
+    return calls
+
+
+class TestHealthScoreEndpointCaching:
+
+    def test_revalidation_returns_304_without_recomputing(self, client, auth_headers, test_user, seeded_history, build_calls):
+        url = f"/users/{test_user.id}/health-score"
+
+        first = client.get(url, headers=auth_headers)
+        assert first.status_code == status.HTTP_200_OK
+        etag = first.headers["etag"]
+        assert first.json()["overall_score"] >= 0
+
+        again = client.get(url, headers=auth_headers)
+        assert again.status_code == status.HTTP_200_OK
+        assert again.headers["etag"] == etag
+        assert again.json() == first.json()
+
+        revalidated = client.get(url, headers={**auth_headers, "If-None-Match": etag})
+        assert revalidated.status_code == status.HTTP_304_NOT_MODIFIED
+        assert revalidated.content == b""
+        assert revalidated.headers["etag"] == etag
+
+        assert build_calls == [test_user.id]
+
+    def test_new_transaction_invalidates_snapshot(self, client, auth_headers, test_user, seeded_history, build_calls):
+        url = f"/users/{test_user.id}/health-score"
+        etag = client.get(url, headers=auth_headers).headers["etag"]
+
+        created = client.post("/transactions/", json={
+            "user_id": test_user.id, "amount": 950.0, "type": "credit", "merchant": "Client 7",
+            "timestamp": datetime.utcnow().isoformat()
+        }, headers=auth_headers)
+        assert created.status_code == status.HTTP_201_CREATED
+
+        refreshed = client.get(url, headers={**auth_headers, "If-None-Match": etag})
+        assert refreshed.status_code == status.HTTP_200_OK
+        assert refreshed.headers["etag"] != etag
+        assert len(build_calls) == 2
+
+    def test_insufficient_data_is_not_cached(self, client, auth_headers, test_user, build_calls):
+        url = f"/users/{test_user.id}/health-score"
+
+        assert client.get(url, headers=auth_headers).status_code == status.HTTP_404_NOT_FOUND
+        assert client.get(url, headers=auth_headers).status_code == status.HTTP_404_NOT_FOUND
+        assert len(build_calls) == 2
+
+
+class TestDataVersion:
+
+    def test_transaction_writes_bump_only_the_owner(self, db_session, test_user, second_user):
+        txn = Transaction(user_id=test_user.id, amount=Decimal("10.00"), type="debit", timestamp=datetime.utcnow())
+        db_session.add(txn)
+        db_session.commit()
+
+        txn.amount = Decimal("12.00")
+        db_session.commit()
+        db_session.delete(txn)
+        db_session.commit()
+
+        assert db_session.get(User, test_user.id).data_version == 3
+        assert db_session.get(User, second_user.id).data_version == 0
+
+    def test_unrelated_user_update_keeps_version(self, db_session, test_user):
+        test_user.savings = Decimal("50.00")
+        db_session.commit()
+
+        assert db_session.get(User, test_user.id).data_version == 0
+
+
+class TestHealthScoreCache:
+
+    def test_entries_are_shared_through_redis(self):
+        shared = FakeRedis()
+        writer = HealthScoreCache(shared, ttl=60)
+        reader = HealthScoreCache(shared, ttl=60)
+
+        stored = asyncio.run(writer.set(1, 4, '{"overall_score": 70.0}'))
+
+        assert asyncio.run(reader.get(1, 4)) == stored
+        assert asyncio.run(reader.get(1, 5)) is None
+
+    def test_falls_back_to_local_cache_when_redis_is_down(self):
+        broken = FakeRedis(fail=True)
+        cache = HealthScoreCache(broken, ttl=60)
+
+        stored = asyncio.run(cache.set(1, 0, "{}"))
+        assert asyncio.run(cache.get(1, 0)) == stored
+        assert asyncio.run(cache.get(2, 0)) is None
+        # Redis is skipped after the first failure
+        assert broken.calls == 1
+
+    @pytest.mark.parametrize("header,expected", [
+        (None, False),
+        ('"abc"', True),
+        ('W/"abc"', True),
+        ('"xyz", "abc"', True),
+        ('"xyz"', False),
+        ("*", True),
+    ])
+    def test_etag_matching(self, header, expected):
+        assert etag_matches(header, '"abc"') is expected
+
+    def test_etag_depends_on_body(self):
+        assert make_etag("a") == make_etag("a") != make_etag("b")
@@ -0,0 +1,133 @@
+"""
+Tests for the health score snapshot job and the snapshot-based score trend
+"""
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from fastapi import status
+from sqlalchemy import event, select
+from sqlalchemy.orm import sessionmaker
+
+from app.models.health_score_snapshot import HealthScoreSnapshot
+from app.models.transactions import Transaction
+from app.services.health_score import build_trend
+from app.services.health_score_snapshots import recent_snapshot_scores, run_snapshot_job
+
+
+def add_history(db_session, user, income, expense, months=5):
+    now = datetime.utcnow()
+    for month in range(months):
+        db_session.add(Transaction(user_id=user.id, amount=Decimal(income), type="credit",
+                                   merchant="Client", timestamp=now - timedelta(days=30 * month + 2)))
+        db_session.add(Transaction(user_id=user.id, amount=Decimal(expense), type="debit",
+                                   timestamp=now - timedelta(days=30 * month + 4)))
+    db_session.commit()
+
+
+@pytest.fixture
+def session_factory(db_session):
+    return sessionmaker(autocommit=False, autoflush=False, bind=db_session.get_bind())
+
+
+class TestSnapshotJob:
+
+    def test_snapshots_active_users_idempotently(self, db_session, session_factory, test_user, second_user):
+        add_history(db_session, test_user, "3000.00", "1800.00")
+        # Spends more than earns: must still be scored
+        add_history(db_session, second_user, "500.00", "2500.00")
+
+        first = run_snapshot_job(session_factory=session_factory, chunk_size=1)
+        second = run_snapshot_job(session_factory=session_factory, chunk_size=1)
+
+        assert first["users"] == 2 and first["snapshots"] == 2 and first["chunks"] == 2
+        assert first["users_per_second"] > 0
+        assert second["snapshots"] == 2
+        snapshots = db_session.execute(select(HealthScoreSnapshot)).scalars().all()
+        assert len(snapshots) == 2
+        assert {s.snapshot_date for s in snapshots} == {datetime.utcnow().date()}
+        assert all(0 <= s.overall_score <= 100 for s in snapshots)
+
+    def test_users_without_recent_data_are_skipped(self, db_session, session_factory, test_user):
+        db_session.add(Transaction(user_id=test_user.id, amount=Decimal("10.00"), type="debit",
+                                   timestamp=datetime.utcnow() - timedelta(days=400)))
+        db_session.commit()
+
+        stats = run_snapshot_job(session_factory=session_factory)
+
+        assert stats["users"] == 0 and stats["snapshots"] == 0
+
+    def test_snapshot_matches_endpoint_score(self, client, auth_headers, db_session, session_factory, test_user):
+        add_history(db_session, test_user, "3000.00", "1800.00")
+        run_snapshot_job(session_factory=session_factory)
+
+        response = client.get(f"/users/{test_user.id}/health-score", headers=auth_headers)
+
+        snapshot = db_session.execute(select(HealthScoreSnapshot)).scalar_one()
+        assert response.json()["overall_score"] == snapshot.overall_score
+        assert response.json()["breakdown"]["savings_rate"] == snapshot.savings_rate
+
+
+class TestScoreTrend:
+
+    def test_trend_uses_latest_snapshot_per_month(self):
+        today = date(2025, 6, 15)
+        history = [
+            (date(2025, 3, 1), 50.0),
+            (date(2025, 3, 31), 55.0),
+            (date(2025, 4, 30), 60.0),
+            (date(2025, 6, 1), 58.0),  # This month: replaced by the current score
+        ]
+
+        trend = build_trend(history, 62.5, today=today)
+
+        assert [(p.date.date(), p.score, p.change) for p in trend] == [
+            (date(2025, 3, 31), 55.0, None),
+            (date(2025, 4, 30), 60.0, 5.0),
+            (today, 62.5, 2.5),
+        ]
+
+    def test_trend_is_capped_to_six_points(self):
+        history = [(date(2024, month, 28), float(month)) for month in range(1, 13)]
+
+        trend = build_trend(history, 70.0, today=date(2025, 1, 10))
+
+        assert len(trend) == 6
+        assert trend[0].date.date() == date(2024, 8, 28)
+
+    def test_endpoint_returns_persisted_trend(self, client, auth_headers, db_session, test_user):
+        add_history(db_session, test_user, "3000.00", "1800.00")
+        today = datetime.utcnow().date()
+        earlier = [today.replace(day=1) - timedelta(days=1 + 31 * i) for i in range(3)]
+        db_session.add_all([
+            HealthScoreSnapshot(user_id=test_user.id, snapshot_date=d, overall_score=40.0 + i,
+                                income_stability=50, spending_discipline=50, emergency_fund=50,
+                                savings_rate=50, debt_health=85, diversification=25)
+            for i, d in enumerate(reversed(earlier))
+        ])
+        db_session.commit()
+
+        trend = client.get(f"/users/{test_user.id}/health-score", headers=auth_headers).json()["trend"]
+
+        assert [point["score"] for point in trend[:3]] == [40.0, 41.0, 42.0]
+        assert len(trend) == 4
+
+    def test_trend_read_uses_snapshot_index(self, db_session, test_user):
+        statements = []
+        engine = db_session.get_bind()
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append((statement, parameters))
+
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            recent_snapshot_scores(db_session, test_user.id)
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+
+        assert len(statements) == 1
+        with engine.connect() as conn:
+            plan = " | ".join(row[-1] for row in conn.exec_driver_sql(
+                f"EXPLAIN QUERY PLAN {statements[0][0]}", statements[0][1]
+            ))
+        assert "uq_health_score_snapshots_user_date" in plan, plan
@@ -0,0 +1,74 @@
+"""
+Tests for OCR image preprocessing
+"""
+import io
+import asyncio
+
+from PIL import Image
+
+from app.utils.image_preprocessing import (
+    detect_image_type,
+    preprocess_image,
+    preprocess_image_async,
+    MAX_DIMENSION,
+)
+
+
+def make_image(fmt: str, size=(4000, 3000), exif=None) -> bytes:
+    img = Image.new("RGB", size, color=(200, 30, 30))
+    output = io.BytesIO()
+    if exif is not None:
+        img.save(output, format=fmt, exif=exif)
+    else:
+        img.save(output, format=fmt)
+    return output.getvalue()
+
+
+class TestDetectImageType:
+
+    def test_detects_common_formats(self):
+        assert detect_image_type(make_image("PNG", (10, 10))) == "image/png"
+        assert detect_image_type(make_image("JPEG", (10, 10))) == "image/jpeg"
+        assert detect_image_type(make_image("WEBP", (10, 10))) == "image/webp"
+
+    def test_unknown_bytes(self):
+        assert detect_image_type(b"not an image") is None
+
+
+class TestPreprocessImage:
+
+    def test_downscales_and_reencodes(self):
+        original = make_image("PNG")
+
+        processed, media_type = preprocess_image(original)
+
+        assert media_type == "image/jpeg"
+        assert len(processed) < len(original)
+        with Image.open(io.BytesIO(processed)) as img:
+            assert max(img.size) == MAX_DIMENSION
+            assert img.mode == "L"
+
+    def test_strips_exif(self):
+        exif = Image.Exif()
+        exif[0x010F] = "PhoneMaker"  # Make
+        original = make_image("JPEG", (800, 600), exif=exif.tobytes())
+
+        processed, _ = preprocess_image(original)
+
+        with Image.open(io.BytesIO(processed)) as img:
+            assert not img.getexif()
+            # Small images are not upscaled
+            assert img.size == (800, 600)
+
+    def test_undecodable_image_is_returned_unchanged(self):
+        data = b"\x89PNG\r\n\x1a\n" + b"corrupt"
+
+        processed, media_type = preprocess_image(data)
+
+        assert processed == data
+        assert media_type == "image/png"
+
+    def test_async_wrapper(self):
+        processed, media_type = asyncio.run(preprocess_image_async(make_image("PNG", (100, 100))))
+        assert media_type == "image/jpeg"
+        assert processed.startswith(b"\xff\xd8\xff")
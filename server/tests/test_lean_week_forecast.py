@@ -0,0 +1,158 @@
+"""
+Tests for LeanWeekPredictor.predict_lean_weeks and the animated timeline
+forecast built on it.
+"""
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+
+from app.models.transactions import Transaction
+from app.routers.health_score_router import build_animated_timeline
+from app.services.lean_week_predictor import CashFlowHistory, LeanWeekPredictor
+
+
+@pytest.fixture
+def weekly_history(db_session, test_user):
+    # Paid every other week; groceries every week
+    today = datetime.utcnow().replace(hour=12, minute=0, second=0, microsecond=0)
+    monday = today - timedelta(days=today.weekday())
+    for weeks_ago in range(1, 13):
+        ts = monday - timedelta(weeks=weeks_ago) + timedelta(days=1)
+        if weeks_ago % 2 == 0:
+            db_session.add(Transaction(user_id=test_user.id, amount=Decimal("2000"), type="credit",
+                                       merchant="Client A", timestamp=ts))
+        db_session.add(Transaction(user_id=test_user.id, amount=Decimal("700"), type="debit",
+                                   merchant="Groceries", timestamp=ts))
+    db_session.commit()
+
+
+def record_statements(db_session, func):
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    engine = db_session.get_bind()
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        result = func()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return result, statements
+
+
+class TestPredictLeanWeeks:
+
+    def test_forecasts_upcoming_iso_weeks(self, db_session, test_user, weekly_history):
+        prediction = LeanWeekPredictor().predict_lean_weeks(db_session, test_user.id, weeks_ahead=8)
+
+        forecast = prediction['forecast']
+        assert len(forecast) == 8
+        today = datetime.utcnow().date()
+        assert forecast[0]['start_date'] == today - timedelta(days=today.weekday()) + timedelta(weeks=1)
+        for week in forecast:
+            assert week['start_date'].weekday() == 0
+            assert week['end_date'] == week['start_date'] + timedelta(days=6)
+            iso_year, iso_week, _ = week['start_date'].isocalendar()
+            assert week['period'] == f"{iso_year}-W{iso_week:02d}"
+            assert week['worst_case'] <= week['likely_case'] <= week['best_case']
+            assert 0 <= week['confidence'] <= 1
+        # The fortnightly pay cycle carries on: 2000 - 700 in paid weeks, -700 between them
+        assert [week['likely_case'] for week in forecast] == [-700.0, 1300.0] * 4
+        assert [week['is_lean'] for week in forecast] == [True, False] * 4
+        assert prediction['predicted_lean_count'] == 4
+
+    def test_weeks_without_transactions_count_as_zero(self, db_session, test_user):
+        now = datetime.utcnow()
+        # Two income weeks four weeks apart: the empty weeks in between pull the mean down
+        for weeks_ago in (2, 6):
+            db_session.add(Transaction(user_id=test_user.id, amount=Decimal("4000"), type="credit",
+                                       merchant="Client A", timestamp=now - timedelta(weeks=weeks_ago)))
+        db_session.commit()
+
+        prediction = LeanWeekPredictor().predict_lean_weeks(db_session, test_user.id, weeks_ahead=2)
+
+        assert prediction['lean_threshold'] == 0.0
+        assert prediction['forecast'][0]['likely_case'] < 4000
+
+    def test_flags_weeks_at_or_below_lean_threshold(self, db_session, test_user):
+        now = datetime.utcnow()
+        for weeks_ago in range(1, 9):
+            db_session.add(Transaction(user_id=test_user.id, amount=Decimal("500"), type="debit",
+                                       merchant="Rent", timestamp=now - timedelta(weeks=weeks_ago)))
+        db_session.commit()
+
+        prediction = LeanWeekPredictor().predict_lean_weeks(db_session, test_user.id, weeks_ahead=4)
+
+        assert prediction['predicted_lean_count'] == 4
+        assert all(week['is_lean'] for week in prediction['forecast'])
+        assert len(prediction['warnings']) == 4
+
+    def test_monthly_payday_leaves_weeks_between_paydays_lean(self, db_session, test_user):
+        today = datetime.utcnow().replace(hour=12, minute=0, second=0, microsecond=0)
+        monday = today - timedelta(days=today.weekday())
+        for weeks_ago in range(1, 27):
+            db_session.add(Transaction(user_id=test_user.id, amount=Decimal("300"), type="debit",
+                                       merchant="Groceries", timestamp=monday - timedelta(weeks=weeks_ago)))
+        # Salary on the 1st of each month, up to last week
+        payday = (monday - timedelta(weeks=26)).replace(day=1)
+        while payday < monday:
+            if payday >= monday - timedelta(weeks=26):
+                db_session.add(Transaction(user_id=test_user.id, amount=Decimal("3000"), type="credit",
+                                           merchant="Employer", timestamp=payday))
+            payday = (payday + timedelta(days=32)).replace(day=1)
+        db_session.commit()
+
+        prediction = LeanWeekPredictor().predict_lean_weeks(db_session, test_user.id, weeks_ahead=8, lookback_weeks=26)
+
+        forecast = prediction['forecast']
+        for week in forecast:
+            payday_week = any((week['start_date'] + timedelta(days=d)).day == 1 for d in range(7))
+            assert week['is_lean'] == (not payday_week)
+        assert 0 < prediction['predicted_lean_count'] < len(forecast)
+
+    def test_insufficient_history(self, db_session, test_user):
+        prediction = LeanWeekPredictor().predict_lean_weeks(db_session, test_user.id)
+
+        assert prediction['forecast'] == []
+        assert prediction['warnings']
+
+    def test_reuses_cached_weekly_series(self, db_session, test_user, weekly_history):
+        history = CashFlowHistory(db_session, test_user.id)
+        history.weekly(12)
+
+        prediction, statements = record_statements(
+            db_session,
+            lambda: LeanWeekPredictor().predict_lean_weeks(db_session, test_user.id, history=history)
+        )
+
+        assert statements == []
+        assert prediction['forecast']
+
+
+class TestTimelineForecast:
+
+    @pytest.mark.parametrize("timeline_type", ["weekly", "monthly"])
+    def test_timeline_forecast_adds_no_queries(self, db_session, test_user, weekly_history, timeline_type):
+        user_id = test_user.id
+        timeline, statements = record_statements(
+            db_session,
+            lambda: build_animated_timeline(db_session, user_id, timeline_type, periods=12)
+        )
+
+        # One series (live partial period + rollups), shared with the forecast
+        assert len(statements) == 2
+        assert len(timeline.forecast_periods) == 6
+        first = timeline.forecast_periods[0]
+        assert first.start_date > date.today() - timedelta(days=1)
+        assert first.worst_case <= first.likely_case <= first.best_case
+
+    def test_monthly_forecast_uses_month_keys(self, db_session, test_user, weekly_history):
+        timeline = build_animated_timeline(db_session, test_user.id, "monthly", periods=6)
+
+        for period in timeline.forecast_periods:
+            assert period.start_date.day == 1
+            assert period.period_key == period.start_date.strftime('%Y-%m')
+            assert (period.end_date + timedelta(days=1)).day == 1
@@ -0,0 +1,31 @@
+"""
+Tests for the shared Gemini client / agent registry
+"""
+import asyncio
+
+from app.core import llm
+from app.utils.ocr import get_ocr_agent
+from app.services.simulations.refinement import RefinementService
+
+
+def test_agents_are_created_once_and_share_the_model():
+    first = get_ocr_agent().image_agent
+    second = get_ocr_agent().image_agent
+    refinement = RefinementService().agent
+
+    assert first is second
+    assert get_ocr_agent() is get_ocr_agent()
+    assert refinement is RefinementService().agent
+    assert refinement.model is first.model is llm.get_gemini_model()
+
+
+def test_close_releases_http_client():
+    client = llm.get_http_client()
+    llm.get_agent("test_agent", str, "Test prompt")
+
+    asyncio.run(llm.close_llm_clients())
+
+    assert client.is_closed
+    assert "test_agent" not in llm._agents
+    # A fresh client is created on next use
+    assert llm.get_http_client() is not client
@@ -0,0 +1,210 @@
+"""
+Tests for the Monte Carlo cash-flow engine and the projection/forecast code
+that reads its percentile bands.
+"""
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from app.models.behaviour import BehaviourModel
+from app.models.transactions import Transaction
+from app.services.lean_week_predictor import LeanWeekPredictor
+from app.services.simulations import project_future_spending
+from app.services.simulations.monte_carlo import (
+    MonteCarloEngine,
+    monthly_category_moments,
+    monthly_income_moments
+)
+
+# Per-transaction statistics over three months of history: 400 a month on dining
+# (8 meals), 600 on groceries (5 shops) and 1,800 of rent
+CATEGORY_STATS = {
+    "DINING": {"mean": 50.0, "variance": 100.0, "count": 24},
+    "GROCERIES": {"mean": 120.0, "variance": 400.0, "count": 15},
+    "RENT": {"mean": 1800.0, "variance": 0.0, "count": 3},
+}
+HISTORY_DAYS = 3 * 365.25 / 12
+INCOME_STATS = {"count": 12, "mean": 3500.0, "variance": 250000.0, "std_dev": 500.0}
+
+
+@pytest.fixture
+def behaviour_model(db_session, test_user):
+    model = BehaviourModel(user_id=test_user.id, category_stats=CATEGORY_STATS, elasticity={},
+                           impulse_score=0.2, monthly_patterns={"income_stats": INCOME_STATS})
+    db_session.add(model)
+    now = datetime.utcnow()
+    for i in range(10):
+        db_session.add(Transaction(user_id=test_user.id, amount=Decimal("280.00"), type="debit",
+                                   category="DINING", timestamp=now - timedelta(days=i * 2)))
+    # Start of the history category_stats cover
+    db_session.add(Transaction(user_id=test_user.id, amount=Decimal("1800.00"), type="debit",
+                               category="RENT", timestamp=now - timedelta(days=HISTORY_DAYS)))
+    db_session.commit()
+    return model
+
+
+class TestMonteCarloEngine:
+
+    def test_bands_match_analytic_moments(self):
+        engine = MonteCarloEngine(3000.0, 300.0, [1000.0, 500.0], [100.0, 0.0], paths=20000, seed=1)
+
+        result = engine.simulate(months=4, starting_balance=200.0)
+
+        assert result.income.shape == (3, 4)
+        assert result.category_expenses.shape == (4, 2)
+        # Normal quantiles: P10/P90 = mean -/+ 1.2816 sd
+        assert result.income[1] == pytest.approx([3000.0] * 4, rel=0.01)
+        assert result.income[0] == pytest.approx([3000.0 - 1.2816 * 300] * 4, rel=0.02)
+        assert result.expenses[2] == pytest.approx([1500.0 + 1.2816 * 100] * 4, rel=0.02)
+        assert result.category_expenses[:, 1] == pytest.approx([500.0] * 4)
+        # Balance P50 grows by the median net each month
+        assert result.balance[1] == pytest.approx([200.0 + 1500.0 * m for m in range(1, 5)], rel=0.02)
+        assert (result.income[0] <= result.income[1]).all() and (result.income[1] <= result.income[2]).all()
+
+    def test_negative_probability_is_cumulative(self):
+        # Zero-mean net flow from a zero balance: about half the paths dip below 0 in month 1
+        engine = MonteCarloEngine(1000.0, 200.0, [1000.0], [200.0], paths=20000, seed=3)
+
+        result = engine.simulate(months=6)
+
+        assert result.negative_probability[0] == pytest.approx(0.5, abs=0.03)
+        assert (np.diff(result.negative_probability) >= 0).all()
+        assert result.negative_probability[-1] > result.negative_probability[0]
+
+        safe = MonteCarloEngine(5000.0, 10.0, [1000.0], [10.0], paths=1000, seed=3).simulate(months=6)
+        assert not safe.negative_probability.any()
+
+    def test_seeded_runs_are_reproducible(self):
+        first = MonteCarloEngine(2000.0, 400.0, [900.0, 300.0], [90.0, 60.0], seed=42).simulate(12)
+        second = MonteCarloEngine(2000.0, 400.0, [900.0, 300.0], [90.0, 60.0], seed=42).simulate(12)
+
+        np.testing.assert_array_equal(first.balance, second.balance)
+        np.testing.assert_array_equal(first.category_expenses, second.category_expenses)
+
+    def test_draws_are_floored_at_zero(self):
+        result = MonteCarloEngine(10.0, 1000.0, [10.0], [1000.0], paths=5000, seed=5).simulate(3)
+
+        assert (result.income >= 0).all()
+        assert (result.expenses >= 0).all()
+
+    def test_from_behaviour_model_scales_changed_categories(self, behaviour_model):
+        engine = MonteCarloEngine.from_behaviour_model(
+            behaviour_model, {"DINING": -25}, observed_days=HISTORY_DAYS, seed=1
+        )
+
+        assert engine.categories == ["DINING", "GROCERIES", "RENT"]
+        assert engine.expense_mean == pytest.approx([300.0, 600.0, 1800.0])
+        assert engine.expense_std == pytest.approx([0.75 * np.sqrt(800.0), np.sqrt(2000.0), 0.0])
+        assert engine.income_mean == 3500.0
+        assert engine.income_std == 500.0
+
+    def test_income_scaled_to_payments_per_month(self):
+        # Weekly paychecks of 900 +/- 100
+        weekly = {"count": 12, "mean": 900.0, "variance": 10000.0, "income_frequency_days": [7] * 11}
+
+        mean, std = monthly_income_moments(weekly)
+
+        assert mean == pytest.approx(900.0 * 365.25 / 12 / 7)
+        assert std == pytest.approx(100.0 * np.sqrt(365.25 / 12 / 7))
+        assert monthly_income_moments({"mean": 900.0, "variance": 10000.0}) == (900.0, 100.0)
+
+    def test_category_stats_scaled_to_transactions_per_month(self):
+        # Half a year of weekly grocery shops of 150 +/- 20
+        stats = {"GROCERIES": {"count": 26, "mean": 150.0, "variance": 400.0},
+                 "RENT": {"count": 6, "mean": 1500.0, "variance": 0.0}}
+
+        mean, std = monthly_category_moments(stats, observed_days=182.625)
+
+        assert mean == pytest.approx([150.0 * 26 / 6, 1500.0])
+        assert std == pytest.approx([20.0 * np.sqrt(26 / 6), 0.0])
+        # Less than a month of history counts as one month
+        assert monthly_category_moments(stats, observed_days=10)[0] == pytest.approx([3900.0, 9000.0])
+        assert monthly_category_moments(stats, observed_days=None)[0].tolist() == [150.0, 1500.0]
+
+    def test_weekly_pay_is_not_projected_as_monthly(self, db_session, test_user, behaviour_model):
+        # About 3,900 a month in weekly paychecks covers 2,800 of spending
+        behaviour_model.monthly_patterns = {"income_stats": {
+            "count": 12, "mean": 900.0, "variance": 10000.0, "std_dev": 100.0,
+            "income_frequency_days": [7, 6, 8, 7, 7, 7, 7, 6, 8, 7, 7]
+        }}
+        db_session.commit()
+
+        result = project_future_spending(db_session, test_user.id, projection_months=6)
+
+        assert result.negative_balance_probability < 0.05
+
+    def test_simulation_is_fast_per_user(self):
+        engine = MonteCarloEngine(3500.0, 500.0, np.full(20, 150.0), np.full(20, 40.0), paths=2000, seed=1)
+
+        started = time.perf_counter()
+        engine.simulate(months=24, starting_balance=1000.0)
+        elapsed = time.perf_counter() - started
+
+        assert elapsed < 0.5
+
+
+class TestProjectionBands:
+
+    def test_projection_reports_percentile_bands(self, db_session, test_user, behaviour_model):
+        result = project_future_spending(db_session, test_user.id, projection_months=6, current_balance=500.0)
+
+        assert result.baseline_monthly == Decimal("2800.0")
+        assert len(result.monthly_projections) == 6
+        for month in result.monthly_projections:
+            assert month.spending_p10 <= month.projected_spending <= month.spending_p90
+            assert float(month.projected_spending) == pytest.approx(2800.0, rel=0.03)
+            assert month.category_breakdown["RENT"] == Decimal("1800.0")
+        # Income of 3500 +/- 500 against 2800 of spending rarely dips below zero
+        assert result.negative_balance_probability is not None
+        assert result.negative_balance_probability < 0.2
+        assert len(result.projection_chart["projected_p10"]) == 6
+
+    def test_projection_is_deterministic_per_user(self, db_session, test_user, behaviour_model):
+        first = project_future_spending(db_session, test_user.id, projection_months=3, behavioral_changes={"DINING": -20})
+        second = project_future_spending(db_session, test_user.id, projection_months=3, behavioral_changes={"DINING": -20})
+
+        assert first.monthly_projections == second.monthly_projections
+        assert float(first.monthly_projections[0].category_breakdown["DINING"]) == pytest.approx(320.0, rel=0.02)
+
+    def test_projection_without_income_has_no_balance_probability(self, db_session, test_user, behaviour_model):
+        behaviour_model.monthly_patterns = {}
+        db_session.commit()
+
+        result = project_future_spending(db_session, test_user.id, projection_months=2)
+
+        assert result.negative_balance_probability is None
+        assert all(m.negative_balance_probability is None for m in result.monthly_projections)
+
+
+class TestForecastBands:
+
+    @pytest.fixture
+    def volatile_history(self, db_session, test_user):
+        now = datetime.utcnow()
+        incomes = [4200, 1500, 3900, 1200, 4500, 1800]
+        for months_ago, income in enumerate(incomes):
+            ts = now - timedelta(days=30 * months_ago + 2)
+            db_session.add(Transaction(user_id=test_user.id, amount=Decimal(income), type="credit",
+                                       merchant="Client A", timestamp=ts))
+            db_session.add(Transaction(user_id=test_user.id, amount=Decimal("2600"), type="debit",
+                                       merchant="Rent", timestamp=ts))
+        db_session.commit()
+
+    def test_forecast_bands_come_from_simulated_paths(self, db_session, test_user, volatile_history):
+        forecast = LeanWeekPredictor().forecast_cash_flow(db_session, test_user.id, forecast_periods=3,
+                                                          current_balance=1000.0)
+
+        assert len(forecast['forecasts']) == 3
+        probabilities = [period['negative_balance_probability'] for period in forecast['forecasts']]
+        assert probabilities == sorted(probabilities)
+        assert 0 < forecast['negative_balance_probability'] <= 1
+        for period in forecast['forecasts']:
+            for key in ('income', 'net_cash_flow', 'projected_balance'):
+                band = period[key]
+                assert band['worst'] <= band['likely'] <= band['best']
+            assert period['expenses']['best'] <= period['expenses']['likely'] <= period['expenses']['worst']
+            assert period['is_lean_period'] == (period['net_cash_flow']['worst'] < 0)
+        assert any('CRITICAL' in warning for warning in forecast['warnings'])
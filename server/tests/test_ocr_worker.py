@@ -0,0 +1,251 @@
+"""
+Tests for the OCR media job queue worker and webhook enqueueing
+"""
+import asyncio
+
+import pytest
+
+from app.routers import twilio_webhook
+from app.services.job_queue import ConcurrencyLimiter
+from app.services.ocr_worker import OCRWorker, OCR_JOB_TYPE, OCR_PRIORITY_INTERACTIVE
+
+
+class FakeQueue:
+    """In-memory stand-in for JobQueue"""
+
+    def __init__(self, jobs):
+        self.jobs = list(jobs)
+        self.completed = {}
+        self.failed = {}
+        self.requeued = []
+
+    def dequeue(self, timeout: int = 0):
+        return self.jobs.pop(0) if self.jobs else None
+
+    def complete_job(self, job_id, result=None):
+        self.completed[job_id] = result
+
+    def fail_job(self, job_id, error, retry=True):
+        self.failed[job_id] = (error, retry)
+
+    def requeue_job(self, job_id, reason=""):
+        self.requeued.append((job_id, reason))
+
+
+class FakeLimiter:
+    """Per-key limit of one running job"""
+
+    def __init__(self, global_limit=10):
+        self.global_limit = global_limit
+        self.active = {}
+
+    def at_global_limit(self):
+        return sum(self.active.values()) >= self.global_limit
+
+    def acquire(self, key):
+        if self.active.get(key) or self.at_global_limit():
+            return None
+        self.active[key] = 1
+        return f"slot-{key}"
+
+    def release(self, key, slot):
+        assert slot == f"slot-{key}"
+        self.active[key] = 0
+
+
+def make_job(job_id, from_number="whatsapp:+911234567890"):
+    return {
+        "job_id": job_id,
+        "job_type": OCR_JOB_TYPE,
+        "data": {"from_number": from_number, "media_url": "https://example.com/m", "content_type": "image/jpeg"},
+    }
+
+
+class TestOCRWorker:
+
+    def test_runs_jobs_and_records_results(self):
+        queue = FakeQueue([make_job("a"), make_job("b", "whatsapp:+919876543210")])
+        worker = OCRWorker(queue, FakeLimiter(), concurrency=2)
+
+        async def fake_process(data):
+            return {"status": "success", "from": data["from_number"]}
+
+        worker.process_media = fake_process
+
+        async def scenario():
+            assert await worker.poll_once()
+            assert await worker.poll_once()
+            await asyncio.gather(*worker._tasks)
+
+        asyncio.run(scenario())
+        assert set(queue.completed) == {"a", "b"}
+
+    def test_per_user_limit_requeues_job(self):
+        queue = FakeQueue([make_job("a"), make_job("b")])
+        limiter = FakeLimiter()
+        worker = OCRWorker(queue, limiter, concurrency=4)
+        release = asyncio.Event()
+
+        async def slow_process(data):
+            await release.wait()
+            return {"status": "success"}
+
+        worker.process_media = slow_process
+
+        async def scenario():
+            assert await worker.poll_once()
+            # Same sender already has a job running
+            assert not await worker.poll_once()
+            release.set()
+            await asyncio.gather(*worker._tasks)
+
+        asyncio.run(scenario())
+        assert queue.requeued == [("b", "concurrency_limit")]
+        assert list(queue.completed) == ["a"]
+        assert limiter.active["whatsapp:+911234567890"] == 0
+
+    def test_blocked_sender_does_not_hold_back_other_senders(self):
+        queue = FakeQueue([
+            make_job("a"), make_job("b"), make_job("c"), make_job("d", "whatsapp:+919876543210"),
+        ])
+        worker = OCRWorker(queue, FakeLimiter(), concurrency=4)
+        release = asyncio.Event()
+
+        async def slow_process(data):
+            await release.wait()
+            return {"status": "success"}
+
+        worker.process_media = slow_process
+
+        async def scenario():
+            assert await worker.poll_once()
+            # The first sender's burst is set aside and the other sender's job runs in the same poll
+            assert await worker.poll_once()
+            release.set()
+            await asyncio.gather(*worker._tasks)
+
+        asyncio.run(scenario())
+        assert queue.requeued == [("b", "concurrency_limit"), ("c", "concurrency_limit")]
+        assert set(queue.completed) == {"a", "d"}
+
+    def test_stops_scanning_at_global_limit(self):
+        queue = FakeQueue([make_job("a"), make_job("b", "whatsapp:+919876543210"), make_job("c", "whatsapp:+910000000000")])
+        worker = OCRWorker(queue, FakeLimiter(global_limit=1), concurrency=4)
+        release = asyncio.Event()
+
+        async def slow_process(data):
+            await release.wait()
+            return {"status": "success"}
+
+        worker.process_media = slow_process
+
+        async def scenario():
+            assert await worker.poll_once()
+            assert not await worker.poll_once()
+            release.set()
+            await asyncio.gather(*worker._tasks)
+
+        asyncio.run(scenario())
+        assert queue.requeued == [("b", "concurrency_limit")]
+        assert [job["job_id"] for job in queue.jobs] == ["c"]
+
+    def test_reported_failures_are_not_retried(self):
+        queue = FakeQueue([make_job("a")])
+        worker = OCRWorker(queue, FakeLimiter())
+
+        async def failing_process(data):
+            return {"status": "failed", "reason": "user_not_found"}
+
+        worker.process_media = failing_process
+
+        async def scenario():
+            await worker.poll_once()
+            await asyncio.gather(*worker._tasks)
+
+        asyncio.run(scenario())
+        assert queue.failed == {"a": ("user_not_found", False)}
+
+
+class TestConcurrencyLimiter:
+    """Leased slots, run through the real Lua script"""
+
+    @pytest.fixture
+    def limiter(self):
+        fakeredis = pytest.importorskip("fakeredis")
+        pytest.importorskip("lupa")
+        return ConcurrencyLimiter(
+            fakeredis.FakeRedis(decode_responses=True), name="ocr", global_limit=2, per_key_limit=1, slot_ttl=60
+        )
+
+    def test_limits_and_release(self, limiter):
+        slot = limiter.acquire("alice", now=0)
+
+        assert slot is not None
+        assert limiter.acquire("alice", now=1) is None
+        assert limiter.acquire("bob", now=1) is not None
+        # Global limit of two
+        assert limiter.acquire("carol", now=1) is None
+
+        assert limiter.at_global_limit(now=1)
+
+        limiter.release("alice", slot)
+        assert not limiter.at_global_limit(now=2)
+        assert limiter.acquire("carol", now=2) is not None
+
+    def test_leaked_slot_expires_under_steady_load(self, limiter):
+        # Taken by a worker that crashed and never released it
+        assert limiter.acquire("alice", now=0) is not None
+
+        # Other jobs keep acquiring and releasing the remaining slot
+        for now in range(0, 60, 5):
+            assert limiter.acquire("alice", now=now) is None
+            slot = limiter.acquire(f"user-{now}", now=now)
+            assert slot is not None
+            limiter.release(f"user-{now}", slot)
+
+        assert limiter.acquire("alice", now=60) is not None
+        assert limiter.redis_client.zcard("ocr:slots") == 1
+
+
+class TestWebhookEnqueue:
+
+    def post_media(self, client):
+        return client.post("/twilio/whatsapp/webhook", data={
+            "From": "whatsapp:+911234567890",
+            "NumMedia": "1",
+            "MediaUrl0": "https://example.com/media",
+            "MediaContentType0": "image/jpeg",
+        })
+
+    def test_media_is_enqueued_with_interactive_priority(self, client, monkeypatch):
+        calls = []
+        monkeypatch.setattr(
+            twilio_webhook, "enqueue_media_job",
+            lambda *args, **kwargs: calls.append((args, kwargs)) or "job-1"
+        )
+
+        response = self.post_media(client)
+
+        assert response.status_code == 200
+        assert "Receipt Received" in response.text
+        assert calls == [(
+            ("whatsapp:+911234567890", "https://example.com/media", "image/jpeg"),
+            {"priority": OCR_PRIORITY_INTERACTIVE},
+        )]
+
+    def test_falls_back_to_background_task_when_queue_is_down(self, client, monkeypatch):
+        processed = []
+
+        def broken_enqueue(*args, **kwargs):
+            raise ConnectionError("redis down")
+
+        async def fake_process(**kwargs):
+            processed.append(kwargs)
+
+        monkeypatch.setattr(twilio_webhook, "enqueue_media_job", broken_enqueue)
+        monkeypatch.setattr(twilio_webhook, "process_media_ocr", fake_process)
+
+        response = self.post_media(client)
+
+        assert response.status_code == 200
+        assert processed and processed[0]["media_url"] == "https://example.com/media"
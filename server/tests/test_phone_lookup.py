@@ -0,0 +1,109 @@
+"""
+Tests for phone normalisation and WhatsApp user lookup
+"""
+import pytest
+from fastapi import status
+from sqlalchemy import event
+
+from app.models.user import User
+from app.services.user_lookup import find_user_by_phone, clear_phone_cache
+from app.utils.phone import has_country_code, normalize_phone
+
+
+@pytest.fixture(autouse=True)
+def empty_phone_cache():
+    clear_phone_cache()
+    yield
+    clear_phone_cache()
+
+
+class TestNormalizePhone:
+
+    @pytest.mark.parametrize("raw, expected", [
+        ("9876543210", "+919876543210"),
+        ("98765 43210", "+919876543210"),
+        ("09876543210", "+919876543210"),
+        ("+91-98765-43210", "+919876543210"),
+        ("whatsapp:+919876543210", "+919876543210"),
+        ("0091 98765 43210", "+919876543210"),
+        ("+1 (415) 555-1234", "+14155551234"),
+        ("+1234567890", "+1234567890"),
+    ])
+    def test_formats(self, raw, expected):
+        assert normalize_phone(raw) == expected
+
+    @pytest.mark.parametrize("raw", [None, "", "12345", "not a phone", "+1234567890123456"])
+    def test_invalid(self, raw):
+        assert normalize_phone(raw) is None
+
+    @pytest.mark.parametrize("raw, expected", [
+        ("+91 98765 43210", True),
+        ("whatsapp:+919876543210", True),
+        ("0091 98765 43210", True),
+        ("9876543210", False),
+        ("09876543210", False),
+        (None, False),
+    ])
+    def test_has_country_code(self, raw, expected):
+        assert has_country_code(raw) is expected
+
+    def test_default_country_code_override(self):
+        assert normalize_phone("4155551234", default_country_code="1") == "+14155551234"
+
+
+class TestFindUserByPhone:
+
+    def test_model_keeps_column_in_sync(self, db_session, test_user):
+        assert test_user.phone_e164 == "+911234567890"
+
+        test_user.phone_number = "+1 415 555 1234"
+        db_session.commit()
+        assert test_user.phone_e164 == "+14155551234"
+
+    def test_whatsapp_sender_matches_national_number(self, db_session, test_user):
+        assert find_user_by_phone(db_session, "whatsapp:+911234567890").id == test_user.id
+        assert find_user_by_phone(db_session, "whatsapp:+919999999999") is None
+
+    def test_single_query_then_cached(self, db_session, test_user):
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        engine = db_session.get_bind()
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            find_user_by_phone(db_session, "whatsapp:+911234567890")
+            first_lookup = len(statements)
+            find_user_by_phone(db_session, "whatsapp:+911234567890")
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+
+        assert first_lookup == 1
+        # Cached id is served from the session identity map
+        assert len(statements) == first_lookup
+
+    def test_stale_cache_entry_is_ignored(self, db_session, test_user, second_user):
+        assert find_user_by_phone(db_session, "+911234567890").id == test_user.id
+
+        # Number moves to another account
+        test_user.phone_number = "5550001111"
+        second_user.phone_number = "1234567890"
+        db_session.commit()
+
+        assert find_user_by_phone(db_session, "+911234567890").id == second_user.id
+
+
+def test_register_rejects_duplicate_phone(client, test_user):
+    response = client.post(
+        "/auth/register",
+        json={
+            "name": "Same Phone",
+            "email": "samephone@example.com",
+            "phone_number": "+91 12345 67890",
+            "password": "password123"
+        }
+    )
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "phone" in response.json()["detail"].lower()
@@ -0,0 +1,168 @@
+"""
+Query-plan regression tests for per-user transaction scans.
+
+Seeds a large SQLite database (QUERY_PLAN_ROWS rows, 1M by default), runs the
+real analytics/dedup code paths, and checks with EXPLAIN QUERY PLAN that each
+statement they issue searches one of the composite transaction indexes
+instead of scanning the table.
+"""
+import os
+import random
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models.transactions import Transaction
+from app.schemas.transaction_schemas import TransactionCreate
+from app.services.lean_week_predictor import LeanWeekPredictor
+from app.services.transaction_import import find_duplicates
+
+pytestmark = pytest.mark.slow
+
+ROW_COUNT = int(os.getenv("QUERY_PLAN_ROWS", "1000000"))
+USER_COUNT = 2000
+USER_ID = 42
+
+
+@pytest.fixture(scope="module")
+def seeded_engine(tmp_path_factory):
+    path = tmp_path_factory.mktemp("plans") / "plans.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+
+    rng = random.Random(7)
+    start = datetime.utcnow() - timedelta(days=730)
+
+    def rows():
+        for i in range(ROW_COUNT):
+            yield (
+                i % USER_COUNT + 1,
+                round(rng.uniform(10, 5000), 2),
+                "credit" if i % 5 == 0 else "debit",
+                (start + timedelta(minutes=rng.randrange(730 * 24 * 60))).isoformat(" "),
+                f"TXN{i}",
+                f"Merchant {i % 300}",
+            )
+
+    # Straight to the DBAPI connection so the rows are streamed, not materialised
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        cursor.executemany(
+            "INSERT INTO transactions (user_id, amount, type, timestamp, \"transactionId\", merchant) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            rows()
+        )
+        cursor.execute("ANALYZE")
+        raw.commit()
+    finally:
+        raw.close()
+
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def plan_session(seeded_engine):
+    session = sessionmaker(bind=seeded_engine)()
+    yield session
+    session.close()
+
+
+def capture_statements(engine, func):
+    """Run func and return the (statement, parameters) it sends to the database."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        func()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return statements
+
+
+def query_plan(engine, statement, parameters=()):
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+    return " | ".join(row[-1] for row in rows)
+
+
+def assert_index_search(plan, index_name):
+    assert f"INDEX {index_name}" in plan, plan
+    assert "SCAN transactions" not in plan, plan
+
+
+def test_monthly_and_weekly_cash_flow_use_user_timestamp_index(seeded_engine, plan_session):
+    predictor = LeanWeekPredictor()
+    statements = capture_statements(seeded_engine, lambda: (
+        predictor.get_monthly_cash_flow(plan_session, USER_ID, months=6),
+        predictor.get_weekly_cash_flow(plan_session, USER_ID, weeks=12),
+    ))
+
+    assert statements
+    for statement, parameters in statements:
+        plan = query_plan(seeded_engine, statement, parameters)
+        if "FROM cash_flow_rollups" in statement:
+            assert "INDEX uq_cash_flow_rollups_user_period" in plan, plan
+        else:
+            assert_index_search(plan, "ix_transactions_user_id_timestamp")
+
+
+def test_date_range_is_ordered_by_index(seeded_engine):
+    end = datetime.utcnow()
+    stmt = select(Transaction).where(
+        Transaction.user_id == USER_ID,
+        Transaction.timestamp >= end - timedelta(days=30),
+        Transaction.timestamp <= end
+    ).order_by(Transaction.timestamp.desc())
+    compiled = stmt.compile(seeded_engine)
+
+    plan = query_plan(seeded_engine, str(compiled), tuple(compiled.params[k] for k in compiled.positiontup))
+
+    assert_index_search(plan, "ix_transactions_user_id_timestamp")
+    assert "TEMP B-TREE" not in plan, plan
+
+
+def test_debit_window_uses_user_type_timestamp_index(seeded_engine):
+    # Same filter as the scenario/projection/comparison simulations
+    stmt = select(Transaction).where(
+        Transaction.user_id == USER_ID,
+        Transaction.type == "debit",
+        Transaction.timestamp >= datetime.utcnow() - timedelta(days=30)
+    )
+    compiled = stmt.compile(seeded_engine)
+
+    plan = query_plan(seeded_engine, str(compiled), tuple(compiled.params[k] for k in compiled.positiontup))
+
+    assert_index_search(plan, "ix_transactions_user_id_type_timestamp")
+
+
+def test_bulk_dedup_uses_composite_indexes(seeded_engine, plan_session):
+    incoming = [
+        TransactionCreate(
+            user_id=USER_ID,
+            amount=Decimal("100.00"),
+            type="debit",
+            merchant="Merchant 1",
+            transactionId=f"NEW{i}",
+            timestamp=datetime.utcnow() - timedelta(days=i)
+        )
+        for i in range(20)
+    ]
+    statements = capture_statements(
+        seeded_engine, lambda: find_duplicates(plan_session, USER_ID, incoming)
+    )
+
+    assert len(statements) == 2
+    id_plan = query_plan(seeded_engine, *statements[0])
+    window_plan = query_plan(seeded_engine, *statements[1])
+    assert_index_search(id_plan, "uq_transactions_user_id_transaction_id")
+    assert_index_search(window_plan, "ix_transactions_user_id_timestamp")
@@ -0,0 +1,174 @@
+"""
+Tests for the refined insight cache and the SSE refinement endpoints.
+Gemini is replaced by a pydantic_ai FunctionModel through Agent.override.
+"""
+import asyncio
+import json
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from fastapi import status
+from pydantic_ai.messages import ModelResponse, TextPart
+from pydantic_ai.models.function import FunctionModel
+
+from app.api import simulation_routes
+from app.models.behaviour import BehaviourModel
+from app.models.transactions import Transaction
+from app.services.simulations import simulate_spending_scenario
+from app.services.simulations.refinement import RefinementCache, RefinementService, payload_hash
+
+TOKENS = ["Cutting ", "**dining** ", "saves ", "$84/month."]
+
+
+class FakeGemini:
+    """Counts model calls; streams TOKENS or returns them joined."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def run(self, messages, info):
+        self.calls += 1
+        return ModelResponse(parts=[TextPart("".join(TOKENS))])
+
+    async def stream(self, messages, info):
+        self.calls += 1
+        for token in TOKENS:
+            yield token
+
+    @property
+    def model(self):
+        return FunctionModel(self.run, stream_function=self.stream)
+
+
+@pytest.fixture
+def gemini():
+    fake = FakeGemini()
+    with RefinementService().agent.override(model=fake.model):
+        yield fake
+
+
+@pytest.fixture
+def service(monkeypatch):
+    refinement = RefinementService(cache=RefinementCache())
+    monkeypatch.setattr(simulation_routes, "refinement_service", refinement)
+    return refinement
+
+
+@pytest.fixture
+def behaviour_model(db_session, test_user):
+    db_session.add(BehaviourModel(
+        user_id=test_user.id,
+        category_stats={"DINING": {"mean": 420.0, "variance": 900.0, "count": 18},
+                        "GROCERIES": {"mean": 610.0, "variance": 2500.0, "count": 25}},
+        elasticity={"DINING": 0.7}, impulse_score=0.4, monthly_patterns={}
+    ))
+    for i in range(4):
+        db_session.add(Transaction(user_id=test_user.id, amount=Decimal("250"), type="debit",
+                                   timestamp=datetime.utcnow() - timedelta(days=i)))
+    db_session.commit()
+
+
+def parse_events(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def simulate(client, auth_headers, user_id, suffix, payload=None):
+    return client.post(f"/api/users/{user_id}/simulate/{suffix}", headers=auth_headers,
+                       json=payload or {"target_percent": 15})
+
+
+class TestPayloadHash:
+
+    def test_hash_ignores_key_order(self, db_session, test_user, behaviour_model):
+        result = simulate_spending_scenario(db_session, test_user.id, "reduction", 15)
+        reordered = result.model_copy(update={
+            "category_breakdown": dict(reversed(list(result.category_breakdown.items())))
+        })
+
+        assert list(reordered.category_breakdown) != list(result.category_breakdown)
+        assert payload_hash(reordered) == payload_hash(result)
+        assert payload_hash(result.model_copy(update={"target_percent": 16})) != payload_hash(result)
+
+
+class TestRefinedEndpoints:
+
+    def test_repeat_simulation_reuses_insight(self, client, auth_headers, test_user, behaviour_model, gemini, service):
+        first = simulate(client, auth_headers, test_user.id, "refined")
+        second = simulate(client, auth_headers, test_user.id, "refined")
+
+        assert first.status_code == status.HTTP_200_OK
+        assert first.json()["refined_insight"] == "".join(TOKENS)
+        assert second.json() == first.json()
+        assert gemini.calls == 1
+
+        simulate(client, auth_headers, test_user.id, "refined", {"target_percent": 25})
+        assert gemini.calls == 2
+
+    def test_compare_refined_is_cached(self, client, auth_headers, test_user, behaviour_model, gemini, service):
+        for _ in range(2):
+            response = simulate(client, auth_headers, test_user.id, "compare/refined", {"num_scenarios": 3})
+            assert response.status_code == status.HTTP_200_OK
+        assert gemini.calls == 1
+
+    def test_stream_sends_result_then_tokens(self, client, auth_headers, test_user, behaviour_model, gemini, service):
+        response = simulate(client, auth_headers, test_user.id, "refined/stream")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = parse_events(response.text)
+        assert events[0][0] == "simulation"
+        assert events[0][1]["target_percent"] == 15
+        assert [data for name, data in events if name == "token"] == TOKENS
+        assert events[-1] == ("done", {"refined_insight": "".join(TOKENS)})
+
+        # Streamed text is cached for both endpoints
+        assert simulate(client, auth_headers, test_user.id, "refined").json()["refined_insight"] == "".join(TOKENS)
+        repeat = parse_events(simulate(client, auth_headers, test_user.id, "refined/stream").text)
+        assert [name for name, _ in repeat] == ["simulation", "token", "done"]
+        assert gemini.calls == 1
+
+    def test_compare_stream(self, client, auth_headers, test_user, behaviour_model, gemini, service):
+        response = simulate(client, auth_headers, test_user.id, "compare/refined/stream", {"num_scenarios": 2})
+
+        events = parse_events(response.text)
+        assert events[0][0] == "comparison"
+        assert len(events[0][1]["scenarios"]) == 2
+        assert events[-1][0] == "done"
+
+    def test_stream_errors(self, client, auth_headers, test_user, behaviour_model, service):
+        async def failing(messages, info):
+            raise RuntimeError("quota exceeded")
+            yield  # pragma: no cover
+
+        with RefinementService().agent.override(model=FunctionModel(stream_function=failing)):
+            events = parse_events(simulate(client, auth_headers, test_user.id, "refined/stream").text)
+
+        assert [name for name, _ in events] == ["simulation", "error"]
+        assert "quota exceeded" in events[-1][1]["detail"]
+
+        missing = simulate(client, auth_headers, test_user.id, "refined/stream",
+                           {"target_percent": 15, "target_categories": ["TRAVEL"]})
+        assert missing.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_failed_stream_is_not_cached(db_session, test_user, behaviour_model):
+    result = simulate_spending_scenario(db_session, test_user.id, "reduction", 15)
+    service = RefinementService(cache=RefinementCache())
+
+    async def broken(messages, info):
+        yield "partial "
+        raise RuntimeError("connection reset")
+
+    async def consume():
+        return [delta async for delta in service.stream_insight(result)]
+
+    with service.agent.override(model=FunctionModel(stream_function=broken)):
+        with pytest.raises(RuntimeError):
+            asyncio.run(consume())
+
+    assert asyncio.run(service.cache.get(result)) is None
@@ -0,0 +1,159 @@
+"""
+Tests for the vectorised ScenarioEngine.
+
+reference_breakdown below is the previous per-category Python loop of
+simulate_spending_scenario; the engine must produce the same numbers.
+"""
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+
+from app.models.behaviour import BehaviourModel
+from app.models.transactions import Transaction
+from app.services.simulations import (
+    ScenarioEngine,
+    compare_scenarios,
+    generate_increase_scenarios,
+    generate_reduction_scenarios,
+    simulate_spending_scenario
+)
+from app.utils.constants import DISCRETIONARY_CATEGORIES, ESSENTIAL_CATEGORIES
+
+CATEGORY_STATS = {
+    "DINING": {"mean": 420.0, "variance": 900.0, "count": 18},
+    "GROCERIES": {"mean": 610.5, "variance": 2500.0, "count": 25},
+    "ENTERTAINMENT": {"mean": 150.0, "variance": 40000.0, "count": 6},
+    "RENT": {"mean": 1800.0, "variance": 0.0, "count": 3},
+    "SHOPPING": {"mean": 275.25, "variance": 1200.0, "count": 11},
+    "SOFTWARE": {"mean": 89.99, "variance": 10.0, "count": 4},
+}
+ELASTICITY = {"DINING": 0.7, "GROCERIES": 0.2, "ENTERTAINMENT": 0.8, "RENT": 0.05, "SHOPPING": 0.6}
+
+
+def reference_breakdown(model, scenario_type, target_percent, categories):
+    stats = model.category_stats
+    breakdown = {}
+    total = 0
+    for category in categories:
+        mean_spending = stats[category].get("mean", 0)
+        elasticity = model.elasticity.get(category, 0.3)
+        if scenario_type == "reduction":
+            max_pct = elasticity * 100
+            achievable = min(target_percent, max_pct)
+            if category in DISCRETIONARY_CATEGORIES:
+                achievable = min(achievable + model.impulse_score * 15, max_pct)
+        else:
+            if category in ESSENTIAL_CATEGORIES:
+                max_pct = min(50, elasticity * 80)
+            else:
+                max_pct = min(200, elasticity * 150)
+            achievable = min(target_percent, max_pct)
+        change = mean_spending * (achievable / 100)
+        total += change
+        count = stats[category].get("count", 0)
+        variance = stats[category].get("variance", 0)
+        confidence = max(0.0, min(1.0, (count / 20) * (1 - variance / (mean_spending ** 2 + 1))))
+        if achievable >= target_percent * 0.9:
+            difficulty = "easy"
+        elif achievable >= target_percent * 0.6:
+            difficulty = "moderate"
+        else:
+            difficulty = "challenging"
+        breakdown[category] = (round(mean_spending, 2), round(max_pct, 1), round(achievable, 1),
+                               round(change, 2), round(confidence, 2), difficulty)
+    return breakdown, total
+
+
+@pytest.fixture
+def behaviour_model(db_session, test_user):
+    model = BehaviourModel(user_id=test_user.id, category_stats=CATEGORY_STATS, elasticity=ELASTICITY,
+                           impulse_score=0.65, monthly_patterns={})
+    db_session.add(model)
+    now = datetime.utcnow()
+    for i in range(12):
+        db_session.add(Transaction(user_id=test_user.id, amount=Decimal("250.40"), type="debit",
+                                   category="DINING", timestamp=now - timedelta(days=i * 2)))
+    db_session.add(Transaction(user_id=test_user.id, amount=Decimal("9999.00"), type="debit",
+                               timestamp=now - timedelta(days=90)))
+    db_session.commit()
+    return model
+
+
+class TestScenarioEngine:
+
+    @pytest.mark.parametrize("scenario_type", ["reduction", "increase"])
+    @pytest.mark.parametrize("target_percent", [5.0, 10.0, 35.0, 80.0])
+    @pytest.mark.parametrize("target_categories", [None, ["DINING", "RENT", "UNKNOWN"]])
+    def test_matches_per_category_loop(self, db_session, test_user, behaviour_model,
+                                       scenario_type, target_percent, target_categories):
+        result = simulate_spending_scenario(db_session, test_user.id, scenario_type, target_percent,
+                                            target_categories=target_categories)
+
+        categories = [c for c in (target_categories or CATEGORY_STATS) if c in CATEGORY_STATS]
+        expected, total = reference_breakdown(behaviour_model, scenario_type, target_percent, categories)
+        actual = {
+            category: (float(a.current_monthly), a.max_reduction_pct, a.achievable_reduction_pct,
+                       float(a.monthly_savings), a.confidence, a.difficulty)
+            for category, a in result.category_breakdown.items()
+        }
+        assert actual == expected
+        assert float(result.baseline_monthly) == pytest.approx(12 * 250.40)
+        assert float(result.total_change) == round(total, 2)
+        assert result.achievable_percent == round(total / (12 * 250.40) * 100, 1)
+
+    def test_unknown_categories_only(self, db_session, test_user, behaviour_model):
+        with pytest.raises(ValueError, match="None of the specified categories"):
+            simulate_spending_scenario(db_session, test_user.id, "reduction", 10.0, target_categories=["NOPE"])
+
+    def test_missing_model_and_baseline(self, db_session, test_user):
+        with pytest.raises(ValueError, match="No behavior model"):
+            ScenarioEngine.load(db_session, test_user.id)
+
+        db_session.add(BehaviourModel(user_id=test_user.id, category_stats=CATEGORY_STATS))
+        db_session.commit()
+        with pytest.raises(ValueError, match="No transactions"):
+            ScenarioEngine.load(db_session, test_user.id)
+
+    def test_evaluate_is_one_matrix_pass(self, db_session, test_user, behaviour_model):
+        engine = ScenarioEngine.load(db_session, test_user.id)
+
+        result = engine.evaluate("reduction", [10.0, 20.0, 35.0], [None, ["DINING"], None])
+
+        assert result["achievable_pct"].shape == (3, len(CATEGORY_STATS))
+        assert result["selected"][1].sum() == 1
+        singles = [engine.simulate("reduction", t, c) for t, c in [(10.0, None), (20.0, ["DINING"]), (35.0, None)]]
+        assert [float(s.total_change) for s in singles] == [round(float(t), 2) for t in result["total_change"]]
+
+
+class TestCompareScenarios:
+
+    @pytest.mark.parametrize("scenario_type", ["reduction", "increase"])
+    def test_compare_reads_database_once(self, db_session, test_user, behaviour_model, scenario_type):
+        user_id = test_user.id
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        engine = db_session.get_bind()
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            comparison = compare_scenarios(db_session, user_id, scenario_type, num_scenarios=5)
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+
+        # Behaviour model + baseline aggregate, regardless of the number of scenarios
+        assert len(statements) == 2
+        assert len(comparison.scenarios) == 5
+
+        generate = generate_reduction_scenarios if scenario_type == "reduction" else generate_increase_scenarios
+        configs = generate(5, CATEGORY_STATS, ELASTICITY)
+        for summary, config in zip(comparison.scenarios, configs):
+            single = simulate_spending_scenario(db_session, user_id, scenario_type, config["target_percent"],
+                                                target_categories=config["target_categories"])
+            assert summary.scenario_id == config["id"]
+            assert summary.achievable_percent == single.achievable_percent
+            assert summary.total_change == single.total_change
+            assert summary.feasibility == single.feasibility
@@ -0,0 +1,114 @@
+"""
+Tests for the cached simulation spending baseline.
+"""
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+
+from app.models.behaviour import BehaviourModel
+from app.models.transactions import Transaction
+from app.services.simulations import (
+    project_future_spending,
+    simulate_reallocation,
+    simulate_spending_scenario
+)
+from app.services.simulations.baseline import spending_baseline
+
+CATEGORY_STATS = {
+    "DINING": {"mean": 400.0, "variance": 900.0, "count": 18},
+    "HEALTHCARE": {"mean": 150.0, "variance": 100.0, "count": 4},
+}
+
+
+@pytest.fixture
+def debits(db_session, test_user, second_user):
+    now = datetime.utcnow()
+    db_session.add_all([
+        Transaction(user_id=test_user.id, amount=Decimal("100.25"), type="debit", timestamp=now - timedelta(days=1)),
+        Transaction(user_id=test_user.id, amount=Decimal("49.75"), type="debit", timestamp=now - timedelta(days=20)),
+        Transaction(user_id=test_user.id, amount=Decimal("999"), type="debit", timestamp=now - timedelta(days=45)),
+        Transaction(user_id=test_user.id, amount=Decimal("500"), type="credit", timestamp=now - timedelta(days=2)),
+        Transaction(user_id=second_user.id, amount=Decimal("77"), type="debit", timestamp=now - timedelta(days=2)),
+    ])
+    db_session.add(BehaviourModel(user_id=test_user.id, category_stats=CATEGORY_STATS, elasticity={},
+                                  impulse_score=0.3, monthly_patterns={}))
+    db_session.commit()
+
+
+def record_statements(db_session, func):
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    engine = db_session.get_bind()
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        result = func()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return result, statements
+
+
+class TestSpendingBaseline:
+
+    def test_sums_debits_in_period(self, db_session, test_user, debits):
+        assert spending_baseline(db_session, test_user.id, 30)[:2] == (2, 150.0)
+        assert spending_baseline(db_session, test_user.id, 60)[:2] == (3, 1149.0)
+
+    def test_history_covers_all_debits(self, db_session, test_user, second_user, debits):
+        assert spending_baseline(db_session, test_user.id, 30).history_days == pytest.approx(45, abs=0.01)
+        assert spending_baseline(db_session, second_user.id, 30).history_days == pytest.approx(2, abs=0.01)
+
+    def test_cached_per_data_version(self, db_session, test_user, debits):
+        user_id = test_user.id
+        spending_baseline(db_session, user_id, 30)
+
+        baseline, statements = record_statements(db_session, lambda: spending_baseline(db_session, user_id, 30))
+
+        # Only the data_version lookup
+        assert baseline[:2] == (2, 150.0)
+        assert len(statements) == 1 and "sum(" not in statements[0].lower()
+
+        db_session.add(Transaction(user_id=user_id, amount=Decimal("50"), type="debit",
+                                   timestamp=datetime.utcnow()))
+        db_session.commit()
+
+        assert spending_baseline(db_session, user_id, 30)[:2] == (3, 200.0)
+
+    def test_other_users_writes_keep_entry(self, db_session, test_user, second_user, debits):
+        user_id = test_user.id
+        spending_baseline(db_session, user_id, 30)
+        db_session.add(Transaction(user_id=second_user.id, amount=Decimal("5"), type="debit",
+                                   timestamp=datetime.utcnow()))
+        db_session.commit()
+
+        _, statements = record_statements(db_session, lambda: spending_baseline(db_session, user_id, 30))
+
+        assert len(statements) == 1
+
+
+class TestSimulationsUseBaseline:
+
+    def test_warm_simulations_skip_the_aggregate(self, db_session, test_user, debits):
+        user_id = test_user.id
+        simulate_spending_scenario(db_session, user_id, "reduction", 10)
+
+        results, statements = record_statements(db_session, lambda: (
+            simulate_spending_scenario(db_session, user_id, "reduction", 20),
+            simulate_reallocation(db_session, user_id, {"DINING": -100, "HEALTHCARE": 100}),
+            project_future_spending(db_session, user_id, projection_months=2),
+        ))
+
+        # One behaviour model + data_version query each
+        assert len(statements) == 3
+        assert all("FROM behaviour_models" in statement for statement in statements)
+        assert all(float(result.baseline_monthly) == 150.0 for result in results)
+
+    def test_reallocation_keeps_error_messages(self, db_session, test_user, second_user, debits):
+        with pytest.raises(ValueError, match="No behavior model"):
+            simulate_reallocation(db_session, second_user.id, {"DINING": -10, "HEALTHCARE": 10})
+        with pytest.raises(ValueError, match="No transactions found"):
+            simulate_reallocation(db_session, test_user.id, {"DINING": -10, "HEALTHCARE": 10}, time_period_days=0)
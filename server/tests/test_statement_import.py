@@ -0,0 +1,227 @@
+"""
+Tests for bank statement import and the shared bulk deduplication path
+"""
+import pymupdf
+from io import BytesIO
+from datetime import datetime
+from decimal import Decimal
+from fastapi import status
+
+from app.models.transactions import Transaction
+from app.schemas.transaction_schemas import TransactionCreate
+from app.services import statement_parser
+from app.services.statement_parser import (
+    parse_statement_pdf,
+    parse_statement_line,
+    resolve_row_types,
+)
+from app.services.transaction_import import find_duplicates
+
+
+COLUMNS = {"date": 40, "narration": 110, "debit": 330, "credit": 410, "balance": 490}
+
+
+def make_statement_pdf(
+    pages: int,
+    rows_per_page: int = 5,
+    header_every_page: bool = True,
+    with_balance: bool = True
+) -> bytes:
+    """Build a tabular statement PDF with withdrawal/deposit (and balance) columns"""
+    doc = pymupdf.open()
+    balance = Decimal("10000.00")
+    day = 0
+    for page_num in range(pages):
+        page = doc.new_page()
+        y = 60
+        if page_num == 0:
+            page.insert_text((40, y), "HDFC Bank Account Statement", fontsize=10)
+            y += 20
+        if page_num == 0 or header_every_page:
+            for name, text in (("date", "Date"), ("narration", "Narration"), ("debit", "Withdrawal"),
+                               ("credit", "Deposit"), ("balance", "Balance")):
+                if name == "balance" and not with_balance:
+                    continue
+                page.insert_text((COLUMNS[name], y), text, fontsize=9)
+            y += 16
+        for _ in range(rows_per_page):
+            day += 1
+            is_credit = day % 3 == 0
+            amount = Decimal(f"{100 + day}.50")
+            balance = balance + amount if is_credit else balance - amount
+            date = f"{(day % 28) + 1:02d}/{(day // 28) % 12 + 1:02d}/2025"
+            page.insert_text((COLUMNS["date"], y), date, fontsize=9)
+            page.insert_text((COLUMNS["narration"], y), f"UPI MERCHANT {day}", fontsize=9)
+            column = "credit" if is_credit else "debit"
+            page.insert_text((COLUMNS[column], y), f"{amount:,.2f}", fontsize=9)
+            if with_balance:
+                page.insert_text((COLUMNS["balance"], y), f"{balance:,.2f}", fontsize=9)
+            y += 16
+    content = doc.tobytes()
+    doc.close()
+    return content
+
+
+def make_word(x0, text, y=100):
+    return (x0, y, x0 + 6 * len(text), y + 10, text, 0, 0, 0)
+
+
+class TestStatementParser:
+    """Row extraction from statement pages"""
+
+    def test_parses_rows_using_columns(self):
+        result = parse_statement_pdf(make_statement_pdf(pages=2), max_workers=1)
+
+        assert result["page_count"] == 2
+        assert result["bank_name"] == "HDFC Bank"
+        rows = result["rows"]
+        assert len(rows) == 10
+        assert rows[0]["amount"] == Decimal("101.50")
+        assert rows[0]["type"] == "debit"
+        assert rows[0]["merchant"] == "UPI MERCHANT 1"
+        assert rows[2]["type"] == "credit"
+        assert rows[2]["balance"] is not None
+
+    def test_process_pool_matches_inline_parse(self):
+        content = make_statement_pdf(pages=6, header_every_page=False)
+
+        inline = parse_statement_pdf(content, max_workers=1)
+        pooled = parse_statement_pdf(content, max_workers=3, inline_page_limit=0)
+
+        assert len(pooled["rows"]) == 30
+        assert pooled["rows"] == inline["rows"]
+
+    def test_pool_workers_use_header_from_first_page(self):
+        # Without a balance column only the header tells credits from debits
+        content = make_statement_pdf(pages=6, header_every_page=False, with_balance=False)
+
+        inline = parse_statement_pdf(content, max_workers=1)
+        pooled = parse_statement_pdf(content, max_workers=3, inline_page_limit=0)
+
+        assert pooled["rows"] == inline["rows"]
+        assert [row["type"] for row in pooled["rows"]].count("credit") == 10
+
+    def test_pool_is_shared_between_uploads(self):
+        content = make_statement_pdf(pages=3)
+        parse_statement_pdf(content, max_workers=3, inline_page_limit=0)
+        pool = statement_parser.get_statement_pool()
+
+        parse_statement_pdf(content, max_workers=3, inline_page_limit=0)
+        assert statement_parser.get_statement_pool() is pool
+
+        statement_parser.shutdown_statement_pool()
+        assert statement_parser.get_statement_pool() is not pool
+        statement_parser.shutdown_statement_pool()
+
+    def test_marker_and_balance_fallbacks(self):
+        marked = parse_statement_line([
+            make_word(10, "05-11-2025"), make_word(80, "NEFT"), make_word(120, "ACME"),
+            make_word(300, "5,000.00"), make_word(360, "Cr"), make_word(420, "15,000.00"),
+        ])
+        assert marked["type"] == "credit"
+        assert marked["amount"] == Decimal("5000.00")
+        assert marked["balance"] == Decimal("15000.00")
+
+        rows = resolve_row_types([
+            {"type": None, "balance": Decimal("1000.00"), "merchant": "Opening"},
+            {"type": None, "balance": Decimal("900.00"), "merchant": "Shop"},
+            {"type": None, "balance": Decimal("1400.00"), "merchant": "Refund"},
+        ])
+        assert [r["type"] for r in rows[1:]] == ["debit", "credit"]
+
+    def test_ignores_non_transaction_lines(self):
+        assert parse_statement_line([make_word(10, "Opening"), make_word(80, "Balance")]) is None
+        assert parse_statement_line([make_word(10, "01/10/2025"), make_word(80, "Summary")]) is None
+
+
+class TestBulkDeduplication:
+    """Set-based duplicate detection shared by bulk and statement imports"""
+
+    def test_matches_by_id_and_time_window(self, db_session, test_user):
+        db_session.add_all([
+            Transaction(user_id=test_user.id, amount=Decimal("50.00"), type="debit",
+                        transactionId="TXN1", timestamp=datetime(2025, 10, 1, 10, 0)),
+            Transaction(user_id=test_user.id, amount=Decimal("75.00"), type="debit",
+                        merchant="Cafe", timestamp=datetime(2025, 10, 2, 9, 0)),
+        ])
+        db_session.commit()
+
+        incoming = [
+            TransactionCreate(user_id=test_user.id, amount=Decimal("1.00"), type="debit", transactionId="TXN1"),
+            TransactionCreate(user_id=test_user.id, amount=Decimal("75.00"), type="debit",
+                              merchant="Cafe", timestamp=datetime(2025, 10, 2, 9, 3)),
+            TransactionCreate(user_id=test_user.id, amount=Decimal("75.00"), type="debit",
+                              merchant="Other", timestamp=datetime(2025, 10, 2, 9, 3)),
+            TransactionCreate(user_id=test_user.id, amount=Decimal("75.00"), type="debit",
+                              merchant="Cafe", timestamp=datetime(2025, 10, 2, 9, 10)),
+            TransactionCreate(user_id=test_user.id, amount=Decimal("75.00"), type="credit"),
+        ]
+
+        assert find_duplicates(db_session, test_user.id, incoming) == [True, True, False, False, False]
+
+    def test_repeated_id_within_batch(self, db_session, test_user):
+        incoming = [
+            TransactionCreate(user_id=test_user.id, amount=Decimal("10.00"), type="debit", transactionId="NEW1"),
+            TransactionCreate(user_id=test_user.id, amount=Decimal("20.00"), type="debit", transactionId="NEW1"),
+        ]
+
+        assert find_duplicates(db_session, test_user.id, incoming) == [False, True]
+
+    def test_bulk_endpoint_skips_duplicates(self, client, auth_headers, test_user, db_session):
+        payload = [{
+            "user_id": test_user.id,
+            "amount": 42.00,
+            "merchant": "Store",
+            "type": "debit",
+            "transactionId": "BULK-1",
+        }]
+        first = client.post("/transactions/bulk", json=payload, headers=auth_headers)
+        second = client.post("/transactions/bulk", json=payload, headers=auth_headers)
+
+        assert len(first.json()) == 1
+        assert second.status_code == status.HTTP_201_CREATED
+        assert second.json() == []
+
+
+class TestStatementImportEndpoint:
+    """POST /transactions/import/statement"""
+
+    def test_imports_and_deduplicates_statement(self, client, auth_headers, test_user, db_session):
+        initial_savings = test_user.savings
+        content = make_statement_pdf(pages=2)
+
+        response = client.post(
+            "/transactions/import/statement",
+            files={"file": ("statement.pdf", BytesIO(content), "application/pdf")},
+            headers=auth_headers
+        )
+
+        assert response.status_code == status.HTTP_201_CREATED
+        data = response.json()
+        assert data == {"pages": 2, "rows_found": 10, "imported": 10, "duplicates_skipped": 0, "rejected": 0}
+
+        stored = db_session.query(Transaction).filter(Transaction.user_id == test_user.id).all()
+        assert len(stored) == 10
+        assert all(t.bankName == "HDFC Bank" for t in stored)
+
+        credits = sum(t.amount for t in stored if t.type == "credit")
+        debits = sum(t.amount for t in stored if t.type == "debit")
+        db_session.refresh(test_user)
+        assert test_user.savings == initial_savings + credits - debits
+
+        # Uploading the same statement again imports nothing
+        response = client.post(
+            "/transactions/import/statement",
+            files={"file": ("statement.pdf", BytesIO(content), "application/pdf")},
+            headers=auth_headers
+        )
+        assert response.json()["imported"] == 0
+        assert response.json()["duplicates_skipped"] == 10
+
+    def test_rejects_non_pdf(self, client, auth_headers):
+        response = client.post(
+            "/transactions/import/statement",
+            files={"file": ("notes.txt", BytesIO(b"hello"), "text/plain")},
+            headers=auth_headers
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -119,6 +119,16 @@ class TestCreateTransaction:
         
         assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
     
+    def test_create_duplicate_transaction_id(self, client, auth_headers, created_transaction, sample_transaction_data):
+        """Test a transactionId can only be stored once per user"""
+        response = client.post(
+            "/transactions/",
+            json=sample_transaction_data,
+            headers=auth_headers
+        )
+        
+        assert response.status_code == status.HTTP_409_CONFLICT
+    
     def test_create_transaction_missing_required_fields(self, client, auth_headers, test_user):
         """Test creating transaction without required fields"""
         response = client.post(
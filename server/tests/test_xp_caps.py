@@ -0,0 +1,189 @@
+"""
+Tests for the Redis daily XP cap counters, their database fallback and batched awards.
+"""
+from datetime import datetime
+
+import pytest
+import redis
+from sqlalchemy import event
+
+from app.models.gamification import (
+    Achievement, EventType, GamificationEvent, UserAchievement, UserPoints
+)
+from app.services.gamification_service import DAILY_XP_CAPS, GamificationService, seed_achievements
+from app.services.xp_caps import DailyXPCounter
+
+
+class FakeRedis:
+    """Minimal sync stand-in for the counter commands."""
+
+    def __init__(self, fail: bool = False):
+        self.store = {}
+        self.expiry = {}
+        self.fail = fail
+
+    def _check(self):
+        if self.fail:
+            raise redis.ConnectionError("redis down")
+
+    def incrby(self, key, amount):
+        self._check()
+        self.store[key] = self.store.get(key, 0) + amount
+        return self.store[key]
+
+    def decrby(self, key, amount):
+        return self.incrby(key, -amount)
+
+    def expireat(self, key, when):
+        self._check()
+        self.expiry[key] = when
+
+
+@pytest.fixture
+def fake_redis():
+    return FakeRedis()
+
+
+@pytest.fixture
+def service(db_session, fake_redis):
+    return GamificationService(db_session, xp_counter=DailyXPCounter(redis_client=fake_redis))
+
+
+def count_sum_queries(db_session, func):
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        if "sum(" in statement.lower():
+            statements.append(statement)
+
+    engine = db_session.get_bind()
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        func()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return len(statements)
+
+
+class TestDailyXPCounter:
+
+    def test_cap_enforced_without_scanning_events(self, db_session, test_user, service, fake_redis):
+        cap = DAILY_XP_CAPS[EventType.TRANSACTION_IMPORTED]
+        service.award_event(test_user.id, EventType.TRANSACTION_IMPORTED)
+
+        awarded = []
+        sums = count_sum_queries(db_session, lambda: awarded.extend(
+            service.award_event(test_user.id, EventType.TRANSACTION_IMPORTED) for _ in range(59)
+        ))
+
+        assert sums == 0
+        assert sum(event is not None for event in awarded) == cap // 2 - 1
+        key = DailyXPCounter.key(test_user.id, EventType.TRANSACTION_IMPORTED, datetime.utcnow().date())
+        # Rejected awards are not counted
+        assert fake_redis.store[key] == cap
+        assert fake_redis.expiry[key].date() > datetime.utcnow().date()
+
+    def test_new_counter_is_seeded_from_database(self, db_session, test_user, fake_redis):
+        db_session.add(GamificationEvent(user_id=test_user.id, event_type=EventType.DAILY_CHECKIN, xp_awarded=3))
+        db_session.commit()
+        counter = DailyXPCounter(redis_client=fake_redis)
+
+        assert not counter.try_add(db_session, test_user.id, EventType.DAILY_CHECKIN, 3, 3)
+        assert counter.try_add(db_session, test_user.id, EventType.TRANSACTION_IMPORTED, 2, 100)
+
+    def test_days_are_counted_separately(self, db_session, test_user, fake_redis):
+        counter = DailyXPCounter(redis_client=fake_redis)
+        monday, tuesday = datetime(2026, 10, 19, 23, 59), datetime(2026, 10, 20, 0, 1)
+
+        assert counter.try_add(db_session, test_user.id, EventType.DAILY_CHECKIN, 3, 3, now=monday)
+        assert not counter.try_add(db_session, test_user.id, EventType.DAILY_CHECKIN, 3, 3, now=monday)
+        assert counter.try_add(db_session, test_user.id, EventType.DAILY_CHECKIN, 3, 3, now=tuesday)
+        assert fake_redis.expiry[DailyXPCounter.key(test_user.id, EventType.DAILY_CHECKIN, monday.date())] == \
+            datetime(2026, 10, 20)
+
+    def test_falls_back_to_database(self, db_session, test_user):
+        fake_redis = FakeRedis(fail=True)
+        service = GamificationService(db_session, xp_counter=DailyXPCounter(redis_client=fake_redis))
+
+        assert service.award_event(test_user.id, EventType.DAILY_CHECKIN) is not None
+        assert service.award_event(test_user.id, EventType.DAILY_CHECKIN) is None
+
+        # Redis is skipped until the retry window passes
+        fake_redis.fail = False
+        assert service.award_event(test_user.id, EventType.DAILY_CHECKIN) is None
+        assert fake_redis.store == {}
+
+    def test_uncapped_events_skip_counter(self, db_session, test_user, service, fake_redis):
+        for _ in range(3):
+            assert service.award_event(test_user.id, EventType.GOAL_CREATED) is not None
+        assert fake_redis.store == {}
+
+
+@pytest.fixture
+def achievements(db_session):
+    seed_achievements(db_session)
+
+
+def earned_codes(db_session, user_id):
+    return {code for (code,) in db_session.query(Achievement.code).join(
+        UserAchievement, UserAchievement.achievement_id == Achievement.id
+    ).filter(UserAchievement.user_id == user_id)}
+
+
+def record_statements(db_session, func):
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    engine = db_session.get_bind()
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        result = func()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return result, statements
+
+
+class TestAwardEvents:
+
+    def test_large_batch_costs_a_handful_of_statements(self, db_session, test_user, service, achievements):
+        user_id = test_user.id
+        events = [(EventType.TRANSACTION_CATEGORIZED, None)] * 1000 + [(EventType.GOAL_CREATED, {"goal_id": 7})]
+
+        awarded, statements = record_statements(db_session, lambda: service.award_events(user_id, events))
+
+        # Cap of 100 XP at 5 XP each
+        assert len(awarded) == 21
+        assert awarded[-1].event_type == EventType.GOAL_CREATED
+        assert awarded[-1].event_metadata == {"goal_id": 7}
+        assert len([s for s in statements if s.startswith("INSERT INTO gamification_events")]) == 1
+        assert len(statements) <= 10
+
+        points = db_session.query(UserPoints).filter_by(user_id=user_id).one()
+        assert points.xp_total == 20 * 5 + 10
+        assert points.level == 2
+        assert earned_codes(db_session, user_id) == {"FIRST_CATEGORIZATION"}
+
+    def test_matches_one_at_a_time(self, db_session, test_user, second_user, achievements):
+        events = [(EventType.GOAL_COMPLETED, None)] * 3 + [(EventType.DAILY_CHECKIN, None)] * 2
+        one_by_one = GamificationService(db_session, xp_counter=DailyXPCounter(redis_client=FakeRedis()))
+        batched = GamificationService(db_session, xp_counter=DailyXPCounter(redis_client=FakeRedis()))
+
+        singles = [one_by_one.award_event(test_user.id, event_type, metadata) for event_type, metadata in events]
+        batch = batched.award_events(second_user.id, events)
+
+        assert [e.xp_awarded for e in batch] == [e.xp_awarded for e in singles if e is not None]
+
+        def profile(user_id):
+            points = db_session.query(UserPoints).filter_by(user_id=user_id).one()
+            return points.xp_total, points.level, earned_codes(db_session, user_id)
+
+        assert profile(second_user.id) == profile(test_user.id)
+        assert profile(test_user.id)[2] == {"GOAL_CRUSHER_BRONZE", "GOAL_CRUSHER_SILVER"}
+
+    def test_fully_capped_batch_writes_nothing(self, db_session, test_user, service):
+        service.award_event(test_user.id, EventType.DAILY_CHECKIN)
+
+        assert service.award_events(test_user.id, [(EventType.DAILY_CHECKIN, None)] * 3) == []
+        assert db_session.query(GamificationEvent).count() == 1